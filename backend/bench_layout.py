@@ -0,0 +1,150 @@
+"""Benchmark the sorted fact-table layout and the metric cube against CSV order.
+Run: python bench_layout.py [--volumes 1 10 100] [--months 58] [--queries 25]
+
+For each volume multiple of today's drop (51 states over 58 months), a synthetic
+drop is written with sample_data.py and built twice: once in CSV order with
+DuckDB's default 122,880-row groups, once with the ETL's sorted layout. Per-id
+history lookups are then profiled against the raw fact tables of both builds and
+against the metric cube /api/history reads, and the rows each table scan had to
+read are reported alongside latency.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import duckdb
+
+import etl
+import main
+import metrics
+from sample_data import write_sample_data
+
+TODAY_STATES = 51
+DEFAULT_ROW_GROUP_ROWS = 122880
+LAYOUTS = {
+    "csv order": {"sort_tables": False, "row_group_rows": DEFAULT_ROW_GROUP_ROWS},
+    "sorted": {"sort_tables": True, "row_group_rows": etl.ETL_ROW_GROUP_ROWS},
+}
+
+
+def table_history_query(dimension_type: str, metric: str, id: str, limit_months: int):
+    """The per-table history SQL the API ran before the metric cube, kept as the baseline."""
+    cfg = metrics.MAP[dimension_type][metric]
+    col = metrics.series_columns(cfg)[0][1]
+    sql = (
+        f"SELECT month, {metrics.value_expr(col)} AS value FROM {cfg['table']} "
+        f"WHERE {cfg['dim']} = ? ORDER BY month DESC LIMIT ?"
+    )
+    return f"SELECT * FROM ({sql}) ORDER BY month", [id, limit_months]
+
+
+def rows_scanned(con: duckdb.DuckDBPyConnection, sql: str, params: List, profile_path: Path) -> int:
+    """Run `sql` with JSON profiling on and sum the rows read by its table scans."""
+    con.execute("SET enable_profiling='json'")
+    con.execute(f"SET profiling_output='{profile_path}'")
+    con.execute(sql, params).fetchall()
+    con.execute("SET enable_profiling='no_output'")
+    profile = json.loads(profile_path.read_text())
+
+    def walk(node) -> int:
+        own = node.get("operator_rows_scanned", 0) if node.get("operator_type") == "TABLE_SCAN" else 0
+        return own + sum(walk(child) for child in node.get("children", []))
+
+    return walk(profile)
+
+
+def history_workload(con: duckdb.DuckDBPyConnection, count: int, seed: int) -> Dict[str, List[tuple]]:
+    """Up to `count` random (dimension_type, metric, id) lookups per metric, grouped by dimension type."""
+    rng = random.Random(seed)
+    workload: Dict[str, List[tuple]] = {}
+    for dimension_type in ("sector", "state", "soc"):
+        for metric, cfg in metrics.MAP[dimension_type].items():
+            ids = [r[0] for r in con.execute(f"SELECT DISTINCT {cfg['dim']} FROM {cfg['table']} ORDER BY 1").fetchall()]
+            for entity in rng.sample(ids, min(count, len(ids))):
+                workload.setdefault(dimension_type, []).append((dimension_type, metric, entity))
+    return workload
+
+
+def cube_history_query(dimension_type: str, metric: str, id: str, limit_months: int):
+    return main.series_query(dimension_type, metric, id, True, limit_months)
+
+
+def profile_lookups(con, layout: str, workload: Dict[str, List[tuple]], make_query, volume: int, workdir: Path) -> List[Dict]:
+    results = []
+    for dimension_type, lookups in workload.items():
+        table = metrics.MAP[dimension_type]["employment"]["table"]
+        table_rows = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        scanned, latencies = [], []
+        for sql, params in (make_query(*lookup, 12) for lookup in lookups):
+            scanned.append(rows_scanned(con, sql, params, workdir / "profile.json"))
+            began = time.perf_counter()
+            con.execute(sql, params).fetchall()
+            latencies.append((time.perf_counter() - began) * 1000)
+        results.append(
+            {
+                "volume": volume,
+                "layout": layout,
+                "dimension_type": dimension_type,
+                "table_rows": table_rows,
+                "queries": len(lookups),
+                "avg_rows_scanned": round(statistics.mean(scanned)),
+                "p50_ms": round(statistics.median(latencies), 3),
+                "p95_ms": round(sorted(latencies)[max(0, math.ceil(len(latencies) * 0.95) - 1)], 3),
+            }
+        )
+    return results
+
+
+def run_volume(volume: int, months: int, queries: int, workdir: Path) -> List[Dict]:
+    data_dir = workdir / f"x{volume}" / "rpls_data"
+    started = time.perf_counter()
+    write_sample_data(data_dir, months=months, scale=math.ceil(TODAY_STATES * volume / 5), granular=False)
+    print(f"[{volume}x] wrote sample drop in {time.perf_counter() - started:.1f}s")
+    etl.DATA_DIR = data_dir
+    results: List[Dict] = []
+    workload = None
+    for layout, options in LAYOUTS.items():
+        etl.DB_PATH = main.DB_PATH = workdir / f"x{volume}" / f"{layout.replace(' ', '_')}.duckdb"
+        etl.build_db(force=True, **options)
+        with main.get_con() as con:
+            workload = workload or history_workload(con, queries, seed=volume)
+            results += profile_lookups(con, layout, workload, table_history_query, volume, workdir)
+            if options["sort_tables"]:
+                results += profile_lookups(con, "cube", workload, cube_history_query, volume, workdir)
+    return results
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--volumes", type=int, nargs="+", default=[1, 10, 100], help="multiples of today's volume")
+    parser.add_argument("--months", type=int, default=58, help="months of history in the synthetic drop")
+    parser.add_argument("--queries", type=int, default=25, help="ids sampled per dimension/metric")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rpls-bench-") as tmp:
+        os.environ.setdefault(etl.staging.STAGING_ENV, str(Path(tmp) / "staging"))
+        results = [row for volume in args.volumes for row in run_volume(volume, args.months, args.queries, Path(tmp))]
+
+    print(
+        f"\n{'volume':>6}  {'layout':<10} {'dimension':<9} {'rows/table':>10} {'queries':>7} "
+        f"{'rows scanned':>12} {'p50 ms':>8} {'p95 ms':>8}"
+    )
+    for row in results:
+        print(
+            f"{row['volume']:>5}x  {row['layout']:<10} {row['dimension_type']:<9} {row['table_rows']:>10} "
+            f"{row['queries']:>7} {row['avg_rows_scanned']:>12} {row['p50_ms']:>8} {row['p95_ms']:>8}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,96 @@
+"""Benchmark the Supabase ETL's sinks against each other on the same synthetic drop.
+Run: python bench_sinks.py [--sinks duckdb sqlite parquet rest] [--states 51] [--months 24]
+
+A drop is written with sample_data.py and loaded in full (fresh snapshot, no delta)
+once per sink: the local DuckDB, SQLite and Parquet sinks, and the REST uploader
+against the in-process PostgREST stub (postgrest_stub.py, with --latency ms added
+to every request to stand in for the network). Reported per sink: rows written,
+seconds spent in the sink's load stage, load rows/s, and the whole run's wall time.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from supabase import create_client
+
+import etl_supabase
+import sinks
+import staging
+from postgrest_stub import PostgrestStub
+from sample_data import write_sample_data
+
+LOCAL_SINKS = ["duckdb", "sqlite", "parquet"]
+
+
+def load_once(name: str, sink: sinks.Sink, data_dir: Path, workdir: Path) -> Dict:
+    etl_supabase.DATA_DIR = data_dir
+    etl_supabase.DRY_RUN = False
+    etl_supabase.DELTA = False
+    etl_supabase.sink = sink
+    etl_supabase.TEMP_DIR = workdir / "duckdb_tmp"
+    etl_supabase.SNAPSHOT_PATH = workdir / f"snapshot-{name}.duckdb"
+    started = time.perf_counter()
+    etl_supabase.run_etl()
+    wall = time.perf_counter() - started
+    loads = [s for s in etl_supabase.profiler.stages if s.name == sink.stage]
+    rows = sum(s.rows_out or 0 for s in loads)
+    seconds = sum(s.wall_seconds for s in loads)
+    return {
+        "sink": name,
+        "tables": len(loads),
+        "rows": rows,
+        "load_seconds": round(seconds, 2),
+        "rows_per_second": round(rows / seconds) if seconds else None,
+        "run_seconds": round(wall, 2),
+    }
+
+
+def run(names: List[str], states: int, months: int, latency_ms: float, workdir: Path) -> List[Dict]:
+    data_dir = workdir / "rpls_data"
+    started = time.perf_counter()
+    write_sample_data(data_dir, months=months, scale=states)
+    print(f"wrote sample drop in {time.perf_counter() - started:.1f}s")
+    results = []
+    for name in names:
+        if name == "rest":
+            with PostgrestStub(latency=latency_ms / 1000) as stub:
+                stub.constraints.update({t: [c] for t, c in etl_supabase.CONFLICT_TARGETS.items()})
+                results.append(load_once(name, sinks.RestSink(create_client(stub.url, "bench")), data_dir, workdir))
+            continue
+        sink = sinks.local_sink(name, workdir / "sinks" / sinks.LOCAL_PATHS[name])
+        try:
+            results.append(load_once(name, sink, data_dir, workdir))
+        finally:
+            sink.close()
+    return results
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sinks", nargs="+", default=LOCAL_SINKS + ["rest"], choices=LOCAL_SINKS + ["rest"])
+    parser.add_argument("--states", type=int, default=51, help="states in the synthetic drop (volume scales with it)")
+    parser.add_argument("--months", type=int, default=24, help="months of history in the synthetic drop")
+    parser.add_argument("--latency", type=float, default=0.0, help="ms added to every REST stub request")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rpls-bench-") as tmp:
+        os.environ.setdefault(staging.STAGING_ENV, str(Path(tmp) / "staging"))
+        results = run(args.sinks, args.states, args.months, args.latency, Path(tmp))
+
+    print(f"\n{'sink':<8} {'tables':>6} {'rows':>10} {'load s':>8} {'rows/s':>10} {'run s':>8}")
+    for row in results:
+        print(
+            f"{row['sink']:<8} {row['tables']:>6} {row['rows']:>10} {row['load_seconds']:>8} "
+            f"{row['rows_per_second'] or '-':>10} {row['run_seconds']:>8}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,150 @@
+"""
+Column-wise row cleaning for etl_supabase.py
+--------------------------------------------
+Rows travel from DuckDB to the sinks as Arrow tables, and every per-row step
+the loader used to run cell by cell in Python works on whole columns instead:
+
+    sanitize()      NaN/inf floats and "nan"/"inf" strings -> null
+    normalize()     the above plus trimmed strings, blanks -> null
+    KeyFilter       first-occurrence dedupe on 64-bit key hashes, across chunks
+    json_rows()     each row as a JSON object, rendered by DuckDB's to_json
+
+Python row lists (dimension and summary tables) are converted with
+to_table() and take the same path.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Strings the sources use for missing numbers; matched case-insensitively
+NAN_STRINGS = pa.array(["nan", "inf", "-inf", "infinity", "-infinity"])
+
+Chunk = Union[pa.Table, pa.RecordBatch]
+_local = threading.local()
+
+
+def _duckdb() -> duckdb.DuckDBPyConnection:
+    # One scratch connection per thread for hashing and JSON rendering
+    con = getattr(_local, "con", None)
+    if con is None:
+        con = _local.con = duckdb.connect(config={"threads": 1})
+    return con
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def to_table(chunk: Union[Chunk, Sequence[Sequence]], columns: Sequence[str]) -> pa.Table:
+    """Arrow table named `columns` from a record batch/table (by position) or a list of rows."""
+    if isinstance(chunk, pa.RecordBatch):
+        chunk = pa.Table.from_batches([chunk])
+    if isinstance(chunk, pa.Table):
+        return pa.table(chunk.columns[: len(columns)], names=list(columns))
+    arrays = [pa.array(values) for values in zip(*chunk)] if chunk else []
+    if not arrays:
+        arrays = [pa.nulls(0) for _ in columns]
+    return pa.table(arrays[: len(columns)], names=list(columns))
+
+
+def tables(rows: Iterable, columns: Sequence[str], size: int) -> Iterator[pa.Table]:
+    """Arrow tables of at most `size` rows from an iterable of record batches/tables or of rows."""
+    pending: List[Sequence] = []
+    for item in rows:
+        if isinstance(item, (pa.RecordBatch, pa.Table)):
+            table = to_table(item, columns)
+            for offset in range(0, table.num_rows, size):
+                yield table.slice(offset, size)
+            continue
+        pending.append(item)
+        if len(pending) >= size:
+            yield to_table(pending, columns)
+            pending = []
+    if pending:
+        yield to_table(pending, columns)
+
+
+def _null_where(column: pa.ChunkedArray, mask) -> pa.ChunkedArray:
+    return pc.if_else(mask, pa.scalar(None, column.type), column)
+
+
+def _is_text(column) -> bool:
+    return pa.types.is_string(column.type) or pa.types.is_large_string(column.type)
+
+
+def sanitize(table: pa.Table) -> pa.Table:
+    """Null out non-finite floats and the NaN/inf spellings in text columns."""
+    columns = []
+    for column in table.columns:
+        if pa.types.is_floating(column.type):
+            column = _null_where(column, pc.invert(pc.is_finite(column)))
+        elif _is_text(column):
+            column = _null_where(column, pc.is_in(pc.utf8_lower(column), value_set=NAN_STRINGS))
+        columns.append(column)
+    return pa.table(columns, names=table.column_names)
+
+
+def normalize(table: pa.Table) -> pa.Table:
+    """sanitize() plus surrounding whitespace trimmed from text, and empty text as null."""
+    columns = []
+    for column in sanitize(table).columns:
+        if _is_text(column):
+            column = pc.utf8_trim_whitespace(column)
+            column = _null_where(column, pc.equal(column, ""))
+        columns.append(column)
+    return pa.table(columns, names=table.column_names)
+
+
+def hash_columns(table: pa.Table, columns: Sequence[str]) -> np.ndarray:
+    """Unsigned 64-bit hash per row of the given columns (NULLs hash alike whatever their type)."""
+    con = _duckdb()
+    con.register("hash_input", table)
+    try:
+        result = con.execute(f"SELECT hash({', '.join(map(quote, columns))}) FROM hash_input").fetchnumpy()
+    finally:
+        con.unregister("hash_input")
+    return np.asarray(next(iter(result.values())), dtype=np.uint64)
+
+
+class KeyFilter:
+    """Remembers the key hashes it has seen; keep() marks the first occurrence of each new key."""
+
+    def __init__(self) -> None:
+        self.seen = np.empty(0, np.uint64)
+
+    def keep(self, hashes: np.ndarray) -> np.ndarray:
+        keys, first = np.unique(hashes, return_index=True)
+        if len(self.seen):
+            pos = np.minimum(np.searchsorted(self.seen, keys), len(self.seen) - 1)
+            new = self.seen[pos] != keys
+        else:
+            new = np.ones(len(keys), bool)
+        # Both runs are sorted, so the stable sort is a linear merge
+        self.seen = np.sort(np.concatenate([self.seen, keys[new]]), kind="stable")
+        mask = np.zeros(len(hashes), bool)
+        mask[first[new]] = True
+        return mask
+
+
+def rows(table: pa.Table) -> Iterator[Tuple]:
+    """Python row tuples of an Arrow table (for sinks that take rows)."""
+    return zip(*(column.to_pylist() for column in table.columns))
+
+
+def json_rows(table: pa.Table) -> pa.StringArray:
+    """One JSON object per row, keyed by column name, rendered by DuckDB's to_json."""
+    con = _duckdb()
+    con.register("json_input", table)
+    try:
+        reader = con.execute("SELECT to_json(json_input)::VARCHAR FROM json_input").arrow()
+        rendered = reader.read_all() if hasattr(reader, "read_all") else reader
+    finally:
+        con.unregister("json_input")
+    return rendered.column(0).combine_chunks()
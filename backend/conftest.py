@@ -0,0 +1,27 @@
+"""Shared pytest fixtures: a small synthetic copy of the RPLS CSV drop."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from sample_data import write_sample_data
+
+
+@pytest.fixture
+def sample_data_dir(tmp_path: Path) -> Path:
+    return write_sample_data(tmp_path / "rpls_data")
+
+
+@pytest.fixture
+def sample_db(sample_data_dir: Path, tmp_path: Path, monkeypatch) -> Path:
+    """Build a DuckDB file from the synthetic drop and point the API at it."""
+    import etl
+    import main
+
+    db_path = tmp_path / "rpls.duckdb"
+    monkeypatch.setattr(etl, "DATA_DIR", sample_data_dir)
+    monkeypatch.setattr(etl, "DB_PATH", db_path)
+    etl.build_db()
+    monkeypatch.setattr(main, "DB_PATH", db_path)
+    return db_path
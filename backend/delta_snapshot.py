@@ -0,0 +1,318 @@
+"""
+Row-hash snapshot of what etl_supabase.py last loaded, for delta uploads
+-----------------------------------------------------------------------
+For every target table the snapshot keeps one (natural key, content hash)
+pair per row, as of the last load that fully succeeded. A new run hashes its
+sanitized rows the same way, chunk by chunk as they stream past, and sorts
+them into:
+
+    inserts  keys not in the snapshot
+    updates  keys whose row hash changed
+    deletes  snapshot keys the run no longer produces
+
+Only inserts + updates are uploaded (and deletes applied); the snapshot for a
+table is replaced only after all of that succeeded, so a failed load is simply
+re-sent next time. Snapshots are scoped per destination (Supabase project or
+Postgres URL), so switching targets starts from a full load.
+
+Chunks arrive as Arrow tables and are hashed column-wise by DuckDB's hash().
+Lookups go against the table's previous (key hash, row hash) pairs held as two
+sorted numpy arrays (16 bytes a row); the run's own keys are appended to a
+DuckDB table, which spills to disk, for the delete and commit steps.
+
+The hashes are only comparable within one hashing scheme (DuckDB version), so
+a snapshot written under another one is discarded on open: the next load of
+every table is then a full one, with nothing deleted.
+
+Within a load, every batch the sink confirms is journalled at once (its key
+and row hashes) together with the tables that finished, so an interrupted run
+can be resumed: finished tables are skipped, and rows of the interrupted table
+that already reached the target count as sent. A table's journal entries are
+folded away when its snapshot is committed; run_etl() clears the journal at
+the start of every run that is not a resume.
+
+The snapshot is a DuckDB file, `<data dir>/.supabase_snapshot.duckdb` unless
+SUPABASE_SNAPSHOT_PATH is set. Delete it (or run with SUPABASE_DELTA=0) after
+editing the remote tables by hand.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Sequence
+from urllib.parse import urlsplit
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+
+import columnar
+
+SNAPSHOT_TABLE = "row_snapshot"
+SNAPSHOT_COLUMNS = [
+    ("scope", "VARCHAR"),
+    ("table_name", "VARCHAR"),
+    ("key_hash", "UBIGINT"),
+    ("row_hash", "UBIGINT"),
+    ("row_key", "VARCHAR"),
+]
+META_TABLE = "snapshot_meta"
+# Resume journal: rows confirmed by the target during the current run, and the tables it finished
+CHECKPOINT_ROWS = "checkpoint_rows"
+CHECKPOINT_TABLES = "checkpoint_tables"
+HASH_SCHEME = f"duckdb-hash/{duckdb.__version__}"
+_pending_ids = itertools.count()
+
+
+def target_scope(target: str) -> str:
+    """Short id for a destination URL, so snapshots of different databases never mix."""
+    parts = urlsplit(target)
+    # Leave out the password: rotating credentials should not force a full reload
+    ident = f"{parts.scheme}://{parts.username or ''}@{parts.hostname or ''}:{parts.port or ''}{parts.path}"
+    return hashlib.sha1(ident.encode()).hexdigest()[:12]
+
+
+@dataclass
+class Delta:
+    table: str
+    key_columns: List[str]
+    rows: int = 0
+    inserts: int = 0
+    updates: int = 0
+    # Natural keys (one list of values per row) present last time but not now
+    deleted_keys: List[list] = field(default_factory=list)
+
+    @property
+    def unchanged(self) -> int:
+        return self.rows - self.inserts - self.updates
+
+    def summary(self) -> str:
+        return f"+{self.inserts} ~{self.updates} -{len(self.deleted_keys)} ={self.unchanged}"
+
+
+class TableDiff:
+    """Streaming diff of one table's rows against its snapshot: add() chunks, then finish() and commit()."""
+
+    def __init__(self, snapshot: "DeltaSnapshot", table: str, columns: Sequence[str], key_columns: Sequence[str]):
+        self.snapshot = snapshot
+        # A connection of its own, so tables loading in parallel can diff at the same time
+        self.con = snapshot.cursor()
+        self.columns = list(columns)
+        self.key_columns = list(key_columns)
+        self.delta = Delta(table, list(key_columns))
+        self.pending = f"pending_rows_{next(_pending_ids)}"
+        self.known_keys, self.known_hashes = self._hash_pairs(SNAPSHOT_TABLE)
+        self.confirmed_keys, self.confirmed_hashes = self._hash_pairs(CHECKPOINT_ROWS)
+        # Rows of the last add()ed chunk that the journal shows as already sent (see select())
+        self.confirmed = np.zeros(0, bool)
+        self.con.execute(
+            f"CREATE TEMP TABLE {self.pending} (idx BIGINT, key_hash UBIGINT, row_hash UBIGINT, row_key VARCHAR)"
+        )
+
+    def _hash_pairs(self, source: str) -> tuple:
+        pairs = self.con.execute(
+            f"SELECT key_hash, row_hash FROM {source} WHERE scope = ? AND table_name = ? ORDER BY key_hash",
+            [self.snapshot.scope, self.delta.table],
+        ).fetchnumpy()
+        return np.asarray(pairs["key_hash"], dtype=np.uint64), np.asarray(pairs["row_hash"], dtype=np.uint64)
+
+    def _hash(self, chunk: pa.Table, start: int = 0) -> pa.Table:
+        """(idx, key_hash, row_hash, row_key) per row of `chunk`, numbered from `start`."""
+        keys = ", ".join(map(columnar.quote, self.key_columns))
+        values = ", ".join(map(columnar.quote, self.columns))
+        numbered = chunk.append_column("_etl_idx", pa.array(np.arange(start, start + chunk.num_rows), pa.int64()))
+        self.con.register("chunk_rows", numbered)
+        try:
+            # Hash the column names too, so a changed column list re-sends everything
+            reader = self.con.execute(
+                f"""
+                SELECT _etl_idx AS idx, hash({keys}) AS key_hash, hash({values}, ?) AS row_hash,
+                       json_array({keys})::VARCHAR AS row_key
+                FROM chunk_rows ORDER BY _etl_idx
+                """,
+                [",".join(self.columns)],
+            ).arrow()
+            # The reader is lazy: drain it while the chunk is still registered
+            return reader.read_all() if hasattr(reader, "read_all") else reader
+        finally:
+            self.con.unregister("chunk_rows")
+
+    @staticmethod
+    def _match(keys: np.ndarray, hashes: np.ndarray, key_hashes: np.ndarray, row_hashes: np.ndarray) -> tuple:
+        """(key found, row hash differs) masks of the given rows against sorted (keys, hashes)."""
+        if not len(keys):
+            found = np.zeros(len(key_hashes), bool)
+            return found, ~found
+        # Past-the-end positions clip to the last key, which then simply does not match
+        pos = np.minimum(np.searchsorted(keys, key_hashes), len(keys) - 1)
+        found = keys[pos] == key_hashes
+        return found, ~found | (hashes[pos] != row_hashes)
+
+    def add(self, chunk: pa.Table) -> np.ndarray:
+        """Record a chunk of the run's rows; returns a mask of the ones that changed since the snapshot."""
+        hashed = self._hash(chunk, self.delta.rows)
+        key_hashes = hashed.column("key_hash").to_numpy()
+        row_hashes = hashed.column("row_hash").to_numpy()
+
+        found, changed = self._match(self.known_keys, self.known_hashes, key_hashes, row_hashes)
+        self.delta.inserts += int((~found).sum())
+        self.delta.updates += int((found & changed).sum())
+        self.delta.rows += hashed.num_rows
+        sent, differs = self._match(self.confirmed_keys, self.confirmed_hashes, key_hashes, row_hashes)
+        self.confirmed = sent & ~differs
+
+        self.con.register("hashed_rows", hashed)
+        try:
+            self.con.execute(f"INSERT INTO {self.pending} SELECT idx, key_hash, row_hash, row_key FROM hashed_rows")
+        finally:
+            self.con.unregister("hashed_rows")
+        return changed
+
+    def select(self, chunk: pa.Table, delta: bool = True) -> pa.Table:
+        """add() a chunk and return the rows still to send: the changed ones (all of them without
+        `delta`), less those the journal shows an interrupted run already sent."""
+        changed = self.add(chunk)
+        keep = (changed if delta else np.ones(len(changed), bool)) & ~self.confirmed
+        return chunk if keep.all() else chunk.filter(pa.array(keep))
+
+    def confirm(self, rows: pa.Table) -> None:
+        """Journal rows the target has accepted, so a resumed run does not send them again."""
+        hashed = self._hash(rows)
+        self.con.register("confirmed_rows", hashed)
+        try:
+            self.con.execute(
+                f"INSERT INTO {CHECKPOINT_ROWS} SELECT ?, ?, key_hash, row_hash FROM confirmed_rows",
+                [self.snapshot.scope, self.delta.table],
+            )
+        finally:
+            self.con.unregister("confirmed_rows")
+
+    def finish(self) -> Delta:
+        """Work out the deletes once every row has been added."""
+        deleted = self.con.execute(
+            f"""
+            SELECT s.row_key FROM {SNAPSHOT_TABLE} s
+            WHERE s.scope = ? AND s.table_name = ?
+              AND s.key_hash NOT IN (SELECT key_hash FROM {self.pending})
+            ORDER BY s.row_key
+            """,
+            [self.snapshot.scope, self.delta.table],
+        ).fetchall()
+        self.delta.deleted_keys = [json.loads(key) for (key,) in deleted]
+        return self.delta
+
+    def commit(self) -> None:
+        """Record the run's rows as loaded (last row wins for repeated keys)."""
+        scope, table = self.snapshot.scope, self.delta.table
+        try:
+            self.con.execute("BEGIN")
+            self.con.execute(f"DELETE FROM {SNAPSHOT_TABLE} WHERE scope = ? AND table_name = ?", [scope, table])
+            self.con.execute(
+                f"""
+                INSERT INTO {SNAPSHOT_TABLE}
+                SELECT ?, ?, key_hash, arg_max(row_hash, idx), arg_max(row_key, idx)
+                FROM {self.pending} GROUP BY key_hash
+                """,
+                [scope, table],
+            )
+            self.con.execute(f"DELETE FROM {CHECKPOINT_ROWS} WHERE scope = ? AND table_name = ?", [scope, table])
+            self.snapshot.mark_done(table, self.con)
+            self.con.execute("COMMIT")
+        except Exception:
+            self.con.execute("ROLLBACK")
+            raise
+
+    def close(self) -> None:
+        self.con.execute(f"DROP TABLE IF EXISTS {self.pending}")
+        self.con.close()
+
+
+class DeltaSnapshot:
+    def __init__(self, path: Path, target: str, memory_limit_mb: Optional[int] = None):
+        self.path = path
+        self.scope = target_scope(target)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = duckdb.connect(str(path))
+        # Table diffs work on cursors of their own; calls on self.con from their threads take the lock
+        self._lock = threading.Lock()
+        if memory_limit_mb:
+            self.con.execute(f"SET memory_limit = '{memory_limit_mb}MB'")
+        layout = self.con.execute(
+            "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position",
+            [SNAPSHOT_TABLE],
+        ).fetchall()
+        self.con.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (hash_scheme VARCHAR)")
+        scheme = self.con.execute(f"SELECT hash_scheme FROM {META_TABLE}").fetchone()
+        if layout and (layout != SNAPSHOT_COLUMNS or scheme != (HASH_SCHEME,)):
+            # Older layout or hashes: start over (the next load of each table is a full one)
+            self.con.execute(f"DROP TABLE {SNAPSHOT_TABLE}")
+            self.con.execute(f"DROP TABLE IF EXISTS {CHECKPOINT_ROWS}")
+        self.con.execute(f"DELETE FROM {META_TABLE}")
+        self.con.execute(f"INSERT INTO {META_TABLE} VALUES (?)", [HASH_SCHEME])
+        self.con.execute(
+            f"CREATE TABLE IF NOT EXISTS {SNAPSHOT_TABLE} ("
+            + ", ".join(f"{name} {kind}" for name, kind in SNAPSHOT_COLUMNS)
+            + ")"
+        )
+        self.con.execute(
+            f"CREATE TABLE IF NOT EXISTS {CHECKPOINT_ROWS} "
+            "(scope VARCHAR, table_name VARCHAR, key_hash UBIGINT, row_hash UBIGINT)"
+        )
+        self.con.execute(f"CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLES} (scope VARCHAR, table_name VARCHAR)")
+
+    def close(self) -> None:
+        self.con.close()
+
+    def cursor(self) -> duckdb.DuckDBPyConnection:
+        with self._lock:
+            return self.con.cursor()
+
+    def has_checkpoint(self) -> bool:
+        """Whether an interrupted run left anything in the journal to resume from."""
+        return any(
+            self.con.execute(f"SELECT 1 FROM {name} WHERE scope = ? LIMIT 1", [self.scope]).fetchone()
+            for name in (CHECKPOINT_ROWS, CHECKPOINT_TABLES)
+        )
+
+    def completed(self) -> set:
+        """Tables the journalled run finished loading."""
+        rows = self.con.execute(f"SELECT table_name FROM {CHECKPOINT_TABLES} WHERE scope = ?", [self.scope]).fetchall()
+        return {table for (table,) in rows}
+
+    def mark_done(self, table: str, con: Optional[duckdb.DuckDBPyConnection] = None) -> None:
+        """Journal `table` as finished (inside `con`'s transaction, if given)."""
+        if con is not None:
+            con.execute(f"INSERT INTO {CHECKPOINT_TABLES} VALUES (?, ?)", [self.scope, table])
+            return
+        with self._lock:
+            self.con.execute(f"INSERT INTO {CHECKPOINT_TABLES} VALUES (?, ?)", [self.scope, table])
+
+    def clear_checkpoint(self) -> None:
+        """Start a new journal (a fresh run, or the last one completed)."""
+        for name in (CHECKPOINT_ROWS, CHECKPOINT_TABLES):
+            self.con.execute(f"DELETE FROM {name} WHERE scope = ?", [self.scope])
+
+    def diff(self, table: str, columns: Sequence[str], key_columns: Sequence[str]) -> TableDiff:
+        with self._lock:
+            stored = self.con.execute(
+                f"SELECT json_array_length(row_key) FROM {SNAPSHOT_TABLE} WHERE scope = ? AND table_name = ? LIMIT 1",
+                [self.scope, table],
+            ).fetchone()
+        if stored and stored[0] != len(key_columns):
+            # Keyed on other columns (CONFLICT_TARGETS changed): nothing to diff or delete by, so send it all
+            print(f"Snapshot of {table} has another key; loading it in full")
+            self.forget([table])
+        return TableDiff(self, table, columns, key_columns)
+
+    def forget(self, tables: Sequence[str]) -> None:
+        """Drop snapshots of tables that were wiped remotely, so their next load is complete."""
+        with self._lock:
+            self.con.execute(
+                f"DELETE FROM {SNAPSHOT_TABLE} WHERE scope = ? AND list_contains(?, table_name)",
+                [self.scope, list(tables)],
+            )
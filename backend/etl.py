@@ -1,16 +1,68 @@
 """Build DuckDB from RPLS CSVs.
-Run: python etl.py
+Run: python etl.py [--force] [--threads N] [--memory-mb N] [--split-mb N] [--row-group-rows N]
+
+Rebuilds are incremental: a manifest of per-file size, mtime and sha256 is kept in
+the DB and only changed CSVs (plus the metadata rows and top-mover views that
+depend on them) are re-ingested. --force rebuilds everything.
+
+Ingestion runs as a small task graph on a bounded thread pool: small files are
+read whole by DuckDB, large ones are split into newline-aligned byte ranges that
+are parsed concurrently and appended back in file order, so the result matches a
+serial build row for row. Sources stored as .csv.gz/.csv.zst are decompressed as a
+stream by DuckDB (never split). Parsed tables are written to the shared Parquet staging
+cache (staging.py); a file whose content was staged before is loaded from Parquet
+without parsing the CSV at all.
+
+Every per-dimension fact table is stored physically ordered by its dimension
+column and month (SORT_KEYS), in row groups of ETL_ROW_GROUP_ROWS rows, so the
+per-id lookups in /api/history and /api/query skip all but a row group or two
+via DuckDB's min/max zone maps. Tables ingested before this layout existed keep
+CSV order until their next re-ingest (or --force).
+
+Finally every MAP series is rolled up into one typed, long-format table
+(metrics.CUBE_TABLE) with its previous-month value and percent change, which
+is what /api/query, /api/history, /api/top-movers and the heatmaps read.
+
+Each run writes a stage profile (wall/CPU time, peak RSS, rows, bytes) via
+etl_profile.py; `python etl_profile.py compare` diffs the last two runs.
 """
+import argparse
+import io
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import duckdb
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+import metrics
+import staging
+from etl_profile import RunProfiler
 
 ROOT = Path(__file__).resolve().parents[2]
-DATA_DIR = ROOT / "rpls_data"
+DATA_DIR = Path(os.environ.get("RPLS_DATA_DIR", ROOT / "rpls_data"))
 DB_PATH = Path(__file__).resolve().parent / "rpls.duckdb"
+MANIFEST_TABLE = "_etl_manifest"
+
+# Ingestion budgets: worker threads, DuckDB memory, and the file size above which a CSV is split by byte range
+ETL_THREADS = int(os.environ.get("ETL_THREADS", "4"))
+ETL_MEMORY_MB = int(os.environ.get("ETL_MEMORY_MB", "2048"))
+ETL_SPLIT_MB = int(os.environ.get("ETL_SPLIT_MB", "64"))
+MIN_CHUNK_BYTES = 4 << 20
+# Rows per DuckDB row group (the zone-map granularity); a multiple of the 2048-row vector size
+ETL_ROW_GROUP_ROWS = int(os.environ.get("ETL_ROW_GROUP_ROWS", "16384"))
+
+# Physical sort order per fact table: the MAP dimension column the API filters on, then month
+SORT_KEYS: Dict[str, Tuple[str, ...]] = {
+    cfg["table"]: (cfg["dim"], "month") if cfg["dim"] else ("month",)
+    for metric_map in metrics.MAP.values()
+    for cfg in metric_map.values()
+}
 
 # Tables with (view_name, table, dimension, value_col, needs_money_cleanup)
 TOP_MOVER_TARGETS: List[Tuple[str, str, str, str, bool]] = [
@@ -26,77 +78,511 @@ TOP_MOVER_TARGETS: List[Tuple[str, str, str, str, bool]] = [
 ]
 
 
-def build_db():
-    if not DATA_DIR.exists():
-        raise FileNotFoundError(f"Data dir not found: {DATA_DIR}")
+def source_files() -> Dict[str, Path]:
+    """Map table name -> CSV path (plain, .csv.gz or .csv.zst) for every source in DATA_DIR."""
+    return staging.find_sources(DATA_DIR)
 
-    if not DB_PATH.parent.exists():
-        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-    con = duckdb.connect(str(DB_PATH))
-    con.execute("PRAGMA threads=4")
-    ingested_at = int(time.time())
-    csv_files = [p for p in DATA_DIR.glob("*.csv") if p.name != "__MACOSX"]
-    table_names = []
-    for csv_path in csv_files:
-        table = csv_path.stem.lower()
-        table_names.append(table)
-        print(f"Ingesting {csv_path.name} -> {table}")
-        con.execute(
-            f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM read_csv_auto(?, header=True, all_varchar=True, sample_size=-1)",
-            [str(csv_path)],
+def load_manifest(con: duckdb.DuckDBPyConnection) -> Dict[str, Tuple[str, int, int, str]]:
+    con.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+          table_name VARCHAR PRIMARY KEY, source_file VARCHAR, size BIGINT, mtime_ns BIGINT,
+          sha256 VARCHAR, ingested_at BIGINT
         )
-    # Build metadata after all tables exist
-    metadata_rows = []
-    for table, csv_path in zip(table_names, csv_files):
+        """
+    )
+    rows = con.execute(f"SELECT table_name, source_file, size, mtime_ns, sha256 FROM {MANIFEST_TABLE}").fetchall()
+    return {r[0]: tuple(r[1:]) for r in rows}
+
+
+def connect_db(path: Path, row_group_rows: int) -> duckdb.DuckDBPyConnection:
+    """Open the DuckDB file for writing; the row group size is an ATTACH option and is not persisted."""
+    con = duckdb.connect()
+    escaped = str(path).replace("'", "''")
+    con.execute(f"ATTACH '{escaped}' AS rpls (ROW_GROUP_SIZE {row_group_rows})")
+    con.execute("USE rpls")
+    return con
+
+
+def existing_tables(con: duckdb.DuckDBPyConnection) -> set:
+    return {
+        r[0]
+        for r in con.execute(
+            "SELECT table_name FROM information_schema.tables "
+            "WHERE table_catalog=current_database() AND table_schema='main' AND table_type='BASE TABLE'"
+        ).fetchall()
+    }
+
+
+def plan_changes(con: duckdb.DuckDBPyConnection, sources: Dict[str, Path], force: bool):
+    """Split sources into (changed, unchanged, touched, removed) against the stored manifest.
+
+    Size+mtime matches skip hashing entirely; files whose mtime moved but whose
+    content hash is unchanged are "touched" and only get their manifest row refreshed.
+    """
+    manifest = load_manifest(con)
+    tables = existing_tables(con)
+    changed: Dict[str, Optional[str]] = {}
+    unchanged: List[str] = []
+    touched: Dict[str, str] = {}
+    for table, path in sources.items():
+        stat = path.stat()
+        prev = manifest.get(table)
+        if force or prev is None or table not in tables:
+            changed[table] = None
+            continue
+        _, prev_size, prev_mtime, prev_sha = prev
+        if stat.st_size == prev_size and stat.st_mtime_ns == prev_mtime:
+            unchanged.append(table)
+            continue
+        sha = staging.content_hash(path)
+        if sha == prev_sha:
+            touched[table] = sha
+            unchanged.append(table)
+        else:
+            changed[table] = sha
+    removed = sorted(set(manifest) - set(sources))
+    return changed, unchanged, touched, removed
+
+
+def record_manifest(con, table: str, path: Path, sha: Optional[str], ingested_at: int) -> None:
+    stat = path.stat()
+    con.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE table_name = ?", [table])
+    con.execute(
+        f"INSERT INTO {MANIFEST_TABLE} VALUES (?, ?, ?, ?, ?, ?)",
+        [table, path.name, stat.st_size, stat.st_mtime_ns, sha or staging.content_hash(path), ingested_at],
+    )
+
+
+@dataclass
+class IngestTask:
+    """One source file to ingest; `ranges` is empty when DuckDB reads the whole file or its staged copy."""
+
+    table: str
+    path: Path
+    sha: Optional[str]
+    staged: Optional[Path] = None
+    ranges: List[Tuple[int, int]] = field(default_factory=list)
+    columns: List[str] = field(default_factory=list)
+    delimiter: str = ","
+    quote: str = '"'
+    parse_seconds: float = 0.0
+    rows: int = 0
+    started: float = 0.0
+    finished: float = 0.0
+
+
+def split_ranges(path: Path, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """Newline-aligned (start, end) byte ranges of roughly `chunk_bytes`, never cutting a quoted field.
+
+    Boundaries are only placed on a newline where the running count of quote
+    characters is even, so embedded newlines inside quotes stay in one range.
+    """
+    size = path.stat().st_size
+    ranges: List[Tuple[int, int]] = []
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = pos = len(header)
+        quotes = header.count(b'"')
+        while pos < size:
+            block = f.read(min(chunk_bytes, size - pos))
+            quotes += block.count(b'"')
+            pos += len(block)
+            if pos >= size:
+                break
+            # extend to the next newline that is outside quotes
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                quotes += line.count(b'"')
+                pos += len(line)
+                if quotes % 2 == 0:
+                    break
+            ranges.append((start, pos))
+            start = pos
+    if start < size:
+        ranges.append((start, size))
+    return ranges
+
+
+def plan_ingestion(con, changed: Dict[str, Optional[str]], sources: Dict[str, Path], threads: int,
+                   memory_mb: int, split_mb: int) -> List[IngestTask]:
+    """Build ingest tasks: staged files load from Parquet, large uncompressed CSVs are split into byte ranges."""
+    # Each in-flight range holds its raw bytes plus the parsed Arrow copy (~3x the chunk)
+    memory_chunk = (memory_mb << 20) // max(1, threads * 3)
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+        shas = dict(zip(changed, pool.map(lambda t: changed[t] or staging.content_hash(sources[t]), changed)))
+    tasks = []
+    for table, sha in shas.items():
+        path = sources[table]
+        task = IngestTask(table, path, sha, staged=staging.lookup(path, sha))
+        size = path.stat().st_size
+        # Compressed sources cannot be entered mid-stream, so DuckDB reads them whole
+        splittable = not staging.is_compressed(path)
+        if task.staged is None and splittable and threads > 1 and split_mb >= 0 and size > (split_mb << 20):
+            # At least one range per worker, but never more bytes in flight than the memory budget allows
+            chunk_bytes = max(MIN_CHUNK_BYTES, min(memory_chunk, -(-size // threads)))
+            # Sniff the same full sample read_csv_auto uses so both readers agree on the dialect
+            sniff = con.execute(
+                "SELECT Delimiter, Quote, Escape, HasHeader, Columns FROM sniff_csv(?, sample_size=-1)", [str(path)]
+            ).fetchone()
+            delimiter, quote, escape, has_header, columns = (
+                "" if v == "(empty)" else v for v in sniff
+            )
+            if has_header and len(delimiter) == 1 and quote in ('"', "") and escape in (quote, ""):
+                task.delimiter = delimiter
+                task.quote = quote
+                task.columns = [c["name"] for c in columns]
+                task.ranges = split_ranges(path, chunk_bytes)
+        tasks.append(task)
+    # Largest work first so the long poles start early
+    return sorted(tasks, key=lambda t: -t.path.stat().st_size)
+
+
+def _parse_range(task: IngestTask, start: int, end: int) -> pa.Table:
+    with open(task.path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pa_csv.read_csv(
+        io.BytesIO(data),
+        read_options=pa_csv.ReadOptions(column_names=task.columns, block_size=max(1 << 20, len(data) + 1)),
+        parse_options=pa_csv.ParseOptions(delimiter=task.delimiter, quote_char=task.quote or False, double_quote=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={c: pa.string() for c in task.columns},
+            null_values=[""],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=True,
+        ),
+    )
+
+
+def cluster_table(cur, table: str) -> None:
+    """Rewrite `table` ordered by its SORT_KEYS; rowid breaks ties so duplicate keys keep CSV order."""
+    keys = SORT_KEYS.get(table)
+    if not keys:
+        return
+    cols = {row[1] for row in cur.execute(f"PRAGMA table_info('{table}')").fetchall()}
+    if not set(keys) <= cols:
+        print(f"  {table}: sort columns {', '.join(keys)} missing, keeping CSV order")
+        return
+    cur.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM {table} ORDER BY {', '.join(keys)}, rowid")
+
+
+def run_ingestion(con, tasks: List[IngestTask], threads: int, sort_tables: bool = True) -> None:
+    """Execute the ingest task graph: range parses in parallel, then an in-order append per table."""
+    pending: Dict[str, int] = {t.table: len(t.ranges) for t in tasks}
+    lock = threading.Lock()
+    # Cursors start in the default catalog, not the one `con` has USEd
+    catalog = con.execute("SELECT current_database()").fetchone()[0]
+
+    def cursor():
+        cur = con.cursor()
+        cur.execute(f"USE {catalog}")
+        return cur
+
+    def whole_file(task: IngestTask) -> None:
+        task.started = time.perf_counter()
+        cur = cursor()
+        if task.staged:
+            cur.execute(f"CREATE OR REPLACE TABLE {task.table} AS SELECT * FROM read_parquet(?)", [str(task.staged)])
+        else:
+            cur.execute(
+                f"CREATE OR REPLACE TABLE {task.table} AS SELECT * FROM read_csv_auto(?, header=True, all_varchar=True, sample_size=-1)",
+                [str(task.path)],
+            )
+            task.parse_seconds = time.perf_counter() - task.started
+            staging.store_table(cur, task.table, task.path, task.sha)
+        if sort_tables:
+            cluster_table(cur, task.table)
+        task.rows = cur.execute(f"SELECT COUNT(*) FROM {task.table}").fetchone()[0]
+        cur.close()
+        task.finished = time.perf_counter()
+
+    def merge(task: IngestTask) -> None:
+        cur = cursor()
+        parts = [f"_ingest_{task.table}_{i}" for i in range(len(task.ranges))]
+        cur.execute(f"CREATE OR REPLACE TABLE {task.table} AS SELECT * FROM {parts[0]}")
+        for part in parts[1:]:
+            cur.execute(f"INSERT INTO {task.table} SELECT * FROM {part}")
+        for part in parts:
+            cur.execute(f"DROP TABLE {part}")
+        staging.store_table(cur, task.table, task.path, task.sha)
+        if sort_tables:
+            cluster_table(cur, task.table)
+        task.rows = cur.execute(f"SELECT COUNT(*) FROM {task.table}").fetchone()[0]
+        cur.close()
+        task.finished = time.perf_counter()
+
+    def range_part(task: IngestTask, index: int) -> None:
+        began = time.perf_counter()
+        with lock:
+            task.started = task.started or began
+        start, end = task.ranges[index]
+        arrow_part = _parse_range(task, start, end)
+        cur = cursor()
+        view = f"_arrow_{task.table}_{index}"
+        cur.register(view, arrow_part)
+        cur.execute(f"CREATE OR REPLACE TABLE _ingest_{task.table}_{index} AS SELECT * FROM {view}")
+        cur.unregister(view)
+        cur.close()
+        with lock:
+            task.parse_seconds += time.perf_counter() - began
+            pending[task.table] -= 1
+            last = pending[task.table] == 0
+        if last:
+            merge(task)
+
+    with ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="ingest") as pool:
+        futures = []
+        for task in tasks:
+            detail = " (staged)" if task.staged else f" ({len(task.ranges)} ranges)" if task.ranges else ""
+            print(f"Ingesting {task.path.name} -> {task.table}{detail}")
+            if task.ranges:
+                futures.extend(pool.submit(range_part, task, i) for i in range(len(task.ranges)))
+            else:
+                futures.append(pool.submit(whole_file, task))
+        for future in futures:
+            future.result()
+
+
+def report_timings(tasks: List[IngestTask]) -> List[Dict]:
+    timings = [
+        {
+            "table": t.table,
+            "source_file": t.path.name,
+            "bytes": t.path.stat().st_size,
+            "rows": t.rows,
+            "ranges": len(t.ranges) or 1,
+            "staged": t.staged is not None,
+            "parse_seconds": round(t.parse_seconds, 3),
+            "wall_seconds": round(t.finished - t.started, 3),
+        }
+        for t in tasks
+    ]
+    for row in sorted(timings, key=lambda r: -r["wall_seconds"]):
+        print(
+            f"  {row['table']:<55} {row['bytes'] / 1e6:9.1f} MB  {row['ranges']:>3} part(s)  "
+            f"parse {row['parse_seconds']:7.2f}s  wall {row['wall_seconds']:7.2f}s" + ("  [staged]" if row["staged"] else "")
+        )
+    return timings
+
+
+def table_fingerprint(con, table: str) -> str:
+    """md5 over every row in storage order; equal fingerprints mean identical content and order."""
+    return con.execute(
+        f"SELECT md5(COALESCE(string_agg(CAST(t AS VARCHAR), chr(10) ORDER BY rowid), '')) FROM {table} t"
+    ).fetchone()[0]
+
+
+def refresh_metadata(con, tables: Dict[str, Path], dropped: List[str], ingested_at: int, force: bool) -> None:
+    """Recompute metadata rows for the given tables only; other rows keep their ingested_at."""
+    if force:
+        con.execute("DROP TABLE IF EXISTS metadata")
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS metadata (
+          table_name VARCHAR, source_file VARCHAR, row_count BIGINT, min_month VARCHAR, max_month VARCHAR,
+          ingested_at BIGINT
+        )
+        """
+    )
+    for table in list(tables) + dropped:
+        con.execute("DELETE FROM metadata WHERE table_name = ?", [table])
+    for table, csv_path in tables.items():
         row_count = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
         min_month = max_month = None
         cols = [row[1] for row in con.execute(f"PRAGMA table_info('{table}')").fetchall()]
         if "month" in cols:
             min_month, max_month = con.execute(f"SELECT MIN(month), MAX(month) FROM {table}").fetchone()
-        metadata_rows.append((table, csv_path.name, row_count, min_month, max_month, ingested_at))
+        con.execute(
+            "INSERT INTO metadata VALUES (?, ?, ?, ?, ?, ?)",
+            [table, csv_path.name, row_count, min_month, max_month, ingested_at],
+        )
 
-    values_sql = ",".join(
-        [
-            f"('{t}', '{src}', {rc}, {'NULL' if min_m is None else repr(min_m)}, {'NULL' if max_m is None else repr(max_m)}, {ingested_at})"
-            for (t, src, rc, min_m, max_m, ingested_at) in metadata_rows
-        ]
-    )
-    con.execute(
-        "CREATE OR REPLACE TABLE metadata AS SELECT * FROM (VALUES %s) AS t(table_name, source_file, row_count, min_month, max_month, ingested_at)"
-        % values_sql
-    )
 
-    # Create top-mover views
-    for view_name, table, dim, val, needs_money in TOP_MOVER_TARGETS:
-        print(f"Creating view {view_name}")
-        if needs_money:
-            l_expr = f"TRY_CAST(REPLACE(REPLACE(l.{val}, '$',''), ',','') AS DOUBLE)"
-            p_expr = f"TRY_CAST(REPLACE(REPLACE(p.{val}, '$',''), ',','') AS DOUBLE)"
-        else:
-            l_expr = f"TRY_CAST(l.{val} AS DOUBLE)"
-            p_expr = f"TRY_CAST(p.{val} AS DOUBLE)"
-        sql = f"""
-        CREATE OR REPLACE VIEW {view_name} AS
-        WITH months AS (SELECT DISTINCT month FROM {table}),
-        latest_m AS (SELECT month FROM months ORDER BY month DESC LIMIT 1),
-        prev_m AS (SELECT month FROM months ORDER BY month DESC OFFSET 1 LIMIT 1)
+def create_top_mover_view(con, view_name: str, table: str, dim: str, val: str, needs_money: bool) -> None:
+    if needs_money:
+        l_expr = f"TRY_CAST(REPLACE(REPLACE(l.{val}, '$',''), ',','') AS DOUBLE)"
+        p_expr = f"TRY_CAST(REPLACE(REPLACE(p.{val}, '$',''), ',','') AS DOUBLE)"
+    else:
+        l_expr = f"TRY_CAST(l.{val} AS DOUBLE)"
+        p_expr = f"TRY_CAST(p.{val} AS DOUBLE)"
+    sql = f"""
+    CREATE OR REPLACE VIEW {view_name} AS
+    WITH months AS (SELECT DISTINCT month FROM {table}),
+    latest_m AS (SELECT month FROM months ORDER BY month DESC LIMIT 1),
+    prev_m AS (SELECT month FROM months ORDER BY month DESC OFFSET 1 LIMIT 1)
+    SELECT
+      l.{dim} AS dimension,
+      {l_expr} AS value,
+      CASE WHEN {p_expr} IS NULL OR {p_expr}=0 THEN NULL
+           ELSE ({l_expr} - {p_expr})/ {p_expr} * 100 END AS pct_change,
+      l.month AS month,
+      p.month AS prev_month
+    FROM {table} l
+    LEFT JOIN {table} p ON l.{dim} = p.{dim} AND p.month = (SELECT month FROM prev_m)
+    WHERE l.month = (SELECT month FROM latest_m);
+    """
+    con.execute(sql)
+
+
+def build_metric_cube(con, tables: set) -> int:
+    """Rebuild metrics.CUBE_TABLE from every MAP series whose table exists; returns its row count.
+
+    prev_value is the same id's value in the source table's previous month (as
+    the top-mover views define it), so gaps in one id's history show as NULL.
+    National series use id ''. Rows are stored sorted by series then month.
+    """
+    selects = []
+    for dimension_type, metric_map in metrics.MAP.items():
+        for metric, cfg in metric_map.items():
+            table = cfg["table"]
+            if table not in tables:
+                print(f"  {metrics.CUBE_TABLE}: {table} missing, skipping {dimension_type}/{metric}")
+                continue
+            id_expr = cfg["dim"] or "''"
+            where = f" WHERE {cfg['dim']} IS NOT NULL" if cfg["dim"] else ""
+            for sa_flag, col in metrics.series_columns(cfg):
+                selects.append(
+                    f"SELECT '{dimension_type}' AS dimension_type, {id_expr} AS id, '{metric}' AS metric, "
+                    f"{sa_flag} AS sa_flag, month, {metrics.value_expr(col)} AS value FROM {table}{where}"
+                )
+    con.execute(f"DROP TABLE IF EXISTS {metrics.CUBE_TABLE}")
+    if not selects:
+        return 0
+    union = "\n      UNION ALL ".join(selects)
+    con.execute(
+        f"""
+        CREATE TABLE {metrics.CUBE_TABLE} AS
+        WITH raw AS (
+          {union}
+        ),
+        series_months AS (
+          SELECT dimension_type, metric, sa_flag, month,
+                 LAG(month) OVER (PARTITION BY dimension_type, metric, sa_flag ORDER BY month) AS prev_month
+          FROM (SELECT DISTINCT dimension_type, metric, sa_flag, month FROM raw)
+        )
         SELECT
-          l.{dim} AS dimension,
-          {l_expr} AS value,
-          CASE WHEN {p_expr} IS NULL OR {p_expr}=0 THEN NULL
-               ELSE ({l_expr} - {p_expr})/ {p_expr} * 100 END AS pct_change,
-          l.month AS month,
-          p.month AS prev_month
-        FROM {table} l
-        LEFT JOIN {table} p ON l.{dim} = p.{dim} AND p.month = (SELECT month FROM prev_m)
-        WHERE l.month = (SELECT month FROM latest_m);
+          CAST(r.dimension_type AS VARCHAR) AS dimension_type,
+          CAST(r.id AS VARCHAR) AS id,
+          CAST(r.metric AS VARCHAR) AS metric,
+          r.sa_flag,
+          r.month,
+          r.value,
+          p.value AS prev_value,
+          p.month AS prev_month,
+          CASE WHEN p.value IS NULL OR p.value = 0 THEN NULL ELSE (r.value - p.value) / p.value * 100 END AS pct_change
+        FROM raw r
+        JOIN series_months m USING (dimension_type, metric, sa_flag, month)
+        LEFT JOIN raw p
+          ON p.dimension_type = r.dimension_type AND p.metric = r.metric AND p.sa_flag = r.sa_flag
+         AND p.id = r.id AND p.month = m.prev_month
+        ORDER BY dimension_type, id, metric, sa_flag, month
         """
-        con.execute(sql)
+    )
+    return con.execute(f"SELECT COUNT(*) FROM {metrics.CUBE_TABLE}").fetchone()[0]
+
+
+def build_db(
+    force: bool = False,
+    threads: Optional[int] = None,
+    memory_mb: Optional[int] = None,
+    split_mb: Optional[int] = None,
+    row_group_rows: Optional[int] = None,
+    sort_tables: bool = True,
+) -> Dict[str, List]:
+    if not DATA_DIR.exists():
+        raise FileNotFoundError(f"Data dir not found: {DATA_DIR}")
+
+    if not DB_PATH.parent.exists():
+        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+    threads = ETL_THREADS if threads is None else threads
+    memory_mb = ETL_MEMORY_MB if memory_mb is None else memory_mb
+    split_mb = ETL_SPLIT_MB if split_mb is None else split_mb
+    row_group_rows = ETL_ROW_GROUP_ROWS if row_group_rows is None else row_group_rows
+
+    profiler = RunProfiler(
+        "etl",
+        DATA_DIR,
+        {"force": force, "threads": threads, "memory_mb": memory_mb, "split_mb": split_mb, "row_group_rows": row_group_rows},
+    )
+    con = connect_db(DB_PATH, row_group_rows)
+    con.execute(f"PRAGMA threads={max(1, threads)}")
+    con.execute(f"SET memory_limit='{memory_mb}MB'")
+    ingested_at = int(time.time())
+    sources = source_files()
+    with profiler.stage("plan", rows_in=len(sources)) as st:
+        changed, unchanged, touched, removed = plan_changes(con, sources, force)
+
+        for table in removed:
+            print(f"Dropping {table} (source file removed)")
+            con.execute(f"DROP TABLE IF EXISTS {table}")
+            con.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE table_name = ?", [table])
+        for table, sha in touched.items():
+            record_manifest(con, table, sources[table], sha, ingested_at)
+
+        tasks = plan_ingestion(con, changed, sources, threads, memory_mb, split_mb)
+        st.rows_out = len(tasks)
+
+    with profiler.stage("ingest", bytes_in=sum(t.path.stat().st_size for t in tasks)) as st:
+        run_ingestion(con, tasks, threads, sort_tables)
+        for task in sorted(tasks, key=lambda t: t.table):
+            record_manifest(con, task.table, task.path, task.sha, ingested_at)
+        st.rows_out = sum(t.rows for t in tasks)
+        timings = report_timings(tasks)
+        # Per-table work ran on pool threads: wall time only, and CSV parse time for files not staged
+        for row in timings:
+            profiler.record("table", row["table"], row["wall_seconds"], rows_out=row["rows"], bytes_in=row["bytes"])
+            if not row["staged"]:
+                profiler.record("parse", row["table"], row["parse_seconds"], bytes_in=row["bytes"])
+
+    # Metadata and top-mover views only for what changed
+    with profiler.stage("metadata", rows_in=len(changed) + len(removed)):
+        refresh_metadata(con, {t: sources[t] for t in changed}, removed, ingested_at, force)
+    with profiler.stage("views"):
+        for view_name, table, dim, val, needs_money in TOP_MOVER_TARGETS:
+            if table in removed:
+                con.execute(f"DROP VIEW IF EXISTS {view_name}")
+            elif table in changed:
+                print(f"Creating view {view_name}")
+                create_top_mover_view(con, view_name, table, dim, val, needs_money)
+
+    cube_inputs = set(metrics.source_tables())
+    tables = existing_tables(con)
+    if force or metrics.CUBE_TABLE not in tables or cube_inputs & (set(changed) | set(removed)):
+        with profiler.stage("cube") as st:
+            st.rows_out = build_metric_cube(con, tables)
+        print(f"Built {metrics.CUBE_TABLE} ({st.rows_out} rows)")
 
     con.close()
-    print(f"DuckDB built at {DB_PATH}")
+    if unchanged:
+        print(f"Skipped {len(unchanged)} unchanged file(s): {', '.join(sorted(unchanged))}")
+    print(f"DuckDB built at {DB_PATH} ({len(changed)} ingested, {len(unchanged)} skipped, {len(removed)} removed)")
+    profile = profiler.write()
+    return {
+        "ingested": sorted(changed),
+        "skipped": sorted(unchanged),
+        "removed": removed,
+        "timings": timings,
+        "profile": str(profile),
+    }
 
 
 if __name__ == "__main__":
-    build_db()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="re-ingest every CSV regardless of the manifest")
+    parser.add_argument("--threads", type=int, default=ETL_THREADS, help="worker threads (1 = serial)")
+    parser.add_argument("--memory-mb", type=int, default=ETL_MEMORY_MB, help="DuckDB memory limit / range budget")
+    parser.add_argument("--split-mb", type=int, default=ETL_SPLIT_MB, help="split CSVs larger than this by byte range")
+    parser.add_argument("--row-group-rows", type=int, default=ETL_ROW_GROUP_ROWS, help="rows per DuckDB row group")
+    args = parser.parse_args()
+    build_db(
+        force=args.force,
+        threads=args.threads,
+        memory_mb=args.memory_mb,
+        split_mb=args.split_mb,
+        row_group_rows=args.row_group_rows,
+    )
@@ -0,0 +1,205 @@
+"""
+Dependency-aware stage scheduler
+--------------------------------
+etl_supabase.py describes a load as a graph of tasks: each names the tasks it must
+wait for and the budgets it draws on while running ("cpu" for DuckDB extraction,
+"network" for sink uploads). A task starts as soon as everything it depends on
+has finished and every budget it uses has a free slot, so independent tables
+extract and upload side by side.
+
+    graph = StageGraph({"cpu": 4, "network": 2})
+    graph.add("dim_states", load_states, uses=("cpu", "network"))
+    graph.add("fact_layoffs", load_layoffs, after=("dim_states",), uses=("cpu", "network"))
+    graph.run()
+    graph.print_report()
+
+The first failure stops new tasks from starting; those already running finish,
+tasks that never ran are marked "skipped", and the error is raised. Afterwards
+the critical path (the chain of tasks, each gated by the one before it, that
+ended last) shows where the wall time went. A task is gated by its last dependency
+to finish or, when it then still had to wait for a budget slot, by the task that
+gave the slot back.
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+@dataclass
+class Task:
+    name: str
+    run: Callable[[], None]
+    after: Tuple[str, ...] = ()
+    uses: Tuple[str, ...] = ("cpu",)
+    status: str = "pending"  # pending, ok, error or skipped
+    # Seconds since the graph started: dependencies done, started, finished
+    ready: Optional[float] = None
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    # The task whose finishing freed the budget slot this one was waiting for, if it had to wait
+    gated_by: Optional[str] = None
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or 0.0) - (self.started or 0.0)
+
+    @property
+    def queued(self) -> float:
+        """Time between the dependencies finishing and a budget slot opening up."""
+        return (self.started or 0.0) - (self.ready or 0.0)
+
+    def as_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "after": list(self.after),
+            "uses": list(self.uses),
+            "status": self.status,
+            "ready": None if self.ready is None else round(self.ready, 4),
+            "started": None if self.started is None else round(self.started, 4),
+            "finished": None if self.finished is None else round(self.finished, 4),
+            "seconds": round(self.seconds, 4) if self.finished is not None else None,
+            "gated_by": self.gated_by,
+        }
+
+
+class StageGraph:
+    def __init__(self, budgets: Dict[str, int]):
+        self.budgets = {name: max(1, slots) for name, slots in budgets.items()}
+        self.tasks: Dict[str, Task] = {}
+        self.wall_seconds = 0.0
+
+    def add(self, name: str, run: Callable[[], None], after: Sequence[str] = (), uses: Sequence[str] = ("cpu",)) -> Task:
+        if name in self.tasks:
+            raise ValueError(f"duplicate task {name!r}")
+        unknown = [u for u in uses if u not in self.budgets]
+        if unknown:
+            raise ValueError(f"task {name!r} uses unknown budget(s) {unknown}")
+        task = self.tasks[name] = Task(name, run, tuple(after), tuple(uses))
+        return task
+
+    def _check(self) -> None:
+        for task in self.tasks.values():
+            missing = [d for d in task.after if d not in self.tasks]
+            if missing:
+                raise ValueError(f"task {task.name!r} depends on unknown task(s) {missing}")
+        # Kahn's algorithm: anything left over sits on a cycle
+        indegree = {name: len(task.after) for name, task in self.tasks.items()}
+        queue = [name for name, degree in indegree.items() if not degree]
+        while queue:
+            done = queue.pop()
+            for task in self.tasks.values():
+                if done in task.after:
+                    indegree[task.name] -= 1
+                    if not indegree[task.name]:
+                        queue.append(task.name)
+        cyclic = sorted(name for name, degree in indegree.items() if degree)
+        if cyclic:
+            raise ValueError(f"dependency cycle among {cyclic}")
+
+    def run(self) -> None:
+        """Run every task once its dependencies are done and its budgets allow; raise the first failure."""
+        self._check()
+        start = time.perf_counter()
+        in_use = {name: 0 for name in self.budgets}
+        released: Dict[str, Task] = {}  # budget -> task that last gave a slot back
+        waiting = list(self.tasks.values())
+        running: Dict[Future, Task] = {}
+        errors: List[BaseException] = []
+
+        def now() -> float:
+            return time.perf_counter() - start
+
+        def launch(task: Task) -> Future:
+            def timed() -> None:
+                task.started = now()
+                try:
+                    task.run()
+                finally:
+                    task.finished = now()
+
+            freed = [released[name] for name in task.uses if name in released]
+            freed = [t for t in freed if t.finished is not None and t.finished > task.ready]
+            if freed:
+                task.gated_by = max(freed, key=lambda t: t.finished).name
+            for name in task.uses:
+                in_use[name] += 1
+            return pool.submit(timed)
+
+        with ThreadPoolExecutor(max_workers=sum(self.budgets.values()), thread_name_prefix="etl-task") as pool:
+            try:
+                while waiting or running:
+                    if not errors:
+                        for task in list(waiting):
+                            if not all(self.tasks[d].status == "ok" for d in task.after):
+                                continue
+                            if task.ready is None:
+                                task.ready = max((self.tasks[d].finished for d in task.after), default=0.0)
+                            if all(in_use[name] < self.budgets[name] for name in task.uses):
+                                waiting.remove(task)
+                                running[launch(task)] = task
+                    if not running:
+                        break
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        task = running.pop(future)
+                        for name in task.uses:
+                            in_use[name] -= 1
+                            released[name] = task
+                        error = future.exception()
+                        task.status = "ok" if error is None else "error"
+                        if error is not None:
+                            errors.append(error)
+            finally:
+                # Interrupted while waiting: let what is running finish, start nothing else
+                waiting.clear()
+                for future, task in running.items():
+                    task.status = "ok" if future.exception() is None else "error"
+                for task in self.tasks.values():
+                    if task.status == "pending":
+                        task.status = "skipped"
+                self.wall_seconds = now()
+        if errors:
+            raise errors[0]
+
+    def _gate(self, task: Task) -> Optional[Task]:
+        """What `task` waited on last: its latest dependency, or the task that freed its budget slot after that."""
+        gates = [self.tasks[d] for d in task.after]
+        if task.gated_by:
+            gates.append(self.tasks[task.gated_by])
+        return max(gates, key=lambda t: t.finished or 0.0, default=None)
+
+    def critical_path(self) -> List[Task]:
+        """Tasks from the one that finished last back through whatever gated each, in run order."""
+        finished = [t for t in self.tasks.values() if t.finished is not None]
+        if not finished:
+            return []
+        path = [max(finished, key=lambda t: t.finished)]
+        while (gate := self._gate(path[-1])) is not None:
+            path.append(gate)
+        return path[::-1]
+
+    def report(self) -> Dict:
+        return {
+            "budgets": self.budgets,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "tasks": [task.as_dict() for task in self.tasks.values()],
+            "critical_path": [task.name for task in self.critical_path()],
+        }
+
+    def print_report(self) -> None:
+        path = self.critical_path()
+        if not path:
+            return
+        busy = sum(t.seconds for t in path)
+        print(
+            f"⏱️  Critical path: {busy:.1f}s of {self.wall_seconds:.1f}s wall "
+            f"({len(self.tasks)} tasks, budgets {self.budgets})"
+        )
+        for task in path:
+            waited = task.gated_by and task.queued >= 0.05
+            note = f"  (waited {task.queued:.1f}s for a {'/'.join(task.uses)} slot)" if waited else ""
+            print(f"  {task.name:<30} {task.started:>7.1f}s → {task.finished:>7.1f}s {task.seconds:>7.1f}s{note}")
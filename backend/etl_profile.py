@@ -0,0 +1,314 @@
+"""
+ETL run profiler
+----------------
+Stage instrumentation shared by `etl.py` and `etl_supabase.py`: wall time,
+process CPU time, peak RSS, rows in/out and bytes per stage, written as one
+JSON report per run to `<data dir>/.etl_runs` (override: ETL_PROFILE_DIR).
+
+    profiler = RunProfiler("etl", data_dir)
+    with profiler.stage("query", table="fact_layoffs") as st:
+        rows = con.execute(sql).fetchall()
+        st.rows_out = len(rows)
+    profiler.write()
+
+Stages nest; a stage's peak RSS is the high-water mark while it was open. On
+Linux that mark is reset per stage through /proc/self/clear_refs, elsewhere it
+falls back to the process-wide peak. CPU time is process-wide, so it includes
+DuckDB's worker threads. Stages may be opened from several threads at once (the
+Supabase ETL runs its tables as parallel tasks, etl_dag.py): each nests under
+the stages open on its own thread, and since RSS is per process, a stage's peak
+then includes whatever ran beside it. Work timed elsewhere is added with `record()`.
+
+Compare two runs (default: the last two of a tool):
+    python etl_profile.py compare [OLD.json NEW.json] [--tool etl]
+    python etl_profile.py list [--tool etl_supabase]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+PROFILE_ENV = "ETL_PROFILE_DIR"
+_STATUS = Path("/proc/self/status")
+_CLEAR_REFS = Path("/proc/self/clear_refs")
+
+
+def profile_dir(data_dir: Path) -> Path:
+    override = os.environ.get(PROFILE_ENV)
+    return Path(override) if override else data_dir / ".etl_runs"
+
+
+def _hwm_kb() -> int:
+    """Peak resident set size in kB since the last reset (or process start)."""
+    try:
+        for line in _STATUS.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def current_rss_mb() -> float:
+    """Resident set size right now (peak RSS where /proc is unavailable)."""
+    try:
+        for line in _STATUS.read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _hwm_kb() / 1024
+
+
+def _reset_hwm() -> bool:
+    try:
+        _CLEAR_REFS.write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+@dataclass
+class Stage:
+    name: str
+    table: Optional[str] = None
+    parent: Optional[str] = None
+    wall_seconds: float = 0.0
+    cpu_seconds: Optional[float] = None
+    peak_rss_mb: Optional[float] = None
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    bytes_in: Optional[int] = None
+    bytes_out: Optional[int] = None
+    status: str = "ok"
+    _peak_kb: int = field(default=0, repr=False)
+
+    @property
+    def key(self) -> str:
+        return f"{self.name} {self.table}" if self.table else self.name
+
+    def as_dict(self) -> Dict:
+        data = {k: v for k, v in asdict(self).items() if not k.startswith("_")}
+        rows = self.rows_out if self.rows_out is not None else self.rows_in
+        data["rows_per_second"] = round(rows / self.wall_seconds, 1) if rows and self.wall_seconds else None
+        return data
+
+
+class RunProfiler:
+    def __init__(self, tool: str, data_dir: Path, meta: Optional[Dict] = None):
+        self.tool = tool
+        self.data_dir = data_dir
+        self.meta = dict(meta or {})
+        self.stages: List[Stage] = []
+        # Every open stage, on any thread (peaks are folded into all of them), and per-thread stacks for nesting
+        self._open: List[Stage] = []
+        self._threads = threading.local()
+        self._lock = threading.Lock()
+        self._per_stage_rss = _reset_hwm()
+        self._started_wall = time.perf_counter()
+        self._started_cpu = time.process_time()
+        self.started_at = datetime.now(timezone.utc)
+        self.run_id = self.started_at.strftime("%Y%m%dT%H%M%S%fZ")
+
+    def _stack(self) -> List[Stage]:
+        stack = getattr(self._threads, "stack", None)
+        if stack is None:
+            stack = self._threads.stack = []
+        return stack
+
+    def _parent(self) -> Optional[str]:
+        stack = self._stack()
+        return stack[-1].key if stack else None
+
+    def _fold_peak(self) -> None:
+        peak = _hwm_kb()
+        for open_stage in self._open:
+            open_stage._peak_kb = max(open_stage._peak_kb, peak)
+
+    @contextmanager
+    def stage(self, name: str, table: Optional[str] = None, **counts) -> Iterator[Stage]:
+        """Time one stage; set rows_in/rows_out/bytes_in/bytes_out on the yielded Stage (or pass them here)."""
+        entry = Stage(name, table, parent=self._parent(), **counts)
+        with self._lock:
+            if self._per_stage_rss:
+                # Credit the current high-water mark to the open stages before restarting it
+                self._fold_peak()
+                _reset_hwm()
+            self._open.append(entry)
+        self._stack().append(entry)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield entry
+        except BaseException:
+            entry.status = "error"
+            raise
+        finally:
+            entry.wall_seconds = round(time.perf_counter() - wall, 4)
+            entry.cpu_seconds = round(time.process_time() - cpu, 4)
+            self._stack().pop()
+            with self._lock:
+                self._fold_peak()
+                self._open = [s for s in self._open if s is not entry]
+                entry.peak_rss_mb = round(entry._peak_kb / 1024, 1)
+                self.stages.append(entry)
+
+    def tally(self, name: str, table: Optional[str] = None) -> "Tally":
+        """One stage entry that many short intervals add up into (e.g. per chunk of a stream)."""
+        entry = Stage(name, table, parent=self._parent(), rows_in=0, rows_out=0)
+        with self._lock:
+            self.stages.append(entry)
+        return Tally(entry)
+
+    def record(self, name: str, table: Optional[str] = None, wall_seconds: float = 0.0, **counts) -> Stage:
+        """Add a stage measured elsewhere (e.g. on a worker thread); CPU and RSS are not attributed."""
+        entry = Stage(name, table, parent=self._parent(), wall_seconds=round(wall_seconds, 4), **counts)
+        with self._lock:
+            self.stages.append(entry)
+        return entry
+
+    def report(self) -> Dict:
+        totals: Dict[str, Dict[str, float]] = {}
+        for entry in self.stages:
+            bucket = totals.setdefault(entry.name, {"count": 0, "wall_seconds": 0.0, "rows_out": 0, "bytes_in": 0})
+            bucket["count"] += 1
+            bucket["wall_seconds"] = round(bucket["wall_seconds"] + entry.wall_seconds, 4)
+            bucket["rows_out"] += entry.rows_out or 0
+            bucket["bytes_in"] += entry.bytes_in or 0
+        return {
+            "tool": self.tool,
+            "run_id": self.run_id,
+            "started_at": self.started_at.isoformat(),
+            "argv": sys.argv,
+            "meta": self.meta,
+            "wall_seconds": round(time.perf_counter() - self._started_wall, 4),
+            "cpu_seconds": round(time.process_time() - self._started_cpu, 4),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+            "per_stage_rss": self._per_stage_rss,
+            "stages": [entry.as_dict() for entry in self.stages],
+            "totals_by_stage": totals,
+        }
+
+    def write(self) -> Path:
+        directory = profile_dir(self.data_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.tool}-{self.run_id}.json"
+        path.write_text(json.dumps(self.report(), indent=2))
+        print(f"Run profile written to {path}")
+        return path
+
+
+class Tally:
+    """Reusable timer for a `RunProfiler.tally()` stage; bump `stage.rows_in/rows_out` as work is done."""
+
+    def __init__(self, stage: Stage):
+        self.stage = stage
+
+    def __enter__(self) -> Stage:
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        return self.stage
+
+    def __exit__(self, exc_type, *exc) -> None:
+        self.stage.wall_seconds = round(self.stage.wall_seconds + time.perf_counter() - self._wall, 4)
+        self.stage.cpu_seconds = round((self.stage.cpu_seconds or 0.0) + time.process_time() - self._cpu, 4)
+        if exc_type is not None:
+            self.stage.status = "error"
+
+
+def list_runs(directory: Path, tool: Optional[str] = None) -> List[Path]:
+    pattern = f"{tool}-*.json" if tool else "*.json"
+    return sorted(directory.glob(pattern), key=lambda p: p.name.rsplit("-", 1)[-1])
+
+
+def _stage_totals(report: Dict) -> Dict[str, Dict[str, float]]:
+    """Sum repeated stages by key so runs with different batch counts still line up."""
+    merged: Dict[str, Dict[str, float]] = {}
+    for entry in report["stages"]:
+        key = f"{entry['name']} {entry['table']}" if entry.get("table") else entry["name"]
+        bucket = merged.setdefault(key, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "rows_out": 0, "peak_rss_mb": 0.0})
+        bucket["wall_seconds"] += entry["wall_seconds"]
+        bucket["cpu_seconds"] += entry.get("cpu_seconds") or 0.0
+        bucket["rows_out"] += entry.get("rows_out") or 0
+        bucket["peak_rss_mb"] = max(bucket["peak_rss_mb"], entry.get("peak_rss_mb") or 0.0)
+    return merged
+
+
+def compare_reports(old: Dict, new: Dict) -> List[Dict]:
+    """Per-stage deltas between two run reports, largest absolute wall-time change first."""
+    before, after = _stage_totals(old), _stage_totals(new)
+    rows = []
+    for key in sorted(set(before) | set(after)):
+        a, b = before.get(key), after.get(key)
+        old_wall = a["wall_seconds"] if a else None
+        new_wall = b["wall_seconds"] if b else None
+        delta = (new_wall or 0.0) - (old_wall or 0.0)
+        rows.append(
+            {
+                "stage": key,
+                "old_wall_seconds": old_wall,
+                "new_wall_seconds": new_wall,
+                "delta_seconds": round(delta, 4),
+                "delta_pct": round(delta / old_wall * 100, 1) if old_wall else None,
+                "old_rows_out": a["rows_out"] if a else None,
+                "new_rows_out": b["rows_out"] if b else None,
+                "old_peak_rss_mb": a["peak_rss_mb"] if a else None,
+                "new_peak_rss_mb": b["peak_rss_mb"] if b else None,
+            }
+        )
+    rows.sort(key=lambda r: -abs(r["delta_seconds"]))
+    return rows
+
+
+def _fmt(value, spec: str = ".2f") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def print_comparison(old: Dict, new: Dict, limit: int = 40) -> None:
+    print(f"old: {old['tool']} {old['run_id']}  wall {old['wall_seconds']:.2f}s  cpu {old['cpu_seconds']:.2f}s  peak {old['peak_rss_mb']} MB")
+    print(f"new: {new['tool']} {new['run_id']}  wall {new['wall_seconds']:.2f}s  cpu {new['cpu_seconds']:.2f}s  peak {new['peak_rss_mb']} MB")
+    print(f"\n{'stage':<58} {'old s':>9} {'new s':>9} {'delta':>9} {'%':>7} {'rows old':>10} {'rows new':>10} {'rss MB':>13}")
+    for row in compare_reports(old, new)[:limit]:
+        rss = f"{_fmt(row['old_peak_rss_mb'], '.0f')}->{_fmt(row['new_peak_rss_mb'], '.0f')}"
+        print(
+            f"{row['stage'][:58]:<58} {_fmt(row['old_wall_seconds']):>9} {_fmt(row['new_wall_seconds']):>9} "
+            f"{row['delta_seconds']:>+9.2f} {_fmt(row['delta_pct'], '+.1f'):>7} "
+            f"{_fmt(row['old_rows_out'], 'd'):>10} {_fmt(row['new_rows_out'], 'd'):>10} {rss:>13}"
+        )
+
+
+def main() -> None:
+    default_dir = profile_dir(Path(os.environ.get("RPLS_DATA_DIR", Path(__file__).resolve().parents[2] / "rpls_data")))
+    parser = argparse.ArgumentParser(description="Inspect and compare ETL run profiles.")
+    parser.add_argument("--dir", type=Path, default=default_dir, help="directory holding run reports")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compare = sub.add_parser("compare", help="diff two run reports (default: the last two runs of --tool)")
+    compare.add_argument("reports", type=Path, nargs="*")
+    compare.add_argument("--tool", default="etl")
+    listing = sub.add_parser("list", help="list recorded runs")
+    listing.add_argument("--tool")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for path in list_runs(args.dir, args.tool):
+            report = json.loads(path.read_text())
+            print(f"{path.name:<48} wall {report['wall_seconds']:8.2f}s  cpu {report['cpu_seconds']:8.2f}s  peak {report['peak_rss_mb']} MB")
+        return
+    paths = args.reports or list_runs(args.dir, args.tool)[-2:]
+    if len(paths) != 2:
+        raise SystemExit(f"Need two reports to compare (found {len(paths)} in {args.dir})")
+    print_comparison(*(json.loads(Path(p).read_text()) for p in paths))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,185 @@
 """
 Supabase ETL (DuckDB -> Supabase Postgres)
 -----------------------------------------
-- Loads CSVs from canonical `rpls_data/`
+- Loads CSVs from canonical `rpls_data/` (via the Parquet staging cache in staging.py);
+  any source may be stored as `.csv.gz` or `.csv.zst` instead. Each file is read once per run
+  into a DuckDB temp table that every dimension, fact and summary query shares (SourceTables)
 - Normalizes to dimension + fact tables (schema in supabase/schema.sql)
-- Upserts to Supabase (Service Role key recommended)
+- Upserts to Supabase (Service Role key recommended), several batches in flight at
+  once with per-batch retries (supabase_upload.py; SUPABASE_UPLOAD_CONCURRENCY,
+  SUPABASE_UPLOAD_RETRIES); batches are sized per table to a byte budget that adapts
+  to response latency and errors and is remembered between runs (SUPABASE_BATCH_BYTES,
+  SUPABASE_BATCH_TARGET_SECONDS, SUPABASE_BATCH_SETTINGS_PATH)
+- Or, with SUPABASE_SINK=copy and SUPABASE_DB_URL, bulk-loads each table straight into
+  Postgres with COPY + a set-based ON CONFLICT merge (postgres_sink.py; needs psycopg)
+- Or, with SUPABASE_SINK=duckdb|sqlite|parquet, runs the same load against a local file or
+  directory (SUPABASE_SINK_PATH), no credentials needed; all destinations share one interface
+  (sinks.py), and bench_sinks.py compares their throughput
+- Full refreshes (SUPABASE_CLEAR_BEFORE_LOAD=1) either delete the live rows first or, with
+  SUPABASE_REFRESH=swap, load shadow copies and swap them all in with one SQL function call at
+  the end, so the dashboard never reads a half-loaded table
+- Only ships rows that changed since the last successful load: each table is diffed
+  against a local row-hash snapshot keyed by CONFLICT_TARGETS (delta_snapshot.py);
+  SUPABASE_DELTA=0 re-sends everything, SUPABASE_DRY_RUN=1 (or --plan) just reports the deltas
+  and a per-table capacity plan: rows, JSON and Postgres heap/index bytes, upload time (load_plan.py)
+- Journals each accepted batch and finished table next to the snapshot, so `--resume` picks an
+  interrupted run up where it stopped instead of clearing and reloading everything
+- Streams fact/summary rows out of DuckDB in SUPABASE_STREAM_ROWS chunks end to end, so peak
+  memory is bounded by SUPABASE_ETL_MEMORY_MB rather than by the size of the drop; chunks stay
+  Arrow tables, cleaned, deduped, diffed and rendered to JSON column-wise (columnar.py)
+- Source tables and the multi-granularity aggregates live in an on-disk work database
+  (SUPABASE_WORK_DB) that DuckDB runs within SUPABASE_DUCKDB_MEMORY_MB and
+  SUPABASE_DUCKDB_THREADS, spilling to SUPABASE_TEMP_DIR, so a drop larger than RAM costs disk
+- With SUPABASE_PARQUET_EXPORT=<dir>, also writes the multi-granularity facts there as
+  month-partitioned, sorted Parquet with a pruning reader (fact_export.py)
+- Runs as a graph of per-table tasks (etl_dag.py): the three dimensions first, then every fact
+  table and the summaries concurrently, each extracted within a CPU budget and uploaded within a
+  network budget (SUPABASE_ETL_CPU_WORKERS, SUPABASE_ETL_NETWORK_WORKERS); each run ends with a
+  critical-path report, also stored in the run profile
+- Summary CSVs are unpivoted in DuckDB into one long `summary_values` table, with months and
+  change columns read from the headers rather than hard-coded (summaries.py)
 
 Run:
   export PUBLIC_SUPABASE_URL=...
   export SUPABASE_SERVICE_ROLE_KEY=...
   python backend/etl_supabase.py
+  python backend/etl_supabase.py --resume   # after an interrupted run: skip finished tables/batches
 """
 
 from __future__ import annotations
 
+import argparse
 import os
+import threading
+from functools import partial
 from pathlib import Path
-from typing import Sequence
+from typing import Iterable, Iterator, Sequence
 
 import duckdb
-import pandas as pd
-import numpy as np
-import math
+import pyarrow as pa
 from dotenv import load_dotenv
-from supabase import Client, create_client
+from supabase import create_client
+
+import columnar
+import etl_dag
+import etl_profile
+import fact_export
+import load_plan
+import sinks
+import staging
+import summaries
+from delta_snapshot import Delta, DeltaSnapshot, target_scope
+from postgres_sink import PostgresSink
+from supabase_upload import UPLOAD_CONCURRENCY, BatchSettings, BatchUploader
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = Path(os.environ.get("RPLS_DATA_DIR", ROOT.parent / "rpls_data"))
 ENV_PATH = ROOT / ".env"
+SCHEMA_PATH = ROOT / "supabase" / "schema.sql"
 CLEAR_BEFORE_LOAD = os.getenv("SUPABASE_CLEAR_BEFORE_LOAD") == "1"
 LOAD_BASE_FACTS = os.getenv("LOAD_BASE_FACTS", "1") != "0"
 LOAD_MULTI_FACTS = os.getenv("LOAD_MULTI_FACTS", "1") != "0"
 LOAD_SUMMARIES = os.getenv("LOAD_SUMMARIES", "1") != "0"
 
-# Safety guard: refuse to proceed if the largest CSV bundle exceeds ~450MB
-BIG_FILES = [
-    DATA_DIR / "employment_all_granularities.csv",
-    DATA_DIR / "salaries_all_granularities.csv",
-    DATA_DIR / "hiring_and_attrition_by_sector_occupation_state.csv",
-    DATA_DIR / "postings_by_sector_occupation_state.csv",
-]
-# Allow up to ~700MB for high-volume sources; warn if exceeded
-MAX_BYTES = 700 * 1024 * 1024
-AVG_ROW_BYTES = int(os.environ.get("SUPABASE_ROW_BYTES_ESTIMATE", "200"))  # rough estimate for size check
+# Peak-memory ceiling for a run. Transform queries stream out of DuckDB in SUPABASE_STREAM_ROWS
+# record batches and only a bounded window of them is in Python/in flight at a time, so memory
+# tracks the chunk size rather than the size of the drop. DuckDB gets half of the ceiling
+# (SUPABASE_DUCKDB_MEMORY_MB) and spills past it to SUPABASE_TEMP_DIR, the delta snapshot a
+# quarter; if resident memory still crosses the ceiling the run stops rather than let the machine swap.
+MEMORY_MB = int(os.environ.get("SUPABASE_ETL_MEMORY_MB", "2048"))
+STREAM_ROWS = int(os.environ.get("SUPABASE_STREAM_ROWS", "10000"))
+TEMP_DIR = Path(os.environ.get("SUPABASE_TEMP_DIR", DATA_DIR / ".duckdb_tmp"))
+DUCKDB_MEMORY_MB = int(os.environ.get("SUPABASE_DUCKDB_MEMORY_MB", MEMORY_MB // 2))
+DUCKDB_THREADS = int(os.environ.get("SUPABASE_DUCKDB_THREADS", "4"))
+# On-disk work database for the run's source tables and multi-fact aggregates, so a drop larger
+# than RAM only costs disk; recreated for every run and removed after it. Default:
+# DATA_DIR/.supabase_work.duckdb; ":memory:" keeps everything in RAM as before.
+WORK_DB = os.environ.get("SUPABASE_WORK_DB")
+# Also write the multi-granularity facts as month-partitioned Parquet here (fact_export.py)
+PARQUET_EXPORT = os.environ.get("SUPABASE_PARQUET_EXPORT")
+# Tables run as parallel tasks once their dependencies are loaded (etl_dag.py): at most
+# SUPABASE_ETL_CPU_WORKERS extracting in DuckDB and SUPABASE_ETL_NETWORK_WORKERS streaming into the
+# sink at once (each REST upload keeps SUPABASE_UPLOAD_CONCURRENCY batches in flight). With 1 and 1
+# the tables upload one after another while the next one is extracted.
+CPU_WORKERS = int(os.environ.get("SUPABASE_ETL_CPU_WORKERS", min(4, os.cpu_count() or 1)))
+NETWORK_WORKERS = int(os.environ.get("SUPABASE_ETL_NETWORK_WORKERS", "2"))
+# Remote storage guard: abort once the loaded tables are estimated past the project's quota
+STORAGE_GUARD_MB = int(os.environ.get("SUPABASE_STORAGE_GUARD_MB", "700"))
+# Bytes per stored row for tables the latest dry-run plan (load_plan.py) has not measured
+AVG_ROW_BYTES = int(os.environ.get("SUPABASE_ROW_BYTES_ESTIMATE", "200"))
 
 load_dotenv(ENV_PATH)
 SUPABASE_URL = os.getenv("PUBLIC_SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+# Where the rows go (sinks.py): "rest" (JSON upserts through the Supabase API), "copy" (COPY + merge
+# over a Postgres connection), or a credential-free local "duckdb"/"sqlite" file or "parquet" directory
+SINK = os.getenv("SUPABASE_SINK", "rest").lower()
+DB_URL = os.getenv("SUPABASE_DB_URL")
+if SINK not in sinks.SINKS:
+    raise SystemExit(f"SUPABASE_SINK must be one of {', '.join(sinks.SINKS)}, got {SINK!r}")
+SINK_PATH = Path(os.environ.get("SUPABASE_SINK_PATH", DATA_DIR / ".sink" / sinks.LOCAL_PATHS.get(SINK, "")))
+# Full refreshes (SUPABASE_CLEAR_BEFORE_LOAD=1): "delete" empties the live tables before loading;
+# "swap" loads shadow copies and swaps them in at the end, so readers never see a partial load
+# (needs supabase/migrations/20261019_etl_shadow_refresh.sql)
+REFRESH = os.getenv("SUPABASE_REFRESH", "delete").lower()
+if REFRESH not in {"delete", "swap"}:
+    raise SystemExit(f"SUPABASE_REFRESH must be 'delete' or 'swap', got {REFRESH!r}")
+
+# Delta uploads against the local snapshot of what was last loaded (0 = re-send every row)
+DELTA = os.getenv("SUPABASE_DELTA", "1") != "0"
+SNAPSHOT_PATH = Path(os.environ.get("SUPABASE_SNAPSHOT_PATH", DATA_DIR / ".supabase_snapshot.duckdb"))
+if SINK in sinks.LOCAL_PATHS:
+    TARGET = f"{SINK}://{SINK_PATH.resolve()}"
+else:
+    TARGET = (DB_URL if SINK == "copy" else SUPABASE_URL) or ""
+# Per-table batch byte budgets learned by the REST uploader, reused by the next run
+BATCH_SETTINGS_PATH = Path(os.environ.get("SUPABASE_BATCH_SETTINGS_PATH", DATA_DIR / ".supabase_batches.json"))
 
-DRY_RUN = not (SUPABASE_URL and SUPABASE_KEY)
-supabase: Client | None = None
-if not DRY_RUN:
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+FORCED_DRY_RUN = os.getenv("SUPABASE_DRY_RUN") == "1"
+if SINK in sinks.LOCAL_PATHS:
+    DRY_RUN = FORCED_DRY_RUN
 else:
-    print(f"⚠️  Supabase credentials missing in {ENV_PATH}. Running in DRY RUN (no uploads).")
+    DRY_RUN = FORCED_DRY_RUN or (not DB_URL if SINK == "copy" else not (SUPABASE_URL and SUPABASE_KEY))
+sink: sinks.Sink | None = None
+if FORCED_DRY_RUN:
+    print("⚠️  SUPABASE_DRY_RUN=1: reporting deltas only (no uploads).")
+elif DRY_RUN:
+    missing = "SUPABASE_DB_URL" if SINK == "copy" else "Supabase credentials"
+    print(f"⚠️  {missing} missing in {ENV_PATH}. Running in DRY RUN (no uploads).")
+elif SINK == "copy":
+    sink = sinks.CopySink(PostgresSink(DB_URL))
+elif SINK == "rest":
+    client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    sink = sinks.RestSink(client, BatchUploader(client, settings=BatchSettings(BATCH_SETTINGS_PATH, target_scope(TARGET))))
+else:
+    sink = sinks.local_sink(SINK, SINK_PATH)
+    print(f"Writing to a local {SINK} sink at {SINK_PATH}")
+
+# Stage timings for the current run; run_etl() starts a fresh one and writes it out
+profiler = etl_profile.RunProfiler("etl_supabase", DATA_DIR)
+# Row-hash snapshot for delta uploads; opened by run_etl() (upsert() sends everything without it)
+snapshot: DeltaSnapshot | None = None
+# Capacity plan of a dry run (load_plan.py); upsert() feeds it every chunk it would send
+plan: load_plan.LoadPlan | None = None
+# Tables an interrupted run already finished; run_etl(resume=True) fills it from the snapshot's journal
+completed_tables: set[str] = set()
+# Tables of a swap refresh currently being loaded into their shadow copies
+shadowed: set[str] = set()
 
-# Explicit conflict targets so upserts hit natural keys instead of UUID ids
+# Explicit conflict targets so upserts hit natural keys instead of UUID ids. Each is a fact
+# table's unique constraint, which has to be NULLS NOT DISTINCT (migration 20261020) for an
+# upsert to replace a row with NULL dimensions rather than add a second one
 CONFLICT_TARGETS = {
-    "fact_employment": "date,sector_id,occupation_id,state_id",
-    "fact_postings": "date,sector_id,occupation_id,state_id",
-    "fact_hiring_attrition": "date,sector_id,occupation_id,state_id",
-    "fact_salaries": "date,sector_id,occupation_id,state_id",
+    "fact_employment": "date,sector_id,occupation_id,state_id,granularity",
+    "fact_postings": "date,sector_id,occupation_id,state_id,granularity",
+    "fact_hiring_attrition": "date,sector_id,occupation_id,state_id,granularity",
+    "fact_salaries": "date,sector_id,occupation_id,state_id,granularity",
     "fact_layoffs": "date,sector_id,state_id,granularity",
     "fact_employment_multi": "date,sector_id,occupation_id,state_id",
     "fact_postings_multi": "date,sector_id,occupation_id,state_id",
     "fact_hiring_attrition_multi": "date,sector_id,occupation_id,state_id",
     "fact_salaries_multi": "date,sector_id,occupation_id,state_id",
-    "summary_sector": "sector_id",
-    "summary_occupation": "occupation_id",
-    "summary_state": "state_id",
-    "salary_overview_naics": "sector_id",
-    "salary_overview_soc": "occupation_id",
-    "salary_overview_state": "state_id",
-    "salary_overview_total": "id",
-    "table_b_naics": "sector_id",
-    "table_b_soc": "occupation_id",
-    "table_b_state": "state_id",
-    "hiring_sector_summary": "sector_id",
-    "attrition_sector_summary": "sector_id",
+    "summary_values": "summary,entity_id,kind,month",
 }
 
 # Columns to use when wiping tables (full refresh mode)
@@ -90,102 +193,334 @@ CLEAR_TARGETS = {
     "fact_postings_multi": "id",
     "fact_hiring_attrition_multi": "id",
     "fact_salaries_multi": "id",
-    "summary_sector": "sector_id",
-    "summary_occupation": "occupation_id",
-    "summary_state": "state_id",
-    "salary_overview_naics": "sector_id",
-    "salary_overview_soc": "occupation_id",
-    "salary_overview_state": "state_id",
-    "salary_overview_total": "id",
-    "table_b_naics": "sector_id",
-    "table_b_soc": "occupation_id",
-    "table_b_state": "state_id",
-    "hiring_sector_summary": "sector_id",
-    "attrition_sector_summary": "sector_id",
+    "summary_values": "summary",
 }
 
-def check_size_guard():
-    total = 0
-    missing = []
-    for p in BIG_FILES:
-        if not p.exists():
-            missing.append(p.name)
-            continue
-        total += p.stat().st_size
-    if missing:
-        print(f"⚠️ Missing expected files: {', '.join(missing)}")
-    print(f"Estimated size of high-volume CSVs: {total/1024/1024:.1f} MB")
-    if total > MAX_BYTES and not DRY_RUN:
+
+class SourceTables:
+    """Source CSVs read once per run into tables of the run's in-memory DuckDB database.
+
+    A file is read (from the Parquet staging cache) the first time a query names it, and
+    every later dimension, fact or summary query scans the table instead; tasks running in
+    parallel on their own cursors share it, and one that asks for a file another is still
+    reading waits for it. Columns stay VARCHAR as staged; the queries apply their own casts.
+    """
+
+    def __init__(self, con: duckdb.DuckDBPyConnection):
+        self.con = con
+        self.tables: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._reading: dict[str, threading.Lock] = {}
+
+    def table(self, name: str) -> str:
+        with self._lock:
+            reading = self._reading.setdefault(name, threading.Lock())
+        with reading:
+            if name not in self.tables:
+                path = staging.resolve_source(DATA_DIR / f"{name}.csv")
+                cur = self.con.cursor()
+                try:
+                    with profiler.stage("parse", name, bytes_in=path.stat().st_size if path.exists() else None) as st:
+                        table = f"src_{name}"
+                        cur.execute(f"CREATE TABLE {table} AS SELECT * FROM {staging.scan_sql(path, cur)}")
+                        st.rows_out = cur.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+                finally:
+                    cur.close()
+                self.tables[name] = table
+        return self.tables[name]
+
+
+# Source tables of the current run; _load_all() opens them on its connection
+sources: SourceTables | None = None
+
+
+def source(name: str) -> str:
+    """Table holding a source CSV's rows for this run, read on first use (see SourceTables)."""
+    if sources is None:
+        raise RuntimeError("source() is only available while _load_all() is running")
+    return sources.table(name)
+
+
+def fetch_rows(con: duckdb.DuckDBPyConnection, table: str, sql: str) -> list:
+    """Run a transform query for `table` and pull its rows into Python, timing the two separately.
+
+    Only for the small dimension queries whose rows are reused; facts go through stream_batches().
+    """
+    with profiler.stage("query", table):
+        result = con.execute(sql)
+    with profiler.stage("fetch", table) as st:
+        rows = result.fetchall()
+        st.rows_out = len(rows)
+    return rows
+
+
+def stream_batches(
+    con: duckdb.DuckDBPyConnection, table: str, sql: str, materialize: bool = False
+) -> Iterator[pa.RecordBatch]:
+    """Lazily yield the result of a transform query as Arrow record batches of STREAM_ROWS rows.
+
+    Nothing runs until the first batch is requested, and at most one batch is held here. With
+    `materialize`, the query (a large aggregation) runs right away, in the caller's extract
+    stage, into a work-database table that is streamed out and dropped, so its hash table is
+    freed, or spilled, before the upload starts rather than held until the last batch is sent.
+    That table is also what SUPABASE_PARQUET_EXPORT writes out.
+    """
+    if not materialize:
+        return _batches(con, table, sql)
+    work = f"work_{table}"
+    with profiler.stage("aggregate", table) as st:
+        con.execute(f"CREATE OR REPLACE TABLE {work} AS {sql}")
+        st.rows_out = con.execute(f"SELECT count(*) FROM {work}").fetchone()[0]
+    if PARQUET_EXPORT:
+        with profiler.stage("export", table) as st:
+            st.rows_out = fact_export.export_table(con, work, table, Path(PARQUET_EXPORT))
+    return _batches(con, table, f"SELECT * FROM {work}", drop=work)
+
+
+def _batches(con: duckdb.DuckDBPyConnection, table: str, sql: str, drop: str | None = None) -> Iterator[pa.RecordBatch]:
+    with profiler.stage("query", table):
+        result = con.execute(sql)
+        # duckdb >= 1.4 names it to_arrow_reader; older releases only have fetch_record_batch
+        reader = (
+            result.to_arrow_reader(STREAM_ROWS)
+            if hasattr(result, "to_arrow_reader")
+            else result.fetch_record_batch(STREAM_ROWS)
+        )
+    batches = iter(reader)
+    fetch = profiler.tally("fetch", table)
+    while True:
+        with fetch as st:
+            batch = next(batches, None)
+            if batch is None:
+                break
+            st.rows_out += batch.num_rows
+        yield batch
+    if drop:
+        con.execute(f"DROP TABLE {drop}")
+
+
+def work_db_path() -> str:
+    return WORK_DB or str(DATA_DIR / ".supabase_work.duckdb")
+
+
+def open_work_db() -> duckdb.DuckDBPyConnection:
+    """The run's DuckDB database (work_db_path()), started empty, under the DuckDB memory/thread settings."""
+    TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    remove_work_db()
+    con = duckdb.connect(
+        database=work_db_path(),
+        config={
+            "threads": DUCKDB_THREADS,
+            "memory_limit": f"{DUCKDB_MEMORY_MB}MB",
+            "temp_directory": str(TEMP_DIR),
+        },
+    )
+    con.execute("SET enable_progress_bar = false;")
+    return con
+
+
+def remove_work_db() -> None:
+    path = work_db_path()
+    if path != ":memory:":
+        Path(path).unlink(missing_ok=True)
+        Path(f"{path}.wal").unlink(missing_ok=True)
+
+
+def check_memory(table: str) -> None:
+    rss = etl_profile.current_rss_mb()
+    if rss > MEMORY_MB:
         raise SystemExit(
-            f"Aborting ETL: high-volume CSVs total {total/1024/1024:.1f} MB exceeds guard {MAX_BYTES/1024/1024} MB. "
-            "Adjust guard or offload data before retrying."
+            f"Aborting ETL: resident memory {rss:.0f} MB exceeds SUPABASE_ETL_MEMORY_MB={MEMORY_MB} while loading "
+            f"{table}. Lower SUPABASE_STREAM_ROWS or SUPABASE_UPLOAD_CONCURRENCY, or raise the ceiling."
         )
 
 
+def summary_batches(con: duckdb.DuckDBPyConnection) -> Iterator[pa.RecordBatch] | None:
+    """All summary files as long-format rows (summaries.py), one query; None if none are present.
+
+    Needs dim_sectors/dim_occupations/dim_states registered on `con` for the name -> id joins.
+    """
+    parts = []
+    for spec in summaries.SUMMARIES:
+        path = staging.resolve_source(DATA_DIR / f"{spec.source}.csv")
+        if not path.exists():
+            print(f"⚠️ Missing summary source {path.name}; skipping {spec.summary}")
+            continue
+        src = source(spec.source)
+        headers = [d[0] for d in con.execute(f"SELECT * FROM {src} LIMIT 0").description]
+        sql = summaries.summary_sql(spec, headers, src, money)
+        if sql is None:
+            print(f"⚠️ No month or change columns in {path.name}; skipping {spec.summary}")
+            continue
+        parts.append(sql)
+    if not parts:
+        return None
+    return stream_batches(con, "summary_values", " UNION ALL ".join(parts))
+
+
 def money(col: str) -> str:
     return f"TRY_CAST(REPLACE(REPLACE({col}, '$',''), ',','') AS DOUBLE)"
 
 
-def upsert(table: str, columns: Sequence[str], rows: Sequence[Sequence]) -> None:
-    """Chunked upsert to Supabase; DRY_RUN logs only."""
-    if DRY_RUN:
-        print(f"DRY RUN: {table} rows={len(rows)}")
+def upsert(table: str, columns: Sequence[str], rows: Iterable) -> None:
+    """Stream rows into `table` through the configured sink; DRY_RUN sanitizes but logs instead of uploading.
+
+    `rows` is a list of rows or any iterable of Arrow record batches (typically stream_batches()).
+    It is consumed STREAM_ROWS at a time as Arrow tables, each sanitized and diffed against the
+    snapshot column-wise (columnar.py) and handed to the sink before the next is read.
+    REST: concurrent batches (supabase_upload.py); failed batches do not stop the others, they are
+    reported together and then raised. COPY: one staged bulk load + merge per table, all or nothing.
+    """
+    if table in completed_tables:
+        print(f"⏭️  Resume: {table} was loaded before the interruption; skipping")
         return
-    assert supabase is not None
-    if not rows:
-        print(f"Skip {table}: no rows")
+    key_columns = delta_key(table, columns)
+    diff = snapshot.diff(table, columns, key_columns) if snapshot is not None and key_columns else None
+    sanitize = profiler.tally("sanitize", table)
+    diffing = profiler.tally("delta", table)
+    planning = profiler.tally("plan", table)
+
+    def outgoing() -> Iterator[pa.Table]:
+        for chunk in columnar.tables(rows, columns, STREAM_ROWS):
+            with sanitize as st:
+                clean = columnar.sanitize(chunk)
+                st.rows_in += chunk.num_rows
+                st.rows_out += clean.num_rows
+            loaded = clean
+            if diff is not None:
+                with diffing as st:
+                    st.rows_in += clean.num_rows
+                    # Sinks that rewrite whole tables need every row, not just the changes
+                    clean = diff.select(clean, delta=DELTA and not (sink is not None and sink.full_tables))
+                    st.rows_out += clean.num_rows
+            if plan is not None:
+                with planning:
+                    plan.observe(table, loaded, clean)
+            check_memory(table)
+            if clean.num_rows:
+                yield clean
+
+    try:
+        if DRY_RUN:
+            for _ in outgoing():
+                pass
+            delta = diff.finish() if diff is not None else None
+            print(f"DRY RUN: {table} rows={sanitize.stage.rows_in}" + (f" delta {delta.summary()}" if delta else ""))
+            return
+
+        _load_rows(table, columns, outgoing(), on_batch=diff.confirm if diff is not None else None)
+        if diff is None:
+            if snapshot is not None:
+                snapshot.mark_done(table)
+            return
+        delta = diff.finish()
+        print(f"Delta {table}: {delta.summary()} (inserts ~updates -deletes =unchanged)")
+        # Rows dropped from a table this loader owns outright; dimension rows may still be referenced
+        if delta.deleted_keys and table in CLEAR_TARGETS and not sink.full_tables:
+            _delete_rows(table, delta)
+        diff.commit()
+    finally:
+        if diff is not None:
+            diff.close()
+
+
+def delta_key(table: str, columns: Sequence[str]) -> list[str] | None:
+    """Natural key used to diff `table`: its conflict target, else its `id` column."""
+    target = CONFLICT_TARGETS.get(table)
+    keys = [k.strip() for k in target.split(",")] if target else ["id"]
+    return keys if all(k in columns for k in keys) else None
+
+
+def _load_rows(table: str, columns: Sequence[str], chunks: Iterable[pa.Table], on_batch=None) -> None:
+    """Send the chunks through the sink; it calls `on_batch` with the rows of each batch it has written for good."""
+    assert sink is not None
+    with profiler.stage(sink.stage, table) as st:
+        result = sink.load(target_table(table), columns, chunks, CONFLICT_TARGETS.get(table), on_batch=on_batch)
+        st.rows_in, st.rows_out = result.rows, result.written
+    if not result.rows:
+        print(f"Skip {table}: no rows to send")
         return
+    print(
+        f"Loaded {result.written}/{result.rows} rows into {table} via {sink.name} in {result.seconds:.1f}s "
+        f"({result.rows_per_second:,.0f} rows/s" + (f", {result.detail})" if result.detail else ")")
+    )
+    _raise_failures(table, "batch", result)
 
-    def _sanitize(val):
-        if isinstance(val, str) and val.lower() in {"nan", "inf", "-inf", "infinity", "-infinity"}:
-            return None
-        if isinstance(val, float) and (np.isnan(val) or np.isinf(val)):
-            return None
-        return val
-
-    payload = []
-    for row in rows:
-        clean = {}
-        for col, val in zip(columns, row):
-            sval = _sanitize(val)
-            clean[col] = sval
-        payload.append(clean)
-    chunk = 1000
-    for i in range(0, len(payload), chunk):
-        batch = payload[i : i + chunk]
-        conflict_target = CONFLICT_TARGETS.get(table)
-        try:
-            supabase.table(table).upsert(batch, on_conflict=conflict_target).execute()
-        except Exception as exc:
-            # Fallback for tables without matching constraints
-            print(f"Upsert warning on {table} with conflict '{conflict_target}': {exc}. Retrying without conflict target.")
-            supabase.table(table).upsert(batch).execute()
-    print(f"Upserted {len(rows)} rows into {table}")
 
+def _delete_rows(table: str, delta: Delta) -> None:
+    assert sink is not None
+    keys = delta.deleted_keys
+    with profiler.stage("delete", table, rows_in=len(keys)) as st:
+        result = sink.delete(target_table(table), delta.key_columns, keys)
+        st.rows_out = result.written
+    print(f"Deleted {result.written} rows from {table} ({len(keys)} keys) in {result.seconds:.1f}s")
+    _raise_failures(table, "delete", result)
 
-def _norm(val):
-    if isinstance(val, float):
-        if math.isnan(val) or math.isinf(val):
-            return None
-        return val
-    if isinstance(val, str):
-        s = val.strip()
-        return s if s else None
-    return val
-
-
-def dedupe_rows(rows, key_indexes=(0, 1, 2, 3)):
-    """Remove duplicate rows based on tuple of key indexes, normalizing blanks/NaN."""
-    seen = set()
-    deduped = []
-    for r in rows:
-        normalized = [_norm(v) for v in r]
-        key = tuple(normalized[i] for i in key_indexes)
-        if key in seen:
-            continue
-        seen.add(key)
-        deduped.append(normalized)
-    return deduped
+
+def _raise_failures(table: str, what: str, result) -> None:
+    """Print every failed batch/delete of an upload result, then abort the run."""
+    if not result.failures:
+        return
+    plural = {"batch": "batches", "delete": "deletes"}[what]
+    for failure in result.failures:
+        print(
+            f"❌ {table} {what} {failure.index} (rows {failure.first_row}-{failure.first_row + failure.rows - 1}) "
+            f"failed after {failure.attempts} attempt(s): {failure.error}"
+        )
+    raise RuntimeError(f"{len(result.failures)} of {result.batches} {plural} failed for {table}")
+
+
+def dedupe_rows(batches: Iterable[pa.RecordBatch], key_indexes=(0, 1, 2, 3), table=None) -> Iterator[pa.Table]:
+    """Drop rows whose key was already seen, after trimming text and nulling blanks/NaN.
+
+    Works chunk by chunk on an Arrow stream; only a 64-bit hash of each key is remembered.
+    """
+    seen = columnar.KeyFilter()
+    tally = profiler.tally("dedupe", table)
+    for batch in batches:
+        with tally as st:
+            normalized = columnar.normalize(columnar.to_table(batch, batch.schema.names))
+            keys = [normalized.column_names[i] for i in key_indexes]
+            deduped = normalized.filter(pa.array(seen.keep(columnar.hash_columns(normalized, keys))))
+            st.rows_in += normalized.num_rows
+            st.rows_out += deduped.num_rows
+        yield deduped
+
+
+def target_table(table: str) -> str:
+    """Where `table`'s rows are written: its shadow copy during a swap refresh, else the table itself."""
+    return sinks.SHADOW_PREFIX + table if table in shadowed else table
+
+
+def start_shadow_refresh(resuming: bool = False) -> None:
+    """Create empty shadow copies of the CLEAR_TARGETS tables (keeping them when resuming) and load into those."""
+    tables = list(CLEAR_TARGETS)
+    if DRY_RUN:
+        print("DRY RUN: skip shadow tables")
+        return
+    assert sink is not None
+    if sink.full_tables:
+        # Every load already builds the whole table aside and moves it into place
+        print(f"The {sink.name} sink replaces each table whole; no shadow copies needed.")
+        return
+    if snapshot is not None and not resuming:
+        # The shadows start empty, so every row has to be sent
+        snapshot.forget(tables)
+    sink.prepare_shadow(tables, keep=resuming)
+    shadowed.update(tables)
+    print(f"Loading {len(tables)} tables into shadow copies; readers keep the current data until the swap.")
+
+
+def swap_shadow_tables() -> None:
+    """Swap every shadow copy in, all in one transaction."""
+    if not shadowed:
+        return
+    tables = [t for t in CLEAR_TARGETS if t in shadowed]
+    with profiler.stage("swap"):
+        assert sink is not None
+        sink.swap_shadow(tables)
+    shadowed.clear()
+    print(f"🔁 Swapped in {len(tables)} refreshed tables: {', '.join(tables)}")
 
 
 def clear_tables():
@@ -193,19 +528,43 @@ def clear_tables():
     if DRY_RUN:
         print("DRY RUN: skip clearing tables")
         return
-    assert supabase is not None
-    for table, col in CLEAR_TARGETS.items():
-        placeholder = "00000000-0000-0000-0000-000000000000" if col == "id" else "__wipe__"
-        supabase.table(table).delete().neq(col, placeholder).execute()
+    if snapshot is not None:
+        # Forget first: whatever happens below, these tables must be re-sent in full next time
+        snapshot.forget(list(CLEAR_TARGETS))
+    assert sink is not None
+    sink.clear(CLEAR_TARGETS)
     print(f"Cleared tables: {', '.join(CLEAR_TARGETS.keys())}")
 
 
+def report_plan(load: load_plan.LoadPlan) -> None:
+    """Finish the dry run's capacity plan: print it, write it next to the run profiles, check the storage guard."""
+    directory = etl_profile.profile_dir(DATA_DIR)
+    rates = load_plan.measured_rates(etl_profile.list_runs(directory, "etl_supabase"), sinks.SINKS[SINK].stage)
+    settings = BatchSettings(BATCH_SETTINGS_PATH, target_scope(TARGET))
+
+    def budget_rate(table: str) -> float | None:
+        # Batches are sized to take about target_seconds each, UPLOAD_CONCURRENCY at a time
+        if SINK != "rest":
+            return None
+        sizer = settings.sizer(table)
+        return UPLOAD_CONCURRENCY * sizer.target_bytes / sizer.target_seconds
+
+    load.finish(rates, budget_rate)
+    print("📐 Load plan (estimated Postgres storage and upload time):")
+    load.print_report()
+    print(f"Load plan written to {load.write(directory, profiler.run_id)}")
+    totals = load.totals()
+    storage_mb = (totals["heap_bytes"] + totals["index_bytes"]) / (1024 * 1024)
+    if storage_mb > STORAGE_GUARD_MB:
+        print(f"⚠️ Planned storage {storage_mb:.1f} MB exceeds SUPABASE_STORAGE_GUARD_MB={STORAGE_GUARD_MB}")
+
+
 def log_table_counts_and_estimate():
     """Log row counts per table and estimate total size; abort if exceeds guard."""
     if DRY_RUN:
         print("DRY RUN: skip table size logging")
         return
-    assert supabase is not None
+    assert sink is not None
     tables = [
         "fact_layoffs",
         "fact_salaries",
@@ -216,651 +575,679 @@ def log_table_counts_and_estimate():
         "fact_postings_multi",
         "fact_hiring_attrition_multi",
         "fact_salaries_multi",
-        "summary_sector",
-        "summary_occupation",
-        "summary_state",
-        "salary_overview_naics",
-        "salary_overview_soc",
-        "salary_overview_state",
-        "salary_overview_total",
-        "table_b_naics",
-        "table_b_soc",
-        "table_b_state",
-        "hiring_sector_summary",
-        "attrition_sector_summary",
+        "summary_values",
     ]
     total_rows = 0
+    total_bytes = 0.0
     counts = {}
+    row_bytes = load_plan.latest_row_bytes(etl_profile.profile_dir(DATA_DIR))
     for t in tables:
         try:
-            res = supabase.table(t).select("id", count="exact").limit(1).execute()
-            counts[t] = res.count or 0
-            total_rows += res.count or 0
+            counts[t] = sink.count_rows(t)
+            total_rows += counts[t]
+            total_bytes += counts[t] * row_bytes.get(t, AVG_ROW_BYTES)
         except Exception as exc:
             counts[t] = f"err:{exc}"
     print("Table row counts:", counts)
-    est_mb = (total_rows * AVG_ROW_BYTES) / (1024 * 1024)
-    print(f"Estimated Supabase payload: {est_mb:.1f} MB (rows={total_rows}, avg_row_bytes={AVG_ROW_BYTES})")
-    if est_mb > (MAX_BYTES / (1024 * 1024)):
-        raise SystemExit(
-            f"Aborting: estimated Supabase storage {est_mb:.1f} MB exceeds guard {(MAX_BYTES / (1024 * 1024)):.1f} MB."
-        )
+    est_mb = total_bytes / (1024 * 1024)
+    basis = "bytes/row from the last dry-run plan" if row_bytes else f"avg_row_bytes={AVG_ROW_BYTES}"
+    print(f"Estimated Supabase storage: {est_mb:.1f} MB (rows={total_rows}, {basis})")
+    if est_mb > STORAGE_GUARD_MB:
+        raise SystemExit(f"Aborting: estimated Supabase storage {est_mb:.1f} MB exceeds guard {STORAGE_GUARD_MB} MB.")
 
 
-def run_etl():
-    check_size_guard()
-    if not DATA_DIR.exists():
-        raise FileNotFoundError(f"Data dir not found: {DATA_DIR}")
+def run_etl(resume: bool = False):
+    """Run the load under a fresh profiler and delta snapshot; the stage report is written even when a stage fails.
+
+    With `resume`, pick up after an interrupted run: tables it finished are skipped, rows it had
+    confirmed are not re-sent, and SUPABASE_CLEAR_BEFORE_LOAD is not applied again.
+    """
+    global profiler, snapshot, sources, completed_tables, plan
+    profiler = etl_profile.RunProfiler(
+        "etl_supabase",
+        DATA_DIR,
+        {
+            "dry_run": DRY_RUN,
+            "clear_before_load": CLEAR_BEFORE_LOAD,
+            "base_facts": LOAD_BASE_FACTS,
+            "multi_facts": LOAD_MULTI_FACTS,
+            "summaries": LOAD_SUMMARIES,
+            "sink": SINK,
+            "delta": DELTA,
+            "resume": resume,
+        },
+    )
+    snapshot = DeltaSnapshot(SNAPSHOT_PATH, TARGET, memory_limit_mb=MEMORY_MB // 4)
+    plan = load_plan.LoadPlan(load_plan.read_schema(SCHEMA_PATH)) if DRY_RUN else None
+    resuming = resume and snapshot.has_checkpoint()
+    if resuming:
+        completed_tables = snapshot.completed()
+        print(f"⏯️  Resuming interrupted load ({len(completed_tables)} tables already done)")
+    elif resume:
+        print("Nothing to resume; running a normal load.")
+    if not resuming and not DRY_RUN:
+        snapshot.clear_checkpoint()
+    try:
+        _load_all(resuming)
+        if plan is not None:
+            report_plan(plan)
+        if not DRY_RUN:
+            snapshot.clear_checkpoint()
+    except BaseException:
+        if shadowed:
+            # The shadows never went live: the snapshot must not claim their rows are loaded
+            snapshot.forget(sorted(shadowed))
+        raise
+    finally:
+        snapshot.close()
+        snapshot = None
+        completed_tables = set()
+        shadowed.clear()
+        plan = None
+        sources = None
+        profiler.write()
 
-    if CLEAR_BEFORE_LOAD:
+
+def prepare_refresh(resuming: bool = False) -> None:
+    """Apply SUPABASE_CLEAR_BEFORE_LOAD: set up shadow copies (swap) or empty the tables (delete)."""
+    if CLEAR_BEFORE_LOAD and REFRESH == "swap":
+        with profiler.stage("shadow"):
+            start_shadow_refresh(resuming)
+    elif CLEAR_BEFORE_LOAD and not resuming:
         # Full refresh: clear downstream tables to avoid duplicate-key issues on unique constraints
-        clear_tables()
+        with profiler.stage("clear"):
+            clear_tables()
+    elif CLEAR_BEFORE_LOAD:
+        print("Skip clearing tables: resuming the interrupted load.")
     else:
         print("Skip clearing tables (set SUPABASE_CLEAR_BEFORE_LOAD=1 to force full refresh delete).")
 
-    con = duckdb.connect(database=":memory:", config={"threads": 4})
-    con.execute("SET enable_progress_bar = false;")
+
+def load_graph(con: duckdb.DuckDBPyConnection, resuming: bool = False) -> etl_dag.StageGraph:
+    """The run as tasks: dimensions first, then every fact table and the summaries side by side.
+
+    Each table is two tasks. "extract <table>" runs the load function on a DuckDB cursor of its
+    own (source reads, aggregates) within the "cpu" budget and returns its upload; the task named
+    after the table then streams that into the sink within the "network" budget, so extraction
+    goes on while the network slots are busy. The refresh step and the final swap bracket the
+    uploads the refresh replaces.
+    """
+    graph = etl_dag.StageGraph({"cpu": CPU_WORKERS, "network": NETWORK_WORKERS})
+    dims: dict[str, list] = {}
+    uploads: dict[str, tuple] = {}
+
+    def extract(table: str, load, *args, keep: bool = False):
+        def run() -> None:
+            cur = con.cursor()
+            try:
+                upload = load(cur, *args)
+            except BaseException:
+                cur.close()
+                raise
+            if keep:
+                dims[table] = upload.args[-1]
+            uploads[table] = (cur, upload)
+
+        return run
+
+    def send(table: str):
+        def run() -> None:
+            cur, upload = uploads.pop(table)
+            try:
+                if upload is not None:
+                    upload()
+            finally:
+                cur.close()
+
+        return run
+
+    def add(table: str, load, *args, after=(), keep: bool = False, extract_after=()) -> None:
+        graph.add(f"extract {table}", extract(table, load, *args, keep=keep), after=extract_after, uses=("cpu",))
+        graph.add(table, send(table), after=(f"extract {table}", *after), uses=("network",))
+
+    graph.add("refresh", lambda: prepare_refresh(resuming), uses=("network",))
+    for table, load in DIMENSION_LOADS.items():
+        add(table, load, keep=True)
+    facts = {**(BASE_FACT_LOADS if LOAD_BASE_FACTS else {}), **(MULTI_FACT_LOADS if LOAD_MULTI_FACTS else {})}
+    for table, load in facts.items():
+        add(table, load, after=("refresh", *FACT_DIMENSIONS.get(table, DIMENSION_LOADS)))
+    if LOAD_SUMMARIES:
+        add(
+            "summary_values", load_summary_values, dims,
+            after=("refresh", *DIMENSION_LOADS), extract_after=[f"extract {d}" for d in DIMENSION_LOADS],
+        )
+    graph.add("swap", swap_shadow_tables, after=tuple(graph.tasks), uses=("network",))
+    return graph
+
+
+def _load_all(resuming: bool = False):
+    global sources
+    if not DATA_DIR.exists():
+        raise FileNotFoundError(f"Data dir not found: {DATA_DIR}")
+
+    con = open_work_db()
+    sources = SourceTables(con)
     print(f"📂 Loading data from {DATA_DIR}")
 
-    # Dimensions
-    sectors = con.execute(
+    graph = load_graph(con, resuming)
+    try:
+        graph.run()
+    finally:
+        profiler.meta["stage_graph"] = graph.report()
+        graph.print_report()
+        con.close()
+        remove_work_db()
+    print("✅ Supabase ETL complete.")
+    with profiler.stage("table_counts"):
+        log_table_counts_and_estimate()
+
+
+# A table's upload as its load function returns it: upsert() with the extracted rows bound
+Upload = partial
+
+
+def load_dim_sectors(con: duckdb.DuckDBPyConnection) -> Upload:
+    sectors = fetch_rows(
+        con,
+        "dim_sectors",
         f"""
         WITH base AS (
-          SELECT naics2d_code AS code, naics2d_name AS name FROM read_csv_auto('{DATA_DIR/'employment_naics.csv'}', all_varchar=True)
+          SELECT naics2d_code AS code, naics2d_name AS name FROM {source('employment_naics')}
           UNION ALL
-          SELECT naics2d_code, naics2d_name FROM read_csv_auto('{DATA_DIR/'salaries_naics.csv'}', all_varchar=True)
+          SELECT naics2d_code, naics2d_name FROM {source('salaries_naics')}
         ),
         codes AS (
           SELECT DISTINCT code FROM base
           UNION
-          SELECT DISTINCT naics2d AS code FROM read_csv_auto('{DATA_DIR/'layoffs_by_naics.csv'}', all_varchar=True)
+          SELECT DISTINCT naics2d AS code FROM {source('layoffs_by_naics')}
           UNION
-          SELECT DISTINCT naics2d_code AS code FROM read_csv_auto('{DATA_DIR/'postings_by_sector.csv'}', all_varchar=True)
+          SELECT DISTINCT naics2d_code AS code FROM {source('postings_by_sector')}
         )
         SELECT c.code AS id, COALESCE(MAX(b.name), c.code) AS name
         FROM codes c
         LEFT JOIN base b ON c.code=b.code
         WHERE c.code IS NOT NULL AND c.code!=''
         GROUP BY c.code
-        """
-    ).fetchall()
-    upsert("dim_sectors", ["id", "name"], sectors)
+        """,
+    )
+    return partial(upsert, "dim_sectors", ["id", "name"], sectors)
 
-    occupations = con.execute(
+
+def load_dim_occupations(con: duckdb.DuckDBPyConnection) -> Upload:
+    occupations = fetch_rows(
+        con,
+        "dim_occupations",
         f"""
         WITH base AS (
-          SELECT soc2d_code AS code, soc2d_name AS name FROM read_csv_auto('{DATA_DIR/'employment_soc.csv'}', all_varchar=True)
+          SELECT soc2d_code AS code, soc2d_name AS name FROM {source('employment_soc')}
           UNION ALL
-          SELECT soc2d_code, soc2d_name FROM read_csv_auto('{DATA_DIR/'salaries_soc.csv'}', all_varchar=True)
+          SELECT soc2d_code, soc2d_name FROM {source('salaries_soc')}
         ),
         codes AS (
           SELECT DISTINCT code FROM base
           UNION
-          SELECT DISTINCT soc2d_code AS code FROM read_csv_auto('{DATA_DIR/'postings_by_occupation.csv'}', all_varchar=True)
+          SELECT DISTINCT soc2d_code AS code FROM {source('postings_by_occupation')}
         )
         SELECT c.code AS id, COALESCE(MAX(b.name), c.code) AS name
         FROM codes c
         LEFT JOIN base b ON c.code=b.code
         WHERE c.code IS NOT NULL AND c.code!=''
         GROUP BY c.code
-        """
-    ).fetchall()
-    upsert("dim_occupations", ["id", "name"], occupations)
+        """,
+    )
+    return partial(upsert, "dim_occupations", ["id", "name"], occupations)
+
 
-    states = con.execute(
+def load_dim_states(con: duckdb.DuckDBPyConnection) -> Upload:
+    states = fetch_rows(
+        con,
+        "dim_states",
         f"""
         WITH base AS (
-          SELECT state FROM read_csv_auto('{DATA_DIR/'employment_state.csv'}', all_varchar=True)
-          UNION ALL SELECT state FROM read_csv_auto('{DATA_DIR/'salaries_state.csv'}', all_varchar=True)
-          UNION ALL SELECT state FROM read_csv_auto('{DATA_DIR/'layoffs_by_state.csv'}', all_varchar=True)
-          UNION ALL SELECT state FROM read_csv_auto('{DATA_DIR/'postings_by_state.csv'}', all_varchar=True)
+          SELECT state FROM {source('employment_state')}
+          UNION ALL SELECT state FROM {source('salaries_state')}
+          UNION ALL SELECT state FROM {source('layoffs_by_state')}
+          UNION ALL SELECT state FROM {source('postings_by_state')}
         )
         SELECT DISTINCT COALESCE(NULLIF(state,''),'empty') AS id
         FROM base
         WHERE state IS NOT NULL
-        """
-    ).fetchall()
-    upsert("dim_states", ["id"], states)
-
-    if LOAD_BASE_FACTS:
-        # Layoffs
-        layoffs = con.execute(
-            f"""
-            WITH total AS (
-              SELECT month||'-01' AS date, NULL AS sector_id, NULL AS state_id,
-                     TRY_CAST(num_employees_notified AS INT), TRY_CAST(num_notices_issued AS INT),
-                     TRY_CAST(num_employees_laidoff AS INT), 'total' AS granularity
-              FROM read_csv_auto('{DATA_DIR/'total_layoffs.csv'}', all_varchar=True)
-            ),
-            naics AS (
-              SELECT month||'-01', naics2d, NULL,
-                     TRY_CAST(num_employees_notified AS INT), TRY_CAST(num_notices_issued AS INT),
-                     TRY_CAST(num_employees_laidoff AS INT), 'sector'
-              FROM read_csv_auto('{DATA_DIR/'layoffs_by_naics.csv'}', all_varchar=True)
-            ),
-            state AS (
-              SELECT month||'-01', NULL, state,
-                     TRY_CAST(num_employees_notified AS INT), TRY_CAST(num_notices_issued AS INT),
-                     TRY_CAST(num_employees_laidoff AS INT), 'state'
-              FROM read_csv_auto('{DATA_DIR/'layoffs_by_state.csv'}', all_varchar=True)
-            )
-            SELECT * FROM total
-            UNION ALL SELECT * FROM naics
-            UNION ALL SELECT * FROM state
-            """
-        ).fetchall()
-        upsert(
-            "fact_layoffs",
-            ["date", "sector_id", "state_id", "employees_notified", "notices_issued", "employees_laidoff", "granularity"],
-            layoffs,
-        )
+        """,
+    )
+    return partial(upsert, "dim_states", ["id"], states)
 
-        # Salaries
-        salaries = con.execute(
-            f"""
-            WITH naics AS (
-              SELECT month||'-01' AS date, naics2d_code AS sector_id, NULL AS occupation_id, NULL AS state_id,
-                     TRY_CAST(count AS INT) AS count, {money('salary_nsa')} AS salary_nsa, {money('salary_sa')} AS salary_sa,
-                     'sector' AS granularity
-              FROM read_csv_auto('{DATA_DIR/'salaries_naics.csv'}', all_varchar=True)
-            ),
-            soc AS (
-              SELECT month||'-01', NULL, soc2d_code, NULL,
-                     TRY_CAST(count AS INT), {money('salary_nsa')}, {money('salary_sa')}, 'occupation'
-              FROM read_csv_auto('{DATA_DIR/'salaries_soc.csv'}', all_varchar=True)
-            ),
-            state AS (
-              SELECT month||'-01', NULL, NULL, state,
-                     TRY_CAST(count AS INT), {money('salary_nsa')}, {money('salary_sa')}, 'state'
-              FROM read_csv_auto('{DATA_DIR/'salaries_state.csv'}', all_varchar=True)
-            ),
-            national AS (
-              SELECT month||'-01', NULL, NULL, NULL,
-                     TRY_CAST(count AS INT), {money('salary_nsa')}, {money('salary_sa')}, 'national'
-              FROM read_csv_auto('{DATA_DIR/'salaries_national.csv'}', all_varchar=True)
-            )
-            SELECT * FROM naics
-            UNION ALL SELECT * FROM soc
-            UNION ALL SELECT * FROM state
-            UNION ALL SELECT * FROM national
-            """
-        ).fetchall()
-        upsert(
-            "fact_salaries",
-            ["date", "sector_id", "occupation_id", "state_id", "count", "salary_nsa", "salary_sa", "granularity"],
-            salaries,
-        )
 
-        # Employment
-        employment = con.execute(
-            f"""
-            WITH national AS (
-              SELECT month||'-01' AS date, NULL AS sector_id, NULL AS occupation_id, NULL AS state_id,
-                     TRY_CAST(employment_nsa AS DOUBLE), TRY_CAST(employment_sa AS DOUBLE), 'national' AS granularity
-              FROM read_csv_auto('{DATA_DIR/'employment_national.csv'}', all_varchar=True)
-            ),
-            naics AS (
-              SELECT month||'-01', naics2d_code, NULL, NULL,
-                     TRY_CAST(employment_nsa AS DOUBLE), TRY_CAST(employment_sa AS DOUBLE), 'sector'
-              FROM read_csv_auto('{DATA_DIR/'employment_naics.csv'}', all_varchar=True)
-            ),
-            soc AS (
-              SELECT month||'-01', NULL, soc2d_code, NULL,
-                     TRY_CAST(employment_nsa AS DOUBLE), TRY_CAST(employment_sa AS DOUBLE), 'occupation'
-              FROM read_csv_auto('{DATA_DIR/'employment_soc.csv'}', all_varchar=True)
-            ),
-            state AS (
-              SELECT month||'-01', NULL, NULL, state,
-                     TRY_CAST(employment_nsa AS DOUBLE), TRY_CAST(employment_sa AS DOUBLE), 'state'
-              FROM read_csv_auto('{DATA_DIR/'employment_state.csv'}', all_varchar=True)
-            )
-            SELECT * FROM national
-            UNION ALL SELECT * FROM naics
-            UNION ALL SELECT * FROM soc
-            UNION ALL SELECT * FROM state
-            """
-        ).fetchall()
-        upsert(
-            "fact_employment",
-            ["date", "sector_id", "occupation_id", "state_id", "employment_nsa", "employment_sa", "granularity"],
-            employment,
+def load_fact_layoffs(con: duckdb.DuckDBPyConnection) -> Upload:
+    layoffs = stream_batches(
+        con,
+        "fact_layoffs",
+        f"""
+        WITH total AS (
+          SELECT month||'-01' AS date, NULL AS sector_id, NULL AS state_id,
+                 TRY_CAST(num_employees_notified AS INT), TRY_CAST(num_notices_issued AS INT),
+                 TRY_CAST(num_employees_laidoff AS INT), 'total' AS granularity
+          FROM {source('total_layoffs')}
+        ),
+        naics AS (
+          SELECT month||'-01', naics2d, NULL,
+                 TRY_CAST(num_employees_notified AS INT), TRY_CAST(num_notices_issued AS INT),
+                 TRY_CAST(num_employees_laidoff AS INT), 'sector'
+          FROM {source('layoffs_by_naics')}
+        ),
+        state AS (
+          SELECT month||'-01', NULL, state,
+                 TRY_CAST(num_employees_notified AS INT), TRY_CAST(num_notices_issued AS INT),
+                 TRY_CAST(num_employees_laidoff AS INT), 'state'
+          FROM {source('layoffs_by_state')}
         )
+        SELECT * FROM total
+        UNION ALL SELECT * FROM naics
+        UNION ALL SELECT * FROM state
+        """,
+    )
+    return partial(
+        upsert,
+        "fact_layoffs",
+        ["date", "sector_id", "state_id", "employees_notified", "notices_issued", "employees_laidoff", "granularity"],
+        layoffs,
+    )
 
-        # Postings
-        postings = con.execute(
-            f"""
-            WITH total AS (
-              SELECT month||'-01' AS date, NULL AS sector_id, NULL AS occupation_id, NULL AS state_id,
-                     TRY_CAST(active_postings_nsa AS DOUBLE), TRY_CAST(active_postings_sa AS DOUBLE),
-                     NULL AS new_postings_nsa, NULL AS new_postings_sa,
-                     NULL AS removed_postings_nsa, NULL AS removed_postings_sa,
-                     'total' AS granularity
-              FROM read_csv_auto('{DATA_DIR/'postings_total_us.csv'}', all_varchar=True)
-            ),
-            naics AS (
-              SELECT month||'-01', naics2d_code, NULL, NULL,
-                     TRY_CAST(active_postings_nsa AS DOUBLE), TRY_CAST(active_postings_sa AS DOUBLE),
-                     NULL,NULL,NULL,NULL,
-                     'sector'
-              FROM read_csv_auto('{DATA_DIR/'postings_by_sector.csv'}', all_varchar=True)
-            ),
-            soc AS (
-              SELECT month||'-01', NULL, soc2d_code, NULL,
-                     TRY_CAST(active_postings_nsa AS DOUBLE), TRY_CAST(active_postings_sa AS DOUBLE),
-                     NULL,NULL,NULL,NULL,
-                     'occupation'
-              FROM read_csv_auto('{DATA_DIR/'postings_by_occupation.csv'}', all_varchar=True)
-            ),
-            state AS (
-              SELECT month||'-01', NULL, NULL, state,
-                     TRY_CAST(active_postings_nsa AS DOUBLE), TRY_CAST(active_postings_sa AS DOUBLE),
-                     NULL,NULL,NULL,NULL,
-                     'state'
-              FROM read_csv_auto('{DATA_DIR/'postings_by_state.csv'}', all_varchar=True)
-            )
-            SELECT * FROM total
-            UNION ALL SELECT * FROM naics
-            UNION ALL SELECT * FROM soc
-            UNION ALL SELECT * FROM state
-            """
-        ).fetchall()
-        upsert(
-            "fact_postings",
-            [
-                "date",
-                "sector_id",
-                "occupation_id",
-                "state_id",
-                "active_postings_nsa",
-                "active_postings_sa",
-                "new_postings_nsa",
-                "new_postings_sa",
-                "removed_postings_nsa",
-                "removed_postings_sa",
-                "granularity",
-            ],
-            postings,
-        )
 
-        # Hiring / Attrition
-        hiring = con.execute(
-            f"""
-            WITH total AS (
-              SELECT month||'-01' AS date, NULL AS sector_id, NULL AS occupation_id, NULL AS state_id,
-                     TRY_CAST(rl_hiring_rate AS DOUBLE) AS hiring_rate_sa,
-                     TRY_CAST(rl_attrition_rate AS DOUBLE) AS attrition_rate_sa,
-                     TRY_CAST(rl_hiring_rate_nsa AS DOUBLE) AS hiring_rate_nsa,
-                     TRY_CAST(rl_attrition_rate_nsa AS DOUBLE) AS attrition_rate_nsa,
-                     'total' AS granularity
-              FROM read_csv_auto('{DATA_DIR/'hiring_and_attrition_total_us.csv'}', all_varchar=True)
-            ),
-            naics AS (
-              SELECT month||'-01', naics2d_code, NULL, NULL,
-                     TRY_CAST(rl_hiring_rate AS DOUBLE), TRY_CAST(rl_attrition_rate AS DOUBLE),
-                     TRY_CAST(rl_hiring_rate_nsa AS DOUBLE), TRY_CAST(rl_attrition_rate_nsa AS DOUBLE),
-                     'sector'
-              FROM read_csv_auto('{DATA_DIR/'hiring_and_attrition_by_sector.csv'}', all_varchar=True)
-            ),
-            soc AS (
-              SELECT month||'-01', NULL, soc2d_code, NULL,
-                     TRY_CAST(rl_hiring_rate AS DOUBLE), TRY_CAST(rl_attrition_rate AS DOUBLE),
-                     TRY_CAST(rl_hiring_rate_nsa AS DOUBLE), TRY_CAST(rl_attrition_rate_nsa AS DOUBLE),
-                     'occupation'
-              FROM read_csv_auto('{DATA_DIR/'hiring_and_attrition_by_occupation.csv'}', all_varchar=True)
-            ),
-            state AS (
-              SELECT month||'-01', NULL, NULL, state,
-                     TRY_CAST(rl_hiring_rate AS DOUBLE), TRY_CAST(rl_attrition_rate AS DOUBLE),
-                     TRY_CAST(rl_hiring_rate_nsa AS DOUBLE), TRY_CAST(rl_attrition_rate_nsa AS DOUBLE),
-                     'state'
-              FROM read_csv_auto('{DATA_DIR/'hiring_and_attrition_by_state.csv'}', all_varchar=True)
-            )
-            SELECT * FROM total
-            UNION ALL SELECT * FROM naics
-            UNION ALL SELECT * FROM soc
-            UNION ALL SELECT * FROM state
-            """
-        ).fetchall()
-        upsert(
-            "fact_hiring_attrition",
-            [
-                "date",
-                "sector_id",
-                "occupation_id",
-                "state_id",
-                "hiring_rate_sa",
-                "attrition_rate_sa",
-                "hiring_rate_nsa",
-                "attrition_rate_nsa",
-                "granularity",
-            ],
-            hiring,
+def load_fact_salaries(con: duckdb.DuckDBPyConnection) -> Upload:
+    salaries = stream_batches(
+        con,
+        "fact_salaries",
+        f"""
+        WITH naics AS (
+          SELECT month||'-01' AS date, naics2d_code AS sector_id, NULL AS occupation_id, NULL AS state_id,
+                 TRY_CAST(count AS INT) AS count, {money('salary_nsa')} AS salary_nsa, {money('salary_sa')} AS salary_sa,
+                 'sector' AS granularity
+          FROM {source('salaries_naics')}
+        ),
+        soc AS (
+          SELECT month||'-01', NULL, soc2d_code, NULL,
+                 TRY_CAST(count AS INT), {money('salary_nsa')}, {money('salary_sa')}, 'occupation'
+          FROM {source('salaries_soc')}
+        ),
+        state AS (
+          SELECT month||'-01', NULL, NULL, state,
+                 TRY_CAST(count AS INT), {money('salary_nsa')}, {money('salary_sa')}, 'state'
+          FROM {source('salaries_state')}
+        ),
+        national AS (
+          SELECT month||'-01', NULL, NULL, NULL,
+                 TRY_CAST(count AS INT), {money('salary_nsa')}, {money('salary_sa')}, 'national'
+          FROM {source('salaries_national')}
         )
+        SELECT * FROM naics
+        UNION ALL SELECT * FROM soc
+        UNION ALL SELECT * FROM state
+        UNION ALL SELECT * FROM national
+        """,
+    )
+    return partial(
+        upsert,
+        "fact_salaries",
+        ["date", "sector_id", "occupation_id", "state_id", "count", "salary_nsa", "salary_sa", "granularity"],
+        salaries,
+    )
 
-    if LOAD_MULTI_FACTS:
-        # Multi-dimension facts (sector + occupation + state)
-        employment_multi = con.execute(
-            f"""
-            WITH base AS (
-              SELECT substr(month,1,7)||'-01' AS date,
-                     NULLIF(TRIM(naics2d_code),'') AS sector_id,
-                     NULLIF(TRIM(soc2d_code),'') AS occupation_id,
-                     NULLIF(TRIM(state),'') AS state_id,
-                     TRY_CAST(count_nsa AS DOUBLE) AS employment_nsa,
-                     TRY_CAST(count_sa AS DOUBLE) AS employment_sa
-              FROM read_csv_auto('{DATA_DIR/'employment_all_granularities.csv'}', all_varchar=True)
-              WHERE month IS NOT NULL
-            )
-            SELECT date, sector_id, occupation_id, state_id,
-                   AVG(employment_nsa) AS employment_nsa,
-                   AVG(employment_sa) AS employment_sa
-            FROM base
-            WHERE sector_id IS NOT NULL AND occupation_id IS NOT NULL AND state_id IS NOT NULL
-            GROUP BY 1,2,3,4
-            """
-        ).fetchall()
-        upsert(
-            "fact_employment_multi",
-            ["date", "sector_id", "occupation_id", "state_id", "employment_nsa", "employment_sa"],
-            dedupe_rows(employment_multi),
-        )
 
-        postings_multi = con.execute(
-            f"""
-            WITH base AS (
-              SELECT substr(month,1,7)||'-01' AS date,
-                     NULLIF(TRIM(naics2d_code),'') AS sector_id,
-                     NULLIF(TRIM(soc2d_code),'') AS occupation_id,
-                     NULLIF(TRIM(state),'') AS state_id,
-                     TRY_CAST(active_postings_nsa AS DOUBLE) AS active_postings_nsa,
-                     TRY_CAST(active_postings_sa AS DOUBLE) AS active_postings_sa
-              FROM read_csv_auto('{DATA_DIR/'postings_by_sector_occupation_state.csv'}', all_varchar=True)
-              WHERE month IS NOT NULL
-            )
-            SELECT date, sector_id, occupation_id, state_id,
-                   AVG(active_postings_nsa) AS active_postings_nsa,
-                   AVG(active_postings_sa) AS active_postings_sa,
-                   NULL AS new_postings_nsa,
-                   NULL AS new_postings_sa,
-                   NULL AS removed_postings_nsa,
-                   NULL AS removed_postings_sa
-            FROM base
-            WHERE sector_id IS NOT NULL AND occupation_id IS NOT NULL AND state_id IS NOT NULL
-            GROUP BY 1,2,3,4
-            """
-        ).fetchall()
-        upsert(
-            "fact_postings_multi",
-            [
-                "date",
-                "sector_id",
-                "occupation_id",
-                "state_id",
-                "active_postings_nsa",
-                "active_postings_sa",
-                "new_postings_nsa",
-                "new_postings_sa",
-                "removed_postings_nsa",
-                "removed_postings_sa",
-            ],
-            dedupe_rows(postings_multi),
+def load_fact_employment(con: duckdb.DuckDBPyConnection) -> Upload:
+    employment = stream_batches(
+        con,
+        "fact_employment",
+        f"""
+        WITH national AS (
+          SELECT month||'-01' AS date, NULL AS sector_id, NULL AS occupation_id, NULL AS state_id,
+                 TRY_CAST(employment_nsa AS DOUBLE), TRY_CAST(employment_sa AS DOUBLE), 'national' AS granularity
+          FROM {source('employment_national')}
+        ),
+        naics AS (
+          SELECT month||'-01', naics2d_code, NULL, NULL,
+                 TRY_CAST(employment_nsa AS DOUBLE), TRY_CAST(employment_sa AS DOUBLE), 'sector'
+          FROM {source('employment_naics')}
+        ),
+        soc AS (
+          SELECT month||'-01', NULL, soc2d_code, NULL,
+                 TRY_CAST(employment_nsa AS DOUBLE), TRY_CAST(employment_sa AS DOUBLE), 'occupation'
+          FROM {source('employment_soc')}
+        ),
+        state AS (
+          SELECT month||'-01', NULL, NULL, state,
+                 TRY_CAST(employment_nsa AS DOUBLE), TRY_CAST(employment_sa AS DOUBLE), 'state'
+          FROM {source('employment_state')}
         )
+        SELECT * FROM national
+        UNION ALL SELECT * FROM naics
+        UNION ALL SELECT * FROM soc
+        UNION ALL SELECT * FROM state
+        """,
+    )
+    return partial(
+        upsert,
+        "fact_employment",
+        ["date", "sector_id", "occupation_id", "state_id", "employment_nsa", "employment_sa", "granularity"],
+        employment,
+    )
 
-        hiring_multi = con.execute(
-            f"""
-            WITH base AS (
-              SELECT substr(month,1,7)||'-01' AS date,
-                     NULLIF(TRIM(naics2d_code),'') AS sector_id,
-                     NULLIF(TRIM(soc2d_code),'') AS occupation_id,
-                     NULLIF(TRIM(state),'') AS state_id,
-                     TRY_CAST(rl_hiring_rate_nsa AS DOUBLE) AS hiring_rate_nsa,
-                     TRY_CAST(rl_attrition_rate_nsa AS DOUBLE) AS attrition_rate_nsa,
-                     TRY_CAST(rl_hiring_rate AS DOUBLE) AS hiring_rate_sa,
-                     TRY_CAST(rl_attrition_rate AS DOUBLE) AS attrition_rate_sa
-              FROM read_csv_auto('{DATA_DIR/'hiring_and_attrition_by_sector_occupation_state.csv'}', all_varchar=True)
-              WHERE month IS NOT NULL
-            )
-            SELECT date, sector_id, occupation_id, state_id,
-                   AVG(hiring_rate_nsa) AS hiring_rate_nsa,
-                   AVG(attrition_rate_nsa) AS attrition_rate_nsa,
-                   AVG(hiring_rate_sa) AS hiring_rate_sa,
-                   AVG(attrition_rate_sa) AS attrition_rate_sa
-            FROM base
-            WHERE sector_id IS NOT NULL AND occupation_id IS NOT NULL AND state_id IS NOT NULL
-            GROUP BY 1,2,3,4
-            """
-        ).fetchall()
-        upsert(
-            "fact_hiring_attrition_multi",
-            [
-                "date",
-                "sector_id",
-                "occupation_id",
-                "state_id",
-                "hiring_rate_nsa",
-                "attrition_rate_nsa",
-                "hiring_rate_sa",
-                "attrition_rate_sa",
-            ],
-            dedupe_rows(hiring_multi),
-        )
 
-        salaries_multi = con.execute(
-            f"""
-            WITH base AS (
-              SELECT substr(month,1,7)||'-01' AS date,
-                     NULLIF(TRIM(naics2d_code),'') AS sector_id,
-                     NULLIF(TRIM(soc2d_code),'') AS occupation_id,
-                     NULLIF(TRIM(state),'') AS state_id,
-                     TRY_CAST(count AS INT) AS count,
-                     TRY_CAST(salary_nsa AS DOUBLE) AS salary_nsa,
-                     TRY_CAST(salary_sa AS DOUBLE) AS salary_sa,
-                     TRY_CAST(weight AS DOUBLE) AS weight
-              FROM read_csv_auto('{DATA_DIR/'salaries_all_granularities.csv'}', all_varchar=True)
-              WHERE month IS NOT NULL
-            )
-            SELECT date, sector_id, occupation_id, state_id,
-                   SUM(count) AS count,
-                   AVG(salary_nsa) AS salary_nsa,
-                   AVG(salary_sa) AS salary_sa,
-                   AVG(weight) AS weight
-            FROM base
-            WHERE sector_id IS NOT NULL AND occupation_id IS NOT NULL AND state_id IS NOT NULL
-            GROUP BY 1,2,3,4
-            """
-        ).fetchall()
-        upsert(
-            "fact_salaries_multi",
-            ["date", "sector_id", "occupation_id", "state_id", "count", "salary_nsa", "salary_sa", "weight"],
-            dedupe_rows(salaries_multi),
+def load_fact_postings(con: duckdb.DuckDBPyConnection) -> Upload:
+    postings = stream_batches(
+        con,
+        "fact_postings",
+        f"""
+        WITH total AS (
+          SELECT month||'-01' AS date, NULL AS sector_id, NULL AS occupation_id, NULL AS state_id,
+                 TRY_CAST(active_postings_nsa AS DOUBLE), TRY_CAST(active_postings_sa AS DOUBLE),
+                 NULL AS new_postings_nsa, NULL AS new_postings_sa,
+                 NULL AS removed_postings_nsa, NULL AS removed_postings_sa,
+                 'total' AS granularity
+          FROM {source('postings_total_us')}
+        ),
+        naics AS (
+          SELECT month||'-01', naics2d_code, NULL, NULL,
+                 TRY_CAST(active_postings_nsa AS DOUBLE), TRY_CAST(active_postings_sa AS DOUBLE),
+                 NULL,NULL,NULL,NULL,
+                 'sector'
+          FROM {source('postings_by_sector')}
+        ),
+        soc AS (
+          SELECT month||'-01', NULL, soc2d_code, NULL,
+                 TRY_CAST(active_postings_nsa AS DOUBLE), TRY_CAST(active_postings_sa AS DOUBLE),
+                 NULL,NULL,NULL,NULL,
+                 'occupation'
+          FROM {source('postings_by_occupation')}
+        ),
+        state AS (
+          SELECT month||'-01', NULL, NULL, state,
+                 TRY_CAST(active_postings_nsa AS DOUBLE), TRY_CAST(active_postings_sa AS DOUBLE),
+                 NULL,NULL,NULL,NULL,
+                 'state'
+          FROM {source('postings_by_state')}
         )
+        SELECT * FROM total
+        UNION ALL SELECT * FROM naics
+        UNION ALL SELECT * FROM soc
+        UNION ALL SELECT * FROM state
+        """,
+    )
+    return partial(
+        upsert,
+        "fact_postings",
+        [
+            "date",
+            "sector_id",
+            "occupation_id",
+            "state_id",
+            "active_postings_nsa",
+            "active_postings_sa",
+            "new_postings_nsa",
+            "new_postings_sa",
+            "removed_postings_nsa",
+            "removed_postings_sa",
+            "granularity",
+        ],
+        postings,
+    )
 
-    # Summary / overview tables
-    sector_name_to_id = {name: code for code, name in sectors}
-    occ_name_to_id = {name: code for code, name in occupations}
-    state_name_to_id = {sid: sid for (sid,) in states}
-
-    def _num(val):
-        try:
-            return float(val)
-        except Exception:
-            return None
-
-    def load_summary(path, key_col, mapper, cols):
-        df = pd.read_csv(path)
-        rows = []
-        for _, r in df.iterrows():
-            key_val = mapper.get(str(r[key_col]), None)
-            if not key_val:
-                continue
-            rows.append([key_val] + [_num(r.get(c)) for c in cols])
-        return rows
-
-    if LOAD_SUMMARIES:
-        sector_summary_rows = load_summary(
-            DATA_DIR / "sector_summary.csv",
-            "Sector",
-            sector_name_to_id,
-            ["August 2025", "September 2025", "October 2025", "YoY change (Oct 24–Oct 25)", "MoM change (Sep 25–Oct 25)"],
-        )
-        upsert("summary_sector", ["sector_id", "aug_2025", "sep_2025", "oct_2025", "yoy", "mom"], sector_summary_rows)
 
-        occupation_summary_rows = load_summary(
-            DATA_DIR / "occupation_summary.csv",
-            "Occupation",
-            occ_name_to_id,
-            ["August 2025", "September 2025", "October 2025", "YoY change (Oct 24–Oct 25)", "MoM change (Sep 25–Oct 25)"],
+def load_fact_hiring_attrition(con: duckdb.DuckDBPyConnection) -> Upload:
+    hiring = stream_batches(
+        con,
+        "fact_hiring_attrition",
+        f"""
+        WITH total AS (
+          SELECT month||'-01' AS date, NULL AS sector_id, NULL AS occupation_id, NULL AS state_id,
+                 TRY_CAST(rl_hiring_rate AS DOUBLE) AS hiring_rate_sa,
+                 TRY_CAST(rl_attrition_rate AS DOUBLE) AS attrition_rate_sa,
+                 TRY_CAST(rl_hiring_rate_nsa AS DOUBLE) AS hiring_rate_nsa,
+                 TRY_CAST(rl_attrition_rate_nsa AS DOUBLE) AS attrition_rate_nsa,
+                 'total' AS granularity
+          FROM {source('hiring_and_attrition_total_us')}
+        ),
+        naics AS (
+          SELECT month||'-01', naics2d_code, NULL, NULL,
+                 TRY_CAST(rl_hiring_rate AS DOUBLE), TRY_CAST(rl_attrition_rate AS DOUBLE),
+                 TRY_CAST(rl_hiring_rate_nsa AS DOUBLE), TRY_CAST(rl_attrition_rate_nsa AS DOUBLE),
+                 'sector'
+          FROM {source('hiring_and_attrition_by_sector')}
+        ),
+        soc AS (
+          SELECT month||'-01', NULL, soc2d_code, NULL,
+                 TRY_CAST(rl_hiring_rate AS DOUBLE), TRY_CAST(rl_attrition_rate AS DOUBLE),
+                 TRY_CAST(rl_hiring_rate_nsa AS DOUBLE), TRY_CAST(rl_attrition_rate_nsa AS DOUBLE),
+                 'occupation'
+          FROM {source('hiring_and_attrition_by_occupation')}
+        ),
+        state AS (
+          SELECT month||'-01', NULL, NULL, state,
+                 TRY_CAST(rl_hiring_rate AS DOUBLE), TRY_CAST(rl_attrition_rate AS DOUBLE),
+                 TRY_CAST(rl_hiring_rate_nsa AS DOUBLE), TRY_CAST(rl_attrition_rate_nsa AS DOUBLE),
+                 'state'
+          FROM {source('hiring_and_attrition_by_state')}
         )
-        upsert("summary_occupation", ["occupation_id", "aug_2025", "sep_2025", "oct_2025", "yoy", "mom"], occupation_summary_rows)
+        SELECT * FROM total
+        UNION ALL SELECT * FROM naics
+        UNION ALL SELECT * FROM soc
+        UNION ALL SELECT * FROM state
+        """,
+    )
+    return partial(
+        upsert,
+        "fact_hiring_attrition",
+        [
+            "date",
+            "sector_id",
+            "occupation_id",
+            "state_id",
+            "hiring_rate_sa",
+            "attrition_rate_sa",
+            "hiring_rate_nsa",
+            "attrition_rate_nsa",
+            "granularity",
+        ],
+        hiring,
+    )
 
-        state_summary_rows = load_summary(
-            DATA_DIR / "state_summary.csv",
-            "State",
-            state_name_to_id,
-            ["August 2025", "September 2025", "October 2025", "YoY change (Oct 24–Oct 25)", "MoM change (Sep 25–Oct 25)"],
-        )
-        upsert("summary_state", ["state_id", "aug_2025", "sep_2025", "oct_2025", "yoy", "mom"], state_summary_rows)
-
-        sal_naics = con.execute(
-            f"""
-            SELECT naics2d_code AS sector_id,
-                   TRY_CAST("Oct 2024" AS DOUBLE),
-                   TRY_CAST("Aug 2025" AS DOUBLE),
-                   TRY_CAST("Sep 2025" AS DOUBLE),
-                   TRY_CAST("Oct 2025" AS DOUBLE),
-                   TRY_CAST("Pct change YoY (Oct 2024 - Oct 2025)" AS DOUBLE),
-                   TRY_CAST("Pct change (Sep 2025 - Oct 2025)" AS DOUBLE)
-            FROM read_csv_auto('{DATA_DIR/'salary_overview_naics.csv'}', all_varchar=True)
-            """
-        ).fetchall()
-        upsert(
-            "salary_overview_naics",
-            ["sector_id", "oct_2024", "aug_2025", "sep_2025", "oct_2025", "pct_change_yoy", "pct_change_mom"],
-            sal_naics,
-        )
 
-        sal_soc = con.execute(
-            f"""
-            SELECT soc2d_code AS occupation_id,
-                   TRY_CAST("Oct 2024" AS DOUBLE),
-                   TRY_CAST("Aug 2025" AS DOUBLE),
-                   TRY_CAST("Sep 2025" AS DOUBLE),
-                   TRY_CAST("Oct 2025" AS DOUBLE),
-                   TRY_CAST("Pct change YoY (Oct 2024 - Oct 2025)" AS DOUBLE),
-                   TRY_CAST("Pct change (Sep 2025 - Oct 2025)" AS DOUBLE)
-            FROM read_csv_auto('{DATA_DIR/'salary_overview_soc.csv'}', all_varchar=True)
-            """
-        ).fetchall()
-        upsert(
-            "salary_overview_soc",
-            ["occupation_id", "oct_2024", "aug_2025", "sep_2025", "oct_2025", "pct_change_yoy", "pct_change_mom"],
-            sal_soc,
+def load_fact_employment_multi(con: duckdb.DuckDBPyConnection) -> Upload:
+    employment_multi = stream_batches(
+        con,
+        "fact_employment_multi",
+        f"""
+        WITH base AS (
+          SELECT substr(month,1,7)||'-01' AS date,
+                 NULLIF(TRIM(naics2d_code),'') AS sector_id,
+                 NULLIF(TRIM(soc2d_code),'') AS occupation_id,
+                 NULLIF(TRIM(state),'') AS state_id,
+                 TRY_CAST(count_nsa AS DOUBLE) AS employment_nsa,
+                 TRY_CAST(count_sa AS DOUBLE) AS employment_sa
+          FROM {source('employment_all_granularities')}
+          WHERE month IS NOT NULL
         )
+        SELECT date, sector_id, occupation_id, state_id,
+               AVG(employment_nsa) AS employment_nsa,
+               AVG(employment_sa) AS employment_sa
+        FROM base
+        WHERE sector_id IS NOT NULL AND occupation_id IS NOT NULL AND state_id IS NOT NULL
+        GROUP BY 1,2,3,4
+        """,
+        materialize=True,
+    )
+    return partial(
+        upsert,
+        "fact_employment_multi",
+        ["date", "sector_id", "occupation_id", "state_id", "employment_nsa", "employment_sa"],
+        dedupe_rows(employment_multi, table="fact_employment_multi"),
+    )
 
-        sal_state = con.execute(
-            f"""
-            SELECT state AS state_id,
-                   TRY_CAST("Oct 2024" AS DOUBLE),
-                   TRY_CAST("Aug 2025" AS DOUBLE),
-                   TRY_CAST("Sep 2025" AS DOUBLE),
-                   TRY_CAST("Oct 2025" AS DOUBLE),
-                   TRY_CAST("Pct change YoY (Oct 2024 - Oct 2025)" AS DOUBLE),
-                   TRY_CAST("Pct change (Sep 2025 - Oct 2025)" AS DOUBLE)
-            FROM read_csv_auto('{DATA_DIR/'salary_overview_state.csv'}', all_varchar=True)
-            """
-        ).fetchall()
-        upsert(
-            "salary_overview_state",
-            ["state_id", "oct_2024", "aug_2025", "sep_2025", "oct_2025", "pct_change_yoy", "pct_change_mom"],
-            sal_state,
-        )
 
-        sal_total = con.execute(
-            f"""
-            SELECT '_total' AS id,
-                   TRY_CAST("Oct 2024" AS DOUBLE),
-                   TRY_CAST("Aug 2025" AS DOUBLE),
-                   TRY_CAST("Sep 2025" AS DOUBLE),
-                   TRY_CAST("Oct 2025" AS DOUBLE),
-                   TRY_CAST("Pct change YoY (Oct 2024 - Oct 2025)" AS DOUBLE),
-                   TRY_CAST("Pct change (Sep 2025 - Oct 2025)" AS DOUBLE)
-            FROM read_csv_auto('{DATA_DIR/'salary_overview_total.csv'}', all_varchar=True)
-            """
-        ).fetchall()
-        upsert(
-            "salary_overview_total",
-            ["id", "oct_2024", "aug_2025", "sep_2025", "oct_2025", "pct_change_yoy", "pct_change_mom"],
-            sal_total,
+def load_fact_postings_multi(con: duckdb.DuckDBPyConnection) -> Upload:
+    postings_multi = stream_batches(
+        con,
+        "fact_postings_multi",
+        f"""
+        WITH base AS (
+          SELECT substr(month,1,7)||'-01' AS date,
+                 NULLIF(TRIM(naics2d_code),'') AS sector_id,
+                 NULLIF(TRIM(soc2d_code),'') AS occupation_id,
+                 NULLIF(TRIM(state),'') AS state_id,
+                 TRY_CAST(active_postings_nsa AS DOUBLE) AS active_postings_nsa,
+                 TRY_CAST(active_postings_sa AS DOUBLE) AS active_postings_sa
+          FROM {source('postings_by_sector_occupation_state')}
+          WHERE month IS NOT NULL
         )
+        SELECT date, sector_id, occupation_id, state_id,
+               AVG(active_postings_nsa) AS active_postings_nsa,
+               AVG(active_postings_sa) AS active_postings_sa,
+               NULL AS new_postings_nsa,
+               NULL AS new_postings_sa,
+               NULL AS removed_postings_nsa,
+               NULL AS removed_postings_sa
+        FROM base
+        WHERE sector_id IS NOT NULL AND occupation_id IS NOT NULL AND state_id IS NOT NULL
+        GROUP BY 1,2,3,4
+        """,
+        materialize=True,
+    )
+    return partial(
+        upsert,
+        "fact_postings_multi",
+        [
+            "date",
+            "sector_id",
+            "occupation_id",
+            "state_id",
+            "active_postings_nsa",
+            "active_postings_sa",
+            "new_postings_nsa",
+            "new_postings_sa",
+            "removed_postings_nsa",
+            "removed_postings_sa",
+        ],
+        dedupe_rows(postings_multi, table="fact_postings_multi"),
+    )
 
-        table_b_naics = load_summary(
-            DATA_DIR / "table_b_naics.csv",
-            "Sector",
-            sector_name_to_id,
-            ["Oct 2024", "Aug 2025", "Sep 2025", "Oct 2025", "Oct 2025 - Oct 2024", "Oct 2025 - Sep 2025"],
-        )
-        upsert(
-            "table_b_naics",
-            ["sector_id", "oct_2024", "aug_2025", "sep_2025", "oct_2025", "diff_yoy", "diff_mom"],
-            table_b_naics,
-        )
 
-        table_b_soc = load_summary(
-            DATA_DIR / "table_b_soc.csv",
-            "SOC Category",
-            occ_name_to_id,
-            ["Oct 2024", "Aug 2025", "Sep 2025", "Oct 2025", "Oct 2025 - Oct 2024", "Oct 2025 - Sep 2025"],
-        )
-        upsert(
-            "table_b_soc",
-            ["occupation_id", "oct_2024", "aug_2025", "sep_2025", "oct_2025", "diff_yoy", "diff_mom"],
-            table_b_soc,
+def load_fact_hiring_attrition_multi(con: duckdb.DuckDBPyConnection) -> Upload:
+    hiring_multi = stream_batches(
+        con,
+        "fact_hiring_attrition_multi",
+        f"""
+        WITH base AS (
+          SELECT substr(month,1,7)||'-01' AS date,
+                 NULLIF(TRIM(naics2d_code),'') AS sector_id,
+                 NULLIF(TRIM(soc2d_code),'') AS occupation_id,
+                 NULLIF(TRIM(state),'') AS state_id,
+                 TRY_CAST(rl_hiring_rate_nsa AS DOUBLE) AS hiring_rate_nsa,
+                 TRY_CAST(rl_attrition_rate_nsa AS DOUBLE) AS attrition_rate_nsa,
+                 TRY_CAST(rl_hiring_rate AS DOUBLE) AS hiring_rate_sa,
+                 TRY_CAST(rl_attrition_rate AS DOUBLE) AS attrition_rate_sa
+          FROM {source('hiring_and_attrition_by_sector_occupation_state')}
+          WHERE month IS NOT NULL
         )
+        SELECT date, sector_id, occupation_id, state_id,
+               AVG(hiring_rate_nsa) AS hiring_rate_nsa,
+               AVG(attrition_rate_nsa) AS attrition_rate_nsa,
+               AVG(hiring_rate_sa) AS hiring_rate_sa,
+               AVG(attrition_rate_sa) AS attrition_rate_sa
+        FROM base
+        WHERE sector_id IS NOT NULL AND occupation_id IS NOT NULL AND state_id IS NOT NULL
+        GROUP BY 1,2,3,4
+        """,
+        materialize=True,
+    )
+    return partial(
+        upsert,
+        "fact_hiring_attrition_multi",
+        [
+            "date",
+            "sector_id",
+            "occupation_id",
+            "state_id",
+            "hiring_rate_nsa",
+            "attrition_rate_nsa",
+            "hiring_rate_sa",
+            "attrition_rate_sa",
+        ],
+        dedupe_rows(hiring_multi, table="fact_hiring_attrition_multi"),
+    )
 
-        table_b_state = load_summary(
-            DATA_DIR / "table_b_state.csv",
-            "State",
-            state_name_to_id,
-            ["Oct 2024", "Aug 2025", "Sep 2025", "Oct 2025", "Oct 2025 - Oct 2024", "Oct 2025 - Sep 2025"],
-        )
-        upsert(
-            "table_b_state",
-            ["state_id", "oct_2024", "aug_2025", "sep_2025", "oct_2025", "diff_yoy", "diff_mom"],
-            table_b_state,
-        )
 
-        hiring_sector_summary = load_summary(
-            DATA_DIR / "hiring_sector_summary.csv",
-            "Sector",
-            sector_name_to_id,
-            ["August 2025", "September 2025", "October 2025", "YoY change (pp) (Oct 24–Oct 25)", "MoM change (pp) (Sep 25–Oct 25)"],
-        )
-        upsert(
-            "hiring_sector_summary",
-            ["sector_id", "aug_2025", "sep_2025", "oct_2025", "yoy_pp", "mom_pp"],
-            hiring_sector_summary,
+def load_fact_salaries_multi(con: duckdb.DuckDBPyConnection) -> Upload:
+    salaries_multi = stream_batches(
+        con,
+        "fact_salaries_multi",
+        f"""
+        WITH base AS (
+          SELECT substr(month,1,7)||'-01' AS date,
+                 NULLIF(TRIM(naics2d_code),'') AS sector_id,
+                 NULLIF(TRIM(soc2d_code),'') AS occupation_id,
+                 NULLIF(TRIM(state),'') AS state_id,
+                 TRY_CAST(count AS INT) AS count,
+                 TRY_CAST(salary_nsa AS DOUBLE) AS salary_nsa,
+                 TRY_CAST(salary_sa AS DOUBLE) AS salary_sa,
+                 TRY_CAST(weight AS DOUBLE) AS weight
+          FROM {source('salaries_all_granularities')}
+          WHERE month IS NOT NULL
         )
+        SELECT date, sector_id, occupation_id, state_id,
+               SUM(count) AS count,
+               AVG(salary_nsa) AS salary_nsa,
+               AVG(salary_sa) AS salary_sa,
+               AVG(weight) AS weight
+        FROM base
+        WHERE sector_id IS NOT NULL AND occupation_id IS NOT NULL AND state_id IS NOT NULL
+        GROUP BY 1,2,3,4
+        """,
+        materialize=True,
+    )
+    return partial(
+        upsert,
+        "fact_salaries_multi",
+        ["date", "sector_id", "occupation_id", "state_id", "count", "salary_nsa", "salary_sa", "weight"],
+        dedupe_rows(salaries_multi, table="fact_salaries_multi"),
+    )
 
-        attrition_sector_summary = load_summary(
-            DATA_DIR / "attrition_sector_summary.csv",
-            "Sector",
-            sector_name_to_id,
-            ["August 2025", "September 2025", "October 2025", "YoY change (pp) (Oct 24–Oct 25)", "MoM change (pp) (Sep 25–Oct 25)"],
-        )
-        upsert(
-            "attrition_sector_summary",
-            ["sector_id", "aug_2025", "sep_2025", "oct_2025", "yoy_pp", "mom_pp"],
-            attrition_sector_summary,
-        )
 
-    print("✅ Supabase ETL complete.")
-    log_table_counts_and_estimate()
+def load_summary_values(con: duckdb.DuckDBPyConnection, dims: dict[str, list]) -> Upload | None:
+    con.register("dim_sectors", columnar.to_table(dims["dim_sectors"], ["id", "name"]))
+    con.register("dim_occupations", columnar.to_table(dims["dim_occupations"], ["id", "name"]))
+    con.register("dim_states", columnar.to_table(dims["dim_states"], ["id"]))
+    summary_rows = summary_batches(con)
+    if summary_rows is None:
+        return None
+    return partial(upsert, "summary_values", summaries.COLUMNS, dedupe_rows(summary_rows, table="summary_values"))
 
 
-def upload_to_supabase(table_name, columns, query_result):
-    """Backward compatibility shim; kept for older imports."""
-    upsert(table_name, columns, query_result)
+DIMENSION_LOADS = {"dim_sectors": load_dim_sectors, "dim_occupations": load_dim_occupations, "dim_states": load_dim_states}
+BASE_FACT_LOADS = {
+    "fact_layoffs": load_fact_layoffs,
+    "fact_salaries": load_fact_salaries,
+    "fact_employment": load_fact_employment,
+    "fact_postings": load_fact_postings,
+    "fact_hiring_attrition": load_fact_hiring_attrition,
+}
+MULTI_FACT_LOADS = {
+    "fact_employment_multi": load_fact_employment_multi,
+    "fact_postings_multi": load_fact_postings_multi,
+    "fact_hiring_attrition_multi": load_fact_hiring_attrition_multi,
+    "fact_salaries_multi": load_fact_salaries_multi,
+}
+# Dimensions a fact table references (supabase/schema.sql); the others reference all three
+FACT_DIMENSIONS = {"fact_layoffs": ("dim_sectors", "dim_states")}
 
 
 if __name__ == "__main__":
-    run_etl()
+    parser = argparse.ArgumentParser(description="Load the RPLS drop into Supabase.")
+    parser.add_argument(
+        "--resume", action="store_true", help="continue an interrupted load instead of starting over"
+    )
+    parser.add_argument(
+        "--plan", action="store_true", help="dry run that only writes the capacity plan (no network calls)"
+    )
+    args = parser.parse_args()
+    if args.plan:
+        DRY_RUN = True
+    run_etl(resume=args.resume)
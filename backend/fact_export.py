@@ -0,0 +1,175 @@
+"""
+Month-partitioned Parquet export of the multi-granularity facts
+---------------------------------------------------------------
+With SUPABASE_PARQUET_EXPORT=<dir>, etl_supabase.py also writes each of the four
+sector x occupation x state fact tables, straight from the aggregate it just built,
+as Hive-partitioned Parquet for consumers that do not go through Supabase:
+
+    <dir>/fact_employment_multi/month=2025-01/part-0.parquet
+    <dir>/fact_employment_multi/month=2025-02/part-0.parquet
+    ...
+
+Within a month, rows are sorted by state, sector and occupation and written in
+row groups of SUPABASE_EXPORT_ROW_GROUP_ROWS, each with min/max statistics. A
+table is built aside and moved into place whole, so readers never see half an
+export. scan() and read() prune first by partition, then by row-group
+statistics, so a one-month, one-state query only touches the few row groups
+that can hold it:
+
+    scan = fact_export.scan(root, "fact_employment_multi", month="2025-01", state_id="Ohio")
+    print(scan.bytes, "of", scan.total_bytes)
+    rows = fact_export.read(root, "fact_employment_multi", month="2025-01", state_id="Ohio")
+
+Run: python fact_export.py <dir> <table> [--month 2025-01] [--state Ohio] [--sector 62] [--occupation 29]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import duckdb
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+import sinks
+
+TABLES = ("fact_employment_multi", "fact_postings_multi", "fact_hiring_attrition_multi", "fact_salaries_multi")
+# Sort order inside each month: the state first, since most consumers ask for one state
+SORT_KEYS = ("state_id", "sector_id", "occupation_id")
+ROW_GROUP_ROWS = int(os.environ.get("SUPABASE_EXPORT_ROW_GROUP_ROWS", "2048"))
+PARTITIONING = ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive")
+
+
+def export_table(con: duckdb.DuckDBPyConnection, relation: str, table: str, root: Path) -> int:
+    """Write `relation` (a table or view on `con` with a 'YYYY-MM-DD' date column) as <root>/<table>.
+
+    Returns the number of rows written.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    building = root / f".{table}.tmp"
+    shutil.rmtree(building, ignore_errors=True)
+    keys = ", ".join(("date", *SORT_KEYS))
+    # DuckDB sorts (spilling if it must); Arrow splits the sorted stream into month directories
+    # without reordering it, which DuckDB's own PARTITION_BY does not promise
+    result = con.execute(f"SELECT *, substr(date, 1, 7) AS month FROM {relation} ORDER BY {keys}")
+    reader = result.to_arrow_reader(ROW_GROUP_ROWS) if hasattr(result, "to_arrow_reader") else result.fetch_record_batch(ROW_GROUP_ROWS)
+    written = 0
+
+    def counted():
+        nonlocal written
+        for batch in reader:
+            written += batch.num_rows
+            yield batch
+
+    ds.write_dataset(
+        counted(),
+        building,
+        schema=reader.schema,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template="part-{i}.parquet",
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+        preserve_order=True,
+        min_rows_per_group=ROW_GROUP_ROWS,
+        max_rows_per_group=ROW_GROUP_ROWS,
+    )
+    # An empty relation writes no files, and no directory; it still replaces the last export
+    building.mkdir(exist_ok=True)
+    sinks.replace_dir(building, root / table)
+    return written
+
+
+@dataclass
+class Scan:
+    """The row groups a query has to read, and what they cost next to the whole table."""
+
+    fragments: List[ds.ParquetFileFragment] = field(default_factory=list)
+    files: int = 0
+    row_groups: int = 0
+    total_row_groups: int = 0
+    bytes: int = 0
+    total_bytes: int = 0
+
+
+def _filter(month: Optional[str], equals: dict) -> Optional[ds.Expression]:
+    terms = [ds.field(column) == value for column, value in equals.items() if value is not None]
+    if month:
+        terms.insert(0, ds.field("month") == month[:7])
+    expression = None
+    for term in terms:
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def _compressed_bytes(fragment: ds.ParquetFileFragment, columns: Optional[Sequence[str]]) -> int:
+    metadata = fragment.metadata
+    total = 0
+    for group in fragment.row_groups:
+        row_group = metadata.row_group(group.id)
+        for i in range(row_group.num_columns):
+            chunk = row_group.column(i)
+            if columns is None or chunk.path_in_schema in columns:
+                total += chunk.total_compressed_size
+    return total
+
+
+def scan(root: Path, table: str, month: Optional[str] = None, columns: Optional[Sequence[str]] = None, **equals) -> Scan:
+    """Plan a read of `table`: partitions outside `month`, then row groups whose statistics rule out `equals`, are skipped."""
+    dataset = ds.dataset(root / table, format="parquet", partitioning=PARTITIONING)
+    expression = _filter(month, equals)
+    plan = Scan()
+    if not dataset.files:
+        return plan
+    for fragment in dataset.get_fragments():
+        plan.total_row_groups += fragment.num_row_groups
+        plan.total_bytes += _compressed_bytes(fragment, columns)
+    for fragment in dataset.get_fragments(filter=expression):
+        kept = fragment.split_by_row_group(expression, schema=dataset.schema) if expression is not None else [fragment]
+        kept = [f for f in kept if f.row_groups]
+        plan.files += bool(kept)
+        for piece in kept:
+            plan.fragments.append(piece)
+            plan.row_groups += len(piece.row_groups)
+            plan.bytes += _compressed_bytes(piece, columns)
+    return plan
+
+
+def read(root: Path, table: str, month: Optional[str] = None, columns: Optional[Sequence[str]] = None, **equals) -> pa.Table:
+    """Rows of `table` in `month` (YYYY-MM or a date in it) matching column=value `equals`, reading only what scan() keeps."""
+    plan = scan(root, table, month, columns, **equals)
+    dataset = ds.dataset(root / table, format="parquet", partitioning=PARTITIONING)
+    if not dataset.files:
+        # An empty export has no files to take columns from
+        return dataset.schema.empty_table()
+    kept = ds.FileSystemDataset(plan.fragments, dataset.schema, dataset.format, dataset.filesystem)
+    return kept.to_table(columns=None if columns is None else list(columns), filter=_filter(month, equals))
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", type=Path, help="the SUPABASE_PARQUET_EXPORT directory")
+    parser.add_argument("table", choices=TABLES)
+    parser.add_argument("--month", help="YYYY-MM")
+    parser.add_argument("--state", dest="state_id")
+    parser.add_argument("--sector", dest="sector_id")
+    parser.add_argument("--occupation", dest="occupation_id")
+    args = parser.parse_args()
+
+    equals = {"state_id": args.state_id, "sector_id": args.sector_id, "occupation_id": args.occupation_id}
+    plan = scan(args.root, args.table, args.month, **equals)
+    rows = read(args.root, args.table, args.month, **equals)
+    print(
+        f"📦 {rows.num_rows} rows from {plan.row_groups}/{plan.total_row_groups} row groups in {plan.files} files "
+        f"({plan.bytes / 1024:.1f} of {plan.total_bytes / 1024:.1f} KiB)"
+    )
+    for row in rows.slice(0, 20).to_pylist():
+        print(row)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,258 @@
+"""
+Pre-flight capacity plan for etl_supabase.py
+--------------------------------------------
+A dry run (SUPABASE_DRY_RUN=1, or `etl_supabase.py --plan`) passes every chunk the loader
+would send through LoadPlan, which measures per table, from the rows themselves:
+
+    rows / send_rows     rows after dedupe, and how many of them the delta would send
+    json_bytes           the REST request bodies, rendered exactly as uploaded (send_json_bytes: the delta)
+    heap_bytes           Postgres heap: tuple headers and null bitmaps, per-type column widths
+                         (supabase/schema.sql), 8-byte alignment, line pointers, 8 KiB pages
+    index_bytes          every btree on the table (primary key, unique constraints, create index),
+                         leaf entries at the default 90% fill
+    upload_seconds       send volume at the rows/s the last real run measured for the table, or
+                         else at the rate its learned batch budget is tuned for
+
+Nothing touches the network. The plan is printed and written as `supabase_plan-<run id>.json`
+next to the run profiles; later real runs read bytes per row from it for the storage guard.
+Sizes are estimates of on-disk size for a freshly loaded table (no TOAST compression, no bloat).
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import columnar
+
+PLAN_PREFIX = "supabase_plan"
+PAGE_BYTES = 8192
+PAGE_HEADER_BYTES = 24
+TUPLE_HEADER_BYTES = 23
+LINE_POINTER_BYTES = 4
+INDEX_TUPLE_HEADER_BYTES = 8
+INDEX_FILL = 0.9
+# Fixed-width Postgres types; anything else is measured as a varlena
+FIXED_WIDTHS = {
+    "smallint": 2, "int": 4, "integer": 4, "serial": 4, "bigint": 8, "bigserial": 8, "real": 4,
+    "double precision": 8, "date": 4, "timestamp": 8, "timestamptz": 8, "boolean": 1, "bool": 1, "uuid": 16,
+}
+
+_TABLE = re.compile(r"create table if not exists (\w+) \((.*?)\n\);", re.S | re.I)
+_INDEX = re.compile(r"create (?:unique )?index (?:if not exists )?\w+ on (\w+)\s*\(([^)]*)\)", re.I)
+_KEY_LIST = re.compile(r"^(?:primary key|unique)\s*\(([^)]*)\)", re.I)
+
+
+@dataclass
+class TableSchema:
+    columns: Dict[str, str] = field(default_factory=dict)  # name -> Postgres type
+    indexes: List[List[str]] = field(default_factory=list)
+
+
+def read_schema(path: Path) -> Dict[str, TableSchema]:
+    """Column types and btree indexes of every table created in a schema file."""
+    text = path.read_text() if path.exists() else ""
+    tables: Dict[str, TableSchema] = {}
+    for name, body in _TABLE.findall(text):
+        schema = tables[name] = TableSchema()
+        for line in body.splitlines():
+            line = line.split("--", 1)[0].strip().rstrip(",")
+            if not line or line.lower().startswith(("check", "constraint", "foreign key")):
+                continue
+            keys = _KEY_LIST.match(line)
+            if keys:
+                schema.indexes.append([k.strip() for k in keys.group(1).split(",")])
+                continue
+            column, _, rest = line.partition(" ")
+            kind = re.split(r"\s+(?:primary|not|null|default|references|unique|check)\b", rest, 1, flags=re.I)[0]
+            schema.columns[column] = kind.strip().lower()
+            if re.search(r"\b(primary key|unique)\b", rest, re.I):
+                schema.indexes.append([column])
+    for name, keys in _INDEX.findall(text):
+        if name in tables:
+            tables[name].indexes.append([k.strip() for k in keys.split(",")])
+    return tables
+
+
+def _pg_type(column: pa.ChunkedArray) -> str:
+    """Type a column would get if the schema does not name it."""
+    if pa.types.is_integer(column.type):
+        return "bigint"
+    if pa.types.is_floating(column.type) or pa.types.is_decimal(column.type):
+        return "numeric"
+    if pa.types.is_boolean(column.type):
+        return "boolean"
+    return "text"
+
+
+def column_widths(column: pa.ChunkedArray, pg_type: str) -> np.ndarray:
+    """Bytes each value takes in a heap tuple (0 for nulls, which only cost their bitmap bit)."""
+    present = pc.is_valid(column).to_numpy(zero_copy_only=False)
+    fixed = FIXED_WIDTHS.get(pg_type)
+    if fixed is not None:
+        return np.where(present, fixed, 0)
+    text = column if pa.types.is_string(column.type) else pc.cast(column, pa.string())
+    lengths = pc.fill_null(pc.binary_length(text), 0).to_numpy(zero_copy_only=False).astype(np.int64)
+    if pg_type.startswith("numeric") or pg_type.startswith("decimal"):
+        # Base-10000 digits of 2 bytes plus a 2-byte header, behind a 1-byte varlena header
+        digits = np.maximum(lengths - 1, 1)
+        widths = 3 + 2 * -(-digits // 4)
+    else:
+        widths = lengths + np.where(lengths < 127, 1, 4)
+    return np.where(present, widths, 0)
+
+
+def _align(values: np.ndarray) -> np.ndarray:
+    return (values + 7) // 8 * 8
+
+
+def _pages(nbytes: float) -> int:
+    """Bytes of the 8 KiB pages `nbytes` of tuples fill."""
+    return math.ceil(nbytes / (PAGE_BYTES - PAGE_HEADER_BYTES)) * PAGE_BYTES
+
+
+@dataclass
+class TablePlan:
+    table: str
+    rows: int = 0
+    send_rows: int = 0
+    json_bytes: int = 0
+    send_json_bytes: int = 0
+    tuple_bytes: int = 0
+    index_entry_bytes: int = 0
+    heap_bytes: int = 0
+    index_bytes: int = 0
+    upload_seconds: Optional[float] = None
+    rate_basis: str = ""
+
+    @property
+    def storage_bytes(self) -> int:
+        return self.heap_bytes + self.index_bytes
+
+    @property
+    def bytes_per_row(self) -> float:
+        return self.storage_bytes / self.rows if self.rows else 0.0
+
+
+class LoadPlan:
+    def __init__(self, schema: Dict[str, TableSchema]):
+        self.schema = schema
+        self.tables: Dict[str, TablePlan] = {}
+
+    def observe(self, table: str, rows: pa.Table, sent: pa.Table) -> None:
+        """Account for one chunk: `rows` as loaded (after dedupe), `sent` the part the delta would send."""
+        plan = self.tables.setdefault(table, TablePlan(table))
+        schema = self.schema.get(table, TableSchema())
+        plan.rows += rows.num_rows
+        plan.send_rows += sent.num_rows
+        json_bytes = self._json_bytes(rows)
+        plan.json_bytes += json_bytes
+        plan.send_json_bytes += json_bytes if sent.num_rows == rows.num_rows else self._json_bytes(sent)
+        if not rows.num_rows:
+            return
+
+        widths = {
+            name: column_widths(rows.column(name), schema.columns.get(name) or _pg_type(rows.column(name)))
+            for name in rows.column_names
+        }
+        # Columns the database fills in itself (generated ids) still take their fixed width
+        for name, kind in schema.columns.items():
+            if name not in widths and kind in FIXED_WIDTHS:
+                widths[name] = np.full(rows.num_rows, FIXED_WIDTHS[kind])
+        column_count = max(len(schema.columns), len(rows.column_names))
+        has_null = np.zeros(rows.num_rows, bool)
+        for name in rows.column_names:
+            has_null |= pc.is_null(rows.column(name)).to_numpy(zero_copy_only=False)
+        header = _align(TUPLE_HEADER_BYTES + np.where(has_null, -(-column_count // 8), 0))
+        data = np.sum(list(widths.values()), axis=0)
+        plan.tuple_bytes += int((_align(header + data) + LINE_POINTER_BYTES).sum())
+        for keys in schema.indexes:
+            key_data = np.sum([widths.get(k, np.zeros(rows.num_rows, np.int64)) for k in keys], axis=0)
+            plan.index_entry_bytes += int((_align(INDEX_TUPLE_HEADER_BYTES + key_data) + LINE_POINTER_BYTES).sum())
+
+    @staticmethod
+    def _json_bytes(rows: pa.Table) -> int:
+        if not rows.num_rows:
+            return 0
+        # Each object plus the comma separating it from the next, as in the request body
+        return int(pc.sum(pc.binary_length(columnar.json_rows(rows))).as_py()) + rows.num_rows
+
+    def finish(self, rates: Dict[str, float], fallback_bytes_per_second: Callable[[str], Optional[float]]) -> None:
+        """Round sizes up to pages and estimate upload time: measured rows/s, else a bytes/s model."""
+        for plan in self.tables.values():
+            plan.heap_bytes = _pages(plan.tuple_bytes) if plan.tuple_bytes else 0
+            plan.index_bytes = _pages(plan.index_entry_bytes / INDEX_FILL) if plan.index_entry_bytes else 0
+            if plan.table in rates:
+                plan.upload_seconds, plan.rate_basis = plan.send_rows / rates[plan.table], "measured"
+                continue
+            speed = fallback_bytes_per_second(plan.table)
+            if speed:
+                plan.upload_seconds, plan.rate_basis = plan.send_json_bytes / speed, "batch budget"
+
+    def totals(self) -> Dict[str, float]:
+        plans = list(self.tables.values())
+        return {
+            "rows": sum(p.rows for p in plans),
+            "send_rows": sum(p.send_rows for p in plans),
+            "json_bytes": sum(p.json_bytes for p in plans),
+            "send_json_bytes": sum(p.send_json_bytes for p in plans),
+            "heap_bytes": sum(p.heap_bytes for p in plans),
+            "index_bytes": sum(p.index_bytes for p in plans),
+            "upload_seconds": round(sum(p.upload_seconds or 0.0 for p in plans), 1),
+        }
+
+    def print_report(self) -> None:
+        mb = 1024 * 1024
+        print(f"{'table':<30} {'rows':>10} {'send':>10} {'json MB':>9} {'heap MB':>9} {'index MB':>9} {'B/row':>7} {'upload s':>9}")
+        for plan in sorted(self.tables.values(), key=lambda p: -p.storage_bytes):
+            seconds = "?" if plan.upload_seconds is None else f"{plan.upload_seconds:.1f}"
+            print(
+                f"{plan.table:<30} {plan.rows:>10,} {plan.send_rows:>10,} {plan.send_json_bytes / mb:>9.2f} "
+                f"{plan.heap_bytes / mb:>9.2f} {plan.index_bytes / mb:>9.2f} {plan.bytes_per_row:>7.0f} {seconds:>9}"
+            )
+        totals = self.totals()
+        print(
+            f"{'total':<30} {totals['rows']:>10,} {totals['send_rows']:>10,} {totals['send_json_bytes'] / mb:>9.2f} "
+            f"{totals['heap_bytes'] / mb:>9.2f} {totals['index_bytes'] / mb:>9.2f} {'':>7} {totals['upload_seconds']:>9.1f}"
+        )
+
+    def write(self, directory: Path, run_id: str) -> Path:
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{PLAN_PREFIX}-{run_id}.json"
+        tables = {
+            name: {**asdict(plan), "storage_bytes": plan.storage_bytes, "bytes_per_row": round(plan.bytes_per_row, 1)}
+            for name, plan in self.tables.items()
+        }
+        path.write_text(json.dumps({"run_id": run_id, "totals": self.totals(), "tables": tables}, indent=2))
+        return path
+
+
+def measured_rates(reports: List[Path], stage: str) -> Dict[str, float]:
+    """Rows/s per table from the newest real (non dry) runs' `stage` stages."""
+    rates: Dict[str, float] = {}
+    for path in reversed(reports):
+        report = json.loads(path.read_text())
+        if report.get("meta", {}).get("dry_run"):
+            continue
+        for entry in report["stages"]:
+            table, seconds = entry.get("table"), entry.get("wall_seconds") or 0.0
+            if entry["name"] == stage and table and table not in rates and entry.get("rows_out") and seconds > 0:
+                rates[table] = entry["rows_out"] / seconds
+    return rates
+
+
+def latest_row_bytes(directory: Path) -> Dict[str, float]:
+    """Storage bytes per row of each table, from the most recent plan (empty if there is none)."""
+    plans = sorted(directory.glob(f"{PLAN_PREFIX}-*.json"))
+    if not plans:
+        return {}
+    tables = json.loads(plans[-1].read_text())["tables"]
+    return {name: plan["bytes_per_row"] for name, plan in tables.items() if plan["bytes_per_row"]}
@@ -1,13 +1,29 @@
+import asyncio
+import json
 import os
+import re
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 
 import duckdb
 import requests
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from metrics import (
+    CUBE_TABLE,
+    MAP,
+    MONEY_COLS,
+    calculate_health_index,
+    classify_quadrant,
+    cube_sa_flag,
+    pct_change,
+    value_expr,
+)
 
 # Load environment variables early
 load_dotenv()
@@ -18,8 +34,9 @@ GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
 GEMINI_ENDPOINT = (
     f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
 )
-
-MONEY_COLS = {"salary_sa", "salary_nsa"}
+# How often the shared watcher stats the DB file, and how long an idle SSE stream waits before a keepalive
+BUILD_POLL_SECONDS = float(os.getenv("BUILD_POLL_SECONDS", "5"))
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
 
 NAICS_NAMES: Dict[str, str] = {
     "00": "Total US",
@@ -69,6 +86,15 @@ class QueryRequest(BaseModel):
     limit_months: Optional[int] = None
 
 
+def db_build_id() -> Optional[str]:
+    """Identify the current DuckDB build from the file's mtime and size (None when missing)."""
+    try:
+        stat = DB_PATH.stat()
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
 def ensure_db_exists():
     if not DB_PATH.exists():
         raise HTTPException(status_code=500, detail=f"DB not found at {DB_PATH}. Run etl.py")
@@ -77,14 +103,11 @@ def ensure_db_exists():
 def get_con():
     """Open a short-lived read-only DuckDB connection with single-threaded execution."""
     ensure_db_exists()
-    return duckdb.connect(str(DB_PATH), read_only=True, config={"threads": 1})
-
-
-def value_expr(col_expr: str) -> str:
-    base = col_expr.split(".")[-1]
-    if base in MONEY_COLS:
-        return f"TRY_CAST(REPLACE(REPLACE({col_expr}, '$',''), ',','') AS DOUBLE)"
-    return f"TRY_CAST({col_expr} AS DOUBLE)"
+    # Late materialization turns `WHERE dim = ? ORDER BY month LIMIT n` into a rowid join
+    # against an unfiltered scan, defeating the zone maps of the sorted fact tables.
+    return duckdb.connect(
+        str(DB_PATH), read_only=True, config={"threads": 1, "disabled_optimizers": "late_materialization"}
+    )
 
 
 def money_expr(col_expr: str) -> str:
@@ -92,85 +115,6 @@ def money_expr(col_expr: str) -> str:
     return f"TRY_CAST(REPLACE(REPLACE({col_expr}, '$',''), ',','') AS DOUBLE)"
 
 
-def pct_change(curr: Optional[float], prev: Optional[float]) -> Optional[float]:
-    if curr is None or prev in (None, 0):
-        return None
-    try:
-        return (curr - prev) / prev * 100
-    except Exception:
-        return None
-
-
-def clamp(value: float, min_value: float, max_value: float) -> float:
-    return max(min_value, min(max_value, value))
-
-
-def calculate_health_index(
-    employment_growth: Optional[float],
-    hiring_rate: Optional[float],
-    attrition_rate: Optional[float],
-    layoff_change: Optional[float],
-) -> int:
-    """Lightweight composite index (0-100) to mirror dashboard health."""
-    score = 50.0
-    if employment_growth is not None:
-        score += clamp(employment_growth * 100, -20, 20)
-    if hiring_rate is not None:
-        score += clamp((hiring_rate - 0.2) * 200, -15, 15)
-    if attrition_rate is not None:
-        score -= clamp((attrition_rate - 0.2) * 200, -15, 15)
-    if layoff_change is not None:
-        score -= clamp(layoff_change * 100, -15, 15)
-    return int(clamp(score, 0, 100))
-
-
-def classify_quadrant(hiring_rate: Optional[float], attrition_rate: Optional[float]) -> str:
-    """Classify sector into a hiring/attrition quadrant."""
-    if hiring_rate is None or attrition_rate is None:
-        return "stagnant"
-    hiring_threshold = 0.28
-    attrition_threshold = 0.26
-    if hiring_rate > hiring_threshold:
-        return "growth" if attrition_rate < attrition_threshold else "churn_burn"
-    return "stagnant" if attrition_rate < attrition_threshold else "decline"
-
-
-# mapping: dimension -> metric -> table/col info
-MAP = {
-    "sector": {
-        "employment": {"table": "employment_naics", "dim": "naics2d_code", "sa_col": "employment_sa", "nsa_col": "employment_nsa"},
-        "postings": {"table": "postings_by_sector", "dim": "naics2d_code", "sa_col": "active_postings_sa", "nsa_col": "active_postings_nsa"},
-        "salary": {"table": "salaries_naics", "dim": "naics2d_code", "sa_col": "salary_sa", "nsa_col": "salary_nsa"},
-        "hiring_rate": {"table": "hiring_and_attrition_by_sector", "dim": "naics2d_code", "col": "rl_hiring_rate"},
-        "attrition_rate": {"table": "hiring_and_attrition_by_sector", "dim": "naics2d_code", "col": "rl_attrition_rate"},
-        "layoffs": {"table": "layoffs_by_naics", "dim": "naics2d", "col": "num_employees_laidoff"},
-    },
-    "state": {
-        "employment": {"table": "employment_state", "dim": "state", "sa_col": "employment_sa", "nsa_col": "employment_nsa"},
-        "postings": {"table": "postings_by_state", "dim": "state", "sa_col": "active_postings_sa", "nsa_col": "active_postings_nsa"},
-        "salary": {"table": "salaries_state", "dim": "state", "sa_col": "salary_sa", "nsa_col": "salary_nsa"},
-        "hiring_rate": {"table": "hiring_and_attrition_by_state", "dim": "state", "col": "rl_hiring_rate"},
-        "attrition_rate": {"table": "hiring_and_attrition_by_state", "dim": "state", "col": "rl_attrition_rate"},
-        "layoffs": {"table": "layoffs_by_state", "dim": "state", "col": "num_employees_laidoff"},
-    },
-    "soc": {
-        "employment": {"table": "employment_soc", "dim": "soc2d_code", "sa_col": "employment_sa", "nsa_col": "employment_nsa"},
-        "postings": {"table": "postings_by_occupation", "dim": "soc2d_code", "sa_col": "active_postings_sa", "nsa_col": "active_postings_nsa"},
-        "salary": {"table": "salaries_soc", "dim": "soc2d_code", "sa_col": "salary_sa", "nsa_col": "salary_nsa"},
-        "hiring_rate": {"table": "hiring_and_attrition_by_occupation", "dim": "soc2d_code", "col": "rl_hiring_rate"},
-        "attrition_rate": {"table": "hiring_and_attrition_by_occupation", "dim": "soc2d_code", "col": "rl_attrition_rate"},
-    },
-    "national": {
-        "employment": {"table": "employment_national", "dim": None, "sa_col": "employment_sa", "nsa_col": "employment_nsa"},
-        "postings": {"table": "postings_total_us", "dim": None, "sa_col": "active_postings_sa", "nsa_col": "active_postings_nsa"},
-        "salary": {"table": "salaries_national", "dim": None, "sa_col": "salary_sa", "nsa_col": "salary_nsa"},
-        "hiring_rate": {"table": "hiring_and_attrition_total_us", "dim": None, "col": "rl_hiring_rate"},
-        "attrition_rate": {"table": "hiring_and_attrition_total_us", "dim": None, "col": "rl_attrition_rate"},
-        "layoffs": {"table": "total_layoffs", "dim": None, "col": "num_employees_laidoff"},
-    },
-}
-
-
 def resolve_mapping(dimension_type: str, metric: str, sa: bool):
     if dimension_type not in MAP or metric not in MAP[dimension_type]:
         raise HTTPException(status_code=400, detail="Unsupported dimension/metric")
@@ -187,7 +131,98 @@ def resolve_mapping(dimension_type: str, metric: str, sa: bool):
 
 @app.get("/api/health")
 def health():
-    return {"status": "ok", "db_exists": DB_PATH.exists()}
+    return {"status": "ok", "db_exists": DB_PATH.exists(), "build_id": db_build_id()}
+
+
+class BuildWatcher:
+    """
+    One polling task per event loop that stats the DB file and wakes every waiting
+    SSE subscriber when the build id changes. Idle subscribers are just suspended
+    coroutines, so thousands of open streams cost no threads.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.build_id: Optional[str] = None
+        self.subscribers = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Condition] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_polling(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._changed = asyncio.Condition()
+            self._task = None
+        if self._task is None or self._task.done():
+            self.build_id = db_build_id()
+            self._task = loop.create_task(self._poll())
+
+    async def _poll(self) -> None:
+        while self.subscribers > 0:
+            await asyncio.sleep(self.interval)
+            current = db_build_id()
+            if current != self.build_id:
+                self.build_id = current
+                async with self._changed:
+                    self._changed.notify_all()
+
+    def subscribe(self) -> Optional[str]:
+        self.subscribers += 1
+        self._ensure_polling()
+        return self.build_id
+
+    def unsubscribe(self) -> None:
+        self.subscribers = max(0, self.subscribers - 1)
+
+    async def wait_for_change(self, known: Optional[str], timeout: float) -> Optional[str]:
+        """Return the build id once it differs from `known`, or the unchanged id after `timeout`."""
+        self._ensure_polling()
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(lambda: self.build_id != known), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.build_id
+
+
+build_watcher = BuildWatcher(BUILD_POLL_SECONDS)
+
+
+def sse_message(event: str, data: str, event_id: Optional[str] = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def build_events(request: Request, watcher: BuildWatcher = build_watcher) -> AsyncIterator[str]:
+    """Yield the current build on connect, then one `build` event per DB change (keepalives in between)."""
+    known = watcher.subscribe()
+    try:
+        yield f"retry: {int(SSE_KEEPALIVE_SECONDS * 1000)}\n\n"
+        yield sse_message("build", json.dumps({"build_id": known}), known)
+        while not await request.is_disconnected():
+            current = await watcher.wait_for_change(known, SSE_KEEPALIVE_SECONDS)
+            if current == known:
+                yield ": keepalive\n\n"
+                continue
+            known = current
+            yield sse_message("build", json.dumps({"build_id": known}), known)
+    finally:
+        watcher.unsubscribe()
+
+
+@app.get("/api/builds/stream")
+async def build_stream(request: Request):
+    """Server-sent events announcing new DuckDB builds so clients refetch only on change."""
+    return StreamingResponse(
+        build_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/api/datasets")
@@ -201,7 +236,7 @@ def datasets():
             tables = [
                 r[0]
                 for r in con.execute(
-                    "SELECT table_name FROM information_schema.tables WHERE table_schema='main'"
+                    "SELECT table_name FROM information_schema.tables WHERE table_schema='main' AND table_name NOT LIKE '\\_%' ESCAPE '\\'"
                 ).fetchall()
             ]
             manifest = []
@@ -443,21 +478,34 @@ def search(q: str = Query("")):
     return {"results": results[:20]}
 
 
+def cube_filter(dimension_type: str, metric: str, sa: bool, id: Optional[str] = None, with_id: bool = True):
+    """WHERE clause + params selecting one series family (and one id) of the metric cube."""
+    if dimension_type not in MAP or metric not in MAP[dimension_type]:
+        raise HTTPException(status_code=400, detail="Unsupported dimension/metric")
+    cfg = MAP[dimension_type][metric]
+    sql = "dimension_type = ? AND metric = ? AND sa_flag = ?"
+    params: List = [dimension_type, metric, cube_sa_flag(cfg, sa)]
+    if with_id:
+        if cfg["dim"] and not id:
+            raise HTTPException(status_code=400, detail="id is required for this dimension")
+        sql += " AND id = ?"
+        params.append(id if cfg["dim"] else "")
+    return sql, params
+
+
+def series_query(dimension_type: str, metric: str, id: Optional[str], sa: bool, limit_months: Optional[int] = None):
+    """SQL + params for one series from the metric cube (the last `limit_months` points when given), oldest first."""
+    where, params = cube_filter(dimension_type, metric, sa, id)
+    sql = f"SELECT month, value FROM {CUBE_TABLE} WHERE {where}"
+    if not limit_months:
+        return sql + " ORDER BY month", params
+    sql += " ORDER BY month DESC LIMIT ?"
+    return f"SELECT * FROM ({sql}) ORDER BY month", params + [limit_months]
+
+
 @app.post("/api/query")
 def api_query(body: QueryRequest):
-    table, dim_col, value_col, needs_money = resolve_mapping(body.dimension_type, body.metric, body.sa)
-    val_expr = value_expr(value_col)  # cast to numeric
-    params: List = []
-    sql = f"SELECT month, {val_expr} AS value FROM {table}"
-    if dim_col:
-        if not body.id:
-            raise HTTPException(status_code=400, detail="id is required for this dimension")
-        sql += f" WHERE {dim_col} = ?"
-        params.append(body.id)
-    sql += " ORDER BY month"
-    if body.limit_months:
-        sql = f"SELECT * FROM ({sql}) ORDER BY month DESC LIMIT {body.limit_months}"
-        sql = f"SELECT * FROM ({sql}) ORDER BY month"
+    sql, params = series_query(body.dimension_type, body.metric, body.id, body.sa, body.limit_months)
     try:
         with get_con() as con:
             rows = con.execute(sql, params).fetchall()
@@ -491,18 +539,7 @@ def api_history(
     sa: bool = True,
     limit_months: int = Query(6, ge=1, le=36),
 ):
-    table, dim_col, value_col, needs_money = resolve_mapping(dimension_type, metric, sa)
-    val_expr = value_expr(value_col)
-    params: List = []
-    sql = f"SELECT month, {val_expr} AS value FROM {table}"
-    if dim_col:
-        if not id:
-            raise HTTPException(status_code=400, detail="id is required for this dimension")
-        sql += f" WHERE {dim_col} = ?"
-        params.append(id)
-    sql += " ORDER BY month DESC LIMIT ?"
-    params.append(limit_months)
-    sql = f"SELECT * FROM ({sql}) ORDER BY month"
+    sql, params = series_query(dimension_type, metric, id, sa, limit_months)
     try:
         with get_con() as con:
             rows = con.execute(sql, params).fetchall()
@@ -539,30 +576,18 @@ def api_top_movers(
     table, dim_col, value_col, needs_money = resolve_mapping(dimension_type, metric, sa)
     if not dim_col:
         raise HTTPException(status_code=400, detail="Top movers requires a dimension column")
-    l_val_expr = value_expr(f"l.{value_col}")
-    p_val_expr = value_expr(f"p.{value_col}")
+    where, params = cube_filter(dimension_type, metric, sa, with_id=False)
     order_clause = "DESC" if direction == "desc" else "ASC"
     sql = f"""
-    WITH months AS (SELECT DISTINCT month FROM {table}),
-    latest_m AS (SELECT month FROM months ORDER BY month DESC LIMIT 1),
-    prev_m AS (SELECT month FROM months ORDER BY month DESC OFFSET 1 LIMIT 1)
-    SELECT
-      l.{dim_col} AS dimension,
-      {l_val_expr} AS value,
-      {p_val_expr} AS prev_value,
-      CASE WHEN {p_val_expr} IS NULL OR {p_val_expr}=0 THEN NULL
-           ELSE ({l_val_expr} - {p_val_expr})/ {p_val_expr} * 100 END AS pct_change,
-      l.month AS month,
-      p.month AS prev_month
-    FROM {table} l
-    LEFT JOIN {table} p ON l.{dim_col}=p.{dim_col} AND p.month=(SELECT month FROM prev_m)
-    WHERE l.month=(SELECT month FROM latest_m)
+    SELECT id AS dimension, value, prev_value, pct_change, month, prev_month
+    FROM {CUBE_TABLE}
+    WHERE {where} AND month = (SELECT MAX(month) FROM {CUBE_TABLE} WHERE {where})
     ORDER BY pct_change {order_clause} NULLS LAST
-    LIMIT {count};
+    LIMIT ?
     """
     try:
         with get_con() as con:
-            rows = con.execute(sql).fetchall()
+            rows = con.execute(sql, params + params + [count]).fetchall()
             cols = [d[0] for d in con.description]
             data = [dict(zip(cols, r)) for r in rows]
             return {"dimension_type": dimension_type, "metric": metric, "data": data}
@@ -642,23 +667,26 @@ def sector_spotlight():
 
 @app.get("/api/postings-heatmap")
 def postings_heatmap():
+    where, params = cube_filter("state", "postings", True, with_id=False)
     with get_con() as con:
-        months = [r[0] for r in con.execute("SELECT DISTINCT month FROM postings_by_state ORDER BY month DESC LIMIT 2").fetchall()]
+        months = [
+            r[0]
+            for r in con.execute(
+                f"SELECT DISTINCT month FROM {CUBE_TABLE} WHERE {where} ORDER BY month DESC LIMIT 2", params
+            ).fetchall()
+        ]
         if not months:
             raise HTTPException(status_code=404, detail="No postings data")
         latest_month = months[0]
         prev_month = months[1] if len(months) > 1 else None
-        sql = f"""
-        WITH latest AS (
-          SELECT state, TRY_CAST(active_postings_sa AS DOUBLE) AS value FROM postings_by_state WHERE month='{latest_month}'
-        ), prev AS (
-          SELECT state, TRY_CAST(active_postings_sa AS DOUBLE) AS value FROM postings_by_state WHERE month='{prev_month}'
-        )
-        SELECT l.state, l.value AS active_postings, CASE WHEN p.value IS NULL OR p.value=0 THEN NULL ELSE (l.value-p.value)/p.value*100 END AS pct_change
-        FROM latest l LEFT JOIN prev p USING(state)
-        ORDER BY pct_change DESC NULLS LAST;
-        """
-        rows = con.execute(sql).fetchall()
+        rows = con.execute(
+            f"""
+            SELECT id AS state, value AS active_postings, pct_change
+            FROM {CUBE_TABLE} WHERE {where} AND month = ?
+            ORDER BY pct_change DESC NULLS LAST
+            """,
+            params + [latest_month],
+        ).fetchall()
         cols = [c[0] for c in con.description]
         data = [dict(zip(cols, r)) for r in rows]
         return {"month": latest_month, "prev_month": prev_month, "data": data}
@@ -666,20 +694,147 @@ def postings_heatmap():
 
 @app.get("/api/layoffs-heatmap")
 def layoffs_heatmap():
+    where, params = cube_filter("state", "layoffs", True, with_id=False)
     with get_con() as con:
-        latest_month = con.execute("SELECT MAX(month) FROM layoffs_by_state").fetchone()[0]
+        latest_month = con.execute(f"SELECT MAX(month) FROM {CUBE_TABLE} WHERE {where}", params).fetchone()[0]
         if latest_month is None:
             raise HTTPException(status_code=404, detail="No layoffs data")
         rows = con.execute(
-            f"SELECT state, TRY_CAST(num_employees_laidoff AS DOUBLE) AS num_employees_laidoff FROM layoffs_by_state WHERE month='{latest_month}' ORDER BY num_employees_laidoff DESC"
+            f"SELECT id, value FROM {CUBE_TABLE} WHERE {where} AND month = ? ORDER BY value DESC",
+            params + [latest_month],
         ).fetchall()
         data = [{"state": r[0], "num_employees_laidoff": r[1]} for r in rows]
         return {"month": latest_month, "data": data}
 
 
+# Budget for the server-assembled LLM context and the optional client note
+CONTEXT_CHAR_LIMIT = int(os.getenv("GEMINI_CONTEXT_CHARS", "2500"))
+CLIENT_NOTE_CHAR_LIMIT = 500
+MAX_CONTEXT_ENTITIES = 4
+ENTITY_STOPWORDS = {"total us", "other services", "unclassified"}
+
+
 class GeminiRequest(BaseModel):
     prompt: str
-    context: str
+    # Optional short instruction from the client, at most CLIENT_NOTE_CHAR_LIMIT characters
+    # (longer ones get a 422); numeric context is assembled server-side.
+    context: Optional[str] = Field(None, max_length=CLIENT_NOTE_CHAR_LIMIT)
+
+
+def compact_number(value: Optional[float]) -> str:
+    """Render numbers tersely for LLM context (1.23M, 45.6K, 0.281)."""
+    if value is None:
+        return "na"
+    magnitude = abs(value)
+    if magnitude >= 1e9:
+        return f"{value / 1e9:.2f}B"
+    if magnitude >= 1e6:
+        return f"{value / 1e6:.2f}M"
+    if magnitude >= 1e4:
+        return f"{value / 1e3:.1f}K"
+    if magnitude >= 100:
+        return f"{value:.0f}"
+    return f"{value:.3g}"
+
+
+def compact_pct(value: Optional[float]) -> str:
+    return "na" if value is None else f"{value:+.1f}%"
+
+
+@lru_cache(maxsize=8)
+def entity_catalog(build_id: Optional[str]) -> List[tuple]:
+    """(regex, dimension_type, id, label) for every sector, state and SOC group in this build."""
+    entries = []
+
+    def add(label: str, dimension_type: str, entity_id: str, aliases: List[str]):
+        for alias in aliases:
+            alias = alias.strip()
+            if len(alias) < 4 or alias.lower() in ENTITY_STOPWORDS:
+                continue
+            entries.append((re.compile(rf"\b{re.escape(alias)}\b", re.IGNORECASE), dimension_type, entity_id, label))
+
+    for code, name in NAICS_NAMES.items():
+        # Match the full sector name and its comma/"and" separated parts ("Retail Trade", "Leasing")
+        add(name, "sector", code, [name] + re.split(r",\s*(?:and\s+)?|\s+and\s+", name))
+    with get_con() as con:
+        for (state,) in con.execute("SELECT DISTINCT state FROM postings_by_state WHERE state IS NOT NULL").fetchall():
+            add(state, "state", state, [state])
+        for code, name in con.execute(
+            "SELECT DISTINCT soc2d_code, soc2d_name FROM salaries_soc WHERE soc2d_name IS NOT NULL"
+        ).fetchall():
+            add(name, "soc", code, [name])
+    return entries
+
+
+def resolve_prompt_entities(prompt: str) -> List[tuple]:
+    """(dimension_type, id, label) referenced in the prompt, first mention first."""
+    hits = {}
+    for pattern, dimension_type, entity_id, label in entity_catalog(db_build_id()):
+        match = pattern.search(prompt)
+        if match:
+            key = (dimension_type, entity_id)
+            hits[key] = min(hits.get(key, (match.start(), label)), (match.start(), label))
+    ordered = sorted(hits.items(), key=lambda item: item[1][0])
+    return [(dim, entity_id, label) for (dim, entity_id), (_, label) in ordered[:MAX_CONTEXT_ENTITIES]]
+
+
+@lru_cache(maxsize=256)
+def context_block(build_id: Optional[str], kind: str, dimension_type: str = "", entity_id: str = "", label: str = "") -> str:
+    """One compact, numeric context block; memoized per DB build so new data invalidates it."""
+    if kind == "summary":
+        data = summary()
+        m = data["headline_metrics"]
+        return (
+            f"[national {data['data_month']}] employment={compact_number(m['total_employment'])} "
+            f"mom_change={compact_number(m['employment_change'])} hiring_rate={compact_number(m['hiring_rate'])} "
+            f"attrition_rate={compact_number(m['attrition_rate'])} layoffs={compact_number(m['latest_layoffs'])} "
+            f"health_index={data['health_index']}/100 ({data['health_trend']})"
+        )
+    if kind == "quadrant":
+        data = hiring_quadrant()
+        parts = [
+            f"{row['code']}:{compact_number(row['hiring_rate'])}/{compact_number(row['attrition_rate'])}:{row['quadrant']}"
+            for row in data["sectors"]
+        ]
+        return f"[sector hiring/attrition {data['month']}] " + " ".join(parts)
+    if kind == "movers":
+        winners = api_top_movers("sector", "employment", count=3, sa=True, direction="desc")["data"]
+        losers = api_top_movers("sector", "employment", count=3, sa=True, direction="asc")["data"]
+
+        def fmt(rows):
+            return ", ".join(f"{r['dimension']} {compact_pct(r['pct_change'])}" for r in rows)
+
+        month = winners[0]["month"] if winners else "na"
+        return f"[sector employment movers {month}] up: {fmt(winners)}; down: {fmt(losers)}"
+    if kind == "entity":
+        parts = []
+        for metric in MAP[dimension_type]:
+            data = api_history(dimension_type, metric, id=entity_id, sa=True, limit_months=6)
+            if not data["series"]:
+                continue
+            values = " ".join(compact_number(point["value"]) for point in data["series"])
+            parts.append(f"{metric} {data['series'][0]['month']}..{data['series'][-1]['month']}: {values} (mom {compact_pct(data['pct_change'])})")
+        return f"[{dimension_type} {entity_id} {label}] " + "; ".join(parts) if parts else ""
+    raise ValueError(f"Unknown context block: {kind}")
+
+
+def assemble_context(prompt: str) -> List[str]:
+    """Entity history blocks for names in the prompt, then national blocks, within the char budget."""
+    build_id = db_build_id()
+    requested = [("entity", dim, entity_id, label) for dim, entity_id, label in resolve_prompt_entities(prompt)]
+    requested += [("summary",), ("movers",), ("quadrant",)]
+    blocks: List[str] = []
+    used = 0
+    for spec in requested:
+        try:
+            block = context_block(build_id, *spec)
+        except HTTPException:
+            continue
+        if not block or used + len(block) > CONTEXT_CHAR_LIMIT:
+            continue
+        blocks.append(block)
+        used += len(block) + 1
+    return blocks
 
 
 @app.post("/api/ask-gemini")
@@ -687,13 +842,16 @@ async def ask_gemini(request: GeminiRequest):
     if not GEMINI_API_KEY:
         raise HTTPException(status_code=500, detail="GEMINI_API_KEY not configured")
 
-    trimmed_context = (request.context or "")[:5000]
     trimmed_prompt = (request.prompt or "")[:1000]
+    client_note = request.context or ""
+    blocks = await asyncio.to_thread(assemble_context, trimmed_prompt)
     composed_prompt = (
         "Use only the provided context. Keep answers concise (<=3 sentences). "
-        "Cite numeric values with units when present.\n\n"
-        f"Context:\n{trimmed_context}\n\n"
-        f"Question:\n{trimmed_prompt}"
+        "Cite numeric values with units when present. Rates are fractions (0.281 = 28.1%).\n"
+        + (f"{client_note}\n" if client_note else "")
+        + "\nContext:\n"
+        + "\n".join(blocks)
+        + f"\n\nQuestion:\n{trimmed_prompt}"
     )
 
     try:
@@ -709,7 +867,7 @@ async def ask_gemini(request: GeminiRequest):
             raise HTTPException(status_code=502, detail="No response from Gemini")
 
         text = candidates[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-        return {"response": text}
+        return {"response": text, "context_chars": sum(len(b) for b in blocks)}
     except requests.HTTPError as http_err:
         raise HTTPException(status_code=502, detail=f"Gemini error: {http_err}") from http_err
     except Exception as e:
@@ -0,0 +1,112 @@
+"""Dimension/metric catalogue and derived-metric formulas shared by the API (main.py), the ETL
+(etl.py) and the static JSON generator (scripts/process_data.py)."""
+from typing import Dict, List, Optional, Tuple
+
+MONEY_COLS = {"salary_sa", "salary_nsa"}
+
+# Long-format rollup of every MAP series, built by etl.py and read by the API
+CUBE_TABLE = "metric_cube"
+
+# mapping: dimension -> metric -> table/col info
+MAP: Dict[str, Dict[str, Dict]] = {
+    "sector": {
+        "employment": {"table": "employment_naics", "dim": "naics2d_code", "sa_col": "employment_sa", "nsa_col": "employment_nsa"},
+        "postings": {"table": "postings_by_sector", "dim": "naics2d_code", "sa_col": "active_postings_sa", "nsa_col": "active_postings_nsa"},
+        "salary": {"table": "salaries_naics", "dim": "naics2d_code", "sa_col": "salary_sa", "nsa_col": "salary_nsa"},
+        "hiring_rate": {"table": "hiring_and_attrition_by_sector", "dim": "naics2d_code", "col": "rl_hiring_rate"},
+        "attrition_rate": {"table": "hiring_and_attrition_by_sector", "dim": "naics2d_code", "col": "rl_attrition_rate"},
+        "layoffs": {"table": "layoffs_by_naics", "dim": "naics2d", "col": "num_employees_laidoff"},
+    },
+    "state": {
+        "employment": {"table": "employment_state", "dim": "state", "sa_col": "employment_sa", "nsa_col": "employment_nsa"},
+        "postings": {"table": "postings_by_state", "dim": "state", "sa_col": "active_postings_sa", "nsa_col": "active_postings_nsa"},
+        "salary": {"table": "salaries_state", "dim": "state", "sa_col": "salary_sa", "nsa_col": "salary_nsa"},
+        "hiring_rate": {"table": "hiring_and_attrition_by_state", "dim": "state", "col": "rl_hiring_rate"},
+        "attrition_rate": {"table": "hiring_and_attrition_by_state", "dim": "state", "col": "rl_attrition_rate"},
+        "layoffs": {"table": "layoffs_by_state", "dim": "state", "col": "num_employees_laidoff"},
+    },
+    "soc": {
+        "employment": {"table": "employment_soc", "dim": "soc2d_code", "sa_col": "employment_sa", "nsa_col": "employment_nsa"},
+        "postings": {"table": "postings_by_occupation", "dim": "soc2d_code", "sa_col": "active_postings_sa", "nsa_col": "active_postings_nsa"},
+        "salary": {"table": "salaries_soc", "dim": "soc2d_code", "sa_col": "salary_sa", "nsa_col": "salary_nsa"},
+        "hiring_rate": {"table": "hiring_and_attrition_by_occupation", "dim": "soc2d_code", "col": "rl_hiring_rate"},
+        "attrition_rate": {"table": "hiring_and_attrition_by_occupation", "dim": "soc2d_code", "col": "rl_attrition_rate"},
+    },
+    "national": {
+        "employment": {"table": "employment_national", "dim": None, "sa_col": "employment_sa", "nsa_col": "employment_nsa"},
+        "postings": {"table": "postings_total_us", "dim": None, "sa_col": "active_postings_sa", "nsa_col": "active_postings_nsa"},
+        "salary": {"table": "salaries_national", "dim": None, "sa_col": "salary_sa", "nsa_col": "salary_nsa"},
+        "hiring_rate": {"table": "hiring_and_attrition_total_us", "dim": None, "col": "rl_hiring_rate"},
+        "attrition_rate": {"table": "hiring_and_attrition_total_us", "dim": None, "col": "rl_attrition_rate"},
+        "layoffs": {"table": "total_layoffs", "dim": None, "col": "num_employees_laidoff"},
+    },
+}
+
+
+def value_expr(col_expr: str) -> str:
+    base = col_expr.split(".")[-1]
+    if base in MONEY_COLS:
+        return f"TRY_CAST(REPLACE(REPLACE({col_expr}, '$',''), ',','') AS DOUBLE)"
+    return f"TRY_CAST({col_expr} AS DOUBLE)"
+
+
+def series_columns(cfg: Dict) -> List[Tuple[bool, str]]:
+    """(sa_flag, column) pairs stored in the cube; single-column metrics are filed under sa_flag=True."""
+    if cfg.get("col"):
+        return [(True, cfg["col"])]
+    pairs = [(True, cfg["sa_col"])]
+    if cfg.get("nsa_col"):
+        pairs.append((False, cfg["nsa_col"]))
+    return pairs
+
+
+def cube_sa_flag(cfg: Dict, sa: bool) -> bool:
+    """The cube's sa_flag for a request, mirroring the column resolve_mapping() would pick."""
+    return bool(sa or not cfg.get("nsa_col") or cfg.get("col"))
+
+
+def source_tables() -> List[str]:
+    return sorted({cfg["table"] for metrics in MAP.values() for cfg in metrics.values()})
+
+
+def pct_change(curr: Optional[float], prev: Optional[float]) -> Optional[float]:
+    if curr is None or prev in (None, 0):
+        return None
+    try:
+        return (curr - prev) / prev * 100
+    except Exception:
+        return None
+
+
+def clamp(value: float, min_value: float, max_value: float) -> float:
+    return max(min_value, min(max_value, value))
+
+
+def calculate_health_index(
+    employment_growth: Optional[float],
+    hiring_rate: Optional[float],
+    attrition_rate: Optional[float],
+    layoff_change: Optional[float],
+) -> int:
+    """Lightweight composite index (0-100) to mirror dashboard health."""
+    score = 50.0
+    if employment_growth is not None:
+        score += clamp(employment_growth * 100, -20, 20)
+    if hiring_rate is not None:
+        score += clamp((hiring_rate - 0.2) * 200, -15, 15)
+    if attrition_rate is not None:
+        score -= clamp((attrition_rate - 0.2) * 200, -15, 15)
+    if layoff_change is not None:
+        score -= clamp(layoff_change * 100, -15, 15)
+    return int(clamp(score, 0, 100))
+
+
+def classify_quadrant(hiring_rate: Optional[float], attrition_rate: Optional[float]) -> str:
+    """Classify sector into a hiring/attrition quadrant."""
+    if hiring_rate is None or attrition_rate is None:
+        return "stagnant"
+    hiring_threshold = 0.28
+    attrition_threshold = 0.26
+    if hiring_rate > hiring_threshold:
+        return "growth" if attrition_rate < attrition_threshold else "churn_burn"
+    return "stagnant" if attrition_rate < attrition_threshold else "decline"
@@ -0,0 +1,187 @@
+"""
+Direct-Postgres bulk-load sink for etl_supabase.py
+--------------------------------------------------
+With SUPABASE_SINK=copy and SUPABASE_DB_URL set (the project's Postgres
+connection string, e.g. the pooler URL from the Supabase dashboard), tables are
+loaded with COPY instead of JSON batches over the REST API:
+
+    1. COPY the rows into a temporary staging table shaped like the target
+       (one transaction per table; the staging table is dropped on commit);
+    2. merge set-based: drop all but the last copied row of each key from the
+       staging table (as sequential upserts would resolve them), delete the
+       target rows with those keys, then insert the staged rows.
+
+The merge key is the target's unique constraint that covers the conflict
+columns from CONFLICT_TARGETS (the base facts' keys also hold granularity),
+else the conflict columns themselves. Keys match null-safely: the facts'
+sector/occupation/state columns are NULL on total rows, which ON CONFLICT
+would never match against a unique constraint whose NULLs are distinct.
+
+For full refreshes (SUPABASE_REFRESH=swap) tables are loaded into shadow
+copies and swapped in at the end through the SQL functions of
+supabase/migrations/20261019_etl_shadow_refresh.sql.
+
+Targets without a conflict key are appended. Requires psycopg 3 (in
+requirements_etl.txt), imported only when this sink is used. test_postgres_sink.py
+runs against a real Postgres in CI (.github/workflows/backend-postgres.yml).
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    import psycopg
+    from psycopg import sql
+except ImportError:  # optional: only SUPABASE_SINK=copy needs it
+    psycopg = None
+
+# Column that records COPY order in the staging table, so the latest duplicate wins the merge
+ORDER_COL = "_etl_ord"
+
+
+@dataclass
+class CopyResult:
+    table: str
+    rows: int = 0
+    merged: int = 0
+    copy_seconds: float = 0.0
+    merge_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        seconds = self.copy_seconds + self.merge_seconds
+        return self.rows / seconds if seconds else 0.0
+
+
+class PostgresSink:
+    def __init__(self, dsn: str, schema: str = "public"):
+        if psycopg is None:
+            raise SystemExit('SUPABASE_SINK=copy needs psycopg 3: pip install "psycopg[binary]"')
+        self.schema = schema
+        self.conn = psycopg.connect(dsn, autocommit=True)
+        # Column lists of each target's unique indexes, looked up once
+        self._unique_keys: Dict[str, List[List[str]]] = {}
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _target(self, table: str):
+        return sql.Identifier(self.schema, table)
+
+    def merge_keys(self, table: str, columns: Sequence[str], conflict: str) -> list[str]:
+        """The columns of `table`'s narrowest unique constraint covering `conflict`, else `conflict`'s own."""
+        keys = [k.strip() for k in conflict.split(",")]
+        if table not in self._unique_keys:
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT array_agg(a.attname::text ORDER BY k.ord)
+                    FROM pg_index i
+                    CROSS JOIN unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord)
+                    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                    WHERE i.indrelid = to_regclass(%s) AND i.indisunique
+                    GROUP BY i.indexrelid
+                    """,
+                    (sql.Identifier(self.schema, table).as_string(self.conn),),
+                )
+                self._unique_keys[table] = [row[0] for row in cur.fetchall()]
+        covering = [u for u in self._unique_keys[table] if set(keys) <= set(u) <= set(columns)]
+        return min(covering, key=len) if covering else keys
+
+    def merge_sql(self, table: str, stage: str, columns: Sequence[str], keys: Sequence[str]) -> list:
+        """Statements merging the staged rows into `table` on `keys` (NULL matching NULL); appends without keys."""
+        cols = sql.SQL(", ").join(map(sql.Identifier, columns))
+        insert = sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {} ORDER BY {}").format(
+            self._target(table), cols, cols, sql.Identifier(stage), sql.Identifier(ORDER_COL)
+        )
+        if not keys:
+            return [insert]
+        key_list = sql.SQL(", ").join(map(sql.Identifier, keys))
+
+        def key(alias: str):
+            # jsonb arrays compare NULL = NULL and hash, so the delete is one hash join, not a nested loop
+            return sql.SQL("jsonb_build_array({})").format(
+                sql.SQL(", ").join(sql.SQL("{}.{}").format(sql.Identifier(alias), sql.Identifier(k)) for k in keys)
+            )
+
+        return [
+            sql.SQL(
+                "DELETE FROM {stage} WHERE {ord} IN (SELECT {ord} FROM (SELECT {ord}, row_number() OVER "
+                "(PARTITION BY {keys} ORDER BY {ord} DESC) AS n FROM {stage}) AS d WHERE n > 1)"
+            ).format(stage=sql.Identifier(stage), ord=sql.Identifier(ORDER_COL), keys=key_list),
+            sql.SQL("DELETE FROM {target} AS t USING {stage} AS s WHERE {tk} = {sk}").format(
+                target=self._target(table), stage=sql.Identifier(stage), tk=key("t"), sk=key("s")
+            ),
+            insert,
+        ]
+
+    def load(self, table: str, columns: Sequence[str], rows: Iterable[Sequence], conflict: Optional[str] = None) -> CopyResult:
+        """COPY `rows` into a staging copy of `table` and merge them in; all-or-nothing per table."""
+        result = CopyResult(table)
+        stage = f"_etl_stage_{table}"
+        cols = sql.SQL(", ").join(map(sql.Identifier, columns))
+        with self.conn.transaction(), self.conn.cursor() as cur:
+            started = time.perf_counter()
+            cur.execute(
+                sql.SQL("CREATE TEMP TABLE {stage} ON COMMIT DROP AS SELECT {cols} FROM {target} WITH NO DATA").format(
+                    stage=sql.Identifier(stage), cols=cols, target=self._target(table)
+                )
+            )
+            cur.execute(sql.SQL("ALTER TABLE {} ADD COLUMN {} bigserial").format(sql.Identifier(stage), sql.Identifier(ORDER_COL)))
+            with cur.copy(sql.SQL("COPY {} ({}) FROM STDIN").format(sql.Identifier(stage), cols)) as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    result.rows += 1
+            result.copy_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            keys = self.merge_keys(table, columns, conflict) if conflict else []
+            for statement in self.merge_sql(table, stage, columns, keys):
+                cur.execute(statement)
+            result.merged = cur.rowcount
+            result.merge_seconds = time.perf_counter() - started
+        return result
+
+    def delete(self, table: str, key_columns: Sequence[str], keys: Iterable[Sequence]) -> int:
+        """COPY natural keys into a staging table and delete the matching rows (NULL matches NULL)."""
+        stage = f"_etl_delete_{table}"
+        cols = sql.SQL(", ").join(map(sql.Identifier, key_columns))
+        match = sql.SQL(" AND ").join(
+            sql.SQL("t.{0} IS NOT DISTINCT FROM s.{0}").format(sql.Identifier(c)) for c in key_columns
+        )
+        with self.conn.transaction(), self.conn.cursor() as cur:
+            cur.execute(
+                sql.SQL("CREATE TEMP TABLE {stage} ON COMMIT DROP AS SELECT {cols} FROM {target} WITH NO DATA").format(
+                    stage=sql.Identifier(stage), cols=cols, target=self._target(table)
+                )
+            )
+            with cur.copy(sql.SQL("COPY {} ({}) FROM STDIN").format(sql.Identifier(stage), cols)) as copy:
+                for key in keys:
+                    copy.write_row(key)
+            cur.execute(
+                sql.SQL("DELETE FROM {target} t USING {stage} s WHERE {match}").format(
+                    target=self._target(table), stage=sql.Identifier(stage), match=match
+                )
+            )
+            return cur.rowcount
+
+    def clear(self, tables: Iterable[str]) -> None:
+        with self.conn.transaction(), self.conn.cursor() as cur:
+            cur.execute(sql.SQL("TRUNCATE {}").format(sql.SQL(", ").join(self._target(t) for t in tables)))
+
+    def prepare_shadow(self, tables: Sequence[str], keep: bool = False) -> None:
+        """Create empty shadow copies of `tables` (kept as they are with `keep`); needs the
+        etl_prepare_shadow() function from supabase/migrations."""
+        self.conn.execute("SELECT etl_prepare_shadow(%s, %s, %s)", (list(tables), keep, self.schema))
+
+    def swap_shadow(self, tables: Sequence[str]) -> None:
+        """Replace the contents of `tables` with their shadows in one transaction (etl_swap_shadow())."""
+        self.conn.execute("SELECT etl_swap_shadow(%s, %s)", (list(tables), self.schema))
+
+    def count_rows(self, table: str) -> int:
+        with self.conn.cursor() as cur:
+            cur.execute(sql.SQL("SELECT count(*) FROM {}").format(self._target(table)))
+            return cur.fetchone()[0]
@@ -0,0 +1,147 @@
+"""Minimal PostgREST stand-in for upload tests: POST /rest/v1/<table> upserts JSON rows,
+DELETE with eq./is.null filters removes them. The ETL's shadow-refresh functions are
+served under /rpc/ (etl_prepare_shadow copies a table's constraints to an empty
+`_etl_shadow_<table>`, etl_swap_shadow puts it in the live table's place).
+
+Faults are scripted per table: `flaky[table] = n` answers the first n requests with a
+plain 503, `constraints[table]` lists the only on_conflict targets that exist (others get
+42P10), any row with `"poison": True` fails its batch with a not-null violation, and
+bodies over `max_body_bytes` get a plain 413 as from the API gateway. Tables in
+`nulls_distinct` have plain Postgres unique constraints: a row with a NULL key never
+conflicts and is added, as is a row without an `id` when there is no conflict target.
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Set
+from urllib.parse import parse_qs, urlparse
+
+
+def error(code: str, message: str) -> dict:
+    """PostgREST error body; the client only parses it when all four keys are present."""
+    return {"code": code, "message": message, "details": None, "hint": None}
+
+
+class PostgrestStub:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.rows: Dict[str, Dict[str, dict]] = defaultdict(dict)
+        self.requests: List[dict] = []
+        self.flaky: Dict[str, int] = {}
+        self.constraints: Dict[str, List[str]] = {}
+        self.nulls_distinct: Set[str] = set()
+        self.max_body_bytes: Optional[int] = None
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._new_rows = itertools.count()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "PostgrestStub":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status: int, body: Optional[dict] = None, content_type="application/json"):
+                data = b"" if body is None else (json.dumps(body).encode() if content_type == "application/json" else body)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                # Table probes (select ... limit 1): every table exists and reads as empty
+                self.reply(200, [])
+
+            def rpc(self, name: str, args: dict):
+                with stub._lock:
+                    stub.requests.append({"rpc": name, **args})
+                    for table in args["tables"]:
+                        shadow = "_etl_shadow_" + table
+                        if name == "etl_prepare_shadow":
+                            if not args.get("keep"):
+                                stub.rows[shadow] = {}
+                            stub.constraints[shadow] = stub.constraints.get(table, [])
+                        elif name == "etl_swap_shadow":
+                            stub.rows[table] = stub.rows.pop(shadow, {})
+                self.reply(204)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                table = url.path.rsplit("/", 1)[-1]
+                on_conflict = parse_qs(url.query).get("on_conflict", [None])[0]
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                if "/rpc/" in url.path:
+                    return self.rpc(table, json.loads(body))
+                if stub.max_body_bytes is not None and len(body) > stub.max_body_bytes:
+                    with stub._lock:
+                        stub.requests.append({"table": table, "too_large": True, "bytes": len(body)})
+                    return self.reply(413, b"Payload Too Large", content_type="text/plain")
+                rows = json.loads(body)
+                with stub._lock:
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    stub.requests.append({"table": table, "on_conflict": on_conflict, "rows": len(rows),
+                                          "bytes": len(body), "prefer": self.headers.get("Prefer", "")})
+                    flaky = stub.flaky.get(table, 0)
+                    if flaky:
+                        stub.flaky[table] = flaky - 1
+                try:
+                    time.sleep(stub.latency)
+                    if flaky:
+                        return self.reply(503, b"upstream unavailable", content_type="text/plain")
+                    if on_conflict and on_conflict not in stub.constraints.get(table, []):
+                        return self.reply(400, error("42P10", "there is no unique or exclusion constraint "
+                                                     "matching the ON CONFLICT specification"))
+                    if any(row.get("poison") for row in rows):
+                        return self.reply(400, error("23502", "null value violates not-null constraint"))
+                    keys = (on_conflict or "id").split(",")
+                    with stub._lock:
+                        for row in rows:
+                            key = [row.get(k) for k in keys]
+                            if (table in stub.nulls_distinct or not on_conflict) and None in key:
+                                key = ["new row", next(stub._new_rows)]
+                            stub.rows[table][json.dumps(key)] = row
+                    self.reply(201)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def do_DELETE(self):
+                url = urlparse(self.path)
+                table = url.path.rsplit("/", 1)[-1]
+                filters = {col: value[0] for col, value in parse_qs(url.query).items()}
+
+                def matches(row):
+                    for col, expr in filters.items():
+                        op, _, value = expr.partition(".")
+                        if (op == "is" and row.get(col) is not None) or (op == "eq" and str(row.get(col)) != value):
+                            return False
+                    return True
+
+                with stub._lock:
+                    stub.requests.append({"table": table, "method": "DELETE", "filters": filters})
+                    for key in [k for k, row in stub.rows[table].items() if matches(row)]:
+                        del stub.rows[table][key]
+                self.reply(204)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
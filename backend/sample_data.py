@@ -0,0 +1,227 @@
+"""Deterministic synthetic copy of the RPLS CSV drop, used by the tests and benchmarks."""
+from __future__ import annotations
+
+import csv
+import random
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence
+
+import duckdb
+
+import staging
+
+SECTORS = [
+    ("00", "Total US"),
+    ("11", "Agriculture, Forestry, Fishing and Hunting"),
+    ("23", "Construction"),
+    ("31-33", "Manufacturing"),
+    ("51", "Information"),
+    ("61-62", "Education and Health Services"),
+]
+OCCUPATIONS = [
+    ("11", "Management"),
+    ("15", "Computer and Mathematical"),
+    ("29", "Healthcare Practitioners and Technical"),
+    ("41", "Sales and Related"),
+]
+STATES = ["California", "New York", "Ohio", "Texas", "Washington"]
+
+
+def sample_months(count: int) -> List[str]:
+    """`count` consecutive YYYY-MM months ending at 2025-10."""
+    months = []
+    year, month = 2025, 10
+    for _ in range(count):
+        months.append(f"{year}-{month:02d}")
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return sorted(months)
+
+
+def read_records(csv_path: Path) -> List[Dict[str, str]]:
+    """Rows of the staged copy of `csv_path` as dicts of strings, '' for empty cells, like csv.DictReader."""
+    with duckdb.connect() as con:
+        cur = con.execute(f"SELECT * FROM {staging.scan_sql(csv_path, con)}")
+        columns = [d[0] for d in cur.description]
+        return [{c: ("" if v is None else v) for c, v in zip(columns, row)} for row in cur.fetchall()]
+
+
+def _write(path: Path, header: Sequence[str], rows: Iterable[Sequence]) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _money(value: float) -> str:
+    return f"${value:,.0f}"
+
+
+def write_sample_data(
+    data_dir: Path, months: int = 6, scale: int = 1, seed: int = 7, granular: bool = True
+) -> Path:
+    """Write a deterministic, schema-faithful RPLS drop into `data_dir`.
+
+    `scale` multiplies the number of states (and therefore the multi-granularity
+    row counts) for volume tests. `granular=False` skips the four
+    sector x occupation x state files when only the per-dimension facts matter.
+    """
+    rng = random.Random(seed)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    month_list = sample_months(months)
+    # Extra regions get short codes: like real state names they differ within the
+    # 8-byte prefix DuckDB keeps in string zone maps
+    states = STATES + [f"R{i:04d}" for i in range(len(STATES) * (scale - 1))]
+
+    def walk(base: float, spread: float = 0.02):
+        value = base
+        for _ in month_list:
+            value *= 1 + rng.uniform(-spread, spread)
+            yield value
+
+    def by_dim(name, dims, header, make_row):
+        rows = []
+        for dim in dims:
+            for month, row in zip(month_list, make_row(dim)):
+                rows.append([month, *row])
+        _write(data_dir / name, ["month", *header], rows)
+
+    def counts(dim, base):
+        return ([f"{v * 0.98:.1f}", f"{v:.1f}"] for v in walk(base))
+
+    def salaries(dim, base):
+        return ([str(rng.randint(800, 1200)), _money(v * 1.01), _money(v)] for v in walk(base, 0.01))
+
+    def rates(dim):
+        return (
+            [f"{h:.4f}", f"{a:.4f}", f"{h * 1.02:.4f}", f"{a * 1.02:.4f}"]
+            for h, a in zip(walk(0.28, 0.05), walk(0.26, 0.05))
+        )
+
+    def layoffs(dim):
+        return (
+            [str(int(v * 1.1)), str(rng.randint(5, 50)), str(int(v))]
+            for v in walk(rng.uniform(500, 5000), 0.2)
+        )
+
+    # Employment
+    by_dim("employment_naics.csv", SECTORS, ["naics2d_code", "naics2d_name", "employment_nsa", "employment_sa"],
+           lambda d: ([d[0], d[1], *c] for c in counts(d, rng.uniform(1e6, 2e7))))
+    by_dim("employment_soc.csv", OCCUPATIONS, ["soc2d_code", "soc2d_name", "employment_nsa", "employment_sa"],
+           lambda d: ([d[0], d[1], *c] for c in counts(d, rng.uniform(1e6, 1e7))))
+    by_dim("employment_state.csv", states, ["state", "employment_nsa", "employment_sa"],
+           lambda d: ([d, *c] for c in counts(d, rng.uniform(1e6, 1e7))))
+    by_dim("employment_national.csv", [None], ["employment_nsa", "employment_sa"],
+           lambda d: counts(d, 1.5e8))
+
+    # Postings
+    by_dim("postings_by_sector.csv", SECTORS, ["naics2d_code", "naics2d_name", "active_postings_nsa", "active_postings_sa"],
+           lambda d: ([d[0], d[1], *c] for c in counts(d, rng.uniform(1e4, 5e5))))
+    by_dim("postings_by_occupation.csv", OCCUPATIONS, ["soc2d_code", "soc2d_name", "active_postings_nsa", "active_postings_sa"],
+           lambda d: ([d[0], d[1], *c] for c in counts(d, rng.uniform(1e4, 5e5))))
+    by_dim("postings_by_state.csv", states, ["state", "active_postings_nsa", "active_postings_sa"],
+           lambda d: ([d, *c] for c in counts(d, rng.uniform(1e4, 5e5))))
+    by_dim("postings_total_us.csv", [None], ["active_postings_nsa", "active_postings_sa"],
+           lambda d: counts(d, 4e6))
+
+    # Salaries
+    by_dim("salaries_naics.csv", SECTORS, ["naics2d_code", "naics2d_name", "count", "salary_nsa", "salary_sa"],
+           lambda d: ([d[0], d[1], *s] for s in salaries(d, rng.uniform(45e3, 120e3))))
+    by_dim("salaries_soc.csv", OCCUPATIONS, ["soc2d_code", "soc2d_name", "count", "salary_nsa", "salary_sa"],
+           lambda d: ([d[0], d[1], *s] for s in salaries(d, rng.uniform(45e3, 120e3))))
+    by_dim("salaries_state.csv", states, ["state", "count", "salary_nsa", "salary_sa"],
+           lambda d: ([d, *s] for s in salaries(d, rng.uniform(45e3, 120e3))))
+    by_dim("salaries_national.csv", [None], ["count", "salary_nsa", "salary_sa"],
+           lambda d: salaries(d, 70e3))
+
+    # Hiring / attrition
+    rate_cols = ["rl_hiring_rate", "rl_attrition_rate", "rl_hiring_rate_nsa", "rl_attrition_rate_nsa"]
+    by_dim("hiring_and_attrition_by_sector.csv", SECTORS, ["naics2d_code", "naics2d_name", *rate_cols],
+           lambda d: ([d[0], d[1], *r] for r in rates(d)))
+    by_dim("hiring_and_attrition_by_occupation.csv", OCCUPATIONS, ["soc2d_code", "soc2d_name", *rate_cols],
+           lambda d: ([d[0], d[1], *r] for r in rates(d)))
+    by_dim("hiring_and_attrition_by_state.csv", states, ["state", *rate_cols],
+           lambda d: ([d, *r] for r in rates(d)))
+    by_dim("hiring_and_attrition_total_us.csv", [None], rate_cols, rates)
+
+    # Layoffs
+    layoff_cols = ["num_employees_notified", "num_notices_issued", "num_employees_laidoff"]
+    by_dim("layoffs_by_naics.csv", SECTORS[1:], ["naics2d", "naics2d_name", *layoff_cols],
+           lambda d: ([d[0], d[1], *r] for r in layoffs(d)))
+    by_dim("layoffs_by_state.csv", states, ["state", *layoff_cols],
+           lambda d: ([d, *r] for r in layoffs(d)))
+    by_dim("total_layoffs.csv", [None], layoff_cols, layoffs)
+
+    # Multi-granularity facts (sector x occupation x state)
+    combos = [(s[0], o[0], st) for s in SECTORS[1:] for o in OCCUPATIONS for st in states]
+
+    def multi(name, header, make_values):
+        if not granular:
+            return
+        rows = []
+        for month in month_list:
+            for sector, occ, state in combos:
+                rows.append([f"{month}-01", sector, occ, state, *make_values()])
+        _write(data_dir / name, ["month", "naics2d_code", "soc2d_code", "state", *header], rows)
+
+    multi("employment_all_granularities.csv", ["count_nsa", "count_sa"],
+          lambda: [f"{rng.uniform(100, 9000):.1f}", f"{rng.uniform(100, 9000):.1f}"])
+    multi("postings_by_sector_occupation_state.csv", ["active_postings_nsa", "active_postings_sa"],
+          lambda: [f"{rng.uniform(10, 900):.1f}", f"{rng.uniform(10, 900):.1f}"])
+    multi("hiring_and_attrition_by_sector_occupation_state.csv", rate_cols,
+          lambda: [f"{rng.uniform(0.1, 0.4):.4f}" for _ in rate_cols])
+    multi("salaries_all_granularities.csv", ["count", "salary_nsa", "salary_sa", "weight"],
+          lambda: [str(rng.randint(1, 90)), f"{rng.uniform(3e4, 2e5):.2f}", f"{rng.uniform(3e4, 2e5):.2f}",
+                   f"{rng.uniform(0, 1):.4f}"])
+
+    # Summary tables (wide, one column per month)
+    def label(month: str, fmt: str) -> str:
+        from datetime import datetime
+
+        return datetime.strptime(month, "%Y-%m").strftime(fmt)
+
+    last3 = month_list[-3:]
+    long_labels = [label(m, "%B %Y") for m in last3]
+    year_ago = f"{int(month_list[-1][:4]) - 1}{month_list[-1][4:]}"
+    short_labels = [label(year_ago, "%b %Y")] + [label(m, "%b %Y") for m in last3]
+    yoy = "YoY change (Oct 24–Oct 25)"
+    mom = "MoM change (Sep 25–Oct 25)"
+    for name, key, dims in [
+        ("sector_summary.csv", "Sector", [s[1] for s in SECTORS]),
+        ("occupation_summary.csv", "Occupation", [o[1] for o in OCCUPATIONS]),
+        ("state_summary.csv", "State", states),
+    ]:
+        _write(data_dir / name, [key, *long_labels, yoy, mom],
+               [[d, *[f"{rng.randint(1000, 90000)}" for _ in last3], f"{rng.uniform(-5, 5):.1f}",
+                 f"{rng.uniform(-2, 2):.1f}"] for d in dims])
+    for name, key, dims in [
+        ("hiring_sector_summary.csv", "Sector", [s[1] for s in SECTORS]),
+        ("attrition_sector_summary.csv", "Sector", [s[1] for s in SECTORS]),
+    ]:
+        _write(data_dir / name, [key, *long_labels, "YoY change (pp) (Oct 24–Oct 25)", "MoM change (pp) (Sep 25–Oct 25)"],
+               [[d, *[f"{rng.uniform(0.2, 0.35):.3f}" for _ in last3], f"{rng.uniform(-1, 1):.2f}",
+                 f"{rng.uniform(-1, 1):.2f}"] for d in dims])
+
+    pct_yoy = f"Pct change YoY ({short_labels[0]} - {short_labels[-1]})"
+    pct_mom = f"Pct change ({short_labels[-2]} - {short_labels[-1]})"
+    for name, keys, dims in [
+        ("salary_overview_naics.csv", ["naics2d_code", "naics2d_name"], [list(s) for s in SECTORS[1:]]),
+        ("salary_overview_soc.csv", ["soc2d_code", "soc2d_name"], [list(o) for o in OCCUPATIONS]),
+        ("salary_overview_state.csv", ["state"], [["Total US"]] + [[s] for s in states]),
+        ("salary_overview_total.csv", [], [[]]),
+    ]:
+        _write(data_dir / name, [*keys, *short_labels, pct_yoy, pct_mom],
+               [[*d, *[f"{rng.uniform(5e4, 9e4):.0f}" for _ in short_labels], f"{rng.uniform(-4, 4):.2f}",
+                 f"{rng.uniform(-1, 1):.2f}"] for d in dims])
+    diff_yoy = f"{short_labels[-1]} - {short_labels[0]}"
+    diff_mom = f"{short_labels[-1]} - {short_labels[-2]}"
+    for name, key, dims in [
+        ("table_b_naics.csv", "Sector", [s[1] for s in SECTORS]),
+        ("table_b_soc.csv", "SOC Category", [o[1] for o in OCCUPATIONS]),
+        ("table_b_state.csv", "State", states),
+    ]:
+        _write(data_dir / name, [key, *short_labels, diff_yoy, diff_mom],
+               [[d, *[f"{rng.randint(1000, 90000)}" for _ in short_labels], str(rng.randint(-500, 500)),
+                 str(rng.randint(-200, 200))] for d in dims])
+    return data_dir
@@ -0,0 +1,466 @@
+"""
+Sinks for etl_supabase.py
+-------------------------
+Everything the loader does to a destination goes through one small interface, so
+the same extraction, dedupe and delta pipeline can write to (SUPABASE_SINK):
+
+    rest      Supabase REST API: concurrent JSON upsert batches (supabase_upload.py)
+    copy      the project's Postgres directly: COPY + set-based merge (postgres_sink.py)
+    duckdb    a local DuckDB file
+    sqlite    a local SQLite file
+    parquet   a local directory of Parquet files, one directory per table
+
+The local sinks need no credentials, so development and CI can run full-volume
+loads, and bench_sinks.py compares all of them on the same drop. DuckDB and
+SQLite create each table from the first chunk's columns and merge on the conflict
+key (NULL matches NULL), one transaction per chunk. Parquet rewrites a table on
+every load (`full_tables`: the loader then sends every row and never deletes) and
+moves the new files into place only once they are complete.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+from postgrest import APIError
+
+import columnar
+from postgres_sink import PostgresSink
+from supabase_upload import BatchUploader
+
+# Loads of a swap refresh go to SHADOW_PREFIX + table (see supabase/migrations/20261019_etl_shadow_refresh.sql)
+SHADOW_PREFIX = "_etl_shadow_"
+SHADOW_WAIT_SECONDS = float(os.getenv("SUPABASE_SHADOW_WAIT_SECONDS", "30"))
+OnBatch = Optional[Callable[[pa.Table], None]]
+
+
+@dataclass
+class SinkResult:
+    table: str
+    rows: int = 0
+    written: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    detail: str = ""  # sink-specific figures for the log line
+    failures: list = field(default_factory=list)  # supabase_upload.BatchFailure entries
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.written / self.seconds if self.seconds else 0.0
+
+
+class Sink:
+    """A destination for the loader's tables."""
+
+    name = ""
+    stage = "load"  # profiler stage the loads are timed under
+    full_tables = False  # True: every load replaces the whole table, so refreshes never need shadow copies
+
+    def load(self, table: str, columns: Sequence[str], chunks: Iterable[pa.Table], conflict: Optional[str] = None,
+             on_batch: OnBatch = None) -> SinkResult:
+        """Write the chunks, merging on `conflict` (comma-separated key columns); `on_batch`
+        gets the rows of each batch once the destination has them for good."""
+        raise NotImplementedError
+
+    def delete(self, table: str, key_columns: Sequence[str], keys: Sequence[Sequence]) -> SinkResult:
+        """Delete rows by natural key (NULL matches NULL)."""
+        raise NotImplementedError
+
+    def clear(self, tables: Dict[str, str]) -> None:
+        """Empty the tables (mapped to a column that is never NULL, for sinks that need one)."""
+        raise NotImplementedError
+
+    def prepare_shadow(self, tables: Sequence[str], keep: bool = False) -> None:
+        """Start empty SHADOW_PREFIX copies of the tables (keep existing ones with `keep`)."""
+        raise NotImplementedError
+
+    def swap_shadow(self, tables: Sequence[str]) -> None:
+        """Replace the tables with their shadow copies, all at once."""
+        raise NotImplementedError
+
+    def count_rows(self, table: str) -> int:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class RestSink(Sink):
+    name = "rest"
+    stage = "upload"
+
+    def __init__(self, client, uploader: Optional[BatchUploader] = None):
+        self.client = client
+        self.uploader = uploader or BatchUploader(client)
+
+    def load(self, table, columns, chunks, conflict=None, on_batch=None) -> SinkResult:
+        result = self.uploader.upload_arrow(table, chunks, on_conflict=conflict, on_batch=on_batch)
+        self.uploader.settings.save()
+        detail = (
+            f"{result.batches} batches, {result.retries} retries, "
+            f"next batch budget {self.uploader.sizer(table).target_bytes // 1024} KiB"
+        )
+        return SinkResult(table, result.rows, result.uploaded_rows, result.batches, result.seconds, detail, result.failures)
+
+    def delete(self, table, key_columns, keys) -> SinkResult:
+        result = self.uploader.delete(table, key_columns, keys)
+        return SinkResult(table, result.rows, result.uploaded_rows, result.batches, result.seconds, "", result.failures)
+
+    def clear(self, tables: Dict[str, str]) -> None:
+        for table, col in tables.items():
+            placeholder = "00000000-0000-0000-0000-000000000000" if col == "id" else "__wipe__"
+            self.client.table(table).delete().neq(col, placeholder).execute()
+
+    def prepare_shadow(self, tables, keep=False) -> None:
+        try:
+            self.client.rpc("etl_prepare_shadow", {"tables": list(tables), "keep": keep}).execute()
+        except APIError as exc:
+            raise SystemExit(
+                f"SUPABASE_REFRESH=swap needs supabase/migrations/20261019_etl_shadow_refresh.sql applied: {exc}"
+            )
+        # PostgREST reloads its schema cache asynchronously; wait until it serves the new tables
+        deadline = time.monotonic() + SHADOW_WAIT_SECONDS
+        for table in tables:
+            while True:
+                try:
+                    self.client.table(SHADOW_PREFIX + table).select("*").limit(1).execute()
+                    break
+                except APIError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.5)
+
+    def swap_shadow(self, tables) -> None:
+        self.client.rpc("etl_swap_shadow", {"tables": list(tables)}).execute()
+
+    def count_rows(self, table: str) -> int:
+        return self.client.table(table).select("*", count="exact").limit(1).execute().count or 0
+
+
+class CopySink(Sink):
+    name = "copy"
+    stage = "copy"
+
+    def __init__(self, pg: PostgresSink):
+        self.pg = pg
+        # One connection, one transaction at a time: tables loading in parallel take turns
+        self.lock = threading.Lock()
+
+    def load(self, table, columns, chunks, conflict=None, on_batch=None) -> SinkResult:
+        # One all-or-nothing transaction per table: nothing is confirmed batch by batch
+        with self.lock:
+            loaded = self.pg.load(table, columns, (row for chunk in chunks for row in columnar.rows(chunk)), conflict)
+        detail = (
+            f"COPY {loaded.copy_seconds:.1f}s + merge {loaded.merge_seconds:.1f}s, {loaded.merged} merged"
+        )
+        return SinkResult(table, loaded.rows, loaded.rows, 1, loaded.copy_seconds + loaded.merge_seconds, detail)
+
+    def delete(self, table, key_columns, keys) -> SinkResult:
+        started = time.perf_counter()
+        with self.lock:
+            deleted = self.pg.delete(table, key_columns, keys)
+        return SinkResult(table, len(keys), deleted, 1, time.perf_counter() - started)
+
+    def clear(self, tables: Dict[str, str]) -> None:
+        self.pg.clear(tables)
+
+    def prepare_shadow(self, tables, keep=False) -> None:
+        self.pg.prepare_shadow(tables, keep=keep)
+
+    def swap_shadow(self, tables) -> None:
+        self.pg.swap_shadow(tables)
+
+    def count_rows(self, table: str) -> int:
+        with self.lock:
+            return self.pg.count_rows(table)
+
+    def close(self) -> None:
+        self.pg.close()
+
+
+class _SQLFileSink(Sink):
+    """Shared merge/shadow logic of the DuckDB and SQLite sinks (autocommit connection, explicit transactions).
+
+    Tables loading in parallel share the one connection, a transaction at a time.
+    """
+
+    stage = "write"
+    null_safe_eq = "IS NOT DISTINCT FROM"
+    con = None
+
+    def _stage(self, name: str, chunk: pa.Table) -> None:
+        raise NotImplementedError
+
+    def _unstage(self, name: str) -> None:
+        raise NotImplementedError
+
+    def _create_sql(self, table: str, chunk: pa.Table) -> str:
+        raise NotImplementedError
+
+    def _exists(self, table: str) -> bool:
+        raise NotImplementedError
+
+    def _transaction(self, statements: Callable[[], None]) -> None:
+        with self.lock:
+            self.con.execute("BEGIN")
+            try:
+                statements()
+            except BaseException:
+                self.con.execute("ROLLBACK")
+                raise
+            self.con.execute("COMMIT")
+
+    def _match(self, keys: Sequence[str]) -> str:
+        return " AND ".join(f"t.{columnar.quote(k)} {self.null_safe_eq} s.{columnar.quote(k)}" for k in keys)
+
+    def _delete_matching_sql(self, table: str, staged: str, keys: Sequence[str]) -> str:
+        """Delete the rows of `table` whose key (NULL matching NULL) is in the `staged` rows."""
+        return f"DELETE FROM {columnar.quote(table)} AS t WHERE EXISTS (SELECT 1 FROM {staged} s WHERE {self._match(keys)})"
+
+    def _index_keys(self, table: str, keys: Sequence[str]) -> None:
+        """Make sure deletes by `keys` do not have to scan `table`; DuckDB's hash join never does."""
+
+    def _unindex_keys(self, table: str) -> None:
+        """Drop _index_keys()'s index before `table` is renamed (the next load rebuilds it under the new name)."""
+
+    def load(self, table, columns, chunks, conflict=None, on_batch=None) -> SinkResult:
+        result = SinkResult(table)
+        started = time.perf_counter()
+        keys = [k.strip() for k in conflict.split(",")] if conflict else []
+        target, cols = columnar.quote(table), ", ".join(map(columnar.quote, columns))
+        for chunk in chunks:
+            def merge() -> None:
+                if not self._exists(table):
+                    self.con.execute(self._create_sql(table, chunk))
+                if keys:
+                    self._index_keys(table, keys)
+                    self.con.execute(self._delete_matching_sql(table, "sink_rows", keys))
+                self.con.execute(f"INSERT INTO {target} ({cols}) SELECT {cols} FROM sink_rows")
+
+            with self.lock:
+                self._stage("sink_rows", chunk)
+                try:
+                    self._transaction(merge)
+                finally:
+                    self._unstage("sink_rows")
+            result.rows += chunk.num_rows
+            result.written += chunk.num_rows
+            result.batches += 1
+            if on_batch is not None:
+                on_batch(chunk)
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def delete(self, table, key_columns, keys) -> SinkResult:
+        started = time.perf_counter()
+        result = SinkResult(table, len(keys), batches=1)
+        with self.lock:
+            if not keys or not self._exists(table):
+                return result
+            staged = pa.table([pa.array(list(values)) for values in zip(*keys)], names=list(key_columns))
+            self._stage("sink_keys", staged)
+            try:
+                before = self.count_rows(table)
+                self._index_keys(table, key_columns)
+                self._transaction(lambda: self.con.execute(self._delete_matching_sql(table, "sink_keys", key_columns)))
+                result.written = before - self.count_rows(table)
+            finally:
+                self._unstage("sink_keys")
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def clear(self, tables: Dict[str, str]) -> None:
+        self._transaction(lambda: [self.con.execute(f"DELETE FROM {columnar.quote(t)}") for t in tables if self._exists(t)])
+
+    def prepare_shadow(self, tables, keep=False) -> None:
+        def create() -> None:
+            for table in tables:
+                shadow = columnar.quote(SHADOW_PREFIX + table)
+                if not keep:
+                    self.con.execute(f"DROP TABLE IF EXISTS {shadow}")
+                # Without a live table the first load creates the shadow from its rows
+                if self._exists(table):
+                    self.con.execute(
+                        f"CREATE TABLE IF NOT EXISTS {shadow} AS SELECT * FROM {columnar.quote(table)} LIMIT 0"
+                    )
+
+        self._transaction(create)
+
+    def swap_shadow(self, tables) -> None:
+        # Locally a rename is the whole swap: there are no grants or policies to carry over
+        def swap() -> None:
+            for table in tables:
+                if self._exists(SHADOW_PREFIX + table):
+                    self._unindex_keys(SHADOW_PREFIX + table)
+                    self.con.execute(f"DROP TABLE IF EXISTS {columnar.quote(table)}")
+                    self.con.execute(
+                        f"ALTER TABLE {columnar.quote(SHADOW_PREFIX + table)} RENAME TO {columnar.quote(table)}"
+                    )
+
+        self._transaction(swap)
+
+    def count_rows(self, table: str) -> int:
+        with self.lock:
+            if not self._exists(table):
+                return 0
+            return self.con.execute(f"SELECT count(*) FROM {columnar.quote(table)}").fetchone()[0]
+
+    def close(self) -> None:
+        self.con.close()
+
+
+class DuckDBSink(_SQLFileSink):
+    name = "duckdb"
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.con = duckdb.connect(str(path))
+        self.lock = threading.RLock()
+
+    def _stage(self, name, chunk) -> None:
+        self.con.register(name, chunk)
+
+    def _unstage(self, name) -> None:
+        self.con.unregister(name)
+
+    def _create_sql(self, table, chunk) -> str:
+        described = self.con.execute("DESCRIBE SELECT * FROM sink_rows").fetchall()
+        # An all-NULL first chunk has no type to go by; text is what such columns hold
+        columns = [f"{columnar.quote(name)} {'VARCHAR' if kind == 'NULL' else kind}" for name, kind, *_ in described]
+        return f"CREATE TABLE {columnar.quote(table)} ({', '.join(columns)})"
+
+    def _exists(self, table) -> bool:
+        return bool(self.con.execute(
+            "SELECT 1 FROM information_schema.tables WHERE table_schema = 'main' AND table_name = ?", [table]
+        ).fetchone())
+
+
+class SQLiteSink(_SQLFileSink):
+    name = "sqlite"
+    null_safe_eq = "IS"
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.con = sqlite3.connect(str(path), isolation_level=None, check_same_thread=False)
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def _affinity(kind: pa.DataType) -> str:
+        if pa.types.is_integer(kind) or pa.types.is_boolean(kind):
+            return "INTEGER"
+        if pa.types.is_floating(kind) or pa.types.is_decimal(kind):
+            return "REAL"
+        return "TEXT"
+
+    @staticmethod
+    def _bindable(chunk: pa.Table) -> pa.Table:
+        """Decimals as floats, dates and times as ISO text: the values sqlite3 binds natively."""
+        for i, f in enumerate(chunk.schema):
+            if pa.types.is_decimal(f.type):
+                chunk = chunk.set_column(i, f.name, chunk.column(i).cast(pa.float64()))
+            elif pa.types.is_temporal(f.type):
+                chunk = chunk.set_column(i, f.name, chunk.column(i).cast(pa.string()))
+        return chunk
+
+    def _stage(self, name, chunk) -> None:
+        chunk = self._bindable(chunk)
+        columns = ", ".join(f"{columnar.quote(f.name)} {self._affinity(f.type)}" for f in chunk.schema)
+        self.con.execute(f"CREATE TEMP TABLE {name} ({columns})")
+        marks = ", ".join("?" * chunk.num_columns)
+        self.con.executemany(f"INSERT INTO {name} VALUES ({marks})", columnar.rows(chunk))
+
+    def _unstage(self, name) -> None:
+        self.con.execute(f"DROP TABLE IF EXISTS temp.{name}")
+
+    def _create_sql(self, table, chunk) -> str:
+        columns = ", ".join(f"{columnar.quote(f.name)} {self._affinity(f.type)}" for f in chunk.schema)
+        return f"CREATE TABLE {columnar.quote(table)} ({columns})"
+
+    def _exists(self, table) -> bool:
+        return bool(self.con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", [table]).fetchone())
+
+    # No UNIQUE index + ON CONFLICT: keys hold NULLs (Total US rows), which a unique index never
+    # matches, so the merge stays a delete + insert, driven from the staged rows through this index
+    def _index_keys(self, table, keys) -> None:
+        columns = ", ".join(map(columnar.quote, keys))
+        self.con.execute(f"CREATE INDEX IF NOT EXISTS {columnar.quote(table + '__key')} ON {columnar.quote(table)} ({columns})")
+
+    def _unindex_keys(self, table) -> None:
+        self.con.execute(f"DROP INDEX IF EXISTS {columnar.quote(table + '__key')}")
+
+    def _delete_matching_sql(self, table, staged, keys) -> str:
+        # Written as a join from the staged rows so each one is an index lookup, not a table scan
+        return (
+            f"DELETE FROM {columnar.quote(table)} WHERE rowid IN "
+            f"(SELECT t.rowid FROM {staged} s JOIN {columnar.quote(table)} t ON {self._match(keys)})"
+        )
+
+
+def replace_dir(building: Path, live: Path) -> None:
+    """Move a finished directory into place, then drop the one it replaces."""
+    old = live.with_name(f".{live.name}.old")
+    shutil.rmtree(old, ignore_errors=True)
+    if live.exists():
+        live.rename(old)
+    building.rename(live)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+class ParquetSink(Sink):
+    """Each table is a directory of zstd Parquet parts, one per chunk, replaced whole on every load."""
+
+    name = "parquet"
+    stage = "write"
+    full_tables = True
+
+    def __init__(self, root: Path):
+        self.root = root
+        root.mkdir(parents=True, exist_ok=True)
+
+    def load(self, table, columns, chunks, conflict=None, on_batch=None) -> SinkResult:
+        result = SinkResult(table)
+        started = time.perf_counter()
+        building = self.root / f".{table}.tmp"
+        shutil.rmtree(building, ignore_errors=True)
+        building.mkdir()
+        for chunk in chunks:
+            pq.write_table(chunk, building / f"part-{result.batches:05d}.parquet", compression="zstd")
+            result.rows += chunk.num_rows
+            result.batches += 1
+        replace_dir(building, self.root / table)
+        result.written = result.rows
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def delete(self, table, key_columns, keys) -> SinkResult:
+        # Never needed: full_tables loads already leave out every row the drop no longer has
+        return SinkResult(table, len(keys))
+
+    def clear(self, tables: Dict[str, str]) -> None:
+        for table in tables:
+            shutil.rmtree(self.root / table, ignore_errors=True)
+
+    def count_rows(self, table: str) -> int:
+        return sum(pq.ParquetFile(path).metadata.num_rows for path in (self.root / table).glob("*.parquet"))
+
+
+SINKS = {"rest": RestSink, "copy": CopySink, "duckdb": DuckDBSink, "sqlite": SQLiteSink, "parquet": ParquetSink}
+LOCAL_PATHS = {"duckdb": "supabase_local.duckdb", "sqlite": "supabase_local.sqlite", "parquet": "parquet"}
+
+
+def local_sink(name: str, path: Path) -> Sink:
+    """One of the credential-free sinks, writing under `path`."""
+    return SINKS[name](path)
+
@@ -0,0 +1,170 @@
+"""
+Parquet staging cache for raw RPLS CSVs
+---------------------------------------
+Each source CSV is converted once into zstd-compressed Parquet named by its
+content hash, so `etl.py`, `etl_supabase.py` and `scripts/process_data.py`
+skip CSV parsing on repeat runs. Columns are staged as VARCHAR exactly as the
+CSV text reads (codes like "00" and "$52,000" survive); every consumer applies
+its own casts, as it did when reading the CSV directly.
+
+The cache lives in `<data dir>/.staging` unless RPLS_STAGING_DIR is set.
+
+Sources may be stored compressed as `<name>.csv.gz` or `<name>.csv.zst`;
+DuckDB decompresses them as a stream while parsing, so the drop never needs an
+uncompressed copy on disk. `resolve_source()` maps a canonical `<name>.csv`
+path to whichever variant exists (plain CSV first).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import duckdb
+
+STAGING_ENV = "RPLS_STAGING_DIR"
+INDEX_FILE = "index.json"
+# Accepted source encodings in lookup order; DuckDB picks the codec from the extension
+CSV_SUFFIXES = (".csv", ".csv.gz", ".csv.zst")
+_index_lock = threading.Lock()
+
+
+def staging_dir(csv_path: Path) -> Path:
+    override = os.environ.get(STAGING_ENV)
+    return Path(override) if override else csv_path.parent / ".staging"
+
+
+def source_name(path: Path) -> Optional[str]:
+    """Source name without its CSV suffix ("employment_state.csv.gz" -> "employment_state"), or None."""
+    lowered = path.name.lower()
+    for suffix in sorted(CSV_SUFFIXES, key=len, reverse=True):
+        if lowered.endswith(suffix):
+            return path.name[: -len(suffix)]
+    return None
+
+
+def is_compressed(path: Path) -> bool:
+    return path.name.lower().endswith(CSV_SUFFIXES[1:])
+
+
+def resolve_source(csv_path: Path) -> Path:
+    """The existing file for a canonical `<name>.csv` path; the path itself if no variant exists."""
+    name = source_name(csv_path) or csv_path.name
+    for suffix in CSV_SUFFIXES:
+        candidate = csv_path.with_name(name + suffix)
+        if candidate.exists():
+            return candidate
+    return csv_path
+
+
+def find_sources(data_dir: Path) -> Dict[str, Path]:
+    """Map lower-cased source name -> file for every CSV (plain or compressed) in `data_dir`."""
+    found: Dict[str, Path] = {}
+    for suffix in CSV_SUFFIXES:
+        for path in sorted(data_dir.glob(f"*{suffix}")):
+            name = source_name(path)
+            if name and path.is_file():
+                found.setdefault(name.lower(), path)
+    return dict(sorted(found.items()))
+
+
+def file_digest(path: Path) -> str:
+    """Streaming sha256 of a source file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_index(directory: Path) -> Dict[str, list]:
+    try:
+        return json.loads((directory / INDEX_FILE).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def content_hash(csv_path: Path) -> str:
+    """sha256 of the CSV, remembered by (size, mtime) so unchanged files are not re-read."""
+    directory = staging_dir(csv_path)
+    stat = csv_path.stat()
+    key = str(csv_path.resolve())
+    with _index_lock:
+        cached = _load_index(directory).get(key)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+    sha = file_digest(csv_path)
+    remember_hash(csv_path, sha)
+    return sha
+
+
+def remember_hash(csv_path: Path, sha: str) -> None:
+    directory = staging_dir(csv_path)
+    stat = csv_path.stat()
+    with _index_lock:
+        directory.mkdir(parents=True, exist_ok=True)
+        index = _load_index(directory)
+        index[str(csv_path.resolve())] = [stat.st_size, stat.st_mtime_ns, sha]
+        tmp = directory / f".{INDEX_FILE}.{threading.get_ident()}"
+        tmp.write_text(json.dumps(index, indent=1))
+        tmp.replace(directory / INDEX_FILE)
+
+
+def staged_path(csv_path: Path, sha: str) -> Path:
+    return staging_dir(csv_path) / f"{csv_path.name}-{sha[:16]}.parquet"
+
+
+def lookup(csv_path: Path, sha: Optional[str] = None) -> Optional[Path]:
+    """Staged Parquet for the file's current content, or None if it has not been staged yet."""
+    path = staged_path(csv_path, sha or content_hash(csv_path))
+    return path if path.exists() else None
+
+
+def _publish(con: duckdb.DuckDBPyConnection, select_sql: str, params: list, csv_path: Path, sha: str) -> Path:
+    target = staged_path(csv_path, sha)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{threading.get_ident()}.tmp")
+    con.execute(f"COPY ({select_sql}) TO '{tmp}' (FORMAT parquet, COMPRESSION zstd)", params)
+    tmp.replace(target)
+    # Older versions of this source are dead weight once the new one is published
+    for stale in target.parent.glob(f"{csv_path.name}-*.parquet"):
+        if stale != target:
+            stale.unlink(missing_ok=True)
+    return target
+
+
+def store_table(con: duckdb.DuckDBPyConnection, table: str, csv_path: Path, sha: str) -> Path:
+    """Stage an already-ingested table (rows in storage order) as the Parquet for `csv_path`."""
+    return _publish(con, f"SELECT * FROM {table}", [], csv_path, sha)
+
+
+def ensure_staged(csv_path: Path, con: Optional[duckdb.DuckDBPyConnection] = None) -> Path:
+    """Return the staged Parquet for `csv_path`, parsing the CSV only when its content is new."""
+    if not csv_path.exists():
+        raise FileNotFoundError(f"{csv_path.name} not found in {csv_path.parent}")
+    sha = content_hash(csv_path)
+    existing = lookup(csv_path, sha)
+    if existing:
+        return existing
+    own = con is None
+    con = con or duckdb.connect()
+    try:
+        return _publish(
+            con,
+            "SELECT * FROM read_csv_auto(?, header=True, all_varchar=True, sample_size=-1)",
+            [str(csv_path)],
+            csv_path,
+            sha,
+        )
+    finally:
+        if own:
+            con.close()
+
+
+def scan_sql(csv_path: Path, con: Optional[duckdb.DuckDBPyConnection] = None) -> str:
+    """SQL table expression reading the staged copy of `csv_path` (drop-in for read_csv_auto(...))."""
+    return f"read_parquet('{ensure_staged(csv_path, con)}')"
@@ -0,0 +1,164 @@
+"""
+Summary CSVs as long-format rows
+--------------------------------
+The published summary files are wide: one column per month plus change
+columns, and the headers move with every drop ("August 2025", "Oct 2025",
+"YoY change (pp) (Oct 24–Oct 25)", "Oct 2025 - Sep 2025", ...). Instead of
+hard-coding them, the loader classifies each header and unpivots the file in
+DuckDB into one row per (summary, entity, kind, month):
+
+    kind    value  a monthly level (the month is the column's month)
+            yoy    year-over-year change, as published (%, pp or difference)
+            mom    month-over-month change, as published
+    month   the level's month, or the month a change ends at
+    label   the source header, which also says the change's unit
+
+Entities are mapped to dimension ids with a join against the dim tables
+registered on the connection (dim_sectors/dim_occupations: id, name;
+dim_states: id); rows whose entity has no match are dropped.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable, Iterable, List, Optional, Sequence
+
+COLUMNS = ["summary", "entity_id", "kind", "month", "label", "value"]
+MONTH_FORMATS = ("%B %Y", "%b %Y")
+# "Oct 2025", "Oct 25", "October 2025", "Sep '25" inside a change header
+_MONTH_TOKEN = re.compile(r"\b([A-Z][a-z]{2})[a-z]*\.?\s+'?(\d{4}|\d{2})\b")
+
+
+@dataclass(frozen=True)
+class SummarySource:
+    summary: str  # name the rows are stored under (the former wide table's name)
+    source: str  # CSV name without extension
+    entity_column: Optional[str]  # None: a single national row
+    dimension: str  # how entity values map to ids, see DIMENSIONS
+
+
+@dataclass(frozen=True)
+class SummaryColumn:
+    column: str
+    kind: str
+    month: date
+
+
+# dimension -> (dim table, column the entity value must equal); "total" rows get TOTAL_ID
+DIMENSIONS = {
+    "sector": ("dim_sectors", "name"),
+    "sector_code": ("dim_sectors", "id"),
+    "occupation": ("dim_occupations", "name"),
+    "occupation_code": ("dim_occupations", "id"),
+    "state": ("dim_states", "id"),
+}
+TOTAL_ID = "_total"
+
+SUMMARIES = [
+    SummarySource("summary_sector", "sector_summary", "Sector", "sector"),
+    SummarySource("summary_occupation", "occupation_summary", "Occupation", "occupation"),
+    SummarySource("summary_state", "state_summary", "State", "state"),
+    SummarySource("salary_overview_naics", "salary_overview_naics", "naics2d_code", "sector_code"),
+    SummarySource("salary_overview_soc", "salary_overview_soc", "soc2d_code", "occupation_code"),
+    SummarySource("salary_overview_state", "salary_overview_state", "state", "state"),
+    SummarySource("salary_overview_total", "salary_overview_total", None, "total"),
+    SummarySource("table_b_naics", "table_b_naics", "Sector", "sector"),
+    SummarySource("table_b_soc", "table_b_soc", "SOC Category", "occupation"),
+    SummarySource("table_b_state", "table_b_state", "State", "state"),
+    SummarySource("hiring_sector_summary", "hiring_sector_summary", "Sector", "sector"),
+    SummarySource("attrition_sector_summary", "attrition_sector_summary", "Sector", "sector"),
+]
+
+
+def parse_month(header: str) -> Optional[date]:
+    """The month a header names outright ("October 2025", "Oct 2025"), else None."""
+    for fmt in MONTH_FORMATS:
+        try:
+            return datetime.strptime(header.strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def months_in(header: str) -> List[date]:
+    """Every month mentioned inside a header, in order ("Oct 24–Oct 25" -> two months)."""
+    found = []
+    for name, year in _MONTH_TOKEN.findall(header):
+        try:
+            month = datetime.strptime(name, "%b").month
+        except ValueError:
+            continue
+        found.append(date(int(year) + (2000 if len(year) == 2 else 0), month, 1))
+    return found
+
+
+def latest_month_column(headers: Iterable[str]) -> Optional[str]:
+    dated = [(parse_month(h), h) for h in headers if parse_month(h)]
+    return max(dated)[1] if dated else None
+
+
+def classify_columns(headers: Sequence[str]) -> List[SummaryColumn]:
+    """Month and change columns of a summary file; anything else (names, codes) is left out."""
+    levels = [parse_month(h) for h in headers if parse_month(h)]
+    latest = max(levels) if levels else None
+    columns = []
+    for header in headers:
+        month = parse_month(header)
+        if month:
+            columns.append(SummaryColumn(header, "value", month))
+            continue
+        mentioned = months_in(header)
+        lowered = header.lower()
+        if "yoy" in lowered:
+            kind = "yoy"
+        elif "mom" in lowered:
+            kind = "mom"
+        elif len(mentioned) == 2:
+            gap = abs((mentioned[0].year - mentioned[1].year) * 12 + mentioned[0].month - mentioned[1].month)
+            kind = {12: "yoy", 1: "mom"}.get(gap)
+        else:
+            kind = None
+        end = max(mentioned) if mentioned else latest
+        if kind and end:
+            columns.append(SummaryColumn(header, kind, end))
+    return columns
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+def summary_sql(spec: SummarySource, headers: Sequence[str], source_sql: str, number: Callable[[str], str]) -> Optional[str]:
+    """Query returning `spec`'s rows in COLUMNS order, or None if the file has no month/change columns.
+
+    `number(expr)` is the SQL that turns a raw cell into a DOUBLE.
+    """
+    columns = classify_columns(headers)
+    if not columns:
+        return None
+    spec_rows = ", ".join(
+        f"({_literal(c.column)}, {_literal(c.kind)}, DATE '{c.month.isoformat()}')" for c in columns
+    )
+    if spec.entity_column is None:
+        entity, join = f"'{TOTAL_ID}'", ""
+    else:
+        table, match = DIMENSIONS[spec.dimension]
+        entity = "d.id"
+        join = f"JOIN {table} d ON d.{match} = trim(w.entity)"
+    entity_select = "NULL" if spec.entity_column is None else f"CAST({_quote(spec.entity_column)} AS VARCHAR)"
+    return f"""
+        SELECT {_literal(spec.summary)} AS summary, {entity} AS entity_id, c.kind, c.month, w.label,
+               {number('w.raw')} AS value
+        FROM (
+          UNPIVOT (SELECT {entity_select} AS entity, {', '.join(_quote(c.column) for c in columns)} FROM {source_sql})
+          ON {', '.join(_quote(c.column) for c in columns)} INTO NAME label VALUE raw
+        ) w
+        JOIN (VALUES {spec_rows}) c(label, kind, month) ON c.label = w.label
+        {join}
+    """
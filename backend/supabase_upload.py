@@ -0,0 +1,402 @@
+"""
+Bounded-concurrency batch uploads to Supabase (PostgREST)
+---------------------------------------------------------
+`etl_supabase.upsert()` streams each table's sanitized rows to a BatchUploader,
+which keeps up to SUPABASE_UPLOAD_CONCURRENCY batches in flight on a thread
+pool (the supabase client's HTTP session is shared and thread-safe) and pulls
+new rows only as batches complete, so memory stays bounded by the window.
+Rows arrive as Arrow chunks (upload_arrow) and are rendered to JSON request
+bodies column-wise by DuckDB and posted as-is, skipping a Python dict per row
+and json.dumps.
+
+Uploads are cut by bytes, not rows: each table has a BatchSizer whose
+byte budget grows while requests come back well under
+SUPABASE_BATCH_TARGET_SECONDS, shrinks in proportion when they run slow, and
+halves on transient errors; a 413 (body too large) also lowers the table's
+ceiling and splits the batch. What each table settled on is kept per
+destination in a JSON file (BatchSettings) and is where the next run starts.
+
+Every batch is retried on its own: transport errors, throttling/5xx responses
+and retryable Postgres errors (deadlock, serialization failure, statement
+timeout, pool exhaustion) back off exponentially with full jitter, up to
+SUPABASE_UPLOAD_RETRIES times. Any other error fails only that batch; the
+remaining batches still upload and the failures are returned together. A
+conflict target with no matching unique constraint (42P10) drops back to a
+plain upsert on the primary key, as the loader always has.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from postgrest import APIError, ReturnMethod
+from postgrest.exceptions import generate_default_error_message
+
+import columnar
+
+UPLOAD_CONCURRENCY = int(os.environ.get("SUPABASE_UPLOAD_CONCURRENCY", "4"))
+UPLOAD_RETRIES = int(os.environ.get("SUPABASE_UPLOAD_RETRIES", "5"))
+UPLOAD_BACKOFF_SECONDS = float(os.environ.get("SUPABASE_UPLOAD_BACKOFF_SECONDS", "0.5"))
+UPLOAD_MAX_BACKOFF_SECONDS = 30.0
+# Byte budget per request for Arrow uploads: starting point, bounds and the latency it aims for
+BATCH_BYTES = int(os.environ.get("SUPABASE_BATCH_BYTES", str(1024 * 1024)))
+BATCH_MIN_BYTES = int(os.environ.get("SUPABASE_BATCH_MIN_BYTES", str(16 * 1024)))
+BATCH_MAX_BYTES = int(os.environ.get("SUPABASE_BATCH_MAX_BYTES", str(8 * 1024 * 1024)))
+BATCH_TARGET_SECONDS = float(os.environ.get("SUPABASE_BATCH_TARGET_SECONDS", "2.0"))
+PAYLOAD_TOO_LARGE = 413
+
+# Gateway/throttling statuses (surfaced as the APIError code when the body is not PostgREST JSON)
+TRANSIENT_STATUS = {408, 425, 429, 500, 502, 503, 504, 520, 522, 524}
+# Postgres/PostgREST codes worth retrying: serialization, deadlock, timeouts, connection trouble
+TRANSIENT_CODES = {
+    "40001", "40P01", "55P03", "57014", "57P01", "53300",
+    "08000", "08003", "08006", "PGRST000", "PGRST001", "PGRST002", "PGRST003",
+}
+NO_MATCHING_CONSTRAINT = "42P10"
+
+
+def is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, APIError):
+        code = str(exc.code) if exc.code is not None else ""
+        if len(code) == 3 and code.isdigit():
+            return int(code) in TRANSIENT_STATUS
+        return code in TRANSIENT_CODES
+    return False
+
+
+@dataclass
+class BatchFailure:
+    index: int
+    first_row: int
+    rows: int
+    attempts: int
+    error: str
+
+
+@dataclass
+class JsonBatch:
+    """Rows already rendered as JSON objects; the body is their JSON array."""
+
+    columns: List[str]
+    rows: List[str]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def body(self) -> bytes:
+        return ("[" + ",".join(self.rows) + "]").encode()
+
+    def halves(self) -> Tuple["JsonBatch", "JsonBatch"]:
+        mid = len(self.rows) // 2
+        return JsonBatch(self.columns, self.rows[:mid]), JsonBatch(self.columns, self.rows[mid:])
+
+
+@dataclass
+class BatchSizer:
+    """Per-table byte budget, adjusted from each request's latency and outcome."""
+
+    target_bytes: int = BATCH_BYTES
+    max_bytes: int = BATCH_MAX_BYTES
+    min_bytes: int = BATCH_MIN_BYTES
+    target_seconds: float = BATCH_TARGET_SECONDS
+    requests: int = 0
+    errors: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def observe(self, nbytes: int, seconds: float, ok: bool = True, too_large: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            if too_large:
+                # The gateway's limit is somewhere below this body: never ask for that much again,
+                # even if that means going under the usual floor
+                self.max_bytes = max(1, min(self.max_bytes, nbytes // 2))
+                self.min_bytes = min(self.min_bytes, self.max_bytes)
+                self.target_bytes = min(self.target_bytes, self.max_bytes)
+            elif not ok:
+                self.errors += 1
+                self.target_bytes = max(self.min_bytes, self.target_bytes // 2)
+            elif seconds > self.target_seconds:
+                scaled = int(self.target_bytes * self.target_seconds / seconds)
+                self.target_bytes = max(self.min_bytes, scaled)
+            elif seconds < self.target_seconds / 2 and nbytes >= self.target_bytes // 2:
+                # Only a batch that actually used the budget says anything about a bigger one
+                self.target_bytes = min(self.max_bytes, int(self.target_bytes * 1.25))
+
+    def cut(self, ends: np.ndarray, start: int) -> int:
+        """End index of the next batch from row `start`; `ends[i]` is the body size through row i."""
+        spent = ends[start - 1] if start else 0
+        end = int(np.searchsorted(ends, spent + self.target_bytes, side="right"))
+        return max(start + 1, end)
+
+    def to_dict(self) -> Dict:
+        return {"target_bytes": self.target_bytes, "max_bytes": self.max_bytes,
+                "requests": self.requests, "errors": self.errors}
+
+
+class BatchSettings:
+    """Learned BatchSizer settings per destination and table, kept in a JSON file between runs."""
+
+    def __init__(self, path: Optional[Path] = None, scope: str = "default"):
+        # Without a path the settings live for this process only
+        self.path = path
+        self.scope = scope
+        self.sizers: Dict[str, BatchSizer] = {}
+        # Tables may upload in parallel (etl_dag.py), each saving when it is done
+        self._lock = threading.Lock()
+        try:
+            saved = json.loads(path.read_text()).get(scope, {}) if path else {}
+        except (OSError, ValueError):
+            saved = {}
+        for table, entry in saved.items():
+            max_bytes = max(1, min(int(entry["max_bytes"]), BATCH_MAX_BYTES))
+            min_bytes = min(BATCH_MIN_BYTES, max_bytes)
+            self.sizers[table] = BatchSizer(
+                target_bytes=max(min_bytes, min(int(entry["target_bytes"]), max_bytes)),
+                max_bytes=max_bytes,
+                min_bytes=min_bytes,
+            )
+
+    def sizer(self, table: str) -> BatchSizer:
+        with self._lock:
+            return self.sizers.setdefault(table, BatchSizer())
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            self._write()
+
+    def _write(self) -> None:
+        try:
+            everything = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            everything = {}
+        everything[self.scope] = {table: sizer.to_dict() for table, sizer in sorted(self.sizers.items())}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(everything, indent=2))
+        tmp.replace(self.path)
+
+
+def api_error(response: httpx.Response) -> APIError:
+    """The APIError postgrest-py would raise for this response."""
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    if isinstance(body, dict) and {"code", "message"} <= body.keys():
+        return APIError(body)
+    return APIError(generate_default_error_message(response))
+
+
+@dataclass
+class UploadResult:
+    table: str
+    rows: int = 0
+    batches: int = 0
+    uploaded_rows: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    failures: List[BatchFailure] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.uploaded_rows / self.seconds if self.seconds else 0.0
+
+
+class BatchUploader:
+    def __init__(
+        self,
+        client,
+        concurrency: int = UPLOAD_CONCURRENCY,
+        retries: int = UPLOAD_RETRIES,
+        backoff_seconds: float = UPLOAD_BACKOFF_SECONDS,
+        sleep: Callable[[float], None] = time.sleep,
+        settings: Optional[BatchSettings] = None,
+    ):
+        self.client = client
+        self.concurrency = max(1, concurrency)
+        self.retries = max(0, retries)
+        self.backoff_seconds = backoff_seconds
+        self.sleep = sleep
+        # Byte budgets for upload_arrow(); in-memory only unless settings come from a file
+        self.settings = settings or BatchSettings()
+
+    def sizer(self, table: str) -> BatchSizer:
+        return self.settings.sizer(table)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential delay before retry number `attempt` (0-based)."""
+        return random.uniform(0, min(UPLOAD_MAX_BACKOFF_SECONDS, self.backoff_seconds * (2 ** attempt)))
+
+    def _retrying(self, request: Callable[[], None]) -> Tuple[int, Optional[Exception]]:
+        """Run `request`, retrying transient errors; returns (retries used, final error or None)."""
+        attempt = 0
+        while True:
+            try:
+                request()
+                return attempt, None
+            except Exception as exc:
+                if attempt < self.retries and is_transient(exc):
+                    self.sleep(self.backoff(attempt))
+                    attempt += 1
+                    continue
+                return attempt, exc
+
+    def _send(self, table: str, index: int, first_row: int, batch: JsonBatch, on_conflict: Optional[str]) -> Tuple[int, Optional[BatchFailure]]:
+        """Upload one batch; returns (retries used, failure or None). Never raises."""
+        conflict = on_conflict
+
+        def request() -> None:
+            nonlocal conflict
+            try:
+                self._post_sized(table, batch, conflict)
+            except APIError as exc:
+                if not (conflict and exc.code == NO_MATCHING_CONSTRAINT):
+                    raise
+                print(f"Upsert warning on {table} with conflict '{conflict}': {exc}. Retrying without conflict target.")
+                conflict = None
+                request()
+
+        retries, error = self._retrying(request)
+        if error is None:
+            return retries, None
+        return retries, BatchFailure(index, first_row, len(batch), retries + 1, repr(error))
+
+    def _post_sized(self, table: str, batch: JsonBatch, conflict: Optional[str]) -> None:
+        """POST a rendered batch, feeding the table's sizer; a 413 splits the batch and shrinks the budget."""
+        sizer = self.sizer(table)
+        body = batch.body
+        started = time.perf_counter()
+        try:
+            self._post_json(table, batch.columns, body, conflict)
+        except Exception as exc:
+            too_large = isinstance(exc, APIError) and str(exc.code) == str(PAYLOAD_TOO_LARGE)
+            sizer.observe(len(body), time.perf_counter() - started, ok=not is_transient(exc), too_large=too_large)
+            if too_large and len(batch) > 1:
+                for half in batch.halves():
+                    self._post_sized(table, half, conflict)
+                return
+            raise
+        sizer.observe(len(body), time.perf_counter() - started)
+
+    def _post_json(self, table: str, columns: List[str], body: bytes, conflict: Optional[str]) -> None:
+        # Let the builder work out URL, auth, Prefer and columns=, then send the rendered body instead
+        request = self.client.table(table).upsert(
+            [dict.fromkeys(columns)], on_conflict=conflict or "", returning=ReturnMethod.minimal
+        ).request
+        response = request.session.request(
+            request.http_method,
+            str(request.path),
+            content=body,
+            params=request.params,
+            headers=request.headers,
+            auth=request.auth,
+        )
+        if not response.is_success:
+            raise api_error(response)
+
+    def _delete(self, table: str, index: int, key_columns: Sequence[str], key: Sequence) -> Tuple[int, Optional[BatchFailure]]:
+        def request() -> None:
+            query = self.client.table(table).delete(returning=ReturnMethod.minimal)
+            for column, value in zip(key_columns, key):
+                query = query.is_(column, "null") if value is None else query.eq(column, value)
+            query.execute()
+
+        retries, error = self._retrying(request)
+        if error is None:
+            return retries, None
+        return retries, BatchFailure(index, index, 1, retries + 1, repr(error))
+
+    def _run(
+        self, result: UploadResult, jobs: Iterable[Tuple], on_success: Optional[Callable[[Any], None]] = None
+    ) -> UploadResult:
+        """Run (rows, request[, tag]) jobs with at most `concurrency` in flight and `2 * concurrency` queued.
+
+        Jobs are pulled lazily, so a generator upstream only runs as far ahead as the window allows.
+        `on_success(tag)` is called on this thread for each job that went through.
+        """
+        started = time.perf_counter()
+        # The client builds its PostgREST session lazily; do it here rather than racing in the workers
+        self.client.table(result.table)
+        window: Deque[Tuple[int, Future, list]] = deque()
+
+        def collect() -> None:
+            size, future, tag = window.popleft()
+            retries, failure = future.result()
+            result.retries += retries
+            if failure:
+                result.failures.append(failure)
+            else:
+                result.uploaded_rows += size
+                if on_success is not None and tag:
+                    on_success(tag[0])
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            try:
+                for size, request, *tag in jobs:
+                    result.rows += size
+                    result.batches += 1
+                    window.append((size, pool.submit(request), tag))
+                    while len(window) >= 2 * self.concurrency:
+                        collect()
+            finally:
+                # Even when the job source fails, settle what is in flight so it is reported
+                while window:
+                    collect()
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def upload_arrow(
+        self,
+        table: str,
+        chunks: Iterable[pa.Table],
+        on_conflict: Optional[str] = None,
+        on_batch: Optional[Callable[[pa.Table], None]] = None,
+    ) -> UploadResult:
+        """Upload Arrow chunks as they are produced, cut into rendered JSON batches of the table's byte budget.
+
+        Each batch is cut when it is queued, so the budget follows the latest responses.
+        `on_batch` receives the rows of every batch the server accepted, as they complete.
+        """
+        sizer = self.sizer(table)
+
+        def jobs():
+            index = first_row = 0
+            for chunk in chunks:
+                rendered = columnar.json_rows(chunk)
+                # Running body size: each row plus its separating comma
+                ends = np.cumsum(pc.binary_length(rendered).to_numpy(zero_copy_only=False) + 1)
+                start = 0
+                while start < len(rendered):
+                    end = sizer.cut(ends, start)
+                    batch = JsonBatch(chunk.column_names, rendered.slice(start, end - start).to_pylist())
+                    send = partial(self._send, table, index, first_row, batch, on_conflict)
+                    yield len(batch), send, chunk.slice(start, end - start)
+                    index += 1
+                    first_row += len(batch)
+                    start = end
+
+        return self._run(UploadResult(table), jobs(), on_batch)
+
+    def delete(self, table: str, key_columns: Sequence[str], keys: Sequence[Sequence]) -> UploadResult:
+        """Delete rows by natural key, one request per key (deltas delete few rows); NULL keys match IS NULL."""
+        jobs = ((1, partial(self._delete, table, i, key_columns, key)) for i, key in enumerate(keys))
+        return self._run(UploadResult(table), jobs)
@@ -0,0 +1,40 @@
+import asyncio
+import os
+
+import main
+
+
+class FakeRequest:
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+def test_build_stream_announces_new_builds(sample_db, monkeypatch):
+    monkeypatch.setattr(main, "SSE_KEEPALIVE_SECONDS", 0.05)
+    watcher = main.BuildWatcher(interval=0.01)
+
+    async def consume():
+        request = FakeRequest()
+        events = main.build_events(request, watcher)
+        assert (await events.__anext__()).startswith("retry:")
+        first = await events.__anext__()
+        assert f"id: {main.db_build_id()}" in first
+
+        stat = sample_db.stat()
+        os.utime(sample_db, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000_000))
+        new_build = main.db_build_id()
+        message = await events.__anext__()
+        while message.startswith(": keepalive"):
+            message = await events.__anext__()
+        request.disconnected = True
+        await events.aclose()
+        return first, message, new_build
+
+    first, message, new_build = asyncio.run(consume())
+    assert first != message
+    assert "event: build" in message
+    assert f'"build_id": "{new_build}"' in message
+    assert watcher.subscribers == 0
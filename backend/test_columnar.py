@@ -0,0 +1,28 @@
+import json
+
+import numpy as np
+import pyarrow as pa
+
+import columnar
+
+
+def test_sanitize_normalize_and_json_bodies():
+    table = columnar.to_table([["Ohio ", float("inf"), 1, "NaN"], ["  ", 2.5, None, "x"]], ["state", "v", "n", "s"])
+    assert columnar.sanitize(table).to_pylist() == [
+        {"state": "Ohio ", "v": None, "n": 1, "s": None},
+        {"state": "  ", "v": 2.5, "n": None, "s": "x"},
+    ]
+    normalized = columnar.normalize(table)
+    assert normalized.column("state").to_pylist() == ["Ohio", None]
+
+    rendered = columnar.json_rows(normalized)
+    assert [json.loads(row) for row in rendered.to_pylist()] == normalized.to_pylist()
+
+
+def test_key_filter_keeps_first_occurrence_across_chunks():
+    keys = columnar.KeyFilter()
+    first = columnar.hash_columns(pa.table({"k": ["a", "b", "a"]}), ["k"])
+    second = columnar.hash_columns(pa.table({"k": ["c", "b", None, None]}), ["k"])
+    assert keys.keep(first).tolist() == [True, True, False]
+    assert keys.keep(second).tolist() == [True, False, True, False]
+    assert keys.seen.dtype == np.uint64 and len(keys.seen) == 4
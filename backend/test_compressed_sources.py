@@ -0,0 +1,39 @@
+import duckdb
+import pyarrow as pa
+
+import etl
+import staging
+from sample_data import read_records
+
+
+def compress(path, codec):
+    """Replace `path` with a byte-identical .csv.gz/.csv.zst copy."""
+    target = path.with_name(f"{path.name}.{'gz' if codec == 'gzip' else 'zst'}")
+    with pa.CompressedOutputStream(str(target), codec) as out:
+        out.write(path.read_bytes())
+    path.unlink()
+    return target
+
+
+def test_compressed_sources_build_identically(sample_db, sample_data_dir, monkeypatch):
+    with duckdb.connect(str(sample_db), read_only=True) as con:
+        before = {t: etl.table_fingerprint(con, t) for t in etl.source_files()}
+    records = read_records(sample_data_dir / "salaries_soc.csv")
+
+    gz = compress(sample_data_dir / "employment_state.csv", "gzip")
+    zst = compress(sample_data_dir / "salaries_soc.csv", "zstd")
+    sources = etl.source_files()
+    assert sources["employment_state"] == gz and sources["salaries_soc"] == zst
+    assert staging.resolve_source(sample_data_dir / "salaries_soc.csv") == zst
+    assert read_records(zst) == records
+
+    # Split aggressively: compressed files must still be read whole
+    monkeypatch.setattr(etl, "MIN_CHUNK_BYTES", 1)
+    etl.build_db(force=True, threads=4, split_mb=0)
+    with duckdb.connect(str(sample_db), read_only=True) as con:
+        after = {t: etl.table_fingerprint(con, t) for t in etl.source_files()}
+        source_file = con.execute(
+            "SELECT source_file FROM metadata WHERE table_name = 'employment_state'"
+        ).fetchone()[0]
+    assert after == before
+    assert source_file == "employment_state.csv.gz"
@@ -0,0 +1,115 @@
+import threading
+import time
+from functools import partial
+
+import duckdb
+import pytest
+
+import etl_dag
+import etl_supabase
+import staging
+
+
+def sleeper(log, name, seconds, fail=False):
+    def run():
+        log.append(("start", name))
+        time.sleep(seconds)
+        if fail:
+            raise RuntimeError(f"{name} failed")
+        log.append(("end", name))
+
+    return run
+
+
+def test_tasks_wait_for_dependencies_and_budgets():
+    log = []
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def counted(name, seconds):
+        def run():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            sleeper(log, name, seconds)()
+            with lock:
+                active[0] -= 1
+
+        return run
+
+    graph = etl_dag.StageGraph({"cpu": 2, "network": 1})
+    graph.add("dim", counted("dim", 0.05))
+    for name in ("a", "b", "c"):
+        graph.add(name, counted(name, 0.1), after=("dim",))
+    graph.add("upload", sleeper(log, "upload", 0.01), after=("a", "b", "c"), uses=("network",))
+    graph.run()
+
+    assert log.index(("end", "dim")) < min(log.index(("start", n)) for n in "abc")
+    assert log[-1] == ("end", "upload") and peak[0] == 2
+    # Two of a/b/c ran side by side; the third waited for a cpu slot, and that wait is on the critical path
+    third = max((graph.tasks[n] for n in "abc"), key=lambda t: t.started)
+    assert third.gated_by in {"a", "b"} and third.queued >= 0.09
+    path = [t.name for t in graph.critical_path()]
+    assert path[0] == "dim" and path[-2:] == [third.name, "upload"] and len(path) == 4
+    assert graph.report()["critical_path"] == path
+
+
+def test_failure_skips_dependents_and_raises():
+    log = []
+    graph = etl_dag.StageGraph({"cpu": 2})
+    graph.add("ok", sleeper(log, "ok", 0.05))
+    graph.add("bad", sleeper(log, "bad", 0.01, fail=True))
+    graph.add("after_bad", sleeper(log, "after_bad", 0), after=("bad",))
+    with pytest.raises(RuntimeError, match="bad failed"):
+        graph.run()
+    assert {n: t.status for n, t in graph.tasks.items()} == {"ok": "ok", "bad": "error", "after_bad": "skipped"}
+
+    cyclic = etl_dag.StageGraph({"cpu": 1})
+    cyclic.add("x", lambda: None, after=("y",))
+    cyclic.add("y", lambda: None, after=("x",))
+    with pytest.raises(ValueError, match="cycle"):
+        cyclic.run()
+
+
+def test_extraction_runs_while_the_network_is_busy(monkeypatch):
+    def load(cur):
+        time.sleep(0.05)
+        return partial(time.sleep, 0.1)
+
+    for name, value in [("DIMENSION_LOADS", dict.fromkeys(("dim_sectors", "dim_occupations", "dim_states"), load)),
+                        ("BASE_FACT_LOADS", dict.fromkeys(("fact_layoffs", "fact_salaries"), load)),
+                        ("LOAD_MULTI_FACTS", False), ("LOAD_SUMMARIES", False), ("CPU_WORKERS", 1), ("NETWORK_WORKERS", 1),
+                        ("prepare_refresh", lambda resuming: None), ("swap_shadow_tables", lambda: None)]:
+        monkeypatch.setattr(etl_supabase, name, value)
+    graph = etl_supabase.load_graph(duckdb.connect())
+    graph.run()
+
+    uploads = [t for t in graph.tasks.values() if t.uses == ("network",) and t.name not in ("refresh", "swap")]
+    extracts = [t for t in graph.tasks.values() if t.name.startswith("extract ")]
+    assert len(uploads) == len(extracts) == 5
+    # The single network slot is held by an upload while the next table extracts
+    overlapping = [(e.name, u.name) for e in extracts for u in uploads if u.started <= e.started < u.finished]
+    assert overlapping and all(e.finished <= graph.tasks[e.name.split()[1]].started for e in extracts)
+    assert graph.wall_seconds < sum(t.seconds for t in graph.tasks.values()) - 0.1
+
+
+def test_run_reports_its_critical_path(sample_data_dir, tmp_path, monkeypatch):
+    for name, value in [("DATA_DIR", sample_data_dir), ("DRY_RUN", True), ("TEMP_DIR", tmp_path / "tmp"),
+                        ("SNAPSHOT_PATH", tmp_path / "snapshot.duckdb"), ("CPU_WORKERS", 3), ("NETWORK_WORKERS", 3)]:
+        monkeypatch.setattr(etl_supabase, name, value)
+    scans = []
+    scan_sql = staging.scan_sql
+    monkeypatch.setattr(staging, "scan_sql", lambda path, con=None: scans.append(path.name) or scan_sql(path, con))
+    etl_supabase.run_etl()
+
+    graph = etl_supabase.profiler.meta["stage_graph"]
+    tasks = {t["name"]: t for t in graph["tasks"]}
+    assert all(t["status"] == "ok" for t in tasks.values())
+    dims = ("dim_sectors", "dim_occupations", "dim_states")
+    assert tasks["fact_layoffs"]["after"] == ["extract fact_layoffs", "refresh", "dim_sectors", "dim_states"]
+    assert tasks["extract fact_layoffs"]["uses"] == ["cpu"] and tasks["fact_layoffs"]["uses"] == ["network"]
+    assert all(tasks[f]["started"] >= max(tasks[d]["finished"] for d in dims if d in tasks[f]["after"])
+               for f in etl_supabase.BASE_FACT_LOADS)
+    assert graph["budgets"] == {"cpu": 3, "network": 3} and graph["critical_path"][-1] == "swap"
+    # Parallel tasks still read each source file once
+    assert scans and len(scans) == len(set(scans))
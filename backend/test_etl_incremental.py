@@ -0,0 +1,34 @@
+import os
+
+import duckdb
+
+import etl
+
+
+def test_rebuild_only_reingests_changed_files(sample_db, sample_data_dir):
+    report = etl.build_db()
+    assert report["ingested"] == []
+    assert "employment_naics" in report["skipped"]
+
+    # Content change -> re-ingest that table; mtime-only change -> skip
+    with open(sample_data_dir / "layoffs_by_state.csv", "a", encoding="utf-8") as f:
+        f.write("2025-11,Ohio,10,1,9\r\n")
+    stat = (sample_data_dir / "salaries_soc.csv").stat()
+    os.utime(sample_data_dir / "salaries_soc.csv", ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+    report = etl.build_db()
+    assert report["ingested"] == ["layoffs_by_state"]
+    assert "salaries_soc" in report["skipped"]
+
+    with duckdb.connect(str(sample_db), read_only=True) as con:
+        max_month = con.execute("SELECT max_month FROM metadata WHERE table_name='layoffs_by_state'").fetchone()[0]
+        view_month = con.execute("SELECT MAX(month) FROM top_movers_layoffs_by_state").fetchone()[0]
+        tables = con.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+    assert max_month == view_month == "2025-11"
+    assert tables == len(etl.source_files())
+
+    (sample_data_dir / "table_b_soc.csv").unlink()
+    report = etl.build_db()
+    assert report["removed"] == ["table_b_soc"]
+
+    report = etl.build_db(force=True)
+    assert report["skipped"] == [] and len(report["ingested"]) == len(etl.source_files())
@@ -0,0 +1,29 @@
+import duckdb
+
+import etl
+import main
+from bench_layout import rows_scanned, table_history_query
+from sample_data import write_sample_data
+
+
+def test_fact_tables_sorted_and_pruned(tmp_path, monkeypatch):
+    data_dir = write_sample_data(tmp_path / "rpls_data", months=58, scale=150, granular=False)
+    monkeypatch.setenv("RPLS_STAGING_DIR", str(tmp_path / "staging"))
+    monkeypatch.setattr(etl, "DATA_DIR", data_dir)
+    monkeypatch.setattr(etl, "DB_PATH", tmp_path / "rpls.duckdb")
+    monkeypatch.setattr(main, "DB_PATH", tmp_path / "rpls.duckdb")
+    etl.build_db()
+
+    with duckdb.connect(str(etl.DB_PATH), read_only=True) as con:
+        for table, keys in etl.SORT_KEYS.items():
+            stored = con.execute(f"SELECT {', '.join(keys)} FROM {table} ORDER BY rowid").fetchall()
+            assert stored == sorted(stored), table
+        total = con.execute("SELECT COUNT(*) FROM employment_state").fetchone()[0]
+
+    assert total > 2 * etl.ETL_ROW_GROUP_ROWS
+    with main.get_con() as con:
+        for sql, params in [
+            table_history_query("state", "employment", "R0250", 12),
+            main.series_query("state", "employment", "R0250", True, 12),
+        ]:
+            assert rows_scanned(con, sql, params, tmp_path / "profile.json") <= etl.ETL_ROW_GROUP_ROWS
@@ -0,0 +1,36 @@
+import duckdb
+
+import etl
+
+
+def _fingerprints(db_path):
+    with duckdb.connect(str(db_path), read_only=True) as con:
+        return {table: etl.table_fingerprint(con, table) for table in etl.source_files()}
+
+
+def test_parallel_split_build_matches_serial(sample_data_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(etl, "DATA_DIR", sample_data_dir)
+
+    monkeypatch.setenv("RPLS_STAGING_DIR", str(tmp_path / "serial_staging"))
+    monkeypatch.setattr(etl, "DB_PATH", tmp_path / "serial.duckdb")
+    serial = etl.build_db(threads=1)
+    assert all(t["ranges"] == 1 for t in serial["timings"])
+
+    monkeypatch.setenv("RPLS_STAGING_DIR", str(tmp_path / "parallel_staging"))
+    monkeypatch.setattr(etl, "DB_PATH", tmp_path / "parallel.duckdb")
+    monkeypatch.setattr(etl, "MIN_CHUNK_BYTES", 16 * 1024)
+    parallel = etl.build_db(threads=4, split_mb=0)
+    split = {t["table"]: t["ranges"] for t in parallel["timings"]}
+    assert split["employment_all_granularities"] > 1
+
+    assert _fingerprints(tmp_path / "parallel.duckdb") == _fingerprints(tmp_path / "serial.duckdb")
+
+
+def test_split_ranges_keep_quoted_newlines_together(tmp_path):
+    path = tmp_path / "quoted.csv"
+    path.write_bytes(b'month,note\n' + b'2025-01,"line one\nline two"\n' * 200)
+    ranges = etl.split_ranges(path, 64)
+    assert len(ranges) > 1
+    data = path.read_bytes()
+    assert all(data[start:end].count(b'"') % 2 == 0 for start, end in ranges)
+    assert ranges[0][0] == len(b"month,note\n") and ranges[-1][1] == len(data)
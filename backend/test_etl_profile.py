@@ -0,0 +1,23 @@
+import json
+
+import etl
+import etl_profile
+
+
+def test_build_db_writes_comparable_profiles(sample_db, sample_data_dir, monkeypatch, tmp_path):
+    monkeypatch.setenv(etl_profile.PROFILE_ENV, str(tmp_path / "runs"))
+    first = etl.build_db(force=True)
+    second = etl.build_db()
+
+    report = json.loads(open(first["profile"]).read())
+    stages = {entry["name"] for entry in report["stages"]}
+    assert {"plan", "ingest", "table", "metadata", "views", "cube"} <= stages
+    table = next(e for e in report["stages"] if e["name"] == "table" and e["table"] == "employment_state")
+    assert table["parent"] == "ingest" and table["rows_out"] > 0
+
+    runs = etl_profile.list_runs(tmp_path / "runs", "etl")
+    assert [str(p) for p in runs] == [first["profile"], second["profile"]]
+    diff = {row["stage"]: row for row in etl_profile.compare_reports(report, json.loads(runs[1].read_text()))}
+    # The incremental rebuild skips every table, so per-table stages only exist in the first run
+    assert diff["table employment_state"]["new_wall_seconds"] is None
+    assert diff["plan"]["old_wall_seconds"] is not None and diff["plan"]["new_wall_seconds"] is not None
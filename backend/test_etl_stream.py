@@ -0,0 +1,93 @@
+import duckdb
+import pyarrow as pa
+import pytest
+from supabase import create_client
+
+import etl_supabase
+import staging
+from postgrest_stub import PostgrestStub
+from sample_data import write_sample_data
+from sinks import RestSink
+from supabase_upload import BatchSizer, BatchUploader
+
+COLUMNS = ["date", "sector_id", "state_id", "employees_notified", "notices_issued", "employees_laidoff", "granularity"]
+LAYOFFS_SQL = """
+SELECT strftime(DATE '2020-01-01' + INTERVAL (i) DAY, '%Y-%m-%d') AS date, NULL AS sector_id, 'Ohio' AS state_id,
+       i AS employees_notified, 1 AS notices_issued, i AS employees_laidoff, 'state' AS granularity
+FROM range(2500) t(i)
+"""
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(etl_supabase, "STREAM_ROWS", 1000)
+    monkeypatch.setattr(etl_supabase, "snapshot", None)
+
+
+def test_stream_batches_is_lazy_and_chunked(small_chunks):
+    con = duckdb.connect()
+    batches = etl_supabase.stream_batches(con, "fact_layoffs", LAYOFFS_SQL)
+    first = next(batches)
+    assert first.num_rows <= 1000 and first.column(2)[0].as_py() == "Ohio"
+    assert first.num_rows + sum(b.num_rows for b in batches) == 2500
+
+    # Keys are trimmed/nulled before comparing, and duplicates are recognised across chunks
+    chunks = [pa.table({"k": [" a", "b", ""], "v": [1.0, float("nan"), 3.0]}), pa.table({"k": ["a ", None, "c"], "v": [4.0, 5.0, 6.0]})]
+    deduped = pa.concat_tables(etl_supabase.dedupe_rows(chunks, key_indexes=(0,), table="t"))
+    assert deduped.to_pylist() == [{"k": "a", "v": 1.0}, {"k": "b", "v": None}, {"k": None, "v": 3.0}, {"k": "c", "v": 6.0}]
+
+
+def test_streamed_upsert_uploads_in_batches(small_chunks, monkeypatch):
+    with PostgrestStub() as stub:
+        stub.constraints["fact_layoffs"] = [etl_supabase.CONFLICT_TARGETS["fact_layoffs"]]
+        uploader = BatchUploader(create_client(stub.url, "key"))
+        uploader.settings.sizers["fact_layoffs"] = BatchSizer(target_bytes=50_000, max_bytes=50_000)
+        monkeypatch.setattr(etl_supabase, "DRY_RUN", False)
+        monkeypatch.setattr(etl_supabase, "sink", RestSink(uploader.client, uploader))
+        etl_supabase.upsert("fact_layoffs", COLUMNS, etl_supabase.stream_batches(duckdb.connect(), "fact_layoffs", LAYOFFS_SQL))
+        assert len(stub.rows["fact_layoffs"]) == 2500
+        # Batches never straddle a 1000-row chunk and stay within the byte budget
+        assert sum(r["rows"] for r in stub.requests) == 2500 and all(r["rows"] <= 1000 for r in stub.requests)
+        assert all(r["bytes"] <= 50_000 for r in stub.requests) and len(stub.requests) > 3
+
+
+def test_memory_ceiling_aborts_the_load(small_chunks, monkeypatch):
+    monkeypatch.setattr(etl_supabase, "DRY_RUN", True)
+    monkeypatch.setattr(etl_supabase, "MEMORY_MB", 1)
+    with pytest.raises(SystemExit, match="SUPABASE_ETL_MEMORY_MB=1"):
+        etl_supabase.upsert("fact_layoffs", COLUMNS, etl_supabase.stream_batches(duckdb.connect(), "fact_layoffs", LAYOFFS_SQL))
+
+
+def test_run_reads_each_source_once(sample_data_dir, tmp_path, monkeypatch):
+    for name, value in [("DATA_DIR", sample_data_dir), ("DRY_RUN", True), ("TEMP_DIR", tmp_path / "tmp"),
+                        ("SNAPSHOT_PATH", tmp_path / "snapshot.duckdb")]:
+        monkeypatch.setattr(etl_supabase, name, value)
+    scans = []
+    scan_sql = staging.scan_sql
+    monkeypatch.setattr(staging, "scan_sql", lambda path, con=None: scans.append(path.name) or scan_sql(path, con))
+    etl_supabase.run_etl()
+
+    # Dimensions, facts and summaries share the files (employment_naics alone feeds three queries)
+    assert len(scans) == len(set(scans)) and "employment_naics.csv" in scans and "sector_summary.csv" in scans
+    assert etl_supabase.sources is None
+
+
+def test_ten_times_the_data_fits_a_small_memory_limit(tmp_path, monkeypatch):
+    data_dir = write_sample_data(tmp_path / "rpls_data", scale=10)
+    for name, value in [("DATA_DIR", data_dir), ("DRY_RUN", True), ("TEMP_DIR", tmp_path / "tmp"),
+                        ("DUCKDB_THREADS", 1)]:
+        monkeypatch.setattr(etl_supabase, name, value)
+
+    def run(memory_mb, work_db):
+        monkeypatch.setattr(etl_supabase, "DUCKDB_MEMORY_MB", memory_mb)
+        monkeypatch.setattr(etl_supabase, "WORK_DB", work_db)
+        monkeypatch.setattr(etl_supabase, "SNAPSHOT_PATH", tmp_path / f"snapshot-{memory_mb}.duckdb")
+        etl_supabase.run_etl()
+        return sorted((s.name, s.table or "", s.rows_out or 0) for s in etl_supabase.profiler.stages)
+
+    # Aggregates go through the on-disk work database, which is gone once the run ends
+    constrained = run(48, None)
+    assert not (data_dir / ".supabase_work.duckdb").exists()
+    aggregates = [(table, rows) for name, table, rows in constrained if name == "aggregate"]
+    assert len(aggregates) == 4 and all(rows == 6000 for _, rows in aggregates)
+    assert constrained == run(1024, ":memory:")
@@ -0,0 +1,53 @@
+import duckdb
+
+import etl_supabase
+import fact_export
+from sample_data import write_sample_data
+
+KEYS = ", ".join(fact_export.SORT_KEYS)
+
+
+def test_export_prunes_by_month_and_state(tmp_path, monkeypatch):
+    data_dir = write_sample_data(tmp_path / "rpls_data", scale=5)
+    export = tmp_path / "export"
+    for name, value in [("DATA_DIR", data_dir), ("DRY_RUN", True), ("TEMP_DIR", tmp_path / "tmp"),
+                        ("SNAPSHOT_PATH", tmp_path / "snapshot.duckdb"), ("PARQUET_EXPORT", str(export))]:
+        monkeypatch.setattr(etl_supabase, name, value)
+    monkeypatch.setattr(fact_export, "ROW_GROUP_ROWS", 64)
+    etl_supabase.run_etl()
+
+    exported = {s.table: s.rows_out for s in etl_supabase.profiler.stages if s.name == "export"}
+    assert set(exported) == set(fact_export.TABLES) and len(set(exported.values())) == 1
+    root = export / "fact_employment_multi"
+    months = sorted(p.name for p in root.iterdir())
+    assert len(months) == 6 and all(m.startswith("month=") for m in months)
+
+    # Rows inside each month keep the sort order, which is what makes the statistics selective
+    con = duckdb.connect()
+    glob = f"{root}/*/*.parquet"
+    for month in root.iterdir():
+        keys = con.execute(f"SELECT {KEYS} FROM '{month}/*.parquet'").fetchall()
+        assert keys == sorted(keys)
+
+    month, state = months[2][len("month="):], "Ohio"
+    plan = fact_export.scan(export, "fact_employment_multi", month=month, state_id=state)
+    assert plan.files == 1 and 0 < plan.row_groups < plan.total_row_groups / 6
+    assert plan.bytes * 20 < plan.total_bytes
+    got = fact_export.read(export, "fact_employment_multi", month=month, state_id=state)
+    expected = con.execute(
+        f"SELECT count(*) FROM read_parquet('{glob}', hive_partitioning=true) WHERE month=? AND state_id=?", [month, state]
+    ).fetchone()[0]
+    assert got.num_rows == expected > 0 and set(got.column("state_id").to_pylist()) == {state}
+    assert set(got.column("month").to_pylist()) == {month}
+
+
+def test_empty_relation_replaces_the_export(tmp_path):
+    con = duckdb.connect()
+    con.execute("CREATE TABLE work AS SELECT '2025-01-01' AS date, 'Ohio' AS state_id, '62' AS sector_id, '29' AS occupation_id, 1.0 AS v")
+    assert fact_export.export_table(con, "work", "fact_employment_multi", tmp_path) == 1
+
+    # A drop with no rows leaves an empty table behind, not last run's months
+    con.execute("DELETE FROM work")
+    assert fact_export.export_table(con, "work", "fact_employment_multi", tmp_path) == 0
+    assert list((tmp_path / "fact_employment_multi").iterdir()) == []
+    assert fact_export.read(tmp_path, "fact_employment_multi", month="2025-01", state_id="Ohio").num_rows == 0
@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_context_is_assembled_from_prompt_entities(sample_db):
+    main.context_block.cache_clear()
+    blocks = main.assemble_context("How are Construction and Ohio doing on hiring?")
+    assert blocks[0].startswith("[sector 23 Construction]")
+    assert blocks[1].startswith("[state Ohio Ohio]")
+    assert any(b.startswith("[national ") for b in blocks)
+    assert sum(len(b) for b in blocks) <= main.CONTEXT_CHAR_LIMIT
+
+    main.assemble_context("And Ohio again?")
+    assert main.context_block.cache_info().hits >= 3
+
+
+def test_ask_gemini_sends_server_context(sample_db, monkeypatch):
+    sent = {}
+
+    class FakeResponse:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}
+
+    def fake_post(url, json, timeout):
+        sent["text"] = json["contents"][0]["parts"][0]["text"]
+        return FakeResponse()
+
+    monkeypatch.setattr(main, "GEMINI_API_KEY", "test")
+    monkeypatch.setattr(main.requests, "post", fake_post)
+    client = TestClient(main.app)
+    res = client.post("/api/ask-gemini", json={"prompt": "What about Texas?", "context": "Keep it short."})
+    assert res.status_code == 200
+    assert res.json()["response"] == "ok"
+    assert "[state Texas Texas] employment" in sent["text"] and "Keep it short.\n" in sent["text"]
+
+    # A client note over the limit is refused rather than cut short
+    sent.clear()
+    note = "x" * (main.CLIENT_NOTE_CHAR_LIMIT + 1)
+    res = client.post("/api/ask-gemini", json={"prompt": "What about Texas?", "context": note})
+    assert res.status_code == 422 and not sent
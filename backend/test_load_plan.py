@@ -0,0 +1,55 @@
+import json
+
+import pyarrow as pa
+
+import load_plan
+
+SCHEMA = """
+create table if not exists t (
+    id uuid primary key default gen_random_uuid(),
+    date date not null, -- month start
+    state text references dim_states(id),
+    value numeric,
+    unique(date, state)
+);
+create index idx_t_date on t(date);
+"""
+
+
+def test_plan_sizes_rows_from_the_schema(tmp_path):
+    path = tmp_path / "schema.sql"
+    path.write_text(SCHEMA)
+    schema = load_plan.read_schema(path)
+    assert schema["t"].columns == {"id": "uuid", "date": "date", "state": "text", "value": "numeric"}
+    assert schema["t"].indexes == [["id"], ["date", "state"], ["date"]]
+
+    plan = load_plan.LoadPlan(schema)
+    rows = pa.table({"date": ["2025-01-01", "2025-02-01"], "state": ["Ohio", None], "value": [12.5, 12.5]})
+    plan.observe("t", rows, rows.slice(1))
+    t = plan.tables["t"]
+    # Tuples: 24-byte header + uuid 16 + date 4 + text 5 + numeric 5, aligned to 56, + 4-byte line pointer
+    assert (t.rows, t.send_rows, t.tuple_bytes) == (2, 1, 120)
+    # Index entries: 8-byte header + key, aligned, + line pointer (the null state adds nothing)
+    assert t.index_entry_bytes == 2 * 28 + (28 + 20) + 2 * 20
+    assert t.json_bytes == sum(len(json.dumps(r, separators=(",", ":"))) + 1 for r in rows.to_pylist())
+
+    plan.finish({"t": 0.5}, lambda table: None)
+    assert t.heap_bytes == 8192 and t.index_bytes == 8192 and (t.upload_seconds, t.rate_basis) == (2.0, "measured")
+    plan.finish({}, lambda table: t.send_json_bytes / 4)
+    assert (t.upload_seconds, t.rate_basis) == (4.0, "batch budget")
+
+    written = plan.write(tmp_path, "20260101T000000Z")
+    assert load_plan.latest_row_bytes(tmp_path) == {"t": 8192.0}
+    assert json.loads(written.read_text())["totals"]["send_rows"] == 1
+
+
+def test_measured_rates_skip_dry_runs(tmp_path):
+    def report(name, dry_run, seconds):
+        stages = [{"name": "upload", "table": "t", "rows_out": 1000, "wall_seconds": seconds}]
+        path = tmp_path / name
+        path.write_text(json.dumps({"meta": {"dry_run": dry_run}, "stages": stages}))
+        return path
+
+    reports = [report("a.json", False, 10.0), report("b.json", False, 4.0), report("c.json", True, 1.0)]
+    assert load_plan.measured_rates(reports, "upload") == {"t": 250.0}
+    assert load_plan.measured_rates(reports, "copy") == {}
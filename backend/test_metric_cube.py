@@ -0,0 +1,42 @@
+import duckdb
+
+import etl
+import main
+import metrics
+
+
+def test_cube_matches_source_tables(sample_db):
+    with duckdb.connect(str(sample_db), read_only=True) as con:
+        for dimension_type, metric_map in metrics.MAP.items():
+            for metric, cfg in metric_map.items():
+                for sa_flag, col in metrics.series_columns(cfg):
+                    id_expr = cfg["dim"] or "''"
+                    raw = con.execute(
+                        f"SELECT {id_expr}, month, {metrics.value_expr(col)} FROM {cfg['table']} ORDER BY 1, 2"
+                    ).fetchall()
+                    cube = con.execute(
+                        f"SELECT id, month, value FROM {metrics.CUBE_TABLE} "
+                        "WHERE dimension_type = ? AND metric = ? AND sa_flag = ? ORDER BY 1, 2",
+                        [dimension_type, metric, sa_flag],
+                    ).fetchall()
+                    assert cube == raw, (dimension_type, metric, sa_flag)
+
+    salary = main.api_history("state", "salary", id="Ohio", sa=False, limit_months=3)
+    assert len(salary["series"]) == 3 and all(isinstance(p["value"], float) for p in salary["series"])
+    national = main.api_query(main.QueryRequest(dimension_type="national", metric="layoffs"))
+    assert len(national["series"]) == 6
+
+
+def test_cube_prev_value_uses_table_months(sample_db, sample_data_dir):
+    # Drop Ohio's second-latest month: its latest row must have no previous value
+    path = sample_data_dir / "employment_state.csv"
+    lines = path.read_text().splitlines(keepends=True)
+    prev_month = sorted({line.split(",")[0] for line in lines[1:]})[-2]
+    path.write_text("".join(l for l in lines if not l.startswith(f"{prev_month},Ohio,")))
+    etl.build_db()
+
+    movers = {row["dimension"]: row for row in main.api_top_movers("state", "employment", count=50)["data"]}
+    assert movers["Ohio"]["prev_value"] is None and movers["Ohio"]["pct_change"] is None
+    texas = movers["Texas"]
+    assert texas["prev_month"] == prev_month
+    assert abs(texas["pct_change"] - (texas["value"] - texas["prev_value"]) / texas["prev_value"] * 100) < 1e-9
@@ -0,0 +1,166 @@
+"""COPY sink tests; they need psycopg and a scratch Postgres in TEST_DATABASE_URL."""
+import os
+import uuid
+from pathlib import Path
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+DSN = os.environ.get("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DSN, reason="TEST_DATABASE_URL not set")
+
+import etl_supabase  # noqa: E402
+from postgres_sink import PostgresSink  # noqa: E402
+
+SUPABASE = Path(__file__).resolve().parents[1] / "supabase"
+SHADOW_MIGRATION = SUPABASE / "migrations" / "20261019_etl_shadow_refresh.sql"
+# Base fact tables of schema.sql: a granularity their national/total rows use, and one metric
+BASE_FACTS = {
+    "fact_employment": ("national", "employment_sa"),
+    "fact_postings": ("total", "active_postings_sa"),
+    "fact_hiring_attrition": ("total", "hiring_rate_sa"),
+    "fact_salaries": ("national", "salary_sa"),
+}
+
+
+@pytest.fixture
+def sink():
+    schema = f"etl_test_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(DSN, autocommit=True) as conn:
+        conn.execute(f"CREATE SCHEMA {schema}")
+        conn.execute(
+            f"""
+            CREATE TABLE {schema}.fact_layoffs (
+                id serial PRIMARY KEY,
+                date date NOT NULL,
+                sector_id text,
+                state_id text,
+                employees_laidoff int,
+                granularity text NOT NULL,
+                unique(date, sector_id, state_id, granularity)
+            )
+            """
+        )
+        conn.execute(f"CREATE TABLE {schema}.summary_state (state_id text PRIMARY KEY, jobs numeric)")
+        conn.execute(f"CREATE TABLE {schema}.events (state_id text, jobs numeric)")
+        sink = PostgresSink(DSN, schema=schema)
+        try:
+            yield sink
+        finally:
+            sink.close()
+            conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+@pytest.fixture
+def schema_sink():
+    """A sink on a scratch schema holding the real supabase/schema.sql tables."""
+    schema = f"etl_test_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(DSN, autocommit=True) as conn:
+        # fact_salaries_multi defaults to uuid_generate_v4(), which Supabase preinstalls
+        conn.execute('CREATE EXTENSION IF NOT EXISTS "uuid-ossp" SCHEMA public')
+        conn.execute(f"CREATE SCHEMA {schema}")
+        conn.execute(f"SET search_path TO {schema}, public")
+        conn.execute((SUPABASE / "schema.sql").read_text())
+        conn.execute("INSERT INTO dim_sectors (id, name) VALUES ('11', 'Agriculture')")
+        sink = PostgresSink(DSN, schema=schema)
+        try:
+            yield sink
+        finally:
+            sink.close()
+            conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+def fetch(sink, sql):
+    return sink.conn.execute(sql.format(schema=sink.schema)).fetchall()
+
+
+def test_copy_merge_upserts_on_conflict_targets(sink):
+    cols = ["date", "sector_id", "state_id", "employees_laidoff", "granularity"]
+    first = sink.load("fact_layoffs", cols, [["2025-01-01", "11", "Ohio", 5, "sector"],
+                                             ["2025-02-01", "11", "Ohio", 7, "sector"]],
+                      "date,sector_id,state_id,granularity")
+    assert (first.rows, first.merged) == (2, 2)
+
+    # Re-load: one update, one insert, and an in-load duplicate where the last copy wins
+    second = sink.load("fact_layoffs", cols, [["2025-02-01", "11", "Ohio", 9, "sector"],
+                                              ["2025-03-01", "11", "Ohio", 1, "sector"],
+                                              ["2025-03-01", "11", "Ohio", 2, "sector"]],
+                       "date,sector_id,state_id,granularity")
+    assert (second.rows, second.merged) == (3, 2)
+    assert fetch(sink, "SELECT date::text, employees_laidoff FROM {schema}.fact_layoffs ORDER BY date") == [
+        ("2025-01-01", 5), ("2025-02-01", 9), ("2025-03-01", 2)
+    ]
+
+    sink.load("summary_state", ["state_id", "jobs"], [["Ohio", None], ["Texas", 1.5]], "state_id")
+    sink.load("events", ["state_id", "jobs"], [["Ohio", 1], ["Ohio", 1]])
+    assert sink.count_rows("summary_state") == 2 and sink.count_rows("events") == 2
+    assert fetch(sink, "SELECT jobs FROM {schema}.summary_state ORDER BY state_id") == [(None,), (1.5,)]
+
+    sink.clear(["fact_layoffs", "summary_state"])
+    assert sink.count_rows("fact_layoffs") == 0 and sink.count_rows("summary_state") == 0
+
+
+def test_failed_load_leaves_table_untouched(sink):
+    sink.load("summary_state", ["state_id", "jobs"], [["Ohio", 1]], "state_id")
+    with pytest.raises(psycopg.Error):
+        sink.load("summary_state", ["state_id", "jobs"], [["Texas", 2], ["Utah", "not a number"]], "state_id")
+    assert fetch(sink, "SELECT state_id FROM {schema}.summary_state") == [("Ohio",)]
+
+
+def test_shadow_refresh_swaps_in_one_transaction(sink):
+    sink.conn.execute(SHADOW_MIGRATION.read_text())
+    cols = ["date", "sector_id", "state_id", "employees_laidoff", "granularity"]
+    key = "date,sector_id,state_id,granularity"
+    sink.load("fact_layoffs", cols, [["2025-01-01", "11", "Ohio", 5, "sector"]], key)
+    sink.load("summary_state", ["state_id", "jobs"], [["Ohio", 1]], "state_id")
+    sink.conn.execute(f"GRANT SELECT ON {sink.schema}.fact_layoffs TO PUBLIC")
+    sink.conn.execute(f"ALTER TABLE {sink.schema}.fact_layoffs ENABLE ROW LEVEL SECURITY")
+    sink.conn.execute(f"CREATE POLICY public_read ON {sink.schema}.fact_layoffs FOR SELECT USING (true)")
+    indexes = "SELECT indexname FROM pg_indexes WHERE schemaname = '{schema}' AND tablename = 'fact_layoffs' ORDER BY 1"
+    live_indexes = fetch(sink, indexes)
+
+    sink.prepare_shadow(["fact_layoffs", "summary_state"])
+    # The shadow has the live table's unique constraint, so the usual merge works against it
+    sink.load("_etl_shadow_fact_layoffs", cols, [["2025-02-01", "11", "Ohio", 7, "sector"]] * 2, key)
+    sink.load("_etl_shadow_summary_state", ["state_id", "jobs"], [["Texas", 2]], "state_id")
+    assert fetch(sink, "SELECT employees_laidoff FROM {schema}.fact_layoffs") == [(5,)]
+
+    sink.prepare_shadow(["fact_layoffs"], keep=True)
+    assert sink.count_rows("_etl_shadow_fact_layoffs") == 1
+    sink.swap_shadow(["fact_layoffs", "summary_state"])
+    assert fetch(sink, "SELECT employees_laidoff FROM {schema}.fact_layoffs") == [(7,)]
+    assert fetch(sink, "SELECT state_id FROM {schema}.summary_state") == [("Texas",)]
+    assert fetch(sink, "SELECT to_regclass('{schema}._etl_shadow_fact_layoffs')") == [(None,)]
+
+    # The swapped-in table is the shadow, renamed, with the live table's names, grants and policies
+    assert fetch(sink, indexes) == live_indexes
+    assert fetch(sink, "SELECT has_table_privilege('public', '{schema}.fact_layoffs', 'SELECT')") == [(True,)]
+    assert fetch(sink, "SELECT relrowsecurity FROM pg_class WHERE oid = '{schema}.fact_layoffs'::regclass") == [(True,)]
+    assert fetch(sink, "SELECT policyname FROM pg_policies WHERE schemaname = '{schema}' AND tablename = 'fact_layoffs'") == [
+        ("public_read",)
+    ]
+    # The serial id keeps counting from the live table's sequence
+    sink.load("fact_layoffs", cols, [["2025-03-01", "11", "Ohio", 1, "sector"]], key)
+    assert sink.count_rows("fact_layoffs") == 2
+
+
+@pytest.mark.parametrize("table", sorted(BASE_FACTS))
+def test_reload_of_base_facts_replaces_rows_with_null_keys(schema_sink, table):
+    granularity, metric = BASE_FACTS[table]
+    cols = ["date", "sector_id", "occupation_id", "state_id", "granularity", metric]
+    conflict = etl_supabase.CONFLICT_TARGETS[table]
+    rows = [["2025-01-01", None, None, None, granularity, 1], ["2025-01-01", "11", None, None, "sector", 2]]
+    schema_sink.load(table, cols, rows, conflict)
+
+    reloaded = schema_sink.load(table, cols, [r[:-1] + [r[-1] * 10] for r in rows], conflict)
+    assert (reloaded.rows, reloaded.merged) == (2, 2)
+    assert schema_sink.count_rows(table) == 2
+    assert fetch(schema_sink, f"SELECT {metric}::int FROM {{schema}}.{table} ORDER BY {metric}") == [(10,), (20,)]
+
+    # The REST sink's upsert: the conflict target is the NULLS NOT DISTINCT key, so NULL dimensions match
+    upsert = (
+        f"INSERT INTO {{schema}}.{table} (date, granularity, {metric}) VALUES ('2025-01-01', '{granularity}', 30) "
+        f"ON CONFLICT ({conflict}) DO UPDATE SET {metric} = excluded.{metric} RETURNING {metric}::int"
+    )
+    assert fetch(schema_sink, upsert) == [(30,)]
+    assert schema_sink.count_rows(table) == 2
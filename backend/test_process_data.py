@@ -0,0 +1,70 @@
+import csv
+import json
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+import main
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import process_data  # noqa: E402
+
+
+def generate(monkeypatch, out: Path, db_path: Path, data_dir: Path) -> dict:
+    monkeypatch.setattr(process_data, "DB_PATH", db_path)
+    monkeypatch.setattr(process_data, "DATA_DIR", data_dir)
+    monkeypatch.setattr(process_data, "OUTPUT_DIR", out)
+    process_data.main()
+    return {path.name: json.loads(path.read_text()) for path in out.glob("*.json")}
+
+
+def test_static_json_matches_the_api(sample_db, sample_data_dir, tmp_path, monkeypatch):
+    files = generate(monkeypatch, tmp_path / "out", sample_db, sample_data_dir)
+    client = TestClient(main.app)
+
+    api = client.get("/api/summary").json()
+    summary = files["summary.json"]
+    assert (summary["data_month"], summary["health_index"], summary["health_trend"]) == (
+        api["data_month"], api["health_index"], api["health_trend"]
+    )
+    assert {k: summary["headline_metrics"][k] for k in api["headline_metrics"]} == api["headline_metrics"]
+
+    # Salaries keep the frontend's shape: the overview's last two months and its published YoY
+    with open(sample_data_dir / "salary_overview_soc.csv", newline="") as f:
+        soc = [row for row in csv.reader(f)][1:]
+    assert files["salaries_by_occupation.json"] == sorted(
+        (
+            {"code": r[0], "name": r[1], "salary": float(r[5]), "prev_year_salary": float(r[4]), "yoy_change": float(r[6])}
+            for r in soc
+        ),
+        key=lambda r: r["code"],
+    )
+    with open(sample_data_dir / "salary_overview_state.csv", newline="") as f:
+        states = [row for row in csv.reader(f)][1:]
+    assert files["salaries_by_state.json"] == {
+        r[0]: {"salary": float(r[4]), "yoy_change": float(r[5])} for r in states if r[0] != "Total US"
+    }
+
+    api = client.get("/api/hiring-quadrant").json()
+    quadrant = files["hiring_attrition.json"]
+
+    def numbers(rows):
+        return sorted((r["code"], r["hiring_rate"], r["attrition_rate"], r["quadrant"]) for r in rows)
+
+    assert quadrant["month"] == api["month"]
+    assert numbers(quadrant["sectors"]) == numbers(r for r in api["sectors"] if r["code"] != "00")
+
+    api = client.get("/api/layoffs-summary").json()
+    assert files["layoffs_by_sector.json"]["month"] == api["month"]
+    assert [(r["code"], r["employees_laidoff"]) for r in files["layoffs_by_sector.json"]["sectors"]] == [
+        (r["code"], r["employees_laidoff"]) for r in api["sectors"]
+    ]
+    assert [(r["month"], r["employees_laidoff"]) for r in files["layoffs.json"]][::-1] == [
+        (r["month"], r["employees_laidoff"]) for r in api["series"]
+    ]
+
+    # Without the DB file the same queries over the staged CSVs give the same files
+    staged = generate(monkeypatch, tmp_path / "staged", tmp_path / "missing.duckdb", sample_data_dir)
+    del files["summary.json"]["updated_at"], staged["summary.json"]["updated_at"]
+    assert staged == files
@@ -0,0 +1,101 @@
+import pyarrow as pa
+import pytest
+
+import etl_supabase
+import sinks
+from delta_snapshot import DeltaSnapshot
+
+COLUMNS = ["date", "sector_id", "state_id", "employees_notified", "notices_issued", "employees_laidoff", "granularity"]
+CONFLICT = etl_supabase.CONFLICT_TARGETS["fact_layoffs"]
+
+
+def layoffs(*months, value=1):
+    return [[m, None, "Ohio", value, 1, value, "state"] for m in months]
+
+
+def chunk(rows):
+    return pa.table(list(zip(*rows)), names=COLUMNS)
+
+
+@pytest.mark.parametrize("name", ["duckdb", "sqlite"])
+def test_sql_sinks_merge_on_the_conflict_key(name, tmp_path):
+    sink = sinks.local_sink(name, tmp_path / sinks.LOCAL_PATHS[name])
+    confirmed = []
+    result = sink.load("fact_layoffs", COLUMNS, [chunk(layoffs("2025-01", "2025-02"))], CONFLICT, on_batch=confirmed.append)
+    assert (result.written, result.batches, sum(c.num_rows for c in confirmed)) == (2, 1, 2)
+
+    # Same keys (a NULL sector included) are replaced, not duplicated
+    sink.load("fact_layoffs", COLUMNS, [chunk(layoffs("2025-02", value=9)), chunk(layoffs("2025-03"))], CONFLICT)
+    rows = sink.con.execute("SELECT date, employees_laidoff FROM fact_layoffs ORDER BY date").fetchall()
+    assert rows == [("2025-01", 1), ("2025-02", 9), ("2025-03", 1)]
+
+    deleted = sink.delete("fact_layoffs", ["date", "sector_id", "state_id", "granularity"], [("2025-01", None, "Ohio", "state")])
+    assert deleted.written == 1 and sink.count_rows("fact_layoffs") == 2
+
+    sink.prepare_shadow(["fact_layoffs", "summary_values"])
+    sink.load(sinks.SHADOW_PREFIX + "fact_layoffs", COLUMNS, [chunk(layoffs("2026-01"))], CONFLICT)
+    assert sink.count_rows("fact_layoffs") == 2
+    sink.swap_shadow(["fact_layoffs", "summary_values"])
+    assert sink.count_rows("fact_layoffs") == 1 and sink.count_rows(sinks.SHADOW_PREFIX + "fact_layoffs") == 0
+    sink.close()
+
+
+def test_sqlite_sink_deletes_through_the_key_index(tmp_path):
+    sink = sinks.SQLiteSink(tmp_path / "local.sqlite")
+    sink.load("fact_layoffs", COLUMNS, [chunk(layoffs("2025-01"))], CONFLICT)
+    sink.con.execute("CREATE TEMP TABLE staged AS SELECT * FROM fact_layoffs")
+    plan = sink.con.execute("EXPLAIN QUERY PLAN " + sink._delete_matching_sql("fact_layoffs", "staged", CONFLICT.split(","))).fetchall()
+    assert any("USING COVERING INDEX fact_layoffs__key" in row[-1] for row in plan)
+
+    # The index follows the table through a shadow swap under the live name
+    sink.prepare_shadow(["fact_layoffs"])
+    sink.load(sinks.SHADOW_PREFIX + "fact_layoffs", COLUMNS, [chunk(layoffs("2026-01"))], CONFLICT)
+    sink.swap_shadow(["fact_layoffs"])
+    sink.load("fact_layoffs", COLUMNS, [chunk(layoffs("2026-01", value=3))], CONFLICT)
+    indexes = {name for (name,) in sink.con.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert indexes == {"fact_layoffs__key"} and sink.count_rows("fact_layoffs") == 1
+    sink.close()
+
+
+def test_parquet_sink_rewrites_whole_tables(tmp_path):
+    sink = sinks.ParquetSink(tmp_path / "parquet")
+    sink.load("fact_layoffs", COLUMNS, [chunk(layoffs("2025-01")), chunk(layoffs("2025-02", "2025-03"))], CONFLICT)
+    assert sink.count_rows("fact_layoffs") == 3 and len(list((tmp_path / "parquet" / "fact_layoffs").iterdir())) == 2
+    sink.load("fact_layoffs", COLUMNS, [chunk(layoffs("2025-02"))], CONFLICT)
+    assert sink.count_rows("fact_layoffs") == 1
+    sink.clear({"fact_layoffs": "date"})
+    assert sink.count_rows("fact_layoffs") == 0
+
+
+def test_upsert_into_a_local_sink(tmp_path, monkeypatch):
+    snapshot = DeltaSnapshot(tmp_path / "snapshot.duckdb", "duckdb://local")
+    sink = sinks.DuckDBSink(tmp_path / "local.duckdb")
+    monkeypatch.setattr(etl_supabase, "DRY_RUN", False)
+    monkeypatch.setattr(etl_supabase, "snapshot", snapshot)
+    monkeypatch.setattr(etl_supabase, "sink", sink)
+    etl_supabase.upsert("fact_layoffs", COLUMNS, layoffs("2025-01", "2025-02", "2025-03"))
+    etl_supabase.upsert("fact_layoffs", COLUMNS, layoffs("2025-01", "2025-03", value=4))
+    rows = sink.con.execute("SELECT date, employees_laidoff FROM fact_layoffs ORDER BY date").fetchall()
+    assert rows == [("2025-01", 4), ("2025-03", 4)]
+
+    # A full-table sink gets every row, unchanged ones included
+    parquet = sinks.ParquetSink(tmp_path / "parquet")
+    monkeypatch.setattr(etl_supabase, "sink", parquet)
+    etl_supabase.upsert("fact_layoffs", COLUMNS, layoffs("2025-01", "2025-03", value=4))
+    assert parquet.count_rows("fact_layoffs") == 2
+    snapshot.close()
+    sink.close()
+
+
+def test_parquet_sink_swap_refresh_loads_the_live_tables(sample_data_dir, tmp_path, monkeypatch):
+    parquet = sinks.ParquetSink(tmp_path / "parquet")
+    for name, value in [("DATA_DIR", sample_data_dir), ("DRY_RUN", False), ("TEMP_DIR", tmp_path / "tmp"),
+                        ("SNAPSHOT_PATH", tmp_path / "snapshot.duckdb"), ("TARGET", "parquet://test"),
+                        ("CLEAR_BEFORE_LOAD", True), ("REFRESH", "swap"), ("sink", parquet)]:
+        monkeypatch.setattr(etl_supabase, name, value)
+
+    for _ in range(2):
+        # The second run sees nothing new, yet the full-table sink must still hold every row
+        etl_supabase.run_etl()
+        assert not list((tmp_path / "parquet").glob(sinks.SHADOW_PREFIX + "*"))
+        assert all(parquet.count_rows(table) > 0 for table in etl_supabase.CLEAR_TARGETS)
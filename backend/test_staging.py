@@ -0,0 +1,33 @@
+import csv
+
+import duckdb
+
+import etl
+import staging
+from sample_data import read_records
+
+
+def test_forced_rebuild_loads_from_staging_without_parsing(sample_db, sample_data_dir):
+    with duckdb.connect(str(sample_db), read_only=True) as con:
+        before = {t: etl.table_fingerprint(con, t) for t in etl.source_files()}
+
+    report = etl.build_db(force=True)
+    assert all(t["staged"] and t["parse_seconds"] == 0 for t in report["timings"])
+    with duckdb.connect(str(sample_db), read_only=True) as con:
+        after = {t: etl.table_fingerprint(con, t) for t in etl.source_files()}
+    assert after == before
+
+
+def test_staged_records_match_csv_reader(sample_data_dir):
+    path = sample_data_dir / "salaries_soc.csv"
+    with open(path, encoding="utf-8") as f:
+        expected = list(csv.DictReader(f))
+    assert read_records(path) == expected
+
+    staged = staging.ensure_staged(path)
+    assert staging.ensure_staged(path) == staged
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("2025-11,15,Computer and Mathematical,900,\"$1,000\",\"$1,000\"\r\n")
+    restaged = staging.ensure_staged(path)
+    assert restaged != staged and not staged.exists()
+    assert read_records(path)[-1]["salary_sa"] == "$1,000"
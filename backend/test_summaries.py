@@ -0,0 +1,58 @@
+from datetime import date
+
+import duckdb
+
+import etl_supabase
+import summaries
+
+
+def test_classify_columns_reads_months_from_headers():
+    headers = [
+        "State", "Oct 2024", "Sep 2025", "Oct 2025",
+        "Pct change YoY (Oct 2024 - Oct 2025)", "Pct change (Sep 2025 - Oct 2025)",
+        "Oct 2025 - Oct 2024", "Oct 2025 - Sep 2025", "MoM change (pp) (Sep 25–Oct 25)", "Notes",
+    ]
+    got = [(c.column, c.kind, c.month) for c in summaries.classify_columns(headers)]
+    oct25 = date(2025, 10, 1)
+    assert got == [
+        ("Oct 2024", "value", date(2024, 10, 1)),
+        ("Sep 2025", "value", date(2025, 9, 1)),
+        ("Oct 2025", "value", oct25),
+        ("Pct change YoY (Oct 2024 - Oct 2025)", "yoy", oct25),
+        ("Pct change (Sep 2025 - Oct 2025)", "mom", oct25),
+        ("Oct 2025 - Oct 2024", "yoy", oct25),
+        ("Oct 2025 - Sep 2025", "mom", oct25),
+        ("MoM change (pp) (Sep 25–Oct 25)", "mom", oct25),
+    ]
+    # A change header without months ends at the latest level month
+    assert summaries.classify_columns(["November 2025", "YoY"])[1].month == date(2025, 11, 1)
+    assert summaries.latest_month_column(["Sector", "August 2025", "November 2025"]) == "November 2025"
+
+
+def test_summary_sql_unpivots_a_new_months_file(tmp_path):
+    # A later drop: the months moved on, and nothing in the loader names them
+    path = tmp_path / "sector_summary.csv"
+    path.write_text(
+        "Sector,October 2025,November 2025,YoY change (Nov 24–Nov 25),MoM change (Oct 25–Nov 25)\n"
+        'Retail Trade,"$1,000",1100,2.5,\n'
+        "Total US,5,6,7,8\n"
+    )
+    con = duckdb.connect()
+    con.execute("CREATE TABLE dim_sectors AS SELECT '44' AS id, 'Retail Trade' AS name")
+    src = f"read_csv('{path}', all_varchar=true)"
+    headers = [d[0] for d in con.execute(f"SELECT * FROM {src} LIMIT 0").description]
+    spec = summaries.SummarySource("summary_sector", "sector_summary", "Sector", "sector")
+    sql = summaries.summary_sql(spec, headers, src, etl_supabase.money)
+
+    rows = con.execute(f"SELECT * FROM ({sql}) ORDER BY kind, month").fetchall()
+    nov = date(2025, 11, 1)
+    # "Total US" has no sector id and is dropped; the empty MoM cell is left out by UNPIVOT
+    assert rows == [
+        ("summary_sector", "44", "value", date(2025, 10, 1), "October 2025", 1000.0),
+        ("summary_sector", "44", "value", nov, "November 2025", 1100.0),
+        ("summary_sector", "44", "yoy", nov, "YoY change (Nov 24–Nov 25)", 2.5),
+    ]
+
+    total = summaries.SummarySource("salary_overview_total", "salary_overview_total", None, "total")
+    sql = summaries.summary_sql(total, headers[1:], src, etl_supabase.money)
+    assert {r[1] for r in con.execute(sql).fetchall()} == {summaries.TOTAL_ID}
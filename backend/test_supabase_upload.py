@@ -0,0 +1,123 @@
+import pyarrow as pa
+import pytest
+from supabase import create_client
+
+import columnar
+import etl_supabase
+from postgrest_stub import PostgrestStub
+from sinks import RestSink
+from supabase_upload import BatchSettings, BatchSizer, BatchUploader
+
+
+def rows(n, poison=()):
+    """n rows whose JSON renderings all have the same length ("poison": true vs null)."""
+    return pa.table({"id": [f"r{i:03}" for i in range(n)], "value": [1.5] * n, "poison": [i in poison for i in range(n)]})
+
+
+def rows_per_request(uploader, table, payload, n):
+    """Pin the table's byte budget to exactly n rows of `payload` per request."""
+    row_bytes = len(columnar.json_rows(payload)[0].as_py()) + 1
+    uploader.settings.sizers[table] = BatchSizer(target_bytes=n * row_bytes, max_bytes=n * row_bytes, min_bytes=1)
+
+
+def test_concurrent_upload_retries_transient_errors():
+    with PostgrestStub(latency=0.05) as stub:
+        stub.flaky["fact_layoffs"] = 3
+        delays = []
+        uploader = BatchUploader(create_client(stub.url, "service-role-key"), concurrency=4,
+                                 retries=5, backoff_seconds=0.01, sleep=delays.append)
+        payload = rows(200).drop(["poison"])
+        rows_per_request(uploader, "fact_layoffs", payload, 10)
+        result = uploader.upload_arrow("fact_layoffs", [payload])
+
+    # Each transient error also halves the byte budget, so later batches may be smaller
+    assert result.failures == [] and result.uploaded_rows == 200 and result.batches >= 20
+    assert len(stub.rows["fact_layoffs"]) == 200
+    assert result.retries == 3 and len(delays) == 3 and all(0 <= d <= 0.01 * 2 ** 5 for d in delays)
+    assert 1 < stub.max_in_flight <= 4
+    assert all("return=minimal" in r["prefer"] for r in stub.requests)
+    assert result.rows_per_second > 0
+
+
+def test_failed_batches_are_isolated_and_conflict_target_falls_back():
+    with PostgrestStub() as stub:
+        stub.constraints["summary_state"] = []
+        uploader = BatchUploader(create_client(stub.url, "service-role-key"), concurrency=3,
+                                 retries=2, sleep=lambda _: None)
+        payload = rows(30, poison={15})
+        rows_per_request(uploader, "summary_state", payload, 10)
+        result = uploader.upload_arrow("summary_state", [payload], on_conflict="state_id")
+
+    # 42P10 drops the conflict target; the not-null violation is permanent and only sinks batch 1
+    assert [(f.index, f.first_row, f.rows, f.attempts) for f in result.failures] == [(1, 10, 10, 1)]
+    assert "23502" in result.failures[0].error
+    assert result.uploaded_rows == 20 and len(stub.rows["summary_state"]) == 20
+    assert {r["on_conflict"] for r in stub.requests} == {"state_id", None}
+
+
+def test_arrow_chunks_post_rendered_json_cut_to_byte_budget():
+    with PostgrestStub() as stub:
+        stub.constraints["summary_state"] = []
+        uploader = BatchUploader(create_client(stub.url, "service-role-key"))
+        uploader.settings.sizers["summary_state"] = BatchSizer(target_bytes=600, max_bytes=600, min_bytes=1)
+        chunks = [pa.table({"id": range(start, start + n), "jobs": [1.5] * n}) for start, n in ((0, 100), (100, 30))]
+        result = uploader.upload_arrow("summary_state", chunks, on_conflict="state_id")
+
+    # The missing constraint (42P10) falls back; bodies never exceed the budget
+    assert result.failures == [] and result.rows == 130 and len(stub.rows["summary_state"]) == 130
+    posts = [r for r in stub.requests if r["on_conflict"] is None]
+    assert len(posts) == result.batches and all(r["bytes"] <= 600 for r in posts)
+    assert max(r["rows"] for r in posts) > 20
+
+
+def test_batch_budget_adapts_to_latency_errors_and_persists(tmp_path):
+    sizer = BatchSizer(target_bytes=100_000, max_bytes=400_000, min_bytes=10_000, target_seconds=2.0)
+    sizer.observe(100_000, 0.5)
+    assert sizer.target_bytes == 125_000
+    sizer.observe(20_000, 0.1)  # a small batch says nothing about bigger ones
+    assert sizer.target_bytes == 125_000
+    sizer.observe(125_000, 5.0)
+    assert sizer.target_bytes == 50_000
+    sizer.observe(50_000, 0.1, ok=False)
+    assert sizer.target_bytes == 25_000 and sizer.errors == 1
+    sizer.observe(300_000, 0.1, too_large=True)
+    assert sizer.max_bytes == 150_000
+
+    settings = BatchSettings(tmp_path / "batches.json", scope="project-a")
+    settings.sizers["dim_states"] = sizer
+    settings.save()
+    BatchSettings(tmp_path / "batches.json", scope="project-b").save()
+    again = BatchSettings(tmp_path / "batches.json", scope="project-a").sizer("dim_states")
+    assert (again.target_bytes, again.max_bytes) == (25_000, 150_000)
+    assert BatchSettings(tmp_path / "batches.json", scope="project-b").sizer("dim_states").target_bytes != 25_000
+
+
+def test_oversized_bodies_are_split_and_cap_the_budget():
+    with PostgrestStub() as stub:
+        stub.constraints["summary_state"] = ["state_id"]
+        stub.max_body_bytes = 2_000
+        uploader = BatchUploader(create_client(stub.url, "service-role-key"), retries=0)
+        table = pa.table({"state_id": [f"s{i:03}" for i in range(200)], "jobs": [1.5] * 200})
+        result = uploader.upload_arrow("summary_state", [table], on_conflict="state_id")
+
+    sizer = uploader.sizer("summary_state")
+    assert result.failures == [] and len(stub.rows["summary_state"]) == 200
+    assert any(r.get("too_large") for r in stub.requests)
+    assert sizer.max_bytes <= 2_000 and sizer.target_bytes <= sizer.max_bytes
+
+
+def test_upsert_reports_and_raises_on_failed_batches(monkeypatch):
+    with PostgrestStub() as stub:
+        stub.constraints["fact_layoffs"] = [etl_supabase.CONFLICT_TARGETS["fact_layoffs"]]
+        monkeypatch.setattr(etl_supabase, "DRY_RUN", False)
+        uploader = BatchUploader(create_client(stub.url, "service-role-key"))
+        # One row per request
+        uploader.settings.sizers["fact_layoffs"] = BatchSizer(target_bytes=1, min_bytes=1)
+        monkeypatch.setattr(etl_supabase, "sink", RestSink(uploader.client, uploader))
+        columns = ["date", "sector_id", "state_id", "granularity", "value"]
+        etl_supabase.upsert("fact_layoffs", columns, [["2025-01", "s1", "st1", "state", float("nan")]] * 3)
+        assert [r["value"] for r in stub.rows["fact_layoffs"].values()] == [None]
+
+        with pytest.raises(RuntimeError, match="1 of 3 batches failed"):
+            etl_supabase.upsert("fact_layoffs", columns + ["poison"], [["2025-02", "s1", "st1", "state", 1.0, False]] * 2
+                                + [["2025-03", "s1", "st1", "state", 1.0, True]])
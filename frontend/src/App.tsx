@@ -4,6 +4,8 @@ import type { CSSProperties } from 'react'
 
 // Dev note: use explicit API base to avoid relative fetches when env is missing.
 const API_BASE = (import.meta.env.VITE_API_BASE as string) || 'http://127.0.0.1:9055'
+// /api/ask-gemini rejects longer context notes with a 422 (CLIENT_NOTE_CHAR_LIMIT in backend/main.py)
+const GEMINI_CONTEXT_MAX_CHARS = 500
 
 type MarketTemperature = {
   month: string
@@ -252,6 +254,16 @@ function App() {
       setLoading(false)
     }
     load()
+
+    // Refetch only when the API announces a new DuckDB build instead of polling.
+    let knownBuild: string | null = null
+    const builds = new EventSource(`${API_BASE}/api/builds/stream`)
+    builds.addEventListener('build', (event) => {
+      const { build_id } = JSON.parse((event as MessageEvent).data)
+      if (knownBuild !== null && build_id !== knownBuild) load()
+      knownBuild = build_id
+    })
+    return () => builds.close()
   }, [])
 
   const handleAskGemini = async () => {
@@ -844,10 +856,11 @@ function App() {
             />
           </label>
           <label className="field">
-            <span>Context</span>
+            <span>Context (up to {GEMINI_CONTEXT_MAX_CHARS} characters)</span>
             <textarea
               value={geminiContext}
               onChange={(e) => setGeminiContext(e.target.value)}
+              maxLength={GEMINI_CONTEXT_MAX_CHARS}
               rows={3}
             />
           </label>
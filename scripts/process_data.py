@@ -1,400 +1,310 @@
 #!/usr/bin/env python3
 """
 RPLS Dashboard Data Processor
-Converts Revelio Labs CSV files to static JSON for the dashboard.
+Converts the RPLS data to static JSON for the dashboard.
+
+Reads the same DuckDB file the API serves (backend/rpls.duckdb, built by
+backend/etl.py; DB_PATH overrides it), one SQL query per artifact that selects
+only the month(s) and columns it needs, with the API's casts and formulas
+(backend/metrics.py), so every number matches the live API. The salary files
+keep the shape the frontend reads: the salary overviews' latest and previous
+month (prev_year_salary) and their published year-over-year change. Without a
+DB file, the same queries run over the staged Parquet copies of the CSVs in
+RPLS_DATA_DIR.
 """
 
-import csv
 import json
 import os
+import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import Dict, List, Optional
+
+import duckdb
 
 # Paths (prefers canonical rpls_data; fallback to env override)
 ROOT_DIR = Path(__file__).resolve().parents[1]
 DATA_DIR = Path(os.environ.get("RPLS_DATA_DIR", ROOT_DIR.parent / "rpls_data"))
+DB_PATH = Path(os.environ.get("DB_PATH", ROOT_DIR / "backend" / "rpls.duckdb"))
 OUTPUT_DIR = ROOT_DIR / "static" / "data"
 
-def load_csv(filename):
-    """Load CSV file and return list of dicts."""
-    filepath = DATA_DIR / filename
-    if not filepath.exists():
-        raise FileNotFoundError(f"{filename} not found in {DATA_DIR}")
-
-    with open(filepath, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        return list(reader)
-
-def parse_currency(val):
-    """Convert $XX,XXX string to float."""
-    if not val:
-        return None
-    return float(val.replace('$', '').replace(',', ''))
-
-def parse_percent(val):
-    """Convert +X.X% or -X.X% to float."""
-    if not val:
-        return None
-    return float(val.replace('%', '').replace('+', ''))
-
-
-def _parse_month_key(key: str):
-    for fmt in ("%B %Y", "%b %Y"):
-        try:
-            return datetime.strptime(key, fmt)
-        except ValueError:
-            continue
-    return None
-
-
-def latest_month_column(keys: Iterable[str]) -> Optional[str]:
-    """Return the column name representing the latest month among the provided keys."""
-    dated_keys: List[tuple[datetime, str]] = []
-    for key in keys:
-        parsed = _parse_month_key(key)
-        if parsed:
-            dated_keys.append((parsed, key))
-    if not dated_keys:
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+import staging  # noqa: E402  (shared Parquet cache of the raw CSVs)
+import summaries  # noqa: E402  (month/change header parsing of the wide summary files)
+from metrics import calculate_health_index, classify_quadrant, pct_change, value_expr  # noqa: E402
+
+# Every table an artifact reads
+SOURCES = [
+    "sector_summary",
+    "salary_overview_soc",
+    "salary_overview_state",
+    "salaries_national",
+    "hiring_and_attrition_by_sector",
+    "hiring_and_attrition_total_us",
+    "total_layoffs",
+    "layoffs_by_naics",
+    "employment_national",
+]
+
+
+def connect() -> duckdb.DuckDBPyConnection:
+    """The API's DuckDB file, read-only; without one, views over the staged Parquet copies of SOURCES."""
+    if DB_PATH.exists():
+        return duckdb.connect(str(DB_PATH), read_only=True)
+    con = duckdb.connect()
+    for table in SOURCES:
+        path = staging.resolve_source(DATA_DIR / f"{table}.csv")
+        if not path.exists():
+            raise FileNotFoundError(f"{table}.csv not found in {DATA_DIR} (and no DB at {DB_PATH})")
+        con.execute(f"CREATE VIEW {table} AS SELECT * FROM {staging.scan_sql(path, con)}")
+    return con
+
+
+def fetch(con, sql: str, params: Optional[list] = None) -> List[Dict]:
+    cur = con.execute(sql, params or [])
+    columns = [d[0] for d in cur.description]
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def overview_columns(con, table: str) -> Optional[Dict[str, Optional[str]]]:
+    """The latest and previous month columns of a wide summary/overview table, and its YoY and MoM change columns."""
+    headers = [d[0] for d in con.execute(f"SELECT * FROM {table} LIMIT 0").description]
+    columns = summaries.classify_columns(headers)
+    levels = sorted((c.month, c.column) for c in columns if c.kind == "value")
+    if not levels:
         return None
-    dated_keys.sort(key=lambda tup: tup[0])
-    return dated_keys[-1][1]
+    return {
+        "latest": levels[-1][1],
+        "prev": levels[-2][1] if len(levels) > 1 else levels[-1][1],
+        "yoy": next((c.column for c in columns if c.kind == "yoy"), None),
+        "mom": next((c.column for c in columns if c.kind == "mom"), None),
+    }
 
-def process_sector_summary():
-    """Process sector summary data for Sector Spotlight Cards."""
-    rows = load_csv("sector_summary.csv")
-    sectors = []
 
-    if not rows:
-        return sectors
+def count(col: str) -> str:
+    return f"COALESCE(TRY_CAST(REPLACE({quote(col)}, ',', '') AS BIGINT), 0)"
 
-    month_cols = [c for c in rows[0].keys() if _parse_month_key(c)]
-    month_cols.sort(key=lambda c: _parse_month_key(c))
-    latest_col = month_cols[-1]
-    prev_col = month_cols[-2] if len(month_cols) > 1 else month_cols[-1]
-    yoy_col = next((c for c in rows[0].keys() if "YoY" in c), None)
-    mom_col = next((c for c in rows[0].keys() if "MoM" in c), None)
 
-    for row in rows:
-        if row.get('Sector') == 'Total US':
-            continue
+def currency(col: str) -> str:
+    return f"TRY_CAST(REPLACE(REPLACE({quote(col)}, '$', ''), ',', '') AS DOUBLE)"
 
-        current = int(row.get(latest_col, '0').replace(',', '') or 0)
-        prev = int(row.get(prev_col, '0').replace(',', '') or 0)
-        yoy = parse_percent(row.get(yoy_col, '0%')) if yoy_col else None
-        mom = parse_percent(row.get(mom_col, '0%')) if mom_col else None
 
-        sectors.append({
-            "name": row.get('Sector', ''),
-            "current_postings": current,
-            "prev_month_postings": prev,
-            "yoy_change": yoy if yoy is not None else ((current - prev) / prev * 100 if prev else None),
-            "mom_change": mom if mom is not None else None
-        })
+def percent(col: Optional[str]) -> str:
+    return f"TRY_CAST(REPLACE(REPLACE({quote(col)}, '%', ''), '+', '') AS DOUBLE)" if col else "NULL"
 
-    return sorted(sectors, key=lambda x: x['current_postings'], reverse=True)
 
-def process_salary_by_occupation():
+def process_sector_summary(con):
+    """Process sector summary data for Sector Spotlight Cards."""
+    cols = overview_columns(con, "sector_summary")
+    if not cols:
+        return []
+    return fetch(
+        con,
+        f"""
+        SELECT name, current_postings, prev_month_postings,
+               COALESCE(yoy, CASE WHEN prev_month_postings != 0
+                                  THEN (current_postings - prev_month_postings) / prev_month_postings * 100 END) AS yoy_change,
+               mom AS mom_change
+        FROM (
+          SELECT "Sector" AS name, {count(cols['latest'])} AS current_postings, {count(cols['prev'])} AS prev_month_postings,
+                 {percent(cols['yoy'])} AS yoy, {percent(cols['mom'])} AS mom
+          FROM sector_summary
+          WHERE "Sector" IS DISTINCT FROM 'Total US'
+        )
+        ORDER BY current_postings DESC, name
+        """,
+    )
+
+
+def salary_overview(con, table: str, key: str, *columns: str) -> List[Dict]:
+    """Latest and previous month salary per `key` of a salary overview, with its published "Pct change YoY"."""
+    cols = overview_columns(con, table)
+    if not cols:
+        return []
+    extra = "".join(f"{column}, " for column in columns)
+    yoy = f"COALESCE({percent(cols['yoy'])}, 0)" if cols["yoy"] else "NULL"
+    return fetch(
+        con,
+        f"""
+        SELECT {key} AS key, {extra}{currency(cols['latest'])} AS salary, {currency(cols['prev'])} AS prev_salary,
+               {yoy} AS yoy_change
+        FROM {table}
+        WHERE {key} IS NOT NULL AND {key} != '' AND {key} != 'Total US'
+        ORDER BY {key}
+        """,
+    )
+
+
+def process_salary_by_occupation(con):
     """Process salary data by occupation for Salary Reality Check."""
-    rows = load_csv("salary_overview_soc.csv")
-    salaries = []
-
-    if not rows:
-        return salaries
-
-    month_cols = [c for c in rows[0].keys() if _parse_month_key(c)]
-    month_cols.sort(key=lambda c: _parse_month_key(c))
-    latest_col = month_cols[-1]
-    prev_col = month_cols[-2] if len(month_cols) > 1 else month_cols[-1]
-    yoy_col = next((c for c in rows[0].keys() if "Pct change YoY" in c), None)
-
-    for row in rows:
-        soc_code = row.get('soc2d_code', '')
-        if soc_code == 'Total US' or not soc_code:
-            continue
-
-        salaries.append({
-            "code": soc_code,
-            "name": row.get('soc2d_name', ''),
-            "salary": parse_currency(row.get(latest_col, '$0')),
-            "prev_year_salary": parse_currency(row.get(prev_col, '$0')),
-            "yoy_change": float(row.get(yoy_col, '0') or 0) if yoy_col else None
-        })
-
-    return salaries
-
-def process_salary_by_state():
-    """Process salary data by state."""
-    rows = load_csv("salary_overview_state.csv")
-    salaries = {}
-    national_avg = 0.0
-
-    if not rows:
-        return salaries, national_avg
-
-    month_cols = [c for c in rows[0].keys() if _parse_month_key(c)]
-    month_cols.sort(key=lambda c: _parse_month_key(c))
-    latest_col = month_cols[-1]
-    yoy_col = next((c for c in rows[0].keys() if "Pct change YoY" in c), None)
-
-    for row in rows:
-        state = row.get('state', '')
-        if not state:
-            continue
-            
-        salary_val = parse_currency(row.get(latest_col, '$0'))
-        
-        if state == 'Total US':
-            national_avg = salary_val or 0.0
-            continue
-
-        salaries[state] = {
-            "salary": salary_val,
-            "yoy_change": float(row.get(yoy_col, '0') or 0) if yoy_col else None
-        }
-
-    return salaries, national_avg
-
-def process_hiring_attrition():
-    """Process hiring and attrition by sector for Quadrant chart."""
-    rows = load_csv("hiring_and_attrition_by_sector.csv")
-
-    # Get latest month data
-    latest_data = {}
-    for row in rows:
-        month = row.get('month', '')
-        naics_code = row.get('naics2d_code', '')
-        naics_name = row.get('naics2d_name', '')
-
-        if naics_code == '00':  # Skip Unknown
-            continue
-
-        if month not in latest_data:
-            latest_data[month] = []
-
-        latest_data[month].append({
-            "code": naics_code,
-            "name": naics_name,
-            "hiring_rate": float(row.get('rl_hiring_rate', '0') or 0),
-            "attrition_rate": float(row.get('rl_attrition_rate', '0') or 0)
-        })
-
-    # Get most recent month
-    if latest_data:
-        latest_month = max(latest_data.keys())
-        return {
-            "month": latest_month,
-            "sectors": latest_data[latest_month]
+    return [
+        {
+            "code": row["key"],
+            "name": row["soc2d_name"],
+            "salary": row["salary"],
+            "prev_year_salary": row["prev_salary"],
+            "yoy_change": row["yoy_change"],
         }
-    return {"month": "", "sectors": []}
+        for row in salary_overview(con, "salary_overview_soc", "soc2d_code", "soc2d_name")
+    ]
 
-def process_layoffs():
-    """Process layoff data for Layoff Ticker."""
-    rows = load_csv("total_layoffs.csv")
-    layoffs = []
 
+def process_salary_by_state(con):
+    """Process salary data by state, plus the national salary_sa of the latest month (/api/summary's average)."""
+    salaries = {
+        row["key"]: {"salary": row["salary"], "yoy_change": row["yoy_change"]}
+        for row in salary_overview(con, "salary_overview_state", "state")
+    }
+    national = con.execute(
+        f"SELECT {value_expr('salary_sa')} FROM salaries_national WHERE month = (SELECT MAX(month) FROM salaries_national)"
+    ).fetchone()
+    return salaries, (national[0] if national and national[0] is not None else 0.0)
+
+
+def process_hiring_attrition(con):
+    """Process hiring and attrition by sector for Quadrant chart (/api/hiring-quadrant, Unknown excluded)."""
+    rows = fetch(
+        con,
+        """
+        SELECT month, naics2d_code AS code, naics2d_name AS name,
+               TRY_CAST(rl_hiring_rate AS DOUBLE) AS hiring_rate, TRY_CAST(rl_attrition_rate AS DOUBLE) AS attrition_rate
+        FROM hiring_and_attrition_by_sector
+        WHERE month = (SELECT MAX(month) FROM hiring_and_attrition_by_sector) AND naics2d_code != '00'
+        ORDER BY naics2d_code
+        """,
+    )
+    month = rows[0]["month"] if rows else ""
     for row in rows:
-        month = row.get('month', '')
-        notified = row.get('num_employees_notified', '')
-        notices = row.get('num_notices_issued', '')
-        laidoff = row.get('num_employees_laidoff', '')
-
-        layoffs.append({
-            "month": month,
-            "employees_notified": int(float(notified)) if notified else None,
-            "notices_issued": int(float(notices)) if notices else None,
-            "employees_laidoff": int(float(laidoff)) if laidoff else None
-        })
-
-    return sorted(layoffs, key=lambda x: x['month'], reverse=True)
-
-def process_layoffs_by_sector():
-    """Process layoffs by sector."""
-    rows = load_csv("layoffs_by_naics.csv")
-
-    # Group by month
-    by_month = {}
+        del row["month"]
+        row["quadrant"] = classify_quadrant(row["hiring_rate"], row["attrition_rate"])
+    return {"month": month, "sectors": rows}
+
+
+def process_layoffs(con):
+    """Process layoff data for Layoff Ticker (the /api/layoffs-summary series), newest first."""
+    return fetch(
+        con,
+        """
+        SELECT month,
+               TRY_CAST(num_employees_notified AS DOUBLE) AS employees_notified,
+               TRY_CAST(num_notices_issued AS DOUBLE) AS notices_issued,
+               TRY_CAST(num_employees_laidoff AS DOUBLE) AS employees_laidoff
+        FROM total_layoffs
+        ORDER BY month DESC
+        """,
+    )
+
+
+def process_layoffs_by_sector(con):
+    """Process layoffs by sector for the latest total_layoffs month, as /api/layoffs-summary does."""
+    rows = fetch(
+        con,
+        """
+        SELECT month, naics2d AS code, naics2d_name AS name, TRY_CAST(num_employees_laidoff AS DOUBLE) AS employees_laidoff
+        FROM layoffs_by_naics
+        WHERE month = (SELECT MAX(month) FROM total_layoffs)
+        ORDER BY employees_laidoff DESC, code
+        """,
+    )
+    month = rows[0]["month"] if rows else ""
     for row in rows:
-        month = row.get('month', '')
-        if month not in by_month:
-            by_month[month] = []
-
-        by_month[month].append({
-            "code": row.get('naics2d_code', ''),
-            "name": row.get('naics2d_name', ''),
-            "employees_laidoff": int(float(row.get('num_employees_laidoff', '0') or 0))
-        })
-
-    # Return latest month
-    if by_month:
-        latest_month = max(by_month.keys())
-        return {
-            "month": latest_month,
-            "sectors": sorted(by_month[latest_month], key=lambda x: x['employees_laidoff'], reverse=True)
-        }
-    return {"month": "", "sectors": []}
+        del row["month"]
+    return {"month": month, "sectors": rows}
 
-def process_employment_trends():
-    """Process national employment trends."""
-    rows = load_csv("employment_national.csv")
-    trends = []
-
-    for row in rows:
-        trends.append({
-            "month": row.get('month', ''),
-            "employment_nsa": int(float(row.get('employment_nsa', '0') or 0)),
-            "employment_sa": int(float(row.get('employment_sa', '0') or 0))
-        })
-
-    return sorted(trends, key=lambda x: x['month'])
 
-def process_hiring_trends():
+def process_employment_trends(con):
+    """Process national employment trends."""
+    # NULL months first, so the last two rows are the months /api/summary compares
+    return fetch(
+        con,
+        f"""
+        SELECT month, {value_expr('employment_nsa')} AS employment_nsa, {value_expr('employment_sa')} AS employment_sa
+        FROM employment_national
+        ORDER BY month NULLS FIRST
+        """,
+    )
+
+
+def process_hiring_trends(con):
     """Process national hiring/attrition trends."""
-    rows = load_csv("hiring_and_attrition_total_us.csv")
-    trends = []
-
-    for row in rows:
-        trends.append({
-            "month": row.get('month', ''),
-            "hiring_rate": float(row.get('rl_hiring_rate', '0') or 0),
-            "attrition_rate": float(row.get('rl_attrition_rate', '0') or 0)
-        })
-
-    return sorted(trends, key=lambda x: x['month'])
-
-def calculate_health_index(employment_trends, hiring_trends, layoffs):
-    """Calculate Labor Market Health Index (0-100)."""
-    if not employment_trends or not hiring_trends or not layoffs:
-        return 50  # Default neutral
-
-    # Get latest data
+    return fetch(
+        con,
+        f"""
+        SELECT month, {value_expr('rl_hiring_rate')} AS hiring_rate, {value_expr('rl_attrition_rate')} AS attrition_rate
+        FROM hiring_and_attrition_total_us
+        ORDER BY month NULLS FIRST
+        """,
+    )
+
+
+def build_summary(employment_trends, hiring_trends, layoffs, national_avg_salary, sectors, salaries_soc):
+    """Headline numbers exactly as /api/summary computes them, plus the static-only extras."""
     latest_emp = employment_trends[-1] if employment_trends else {}
-    prev_emp = employment_trends[-2] if len(employment_trends) > 1 else latest_emp
+    prev_emp = employment_trends[-2] if len(employment_trends) > 1 else {}
     latest_hiring = hiring_trends[-1] if hiring_trends else {}
-    latest_layoffs = layoffs[0] if layoffs else {}
-    prev_layoffs = layoffs[1] if len(layoffs) > 1 else latest_layoffs
-
-    # Calculate component scores (0-100 each)
-    scores = []
-
-    # Employment growth (positive = good)
-    if prev_emp.get('employment_sa'):
-        emp_growth = (latest_emp.get('employment_sa', 0) - prev_emp['employment_sa']) / prev_emp['employment_sa']
-        emp_score = 50 + (emp_growth * 10000)  # Scale to reasonable range
-        scores.append(('employment', max(0, min(100, emp_score)), 0.25))
-
-    # Hiring rate (higher = better, typical range 0.2-0.4)
-    hiring_rate = latest_hiring.get('hiring_rate', 0.25)
-    hiring_score = (hiring_rate - 0.15) / 0.25 * 100
-    scores.append(('hiring', max(0, min(100, hiring_score)), 0.25))
-
-    # Attrition rate (lower = better, typical range 0.2-0.4)
-    attrition_rate = latest_hiring.get('attrition_rate', 0.25)
-    attrition_score = 100 - ((attrition_rate - 0.15) / 0.25 * 100)
-    scores.append(('attrition', max(0, min(100, attrition_score)), 0.20))
-
-    # Net hiring (hiring - attrition, positive = good)
-    net_hiring = hiring_rate - attrition_rate
-    net_score = 50 + (net_hiring * 500)
-    scores.append(('net_hiring', max(0, min(100, net_score)), 0.15))
-
-    # Layoffs trend (decreasing = good)
-    curr_layoffs = latest_layoffs.get('employees_laidoff') or 0
-    prev_layoffs_val = prev_layoffs.get('employees_laidoff') or curr_layoffs
-    if prev_layoffs_val > 0:
-        layoff_change = (curr_layoffs - prev_layoffs_val) / prev_layoffs_val
-        layoff_score = 50 - (layoff_change * 100)
-        scores.append(('layoffs', max(0, min(100, layoff_score)), 0.15))
-
-    # Weighted average
-    if scores:
-        weighted_sum = sum(score * weight for _, score, weight in scores)
-        total_weight = sum(weight for _, _, weight in scores)
-        return round(weighted_sum / total_weight)
-
-    return 50
-
-def classify_sector_quadrant(hiring_rate, attrition_rate):
-    """Classify sector into quadrant based on hiring/attrition."""
-    hiring_threshold = 0.28
-    attrition_threshold = 0.26
-
-    if hiring_rate > hiring_threshold:
-        if attrition_rate < attrition_threshold:
-            return "growth"
-        else:
-            return "churn_burn"
-    else:
-        if attrition_rate < attrition_threshold:
-            return "stagnant"
-        else:
-            return "decline"
-
-def main():
-    """Main processing function."""
-    print("Processing RPLS data...")
-
-    # Create output directory
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-    # Process all data
-    sectors = process_sector_summary()
-    salaries_soc = process_salary_by_occupation()
-    salaries_state, national_avg_salary = process_salary_by_state()
-    hiring_attrition = process_hiring_attrition()
-    layoffs = process_layoffs()
-    layoffs_by_sector = process_layoffs_by_sector()
-    employment_trends = process_employment_trends()
-    hiring_trends = process_hiring_trends()
-
-    # Add quadrant classification to hiring/attrition data
-    for sector in hiring_attrition.get('sectors', []):
-        sector['quadrant'] = classify_sector_quadrant(
-            sector['hiring_rate'],
-            sector['attrition_rate']
-        )
-
-    # Calculate health index
-    health_index = calculate_health_index(employment_trends, hiring_trends, layoffs)
-
-    # Get latest data for summary
     latest_layoff = layoffs[0] if layoffs else {}
-    latest_hiring = hiring_trends[-1] if hiring_trends else {}
-    latest_emp = employment_trends[-1] if employment_trends else {}
-    prev_emp = employment_trends[-2] if len(employment_trends) > 1 else {}
-
-    # Determine health trend
-    if len(employment_trends) >= 3:
-        recent_growth = (latest_emp.get('employment_sa', 0) - prev_emp.get('employment_sa', 0))
-        if recent_growth > 50000:
+    prev_layoff = layoffs[1] if len(layoffs) > 1 else {}
+
+    employment_change = None
+    if latest_emp.get("employment_sa") is not None and prev_emp.get("employment_sa") is not None:
+        employment_change = latest_emp["employment_sa"] - prev_emp["employment_sa"]
+    health_index = calculate_health_index(
+        employment_growth=pct_change(latest_emp.get("employment_sa"), prev_emp.get("employment_sa")),
+        hiring_rate=latest_hiring.get("hiring_rate"),
+        attrition_rate=latest_hiring.get("attrition_rate"),
+        layoff_change=pct_change(latest_layoff.get("employees_laidoff"), prev_layoff.get("employees_laidoff")),
+    )
+    health_trend = "stable"
+    if employment_change is not None:
+        if employment_change > 50000:
             health_trend = "improving"
-        elif recent_growth < -50000:
+        elif employment_change < -50000:
             health_trend = "declining"
-        else:
-            health_trend = "stable"
-    else:
-        health_trend = "stable"
 
-    # Build summary
-    summary = {
+    return {
         "updated_at": datetime.now().isoformat(),
-        "data_month": latest_emp.get('month') or latest_hiring.get('month') or "",
+        "data_month": latest_emp.get("month") or latest_hiring.get("month") or "",
         "health_index": health_index,
         "health_trend": health_trend,
         "headline_metrics": {
-            "total_employment": latest_emp.get('employment_sa'),
-            "employment_change": (latest_emp.get('employment_sa', 0) - prev_emp.get('employment_sa', 0)) if prev_emp else 0,
-            "hiring_rate": latest_hiring.get('hiring_rate'),
-            "attrition_rate": latest_hiring.get('attrition_rate'),
+            "total_employment": latest_emp.get("employment_sa"),
+            "employment_change": employment_change or 0,
+            "hiring_rate": latest_hiring.get("hiring_rate"),
+            "attrition_rate": latest_hiring.get("attrition_rate"),
             "average_salary": national_avg_salary,
-            "latest_layoffs": latest_layoff.get('employees_laidoff'),
+            "latest_layoffs": latest_layoff.get("employees_laidoff"),
             "total_sectors": len(sectors),
-            "total_occupations": len(salaries_soc)
+            "total_occupations": len(salaries_soc),
         },
         "top_sectors_by_postings": sectors[:5],
-        "recent_layoffs": layoffs[:3]
+        "recent_layoffs": layoffs[:3],
     }
 
+
+def main():
+    """Main processing function."""
+    print("Processing RPLS data...")
+
+    # Create output directory
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Process all data
+    with connect() as con:
+        sectors = process_sector_summary(con)
+        salaries_soc = process_salary_by_occupation(con)
+        salaries_state, national_avg_salary = process_salary_by_state(con)
+        hiring_attrition = process_hiring_attrition(con)
+        layoffs = process_layoffs(con)
+        layoffs_by_sector = process_layoffs_by_sector(con)
+        employment_trends = process_employment_trends(con)
+        hiring_trends = process_hiring_trends(con)
+
+    summary = build_summary(employment_trends, hiring_trends, layoffs, national_avg_salary, sectors, salaries_soc)
+
     # Write JSON files
     files_to_write = {
         "summary.json": summary,
@@ -414,7 +324,7 @@ def main():
             json.dump(data, f, indent=2)
         print(f"  Wrote {filename}")
 
-    print(f"\nHealth Index: {health_index}/100 ({health_trend})")
+    print(f"\nHealth Index: {summary['health_index']}/100 ({summary['health_trend']})")
     print(f"Data files written to: {OUTPUT_DIR}")
     print("Done!")
 
@@ -0,0 +1,161 @@
+-- Full refreshes through shadow tables (backend/etl_supabase.py, SUPABASE_REFRESH=swap).
+-- The ETL loads every cleared table into _etl_shadow_<table> (a `like ... including all` copy
+-- plus the live table's foreign keys) while readers keep seeing the live tables, then swaps all
+-- of them in one transaction. The swap renames each shadow over its live table, so readers
+-- are only blocked (access exclusive lock) for the catalog updates, not for a copy of the data,
+-- and see either the old data or the new, never a partial load. The swapped-in tables keep
+-- the live tables' owner, grants, RLS settings and policies, publications, serial sequences
+-- and index and constraint names. Tables referenced by other tables' foreign keys or with triggers are
+-- refused by etl_prepare_shadow; a view on a live table makes the swap fail and roll back.
+
+create or replace function etl_prepare_shadow(tables text[], keep boolean default false, target_schema text default 'public')
+returns void
+language plpgsql
+security definer
+set search_path = ''
+as $$
+declare
+    t text;
+    live text;
+    shadow text;
+    r record;
+begin
+    foreach t in array tables loop
+        live := format('%I.%I', target_schema, t);
+        shadow := format('%I.%I', target_schema, '_etl_shadow_' || t);
+        -- The swap drops the live table, which would take these foreign keys and triggers with it
+        if exists (select from pg_constraint where contype = 'f' and confrelid = live::regclass) then
+            raise exception '% is referenced by a foreign key and cannot be swapped', live;
+        end if;
+        if exists (select from pg_trigger where tgrelid = live::regclass and not tgisinternal) then
+            raise exception '% has triggers and cannot be swapped', live;
+        end if;
+        if not keep then
+            execute format('drop table if exists %s', shadow);
+        end if;
+        execute format('create table if not exists %s (like %s including all)', shadow, live);
+        -- like ... including all copies everything but foreign keys
+        for r in
+            select conname, pg_get_constraintdef(oid) as def
+            from pg_constraint
+            where contype = 'f' and conrelid = live::regclass
+              and conname not in (select conname from pg_constraint where conrelid = shadow::regclass)
+        loop
+            execute format('alter table %s add constraint %I %s', shadow, r.conname, r.def);
+        end loop;
+        -- No policies until the swap: only the service role, which bypasses RLS, can read or write it
+        execute format('alter table %s enable row level security', shadow);
+    end loop;
+    notify pgrst, 'reload schema';
+end;
+$$;
+
+create or replace function etl_swap_shadow(tables text[], target_schema text default 'public')
+returns void
+language plpgsql
+security definer
+set search_path = ''
+as $$
+declare
+    t text;
+    live text;
+    shadow text;
+    live_oid oid;
+    shadow_oid oid;
+    r record;
+    live_indexes text[];
+    shadow_indexes text[];
+begin
+    -- Lock every live table first (in the given order) so the swap is all-or-nothing for readers
+    foreach t in array tables loop
+        execute format('lock table %I.%I in access exclusive mode', target_schema, t);
+    end loop;
+    foreach t in array tables loop
+        live := format('%I.%I', target_schema, t);
+        shadow := format('%I.%I', target_schema, '_etl_shadow_' || t);
+        live_oid := live::regclass;
+        shadow_oid := shadow::regclass;
+
+        -- Owner and grants: exactly the live table's
+        select * into r from pg_class where oid = live_oid;
+        execute format('alter table %s owner to %I', shadow, pg_get_userbyid(r.relowner));
+        execute format(
+            'alter table %s %s row level security, %s row level security', shadow,
+            case when r.relrowsecurity then 'enable' else 'disable' end,
+            case when r.relforcerowsecurity then 'force' else 'no force' end
+        );
+        execute format('revoke all on %s from public', shadow);
+        for r in
+            select distinct a.grantee from pg_class c, aclexplode(c.relacl) a
+            where c.oid = shadow_oid and a.grantee not in (0, c.relowner)
+        loop
+            execute format('revoke all on %s from %I', shadow, pg_get_userbyid(r.grantee));
+        end loop;
+        for r in
+            select a.grantee, a.privilege_type, a.is_grantable from pg_class c, aclexplode(c.relacl) a
+            where c.oid = live_oid and a.grantee <> c.relowner
+        loop
+            execute format(
+                'grant %s on %s to %s%s', r.privilege_type, shadow,
+                case when r.grantee = 0 then 'public' else quote_ident(pg_get_userbyid(r.grantee)) end,
+                case when r.is_grantable then ' with grant option' else '' end
+            );
+        end loop;
+
+        -- RLS policies and publication membership (Realtime)
+        for r in select * from pg_policies where schemaname = target_schema and tablename = t loop
+            execute format(
+                'create policy %I on %s as %s for %s to %s%s%s', r.policyname, shadow, r.permissive, r.cmd,
+                (select string_agg(case when role = 'public' then 'public' else quote_ident(role) end, ', ') from unnest(r.roles) as role),
+                coalesce(' using (' || r.qual || ')', ''),
+                coalesce(' with check (' || r.with_check || ')', '')
+            );
+        end loop;
+        for r in select p.pubname from pg_publication_rel pr join pg_publication p on p.oid = pr.prpubid where pr.prrelid = live_oid loop
+            execute format('alter publication %I add table %s', r.pubname, shadow);
+        end loop;
+
+        -- Pair each live index (and the constraint it backs) with its shadow copy by definition
+        with indexes as (
+            select i.indrelid, c.relname::text as name, i.indisunique, i.indisprimary,
+                   split_part(pg_get_indexdef(i.indexrelid), ' USING ', 2) as def
+            from pg_index i join pg_class c on c.oid = i.indexrelid
+            where i.indrelid in (live_oid, shadow_oid)
+        ), numbered as (
+            select *, row_number() over (partition by indrelid, def, indisunique, indisprimary order by name) as n
+            from indexes
+        )
+        select array_agg(l.name), array_agg(s.name) into live_indexes, shadow_indexes
+        from numbered l join numbered s using (def, indisunique, indisprimary, n)
+        where l.indrelid = live_oid and s.indrelid = shadow_oid;
+
+        -- Serial sequences the shadow's defaults share with the live table move over to the shadow
+        for r in
+            select d.objid::regclass::text as seq, a.attname
+            from pg_depend d join pg_attribute a on a.attrelid = d.refobjid and a.attnum = d.refobjsubid
+            where d.classid = 'pg_class'::regclass and d.refobjid = live_oid and d.deptype = 'a'
+              and d.objid in (select oid from pg_class where relkind = 'S')
+        loop
+            execute format('alter sequence %s owned by %s.%I', r.seq, shadow, r.attname);
+        end loop;
+
+        execute format('drop table %s', live);
+        execute format('alter table %s rename to %I', shadow, t);
+        for i in 1 .. coalesce(array_length(live_indexes, 1), 0) loop
+            execute format('alter index %I.%I rename to %I', target_schema, shadow_indexes[i], live_indexes[i]);
+        end loop;
+    end loop;
+    notify pgrst, 'reload schema';
+end;
+$$;
+
+do $$
+begin
+    if exists (select from pg_roles where rolname = 'service_role') then
+        revoke execute on function etl_prepare_shadow(text[], boolean, text) from public;
+        revoke execute on function etl_swap_shadow(text[], text) from public;
+        grant execute on function etl_prepare_shadow(text[], boolean, text) to service_role;
+        grant execute on function etl_swap_shadow(text[], text) to service_role;
+    end if;
+end;
+$$;
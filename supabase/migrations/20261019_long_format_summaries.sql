@@ -0,0 +1,25 @@
+-- Summary tables move from one wide table per file (a column per month) to one long table.
+-- The wide tables are derived data reloaded by every ETL run, so they are simply dropped.
+create table if not exists summary_values (
+    summary text not null,
+    entity_id text not null,
+    kind text not null check (kind in ('value', 'yoy', 'mom')),
+    month date not null,
+    label text,
+    value numeric,
+    primary key (summary, entity_id, kind, month)
+);
+create index if not exists idx_summary_values_entity on summary_values(entity_id);
+
+drop table if exists summary_sector;
+drop table if exists summary_occupation;
+drop table if exists summary_state;
+drop table if exists salary_overview_naics;
+drop table if exists salary_overview_soc;
+drop table if exists salary_overview_state;
+drop table if exists salary_overview_total;
+drop table if exists table_b_naics;
+drop table if exists table_b_soc;
+drop table if exists table_b_state;
+drop table if exists hiring_sector_summary;
+drop table if exists attrition_sector_summary;
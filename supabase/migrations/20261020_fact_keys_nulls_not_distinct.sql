@@ -0,0 +1,38 @@
+-- Fact table natural keys that match NULL dimensions (backend/etl_supabase.py CONFLICT_TARGETS).
+-- National and total rows have NULL sector/occupation/state ids, and a plain unique constraint
+-- treats NULLs as distinct: an upsert of such a row never conflicts, so every reload or delta
+-- update added a copy instead of replacing it. Duplicates already loaded are dropped (keeping
+-- the latest physical row) and each unique constraint is recreated as NULLS NOT DISTINCT
+-- under its old name. Needs Postgres 15.
+
+do $$
+declare
+    t text;
+    r record;
+    cols text;
+begin
+    foreach t in array array[
+        'fact_layoffs', 'fact_employment', 'fact_postings', 'fact_hiring_attrition', 'fact_salaries',
+        'fact_employment_multi', 'fact_postings_multi', 'fact_hiring_attrition_multi', 'fact_salaries_multi'
+    ] loop
+        continue when to_regclass(format('public.%I', t)) is null;
+        for r in
+            select c.conname, c.conkey from pg_constraint c
+            where c.conrelid = format('public.%I', t)::regclass and c.contype = 'u'
+        loop
+            select string_agg(quote_ident(a.attname), ', ' order by k.n) into cols
+            from unnest(r.conkey) with ordinality as k(attnum, n)
+            join pg_attribute a on a.attrelid = format('public.%I', t)::regclass and a.attnum = k.attnum;
+            execute format(
+                'delete from public.%I where ctid in (select ctid from (select ctid, row_number() over '
+                '(partition by %s order by ctid desc) as n from public.%I) as d where n > 1)',
+                t, cols, t
+            );
+            execute format(
+                'alter table public.%I drop constraint %I, add constraint %I unique nulls not distinct (%s)',
+                t, r.conname, r.conname, cols
+            );
+        end loop;
+    end loop;
+end
+$$;
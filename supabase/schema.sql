@@ -43,7 +43,7 @@ create table if not exists fact_layoffs (
     -- Granularity tracking
     granularity text not null check (granularity in ('total', 'sector', 'state')),
     
-    unique(date, sector_id, state_id, granularity)
+    unique nulls not distinct (date, sector_id, state_id, granularity)
 );
 
 -- Salaries
@@ -61,7 +61,7 @@ create table if not exists fact_salaries (
     
     granularity text not null check (granularity in ('national', 'sector', 'occupation', 'state', 'total')),
     
-    unique(date, sector_id, occupation_id, state_id, granularity)
+    unique nulls not distinct (date, sector_id, occupation_id, state_id, granularity)
 );
 
 -- Hiring & Attrition
@@ -80,7 +80,7 @@ create table if not exists fact_hiring_attrition (
     
     granularity text not null check (granularity in ('total', 'sector', 'occupation', 'state')),
     
-    unique(date, sector_id, occupation_id, state_id, granularity)
+    unique nulls not distinct (date, sector_id, occupation_id, state_id, granularity)
 );
 
 -- Job Postings
@@ -101,7 +101,7 @@ create table if not exists fact_postings (
     
     granularity text not null check (granularity in ('total', 'sector', 'occupation', 'state')),
     
-    unique(date, sector_id, occupation_id, state_id, granularity)
+    unique nulls not distinct (date, sector_id, occupation_id, state_id, granularity)
 );
 
 -- Employment
@@ -118,7 +118,7 @@ create table if not exists fact_employment (
     
     granularity text not null check (granularity in ('national', 'sector', 'occupation', 'state')),
     
-    unique(date, sector_id, occupation_id, state_id, granularity)
+    unique nulls not distinct (date, sector_id, occupation_id, state_id, granularity)
 );
 
 -- Indexes for Performance
@@ -137,7 +137,7 @@ create table if not exists fact_employment_multi (
     state_id text references dim_states(id),
     employment_nsa numeric,
     employment_sa numeric,
-    unique(date, sector_id, occupation_id, state_id)
+    unique nulls not distinct (date, sector_id, occupation_id, state_id)
 );
 create index idx_employment_multi_date on fact_employment_multi(date);
 
@@ -153,7 +153,7 @@ create table if not exists fact_postings_multi (
     new_postings_sa numeric,
     removed_postings_nsa numeric,
     removed_postings_sa numeric,
-    unique(date, sector_id, occupation_id, state_id)
+    unique nulls not distinct (date, sector_id, occupation_id, state_id)
 );
 create index idx_postings_multi_date on fact_postings_multi(date);
 
@@ -167,7 +167,7 @@ create table if not exists fact_hiring_attrition_multi (
     attrition_rate_nsa numeric,
     hiring_rate_sa numeric,
     attrition_rate_sa numeric,
-    unique(date, sector_id, occupation_id, state_id)
+    unique nulls not distinct (date, sector_id, occupation_id, state_id)
 );
 create index idx_hiring_attrition_multi_date on fact_hiring_attrition_multi(date);
 
@@ -181,122 +181,173 @@ create table if not exists fact_salaries_multi (
     salary_nsa numeric,
     salary_sa numeric,
     weight numeric,
-    unique(date, sector_id, occupation_id, state_id)
+    unique nulls not distinct (date, sector_id, occupation_id, state_id)
 );
 create index idx_salaries_multi_date on fact_salaries_multi(date);
 
--- Summary / Overview Tables
-create table if not exists summary_sector (
-    sector_id text primary key references dim_sectors(id),
-    aug_2025 numeric,
-    sep_2025 numeric,
-    oct_2025 numeric,
-    yoy numeric,
-    mom numeric
+-- Summary / Overview values, one row per (summary, entity, kind, month); see backend/summaries.py.
+-- summary: summary_sector, salary_overview_naics, table_b_state, ...; entity_id: the sector,
+-- occupation or state id ('_total' for national rows); kind: value | yoy | mom; label: source header
+create table if not exists summary_values (
+    summary text not null,
+    entity_id text not null,
+    kind text not null check (kind in ('value', 'yoy', 'mom')),
+    month date not null,
+    label text,
+    value numeric,
+    primary key (summary, entity_id, kind, month)
 );
+create index if not exists idx_summary_values_entity on summary_values(entity_id);
 
-create table if not exists summary_occupation (
-    occupation_id text primary key references dim_occupations(id),
-    aug_2025 numeric,
-    sep_2025 numeric,
-    oct_2025 numeric,
-    yoy numeric,
-    mom numeric
-);
-
-create table if not exists summary_state (
-    state_id text primary key references dim_states(id),
-    aug_2025 numeric,
-    sep_2025 numeric,
-    oct_2025 numeric,
-    yoy numeric,
-    mom numeric
-);
-
-create table if not exists salary_overview_naics (
-    sector_id text primary key references dim_sectors(id),
-    oct_2024 numeric,
-    aug_2025 numeric,
-    sep_2025 numeric,
-    oct_2025 numeric,
-    pct_change_yoy numeric,
-    pct_change_mom numeric
-);
-
-create table if not exists salary_overview_soc (
-    occupation_id text primary key references dim_occupations(id),
-    oct_2024 numeric,
-    aug_2025 numeric,
-    sep_2025 numeric,
-    oct_2025 numeric,
-    pct_change_yoy numeric,
-    pct_change_mom numeric
-);
+-- ETL full-refresh helpers (shadow tables swapped in atomically)
+create or replace function etl_prepare_shadow(tables text[], keep boolean default false, target_schema text default 'public')
+returns void
+language plpgsql
+security definer
+set search_path = ''
+as $$
+declare
+    t text;
+    live text;
+    shadow text;
+    r record;
+begin
+    foreach t in array tables loop
+        live := format('%I.%I', target_schema, t);
+        shadow := format('%I.%I', target_schema, '_etl_shadow_' || t);
+        -- The swap drops the live table, which would take these foreign keys and triggers with it
+        if exists (select from pg_constraint where contype = 'f' and confrelid = live::regclass) then
+            raise exception '% is referenced by a foreign key and cannot be swapped', live;
+        end if;
+        if exists (select from pg_trigger where tgrelid = live::regclass and not tgisinternal) then
+            raise exception '% has triggers and cannot be swapped', live;
+        end if;
+        if not keep then
+            execute format('drop table if exists %s', shadow);
+        end if;
+        execute format('create table if not exists %s (like %s including all)', shadow, live);
+        -- like ... including all copies everything but foreign keys
+        for r in
+            select conname, pg_get_constraintdef(oid) as def
+            from pg_constraint
+            where contype = 'f' and conrelid = live::regclass
+              and conname not in (select conname from pg_constraint where conrelid = shadow::regclass)
+        loop
+            execute format('alter table %s add constraint %I %s', shadow, r.conname, r.def);
+        end loop;
+        -- No policies until the swap: only the service role, which bypasses RLS, can read or write it
+        execute format('alter table %s enable row level security', shadow);
+    end loop;
+    notify pgrst, 'reload schema';
+end;
+$$;
 
-create table if not exists salary_overview_state (
-    state_id text primary key references dim_states(id),
-    oct_2024 numeric,
-    aug_2025 numeric,
-    sep_2025 numeric,
-    oct_2025 numeric,
-    pct_change_yoy numeric,
-    pct_change_mom numeric
-);
+create or replace function etl_swap_shadow(tables text[], target_schema text default 'public')
+returns void
+language plpgsql
+security definer
+set search_path = ''
+as $$
+declare
+    t text;
+    live text;
+    shadow text;
+    live_oid oid;
+    shadow_oid oid;
+    r record;
+    live_indexes text[];
+    shadow_indexes text[];
+begin
+    -- Lock every live table first (in the given order) so the swap is all-or-nothing for readers
+    foreach t in array tables loop
+        execute format('lock table %I.%I in access exclusive mode', target_schema, t);
+    end loop;
+    foreach t in array tables loop
+        live := format('%I.%I', target_schema, t);
+        shadow := format('%I.%I', target_schema, '_etl_shadow_' || t);
+        live_oid := live::regclass;
+        shadow_oid := shadow::regclass;
 
-create table if not exists salary_overview_total (
-    id text primary key default 'total',
-    oct_2024 numeric,
-    aug_2025 numeric,
-    sep_2025 numeric,
-    oct_2025 numeric,
-    pct_change_yoy numeric,
-    pct_change_mom numeric
-);
+        -- Owner and grants: exactly the live table's
+        select * into r from pg_class where oid = live_oid;
+        execute format('alter table %s owner to %I', shadow, pg_get_userbyid(r.relowner));
+        execute format(
+            'alter table %s %s row level security, %s row level security', shadow,
+            case when r.relrowsecurity then 'enable' else 'disable' end,
+            case when r.relforcerowsecurity then 'force' else 'no force' end
+        );
+        execute format('revoke all on %s from public', shadow);
+        for r in
+            select distinct a.grantee from pg_class c, aclexplode(c.relacl) a
+            where c.oid = shadow_oid and a.grantee not in (0, c.relowner)
+        loop
+            execute format('revoke all on %s from %I', shadow, pg_get_userbyid(r.grantee));
+        end loop;
+        for r in
+            select a.grantee, a.privilege_type, a.is_grantable from pg_class c, aclexplode(c.relacl) a
+            where c.oid = live_oid and a.grantee <> c.relowner
+        loop
+            execute format(
+                'grant %s on %s to %s%s', r.privilege_type, shadow,
+                case when r.grantee = 0 then 'public' else quote_ident(pg_get_userbyid(r.grantee)) end,
+                case when r.is_grantable then ' with grant option' else '' end
+            );
+        end loop;
 
-create table if not exists table_b_naics (
-    sector_id text primary key references dim_sectors(id),
-    oct_2024 numeric,
-    aug_2025 numeric,
-    sep_2025 numeric,
-    oct_2025 numeric,
-    diff_yoy numeric,
-    diff_mom numeric
-);
+        -- RLS policies and publication membership (Realtime)
+        for r in select * from pg_policies where schemaname = target_schema and tablename = t loop
+            execute format(
+                'create policy %I on %s as %s for %s to %s%s%s', r.policyname, shadow, r.permissive, r.cmd,
+                (select string_agg(case when role = 'public' then 'public' else quote_ident(role) end, ', ') from unnest(r.roles) as role),
+                coalesce(' using (' || r.qual || ')', ''),
+                coalesce(' with check (' || r.with_check || ')', '')
+            );
+        end loop;
+        for r in select p.pubname from pg_publication_rel pr join pg_publication p on p.oid = pr.prpubid where pr.prrelid = live_oid loop
+            execute format('alter publication %I add table %s', r.pubname, shadow);
+        end loop;
 
-create table if not exists table_b_soc (
-    occupation_id text primary key references dim_occupations(id),
-    oct_2024 numeric,
-    aug_2025 numeric,
-    sep_2025 numeric,
-    oct_2025 numeric,
-    diff_yoy numeric,
-    diff_mom numeric
-);
+        -- Pair each live index (and the constraint it backs) with its shadow copy by definition
+        with indexes as (
+            select i.indrelid, c.relname::text as name, i.indisunique, i.indisprimary,
+                   split_part(pg_get_indexdef(i.indexrelid), ' USING ', 2) as def
+            from pg_index i join pg_class c on c.oid = i.indexrelid
+            where i.indrelid in (live_oid, shadow_oid)
+        ), numbered as (
+            select *, row_number() over (partition by indrelid, def, indisunique, indisprimary order by name) as n
+            from indexes
+        )
+        select array_agg(l.name), array_agg(s.name) into live_indexes, shadow_indexes
+        from numbered l join numbered s using (def, indisunique, indisprimary, n)
+        where l.indrelid = live_oid and s.indrelid = shadow_oid;
 
-create table if not exists table_b_state (
-    state_id text primary key references dim_states(id),
-    oct_2024 numeric,
-    aug_2025 numeric,
-    sep_2025 numeric,
-    oct_2025 numeric,
-    diff_yoy numeric,
-    diff_mom numeric
-);
+        -- Serial sequences the shadow's defaults share with the live table move over to the shadow
+        for r in
+            select d.objid::regclass::text as seq, a.attname
+            from pg_depend d join pg_attribute a on a.attrelid = d.refobjid and a.attnum = d.refobjsubid
+            where d.classid = 'pg_class'::regclass and d.refobjid = live_oid and d.deptype = 'a'
+              and d.objid in (select oid from pg_class where relkind = 'S')
+        loop
+            execute format('alter sequence %s owned by %s.%I', r.seq, shadow, r.attname);
+        end loop;
 
-create table if not exists hiring_sector_summary (
-    sector_id text primary key references dim_sectors(id),
-    aug_2025 numeric,
-    sep_2025 numeric,
-    oct_2025 numeric,
-    yoy_pp numeric,
-    mom_pp numeric
-);
+        execute format('drop table %s', live);
+        execute format('alter table %s rename to %I', shadow, t);
+        for i in 1 .. coalesce(array_length(live_indexes, 1), 0) loop
+            execute format('alter index %I.%I rename to %I', target_schema, shadow_indexes[i], live_indexes[i]);
+        end loop;
+    end loop;
+    notify pgrst, 'reload schema';
+end;
+$$;
 
-create table if not exists attrition_sector_summary (
-    sector_id text primary key references dim_sectors(id),
-    aug_2025 numeric,
-    sep_2025 numeric,
-    oct_2025 numeric,
-    yoy_pp numeric,
-    mom_pp numeric
-);
+do $$
+begin
+    if exists (select from pg_roles where rolname = 'service_role') then
+        revoke execute on function etl_prepare_shadow(text[], boolean, text) from public;
+        revoke execute on function etl_swap_shadow(text[], text) from public;
+        grant execute on function etl_prepare_shadow(text[], boolean, text) to service_role;
+        grant execute on function etl_swap_shadow(text[], text) to service_role;
+    end if;
+end;
+$$;